@@ -1,13 +1,35 @@
 import os
 import pandas as pd
-import re
+import sys
 from catboost import CatBoostClassifier, Pool
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 
-# データ格納フォルダからformatted_ohlc_{date}.csvに合致するCSVファイル名のみ取得する
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from util.log import Log
+from util.feature_dtype import FeatureDtype
+from util.feature_manifest import FeatureManifest
+from util.feature_store import FeatureStore
+from util.frame_store import FrameStore
+from util.schema import Schema
+
+# 成形済データはCSV・Parquet・Featherのいずれか(CSVはカラムごとに小さい型を指定して読み込む)
+log = Log()
+frame_store = FrameStore(log, Schema(log, FeatureDtype(log)))
+
+# データ格納フォルダからformatted_ohlc_{date}.csv/.parquet/.featherに合致するファイル名のみ取得する
 data_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'csv', 'past_ohlc', 'formatted')
-csv_files = [csv_file for csv_file in os.listdir(data_dir) if re.fullmatch(r'formatted_ohlc_\d{8}.csv', csv_file)]
+
+# 説明変数のバージョンを固定する場合に指定する(manage_feature_store.py listで確認)
+# 指定した場合はバージョンの指標が全て計算済のファイルのみ、バージョンにない指標のカラムを除いて読み込む ※Noneの場合は全て
+feature_set_version = None
+feature_store = FeatureStore(log, frame_store, FeatureManifest(log))
+feature_store.set_dir(data_dir)
+
+if feature_set_version is None:
+    csv_files = frame_store.get_file_list(data_dir, r'formatted_ohlc_\d{8}')
+else:
+    csv_files = feature_store.get_file_list(feature_set_version)
 
 # 最後のデータはテストデータとして使用するので分割
 train_csv_names = csv_files[:-1]
@@ -39,6 +61,14 @@ leak_columns = ['change_1min_price', 'change_1min_rate', 'change_1min_flag',
 #### 説明変数として使えないカラム
 cant_use_columns = not_related_columns + leak_columns + [target_column]
 
+def read_data(file_path):
+    '''説明変数として使うカラムと目的変数のみを読み込む(Parquet/Featherはそれ以外のカラムをファイルから読まない)'''
+    columns = frame_store.get_columns(file_path)
+    if feature_set_version is not None:
+        columns = feature_store.select_columns(os.path.basename(file_path), feature_set_version, columns)
+    use_columns = [column for column in columns if column not in cant_use_columns]
+    return frame_store.read(file_path, columns = use_columns + [target_column], use_dtype = True)
+
 
 # 学習済みのモデルがあるか
 model = CatBoostClassifier(iterations=30, learning_rate=0.1, depth=6, loss_function='Logloss', verbose=10)
@@ -49,7 +79,7 @@ for index, train_csv_name in enumerate(train_csv_names):
     # メモリ開放
     train_df = None
     # 訓練用データの読み込み
-    train_df = pd.read_csv(os.path.join(data_dir, train_csv_name))
+    train_df = read_data(os.path.join(data_dir, train_csv_name))
 
     # 9:30以前と15:00以降のデータを削除
     train_df = train_df[30:-25]
@@ -69,7 +99,7 @@ for index, train_csv_name in enumerate(train_csv_names):
     df_balanced = pd.concat([df_0_under, df_1])
 
     # 特徴量と目的変数に分割
-    X_train = df_balanced.drop(cant_use_columns, axis=1)
+    X_train = df_balanced.drop(cant_use_columns, axis=1, errors='ignore')
     y_train = df_balanced[target_column]
 
     # stock_codeはカテゴリ変数なので、文字列型に変換
@@ -111,13 +141,13 @@ for index, train_csv_name in enumerate(train_csv_names):
 #### テストデータでの予測
 
 # テスト用データの読み込み
-test_df = pd.read_csv(os.path.join(data_dir, test_csv_name))
+test_df = read_data(os.path.join(data_dir, test_csv_name))
 
 # 9:30以前と15:00以降のデータを削除
 test_df = test_df[30:-25]
 
 # 特徴量と目的変数に分割
-X_test = test_df.drop(cant_use_columns, axis=1)
+X_test = test_df.drop(cant_use_columns, axis=1, errors='ignore')
 y_test = test_df[target_column]
 
 # stock_codeはカテゴリ変数なので、文字列型に変換
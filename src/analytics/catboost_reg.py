@@ -1,7 +1,6 @@
 import custom_loss as cl
 import os
 import pandas as pd
-import re
 import sys
 import time
 from catboost import CatBoostRegressor, Pool
@@ -10,12 +9,30 @@ from sklearn.metrics import root_mean_squared_error, mean_absolute_error, r2_sco
 
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 from util.log import Log
+from util.feature_dtype import FeatureDtype
+from util.feature_manifest import FeatureManifest
+from util.feature_store import FeatureStore
+from util.frame_store import FrameStore
+from util.schema import Schema
 
 log = Log()
 
-# データ格納フォルダからformatted_ohlc_{date}.csvに合致するCSVファイル名のみ取得する
+# 成形済データはCSV・Parquet・Featherのいずれか(CSVはカラムごとに小さい型を指定して読み込む)
+frame_store = FrameStore(log, Schema(log, FeatureDtype(log)))
+
+# データ格納フォルダからformatted_ohlc_{date}.csv/.parquet/.featherに合致するファイル名のみ取得する
 data_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'csv', 'past_ohlc', 'formatted')
-csv_files = [csv_file for csv_file in os.listdir(data_dir) if re.fullmatch(r'formatted_ohlc_\d{8}.csv', csv_file)]
+
+# 説明変数のバージョンを固定する場合に指定する(manage_feature_store.py listで確認)
+# 指定した場合はバージョンの指標が全て計算済のファイルのみ、バージョンにない指標のカラムを除いて読み込む ※Noneの場合は全て
+feature_set_version = None
+feature_store = FeatureStore(log, frame_store, FeatureManifest(log))
+feature_store.set_dir(data_dir)
+
+if feature_set_version is None:
+    csv_files = frame_store.get_file_list(data_dir, r'formatted_ohlc_\d{8}')
+else:
+    csv_files = feature_store.get_file_list(feature_set_version)
 
 csv_counter = 0
 
@@ -23,6 +40,14 @@ csv_counter = 0
 train_csv_names = csv_files[:-1]
 test_csv_name = csv_files[-1]
 
+def read_data(file_path, cant_use_columns, target_column):
+    '''説明変数として使うカラムと目的変数のみを読み込む(Parquet/Featherはそれ以外のカラムをファイルから読まない)'''
+    columns = frame_store.get_columns(file_path)
+    if feature_set_version is not None:
+        columns = feature_store.select_columns(os.path.basename(file_path), feature_set_version, columns)
+    use_columns = [column for column in columns if column not in cant_use_columns]
+    return frame_store.read(file_path, columns = use_columns + [target_column], use_dtype = True)
+
 for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
 
     # x分後の数値予測を行う
@@ -116,7 +141,7 @@ for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
         # 訓練用データの読み込み
         while True:
             try:
-                train_df = pd.read_csv(os.path.join(data_dir, train_csv_name))
+                train_df = read_data(os.path.join(data_dir, train_csv_name), cant_use_columns, target_column)
                 break
             except Exception as e:
                 log.error(e)
@@ -130,7 +155,7 @@ for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
         train_df = train_df.dropna(subset=[target_column])
 
         # 特徴量と目的変数に分割
-        X_train = train_df.drop(cant_use_columns, axis=1)
+        X_train = train_df.drop(cant_use_columns, axis=1, errors='ignore')
         y_train = train_df[target_column]
 
         # stock_codeをカテゴリ型に変換
@@ -172,7 +197,7 @@ for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
 
     while True:
         try:
-            test_df = pd.read_csv(os.path.join(data_dir, test_csv_name))
+            test_df = read_data(os.path.join(data_dir, test_csv_name), cant_use_columns, target_column)
             break
         except Exception as e:
             log.error(e)
@@ -186,7 +211,7 @@ for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
     test_df = test_df.dropna(subset=[target_column])
 
     # 特徴量と目的変数に分割
-    X_test = test_df.drop(cant_use_columns, axis=1)
+    X_test = test_df.drop(cant_use_columns, axis=1, errors='ignore')
     y_test = test_df[target_column]
 
     # stock_codeをカテゴリ型に変換
@@ -1,7 +1,5 @@
 import custom_loss as cl
 import os
-import pandas as pd
-import re
 import time
 import sys
 from catboost import CatBoostRegressor, Pool
@@ -12,17 +10,43 @@ from bayes_opt import BayesianOptimization
 
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 from util.log import Log
+from util.feature_dtype import FeatureDtype
+from util.feature_manifest import FeatureManifest
+from util.feature_store import FeatureStore
+from util.frame_store import FrameStore
+from util.schema import Schema
 
 log = Log()
 
-# データ格納フォルダからformatted_ohlc_{date}.csvに合致するCSVファイル名のみ取得する
+# 成形済データはCSV・Parquet・Featherのいずれか(CSVはカラムごとに小さい型を指定して読み込む)
+frame_store = FrameStore(log, Schema(log, FeatureDtype(log)))
+
+# データ格納フォルダからformatted_ohlc_{date}.csv/.parquet/.featherに合致するファイル名のみ取得する
 data_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'csv', 'past_ohlc', 'formatted')
-csv_files = [csv_file for csv_file in os.listdir(data_dir) if re.fullmatch(r'formatted_ohlc_\d{8}.csv', csv_file)]
+
+# 説明変数のバージョンを固定する場合に指定する(manage_feature_store.py listで確認)
+# 指定した場合はバージョンの指標が全て計算済のファイルのみ、バージョンにない指標のカラムを除いて読み込む ※Noneの場合は全て
+feature_set_version = None
+feature_store = FeatureStore(log, frame_store, FeatureManifest(log))
+feature_store.set_dir(data_dir)
+
+if feature_set_version is None:
+    csv_files = frame_store.get_file_list(data_dir, r'formatted_ohlc_\d{8}')
+else:
+    csv_files = feature_store.get_file_list(feature_set_version)
 
 # 最後のデータはテストデータとして使用するので分割 軽量化のためデータ量は5日分で
 train_csv_names = csv_files[:5]
 test_csv_name = csv_files[-1]
 
+def read_data(file_path, cant_use_columns, target_column):
+    '''説明変数として使うカラムと目的変数のみを読み込む(Parquet/Featherはそれ以外のカラムをファイルから読まない)'''
+    columns = frame_store.get_columns(file_path)
+    if feature_set_version is not None:
+        columns = feature_store.select_columns(os.path.basename(file_path), feature_set_version, columns)
+    use_columns = [column for column in columns if column not in cant_use_columns]
+    return frame_store.read(file_path, columns = use_columns + [target_column], use_dtype = True)
+
 def catboost_cv(iterations, learning_rate, depth, l2_leaf_reg):
     log.info(datetime.now())
     log.info(f'パラメータ iterations: {int(iterations)}, learning_rate: {round(learning_rate, 3)}, depth: {int(depth)}, l2_leaf_reg: {round(l2_leaf_reg, 2)}')
@@ -127,7 +151,7 @@ def catboost_cv(iterations, learning_rate, depth, l2_leaf_reg):
         # 訓練用データの読み込み
         while True:
             try:
-                train_df = pd.read_csv(os.path.join(data_dir, train_csv_name))
+                train_df = read_data(os.path.join(data_dir, train_csv_name), cant_use_columns, target_column)
                 break
             except Exception as e:
                 log.info(e)
@@ -141,7 +165,7 @@ def catboost_cv(iterations, learning_rate, depth, l2_leaf_reg):
         train_df = train_df.dropna(subset=[target_column])
 
         # 特徴量と目的変数に分割
-        X_train = train_df.drop(cant_use_columns, axis=1)
+        X_train = train_df.drop(cant_use_columns, axis=1, errors='ignore')
         y_train = train_df[target_column]
 
         # stock_codeはカテゴリ変数なので、文字列型に変換
@@ -180,7 +204,7 @@ def catboost_cv(iterations, learning_rate, depth, l2_leaf_reg):
 
     while True:
         try:
-            test_df = pd.read_csv(os.path.join(data_dir, test_csv_name))
+            test_df = read_data(os.path.join(data_dir, test_csv_name), cant_use_columns, target_column)
             break
         except Exception as e:
             log.info(e)
@@ -194,7 +218,7 @@ def catboost_cv(iterations, learning_rate, depth, l2_leaf_reg):
     test_df = test_df.dropna(subset=[target_column])
 
     # 特徴量と目的変数に分割
-    X_test = test_df.drop(cant_use_columns, axis=1)
+    X_test = test_df.drop(cant_use_columns, axis=1, errors='ignore')
     y_test = test_df[target_column]
 
     # stock_codeはカテゴリ変数なので、文字列型に変換
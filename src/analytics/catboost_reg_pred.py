@@ -1,9 +1,21 @@
 import os
 import pandas as pd
+import sys
 from catboost import CatBoostRegressor, Pool
 from sklearn.metrics import root_mean_squared_error, mean_absolute_error, r2_score
 
-# テストデータのCSVファイル名
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from util.log import Log
+from util.feature_dtype import FeatureDtype
+from util.frame_store import FrameStore
+from util.schema import Schema
+
+# 成形済データはCSV・Parquet・Featherのいずれか(CSVはカラムごとに小さい型を指定して読み込む)
+log = Log()
+schema = Schema(log, FeatureDtype(log))
+frame_store = FrameStore(log, schema)
+
+# テストデータのファイル名(.csv/.parquet/.feather)
 test_csv_name = 'formatted_ohlc_20250228.csv'
 
 # 学習済モデルと予測を行うファイルの保管ディレクトリのパス
@@ -93,8 +105,11 @@ for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
     # 目的変数のカラム名
     target_column = f'change_{minute}min_rate'
 
-    # 予測を行うデータの読み込み
-    test_df = pd.read_csv(os.path.join(test_data_dir, test_csv_name))
+    # 予測結果のカラム(予測値を除く) ※カラム順と型はschema.pyのpredictionで管理する
+    keep_columns = schema.get_columns('prediction', minute = minute)[:-1]
+
+    # 予測を行うデータの読み込み(モデルの説明変数と予測結果に残すカラムのみ)
+    test_df = frame_store.read(os.path.join(test_data_dir, test_csv_name), columns = list(model.feature_names_) + keep_columns, use_dtype = True)
 
     # timestampカラムをdatetime型に変換して、9:30以前と15:00以降のデータを削除
     test_df['timestamp'] = pd.to_datetime(test_df['timestamp'])
@@ -104,7 +119,8 @@ for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
     test_df = test_df.dropna(subset=[target_column])
 
     # 特徴量と目的変数に分割
-    X_test = test_df.drop(cant_use_columns, axis=1)
+    # 説明変数を絞って成形したデータは余分なカラムを持つことがあるので、学習時の説明変数を学習時の順に取り出す
+    X_test = test_df.drop(cant_use_columns, axis=1, errors='ignore')[model.feature_names_]
     y_test = test_df[target_column]
 
     # stock_codeをカテゴリ型に変更
@@ -117,7 +133,6 @@ for minute in [1, 2, 3, 5, 10, 15, 30, 60, 90]:
     y_pred = model.predict(test_pool)
 
     # 一部カラムのみを切り出して、予測値を結合する
-    keep_columns = ['stock_code', 'timestamp', 'open', 'high', 'low', 'close', 'volume', f'change_{minute}min_flag', f'change_{minute}min_price', f'change_{minute}min_rate']
     test_df_result = test_df[keep_columns].copy()
     test_df_result[f'pred_change_{minute}min_rate'] = y_pred
 
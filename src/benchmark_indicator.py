@@ -0,0 +1,107 @@
+import config
+import os
+import sys
+from datetime import datetime
+from base import Base
+
+class BenchmarkIndicator(Base):
+    '''
+    テクニカル指標(util/indicator.py)の計算時間を合成データで計測し、ベースラインと比較する
+
+    Usage:
+        python benchmark_indicator.py run [day,month,year]      : 計測してレポートを保存し、ベースラインと比較 ※劣化があれば終了コード1
+        python benchmark_indicator.py baseline [day,month,year] : 計測してベースラインとして保存
+        python benchmark_indicator.py compare レポートのパス      : 保存済のレポートをベースラインと比較 ※劣化があれば終了コード1
+    '''
+    def __init__(self):
+        super().__init__(use_db = False, use_api = False)
+        self.benchmark_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'benchmark')
+        self.baseline_path = os.path.join(self.benchmark_dir, 'baseline.json')
+        self.benchmark = self.util.indicator_benchmark
+
+    def main(self):
+        '''メイン処理'''
+        command = sys.argv[1] if len(sys.argv) >= 2 else ''
+        size_list = sys.argv[2].split(',') if len(sys.argv) >= 3 and command in ['run', 'baseline'] else None
+
+        if command == 'run':
+            result, report = self.run(size_list)
+            if result == False:
+                sys.exit(1)
+            report_path = os.path.join(self.benchmark_dir, f'report_{datetime.now().strftime("%Y%m%d%H%M%S")}.json')
+            self.benchmark.save_report(report, report_path)
+            self.log.info(f'計測結果を保存しました ファイルパス: {report_path}')
+            if self.compare(report) == False:
+                sys.exit(1)
+        elif command == 'baseline':
+            result, report = self.run(size_list)
+            if result == False:
+                sys.exit(1)
+            if self.benchmark.save_report(report, self.baseline_path):
+                self.log.info(f'ベースラインを保存しました ファイルパス: {self.baseline_path}')
+        elif command == 'compare' and len(sys.argv) >= 3:
+            result, report = self.benchmark.load_report(sys.argv[2])
+            if result == False or report is None:
+                self.log.error(f'レポートが読み込めません ファイルパス: {sys.argv[2]}')
+                sys.exit(1)
+            if self.compare(report) == False:
+                sys.exit(1)
+        else:
+            print(self.__doc__)
+
+    def run(self, size_list):
+        '''
+        計測を行い結果を表示する
+
+        Args:
+            size_list(list or None): 計測するデータ量 ※Noneの場合は全て
+
+        Returns:
+            bool: 実行結果
+            report(dict): 計測結果
+        '''
+        self.log.info('テクニカル指標のベンチマーク開始')
+        result, report = self.benchmark.run(size_list)
+        if result == False:
+            self.log.error('テクニカル指標のベンチマークに失敗しました')
+            return False, None
+
+        for key, case in report['results'].items():
+            print(f'{key}: {case["seconds"] * 1000:.2f}ms ({case["rows"]}行)')
+        self.log.info('テクニカル指標のベンチマーク終了')
+        return True, report
+
+    def compare(self, report):
+        '''
+        計測結果をベースラインと比較して表示する
+
+        Args:
+            report(dict): 計測結果
+
+        Returns:
+            bool: 劣化がなければTrue ※ベースラインがない場合もTrue
+        '''
+        result, baseline = self.benchmark.load_report(self.baseline_path)
+        if result == False:
+            return False
+        if baseline is None:
+            self.log.warning(f'ベースラインが存在しないため比較しません ファイルパス: {self.baseline_path}')
+            return True
+
+        comparison_list = self.benchmark.compare(report, baseline, config.BENCHMARK_REGRESSION_THRESHOLD)
+        regression_list = [comparison for comparison in comparison_list if comparison['regression']]
+
+        for comparison in comparison_list:
+            mark = ' <- 劣化' if comparison['regression'] else ''
+            print(f'{comparison["key"]}: {comparison["baseline"] * 1000:.2f}ms -> {comparison["seconds"] * 1000:.2f}ms (x{comparison["ratio"]}){mark}')
+
+        if len(regression_list) != 0:
+            self.log.error(f'ベースラインの{config.BENCHMARK_REGRESSION_THRESHOLD}倍以上の時間がかかったケースがあります 件数: {len(regression_list)}')
+            return False
+
+        self.log.info(f'ベースラインと比較して劣化はありません 比較件数: {len(comparison_list)}')
+        return True
+
+if __name__ == '__main__':
+    bi = BenchmarkIndicator()
+    bi.main()
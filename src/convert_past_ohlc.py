@@ -0,0 +1,44 @@
+import os
+import sys
+from base import Base
+
+class ConvertPastOhlc(Base):
+    '''
+    成形済のデータ(csv/past_ohlc/formatted/formatted_ohlc_yyyymmdd.xxx)を別の保存形式に変換する
+    ※変換元のファイルは残す 同じ日付で複数の形式がある場合、学習スクリプトはParquet→Feather→CSVの順に優先して読み込む
+
+    Usage:
+        python convert_past_ohlc.py csv [yyyymmdd]      : CSVに書き出す(既存のCSVを使うスクリプト向け)
+        python convert_past_ohlc.py parquet [yyyymmdd]  : Parquet(zstd圧縮)に変換する
+        python convert_past_ohlc.py feather [yyyymmdd]  : Feather(Arrow IPC, zstd圧縮)に変換する
+    '''
+    def __init__(self):
+        super().__init__(use_db = False, use_api = False)
+        self.formatted_csv_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc', 'formatted')
+        self.frame_store = self.util.frame_store
+
+    def main(self):
+        '''メイン処理'''
+        file_format = sys.argv[1] if len(sys.argv) >= 2 else ''
+        date = sys.argv[2] if len(sys.argv) >= 3 else r'\d{8}'
+
+        # 変換先の形式が使えるか確認
+        if self.frame_store.set_format(file_format) == False:
+            print(self.__doc__)
+            return
+
+        # 日付ごとに優先する形式のファイルを変換元にする ※既に変換先の形式のファイルがある日付は除く
+        file_list = [file_name for file_name in self.frame_store.get_file_list(self.formatted_csv_dir, f'formatted_ohlc_{date}')
+                     if self.frame_store.get_format(file_name) != file_format]
+
+        self.log.info(f'成形済データの形式変換開始 変換先の形式: {file_format} 対象ファイル数: {len(file_list)}')
+        for file_name in sorted(file_list):
+            result, output_path = self.frame_store.convert(os.path.join(self.formatted_csv_dir, file_name), file_format)
+            if result == False:
+                continue
+            print(f'{file_name} -> {os.path.basename(output_path)}')
+        self.log.info('成形済データの形式変換終了')
+
+if __name__ == '__main__':
+    cpo = ConvertPastOhlc()
+    cpo.main()
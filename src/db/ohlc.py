@@ -336,4 +336,69 @@ class Ohlc():
             return True, cursor.rowcount
         except Exception as e:
             self.log.error(f'四本値テーブルのレコード追加または更新処理でエラー\n{e}\n{traceback.format_exc()}')
-            return False, 0
\ No newline at end of file
+            return False, 0
+
+    def upsert_many(self, ohlc_list):
+        '''
+        四本値テーブル(ohlc)のレコードを複数行まとめて追加または更新する
+
+        1回のINSERT文(複数行のVALUES)で実行する 同じ銘柄・取引時間のデータが複数ある場合は後のデータで更新される
+
+        Args:
+            ohlc_list(list[dict]): 追加または更新データのリスト ※各データの項目はupsertと同じ
+
+        Returns:
+            result(bool): SQL実行結果
+            row_count(int): 影響を受けた行数 ※追加は1行、更新は2行として数えられる
+        '''
+        if len(ohlc_list) == 0:
+            return True, 0
+
+        try:
+            with self.conn.cursor() as cursor:
+                # ON DUPLICATE KEY UPDATEで別名(new)を使う場合はexecutemanyで複数行にまとめられないため、VALUESを行数分並べる
+                sql = f'''
+                    INSERT INTO ohlc
+                    (
+                        symbol,
+                        trade_time,
+                        open_price,
+                        high_price,
+                        low_price,
+                        close_price,
+                        volume,
+                        total_volume,
+                        status
+                    )
+                    VALUES
+                        {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(ohlc_list))}
+                    as new
+                    ON DUPLICATE KEY UPDATE
+                        high_price = new.high_price,
+                        low_price = new.low_price,
+                        close_price = new.close_price,
+                        volume = new.volume,
+                        total_volume = new.total_volume,
+                        status = new.status
+                '''
+
+                params = []
+                for ohlc_data in ohlc_list:
+                    params.extend([
+                        ohlc_data['symbol'],
+                        ohlc_data['trade_time'],
+                        ohlc_data['open_price'],
+                        ohlc_data['high_price'],
+                        ohlc_data['low_price'],
+                        ohlc_data['close_price'],
+                        ohlc_data['volume'],
+                        ohlc_data['total_volume'],
+                        ohlc_data['status']
+                    ])
+
+                cursor.execute(sql, params)
+
+            return True, cursor.rowcount
+        except Exception as e:
+            self.log.error(f'四本値テーブルのレコード一括追加または更新処理でエラー 件数: {len(ohlc_list)}\n{e}\n{traceback.format_exc()}')
+            return False, 0
@@ -0,0 +1,97 @@
+import config
+import os
+import sys
+from datetime import datetime
+from base import Base
+
+class ManageFeatureStore(Base):
+    '''
+    成形済データ(mold_past_ohlc.pyで作成)の説明変数のバージョンの確認・再計算を行う
+
+    Usage:
+        python manage_feature_store.py list               : 登録済の説明変数のバージョンを表示
+        python manage_feature_store.py status [バージョン] : バージョンの指標が計算済のファイル数を表示 ※省略時は現在の定義
+        python manage_feature_store.py update [prune]     : 定義・計算ロジックが変わった指標のみ全ファイルで計算し直す
+                                                            ※pruneを指定した場合は現在の定義にない指標のカラムを削除
+    '''
+    def __init__(self):
+        super().__init__(use_db = False, use_api = False)
+        self.formatted_csv_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc', 'formatted')
+        self.indicator_cache_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc', 'indicator_cache')
+        self.store = self.util.feature_store
+        self.store.set_dir(self.formatted_csv_dir)
+        self.logic = self.service.preprocess.past_record_mold
+
+    def main(self):
+        '''メイン処理'''
+        command = sys.argv[1] if len(sys.argv) >= 2 else ''
+
+        if command == 'list':
+            self.list()
+        elif command == 'status':
+            self.status(sys.argv[2] if len(sys.argv) >= 3 else None)
+        elif command == 'update':
+            self.update(len(sys.argv) >= 3 and sys.argv[2] == 'prune')
+        else:
+            print(self.__doc__)
+
+    def set_feature_spec(self):
+        '''
+        mold_past_ohlc.pyと同じ設定で、現在の説明変数の定義を設定する
+
+        Returns:
+            bool: 実行結果
+        '''
+        self.util.indicator_cache.set_cache_dir(self.indicator_cache_dir if config.INDICATOR_CACHE else None, config.INDICATOR_CACHE_MAX_SIZE_MB)
+
+        # モデルで使う説明変数の一覧がある場合は必要な指標のみ
+        if config.FEATURE_MANIFEST is not None:
+            result, required_columns = self.util.feature_manifest.load(config.FEATURE_MANIFEST)
+            if result == False:
+                self.log.error('説明変数の一覧の読み込みに失敗しました')
+                return False
+            self.logic.set_required_columns(required_columns)
+
+        return True
+
+    def list(self):
+        '''登録済の説明変数のバージョンを表示する'''
+        for feature_set in self.store.get_set_list():
+            created_at = datetime.fromtimestamp(feature_set['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f'{feature_set["version"]} 指標数: {feature_set["feature_count"]} 登録日時: {created_at}')
+
+    def status(self, version = None):
+        '''
+        バージョンの指標が全て計算済のファイル数を表示する
+
+        Args:
+            version(str or None): 説明変数のバージョン ※Noneの場合は現在の定義
+        '''
+        if version is None:
+            if self.set_feature_spec() == False:
+                return
+            result, version = self.store.register_set(self.logic.get_iv_feature_spec())
+            if result == False:
+                return
+
+        file_count = len(self.util.frame_store.get_file_list(self.formatted_csv_dir, r'formatted_ohlc_\d{8}'))
+        print(f'バージョン: {version} 計算済: {len(self.store.get_file_list(version))}/{file_count}ファイル')
+
+    def update(self, prune = False):
+        '''
+        定義・計算ロジックが変わった指標のみ全ファイルで計算し直す
+
+        Args:
+            prune(bool): 現在の定義にない指標のカラムを削除するか
+        '''
+        if self.set_feature_spec() == False:
+            return
+
+        result, updated_count = self.store.update(self.logic.get_iv_feature_spec(), prune)
+        if result == False:
+            return
+        print(f'{updated_count}ファイルの説明変数を計算し直しました')
+
+if __name__ == '__main__':
+    mfs = ManageFeatureStore()
+    mfs.main()
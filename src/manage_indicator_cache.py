@@ -0,0 +1,85 @@
+import config
+import os
+import sys
+from datetime import datetime
+from base import Base
+
+class ManageIndicatorCache(Base):
+    '''
+    テクニカル指標のキャッシュ(mold_past_ohlc.pyで作成)の確認・削除を行う
+
+    Usage:
+        python manage_indicator_cache.py stats              : 件数・合計サイズを銘柄ごとに表示
+        python manage_indicator_cache.py list [証券コード]   : キャッシュファイルと保存済の指標数を表示
+        python manage_indicator_cache.py prune [上限(MB)]    : 上限サイズ以下になるまで古いものから削除 ※省略時はconfigの値
+        python manage_indicator_cache.py clear              : 全て削除
+    '''
+    def __init__(self):
+        super().__init__(use_db = False, use_api = False)
+        self.cache_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc', 'indicator_cache')
+        self.cache = self.util.indicator_cache
+        self.cache.set_cache_dir(self.cache_dir)
+
+    def main(self):
+        '''メイン処理'''
+        command = sys.argv[1] if len(sys.argv) >= 2 else ''
+
+        if command == 'stats':
+            self.stats()
+        elif command == 'list':
+            self.list(sys.argv[2] if len(sys.argv) >= 3 else None)
+        elif command == 'prune':
+            self.prune(float(sys.argv[2]) if len(sys.argv) >= 3 else config.INDICATOR_CACHE_MAX_SIZE_MB)
+        elif command == 'clear':
+            self.prune(0)
+        else:
+            print(self.__doc__)
+
+    def stats(self):
+        '''銘柄ごとのキャッシュ件数・サイズを表示する'''
+        result, cache_list = self.cache.get_cache_list()
+        if result == False:
+            return
+
+        stock_stats = {}
+        for cache in cache_list:
+            count, size = stock_stats.get(cache['stock_code'], (0, 0))
+            stock_stats[cache['stock_code']] = (count + 1, size + cache['size'])
+
+        for stock_code, (count, size) in sorted(stock_stats.items()):
+            print(f'{stock_code}: {count}件 {size / 1024 / 1024:.1f}MB')
+        print(f'合計: {len(cache_list)}件 {sum(cache["size"] for cache in cache_list) / 1024 / 1024:.1f}MB ディレクトリ: {os.path.abspath(self.cache_dir)}')
+
+    def list(self, stock_code = None):
+        '''
+        キャッシュファイルの一覧を表示する
+
+        Args:
+            stock_code(str or None): 表示する証券コード ※Noneの場合は全て
+        '''
+        result, cache_list = self.cache.get_cache_list()
+        if result == False:
+            return
+
+        for cache in cache_list:
+            if stock_code is not None and cache['stock_code'] != stock_code:
+                continue
+            feature_count = len(self.cache.get_feature_keys(cache['path']))
+            last_used = datetime.fromtimestamp(cache['mtime']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f'{cache["stock_code"]} {cache["date"]} 指標数: {feature_count} {cache["size"] / 1024:.0f}KB 最終利用: {last_used}')
+
+    def prune(self, max_size_mb):
+        '''
+        上限サイズ以下になるまで古いキャッシュを削除する
+
+        Args:
+            max_size_mb(float): 上限サイズ(MB)
+        '''
+        result, deleted_list = self.cache.prune(max_size_mb)
+        if result == False:
+            return
+        print(f'{len(deleted_list)}件のキャッシュを削除しました')
+
+if __name__ == '__main__':
+    mic = ManageIndicatorCache()
+    mic.main()
@@ -1,3 +1,4 @@
+import config
 import os
 from base import Base
 
@@ -9,13 +10,33 @@ class MoldPastOhlc(Base):
         self.output_csv_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc')
         self.tmp_csv_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc', 'tmp')
         self.formatted_csv_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc', 'formatted')
+        self.indicator_cache_dir = os.path.join(os.path.dirname(__file__), '..',  'csv', 'past_ohlc', 'indicator_cache')
         self.logic = self.service.preprocess.past_record_mold
 
     def main(self):
         '''メイン処理'''
 
         # ディレクトリ名の設定
-        self.logic.set_dir_name(self.output_csv_dir, self.tmp_csv_dir, self.formatted_csv_dir)
+        self.logic.set_dir_name(self.output_csv_dir, self.tmp_csv_dir, self.formatted_csv_dir,
+                                self.indicator_cache_dir if config.INDICATOR_CACHE else None, config.INDICATOR_CACHE_MAX_SIZE_MB)
+
+        # 成形したデータの保存形式の設定
+        if self.util.frame_store.set_format(config.PAST_OHLC_FORMAT) == False:
+            return
+
+        # モデルで使う説明変数の一覧がある場合は必要な指標のみ計算する
+        if config.FEATURE_MANIFEST is not None:
+            result, required_columns = self.util.feature_manifest.load(config.FEATURE_MANIFEST)
+            if result == False:
+                self.log.error('説明変数の一覧の読み込みに失敗しました')
+                return
+            self.logic.set_required_columns(required_columns)
+
+        # 銘柄・日付ごとの処理の並列実行の設定
+        self.logic.set_parallel(config.MOLD_WORKERS, config.MOLD_CHUNK_SIZE, config.MOLD_WORKER_MEMORY_LIMIT_MB)
+
+        # 四本値CSVを分割して読み込む行数の設定
+        self.logic.set_read_chunk_rows(config.MOLD_READ_CHUNK_ROWS)
 
         self.log.info('成形対象の四本値CSVファイル名の取得開始')
         result = self.logic.get_target_csv_name_list()
@@ -24,6 +45,16 @@ class MoldPastOhlc(Base):
             return
         self.log.info('成形対象の四本値CSVファイル名の取得終了')
 
+        # 目的変数・説明変数の追加とまとめを1銘柄・1日分ずつ続けて行う(途中のファイルを出力しない)
+        if config.MOLD_FUSED:
+            self.log.info('目的変数・説明変数追加とまとめ処理開始')
+            result = self.logic.create_fused(config.MOLD_KEEP_INTERMEDIATE)
+            if result == False:
+                self.log.error('目的変数・説明変数追加とまとめ処理に失敗しました')
+                return
+            self.log.info('目的変数・説明変数追加とまとめ処理終了')
+            return
+
         self.log.info('目的変数追加処理開始')
         result = self.logic.create_dv()
         if result == False:
@@ -64,4 +95,8 @@ if __name__ == '__main__':
 # csv/past_ohlc/tmp/tmp_ohlc_yyyyymmdd_[stock_code].csv          : ↑の中で証券コードと日付ごとに分割して、株価の変動(目的変数)カラムを追加したデータ
 # csv/past_ohlc/tmp/formatted_tmp_ohlc_yyyymmdd_[stock_code.csv] : ↑のデータにテクニカル指標(説明変数)カラムを追加したデータ
 # csv/past_ohlc/formatted_ohlc_yyyymmddhhmm.csv                  : ↑のデータを結合したデータ
-# csv/past_ohlc/recorded_ohlc.csv                                : 既に結合済のデータをメモしておくファイル
+# ※config.MOLD_FUSEDがTrueの場合、tmpのファイルは作成せずに直接formatted_ohlc_yyyymmdd.csvを作成する(MOLD_KEEP_INTERMEDIATEの場合はtmp/debugに出力)
+# ※config.PAST_OHLC_FORMATがparquet/featherの場合、tmp・formattedのファイルは.parquet/.featherになる(convert_past_ohlc.pyでCSVに変換可能)
+# csv/past_ohlc/pipeline_manifest.db                             : 取得済・結合済の銘柄・日付を記録するSQLite(pipeline_manifest.py) ※初回作成時にrecorded_ohlc.csv・check_past_ohlc.csvを取り込む
+# csv/past_ohlc/indicator_cache/[stock_code]/yyyymmdd(.N).npz     : 計算済のテクニカル指標のキャッシュ(manage_indicator_cache.pyで確認・削除) ※指標を追加するとyyyymmdd.N.npzが増える
+# csv/past_ohlc/formatted/feature_store.db                       : formatted_ohlcごとの説明変数の定義・計算ロジックのバージョン(manage_feature_store.pyで確認・再計算)
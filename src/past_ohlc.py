@@ -20,9 +20,9 @@ class PastOhlc(Base):
         _ = self.logic.main(self.target_stock_code_list, self.target_days, self.output_csv_dir)
         self.log.info('米Yahoo!Financeからの四本値取得処理終了')
 
-        self.log.info('記録管理用CSVから古いデータの削除処理開始')
+        self.log.info('記録管理用DBから古いデータの削除処理開始')
         _ = self.logic.delete_old_data()
-        self.log.info('記録管理用CSVから古いデータの削除処理終了')
+        self.log.info('記録管理用DBから古いデータの削除処理終了')
 
         self.log.info('古い四本値データの圧縮処理開始')
         _ = self.logic.compress_old_data(self.output_csv_dir)
@@ -17,6 +17,10 @@ class ReceptionWebsocket(Base):
         if record_init == False:
             return False
 
+        # 受信データをキャプチャファイルに記録する場合
+        if config.CAPTURE_MESSAGE:
+            self.service.collect.record.start_capture('push')
+
         # WebSocket接続/PUSH配信の受信/データのDB登録
         try:
             # 前場
@@ -27,6 +31,8 @@ class ReceptionWebsocket(Base):
         except Exception as e:
             self.log.error(f'WebSocket接続でエラー\n{e}\n{traceback.format_exc()}')
             return False
+        finally:
+            self.service.collect.record.stop_capture()
 
 if __name__ == "__main__":
     rw = ReceptionWebsocket()
@@ -0,0 +1,63 @@
+import asyncio
+import config
+import sys
+import time
+from base import Base
+
+class ReplayCapture(Base):
+    '''
+    キャプチャファイル(config.CAPTURE_MESSAGE = Trueで記録)の受信データを記録処理に流して再生する
+
+    Usage:
+        python replay_capture.py push <日付 or ファイルパス> [速度]  : PUSH配信を再生して四本値テーブルに登録する
+        python replay_capture.py board <日付 or ファイルパス> [速度] : 板情報を再生してDBまたはCSVに記録する(BOARD_RECORD_DBに従う)
+            ※日付はyyyymmdd形式、速度は1(等倍)・N(N倍速)・max(待たずに最大速度) 省略時はmax
+    '''
+    def __init__(self):
+        self.kind = sys.argv[1] if len(sys.argv) >= 2 else ''
+
+        # DBを使うのは四本値を登録する場合と板情報をDBに記録する場合のみ
+        super().__init__(use_db = self.kind == 'push' or (self.kind == 'board' and config.BOARD_RECORD_DB == 1), use_api = False)
+        self.record = self.service.collect.record
+
+    def main(self):
+        '''メイン処理'''
+        if self.kind not in ['push', 'board'] or len(sys.argv) < 3:
+            print(self.__doc__)
+            return
+
+        # 再生速度
+        speed = sys.argv[3] if len(sys.argv) >= 4 else 'max'
+        try:
+            speed = None if speed == 'max' else float(speed)
+        except ValueError:
+            print(self.__doc__)
+            return
+
+        path_list = self.record.get_capture_path_list(self.kind, sys.argv[2])
+        if len(path_list) == 0:
+            self.log.error(f'再生するキャプチャファイルがありません 指定: {sys.argv[2]}')
+            return
+
+        self.log.info(f'キャプチャファイルの再生開始 ファイル数: {len(path_list)} 速度: {"max" if speed is None else speed}')
+        start_time = time.perf_counter()
+
+        if self.kind == 'push':
+            result, count = asyncio.run(self.record.replay_push(path_list, speed))
+        else:
+            result, count = self.record.replay_board(path_list, speed)
+
+        # 受信処理のスループット
+        elapsed = time.perf_counter() - start_time
+        self.log.info(f'キャプチャファイルの再生終了 件数: {count} 処理時間: {elapsed:.2f}秒 {count / elapsed if elapsed > 0 else 0:.0f}件/秒')
+        if result == False:
+            return
+
+        # CSV記録モードの場合は板情報の記録後と同じく計算可能な情報を計算してCSVに記録・成形
+        if self.kind == 'board' and config.BOARD_RECORD_DB == 0:
+            self.service.preprocess.board_mold.set_yobine_group_list(config.BOARD_YOBINE_GROUP_LIST)
+            self.service.preprocess.board_mold.main()
+
+if __name__ == '__main__':
+    rc = ReplayCapture()
+    rc.main()
@@ -0,0 +1,176 @@
+import asyncio
+import queue
+import threading
+import time
+import traceback
+
+class OhlcWriter():
+    '''
+    作成済の1分足を別スレッドでまとめて四本値テーブルに登録するクラス(write-behind)
+
+    WebSocketの受信処理(asyncioのイベントループ)からはキューに追加するだけにして、
+    MySQLの応答待ちで受信が止まらないようにする
+    書き込みスレッドは一定件数(flush_size)または一定時間(flush_interval秒)ごとに複数行のupsertで登録する
+
+    Memo:
+        キューが上限(queue_size)に達した場合は空くまで追加側が待つ(受信側に負荷を伝える)
+        イベントループからはput_asyncで追加すること(putはキューが空くまでスレッドごと止まる)
+        一括登録に失敗した場合は1件ずつ登録し直し、それでも失敗したデータはログに出力する
+        書き込みスレッドの実行中はDB接続を書き込みスレッドのみで使うこと(pymysqlの接続はスレッド間で共有できない)
+    '''
+    def __init__(self, log, db, flush_size = 500, flush_interval = 1.0, queue_size = 10000):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            db(Db): DB操作クラスのインスタンス
+            flush_size(int): 1回の登録でまとめる最大件数
+            flush_interval(float): 件数に達しなくても登録するまでの秒数
+            queue_size(int): キューに溜められる最大件数
+        '''
+        self.log = log
+        self.db = db
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize = queue_size)
+        self.thread = None
+
+        # 書き込みスレッドの終了を知らせる値
+        self.stop_signal = object()
+
+        # 計測値(queue_full_count: キューが上限に達して追加を待った回数)
+        self.stats = {'put_count': 0, 'queue_full_count': 0, 'max_queue_size': 0, 'flush_count': 0, 'write_count': 0,
+                      'error_count': 0, 'total_flush_seconds': 0.0, 'max_flush_seconds': 0.0}
+        self.stats_lock = threading.Lock()
+
+    def start(self):
+        '''書き込みスレッドを開始する'''
+        self.thread = threading.Thread(target = self.run, name = 'ohlc_writer', daemon = True)
+        self.thread.start()
+
+    def put(self, ohlc):
+        '''
+        登録する1分足をキューに追加する ※キューが上限の場合は空くまで待つ
+
+        Args:
+            ohlc(dict): 四本値テーブルに登録するデータ(Mold.response_to_ohlcの形式)
+        '''
+        if self.queue.full():
+            with self.stats_lock:
+                self.stats['queue_full_count'] += 1
+
+        # 登録前に呼び出し元で値が変わらないようにコピーして追加する
+        self.queue.put(dict(ohlc))
+        self.count_put()
+
+    async def put_async(self, ohlc):
+        '''
+        イベントループから登録する1分足をキューに追加する
+
+        キューが上限の場合は別スレッドで空くのを待ち、その間もイベントループ(WebSocketの受信など)は止めない
+
+        Args:
+            ohlc(dict): 四本値テーブルに登録するデータ(Mold.response_to_ohlcの形式)
+        '''
+        try:
+            self.queue.put_nowait(dict(ohlc))
+        except queue.Full:
+            with self.stats_lock:
+                self.stats['queue_full_count'] += 1
+            await asyncio.to_thread(self.queue.put, dict(ohlc))
+        self.count_put()
+
+    def count_put(self):
+        '''キューへの追加件数と最大待ち件数を記録する'''
+        with self.stats_lock:
+            self.stats['put_count'] += 1
+            self.stats['max_queue_size'] = max(self.stats['max_queue_size'], self.queue.qsize())
+
+    def stop(self):
+        '''
+        キューに残っているデータを全て登録してから書き込みスレッドを終了する
+
+        Returns:
+            stats(dict): 計測値
+        '''
+        if self.thread is not None:
+            self.queue.put(self.stop_signal)
+            self.thread.join()
+            self.thread = None
+
+        stats = self.get_stats()
+        self.log.info(f'四本値テーブルへの書き込み終了 登録件数: {stats["write_count"]} 失敗件数: {stats["error_count"]} 登録回数: {stats["flush_count"]} '
+                      f'最大待ち件数: {stats["max_queue_size"]} キュー上限到達: {stats["queue_full_count"]}回 '
+                      f'平均処理時間: {stats["avg_flush_seconds"] * 1000:.1f}ms 最大処理時間: {stats["max_flush_seconds"] * 1000:.1f}ms')
+        return stats
+
+    def get_stats(self):
+        '''
+        キューの待ち件数・登録の処理時間などの計測値を取得する
+
+        Returns:
+            stats(dict): 計測値 ※queue_size: 現在の待ち件数、avg_flush_seconds: 1回の登録の平均処理時間
+        '''
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['queue_size'] = self.queue.qsize()
+        stats['avg_flush_seconds'] = stats['total_flush_seconds'] / stats['flush_count'] if stats['flush_count'] != 0 else 0.0
+        return stats
+
+    def run(self):
+        '''書き込みスレッドの処理 キューからデータを取り出して一定件数・一定時間ごとに登録する'''
+        batch = []
+        deadline = None
+        stop = False
+
+        while not stop:
+            # 最初の1件は登録するデータが来るまで待ち、以降は登録時刻まで待つ
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                ohlc = self.queue.get(timeout = timeout)
+                if ohlc is self.stop_signal:
+                    stop = True
+                else:
+                    batch.append(ohlc)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            if len(batch) != 0 and (stop or len(batch) >= self.flush_size or time.monotonic() >= deadline):
+                self.flush(batch)
+                batch = []
+                deadline = None
+
+    def flush(self, batch):
+        '''
+        1分足をまとめて四本値テーブルに登録する
+
+        Args:
+            batch(list[dict]): 登録するデータのリスト
+        '''
+        start_time = time.perf_counter()
+        write_count, error_count = len(batch), 0
+
+        try:
+            result, row_count = self.db.ohlc.upsert_many(batch)
+
+            # 一括登録に失敗した場合は1件ずつ登録し直す
+            if result != True:
+                for ohlc in batch:
+                    result, operate_type = self.db.ohlc.upsert(ohlc)
+                    if result != True:
+                        self.log.error(f'記録に失敗したデータ: {ohlc}')
+                        error_count += 1
+        except Exception as e:
+            self.log.error(f'四本値テーブルへの書き込み処理でエラー 件数: {len(batch)}\n{str(e)}\n{traceback.format_exc()}')
+            error_count = len(batch)
+
+        elapsed = time.perf_counter() - start_time
+        with self.stats_lock:
+            self.stats['flush_count'] += 1
+            self.stats['write_count'] += write_count - error_count
+            self.stats['error_count'] += error_count
+            self.stats['total_flush_seconds'] += elapsed
+            self.stats['max_flush_seconds'] = max(self.stats['max_flush_seconds'], elapsed)
+
+        self.log.info(f'四本値テーブルへの登録処理完了 件数: {write_count - error_count} 待ち件数: {self.queue.qsize()} 処理時間: {elapsed * 1000:.1f}ms')
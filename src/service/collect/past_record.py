@@ -1,6 +1,5 @@
 import csv
 import os
-import pandas as pd
 import pytz
 import py7zr
 import re
@@ -28,6 +27,9 @@ class PastRecord(ServiceBase):
         # CSV保存ディレクトリ
         self.output_csv_dir = output_csv_dir
 
+        # 記録済みの銘柄・日付はCSV保存ディレクトリの進捗管理用DBで管理する
+        self.set_manifest_path()
+
         # 1銘柄ずつ処理
         for stock_code in target_stock_code_list:
             time.sleep(5)
@@ -40,7 +42,7 @@ class PastRecord(ServiceBase):
             self.log.info(f'銘柄コード: {stock_code} の四本値取得処理終了')
 
             # 記録済みの日付チェック
-            recorded_date_list = self.check_recorded_csv(stock_code)
+            recorded_date_list = self.get_recorded_date_set(stock_code)
 
             # 取得データの成形
             result, formatted_ohlc, record_list = self.format_ohlc(ohlc, recorded_date_list)
@@ -50,21 +52,19 @@ class PastRecord(ServiceBase):
 
             self.log.info(f'銘柄コード: {stock_code} の四本値データのCSV出力開始')
             csv_path = os.path.join(self.output_csv_dir, f'ohlc_{datetime.now().strftime("%Y%m")}.csv')
-            header = ['stock_code', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+            header = self.util.schema.get_columns('ohlc')
             result = self.write_csv(formatted_ohlc, header, csv_path)
             if result == False:
                 # TODO エラーリストをCSVに出力
                 continue
             self.log.info(f'銘柄コード: {stock_code} の四本値データのCSV出力終了')
 
-            self.log.info(f'銘柄コード: {stock_code} の記録済み日付のCSV出力開始')
-            check_csv_path = os.path.join(self.output_csv_dir, f'check_past_ohlc.csv')
-            header = ['stock_code', 'date']
-            result = self.write_csv(record_list, header, check_csv_path)
+            self.log.info(f'銘柄コード: {stock_code} の記録済み日付のDB記録開始')
+            result = self.util.pipeline_manifest.mark_done(record_list, 'collect')
             if result == False:
                 # TODO エラーリストをCSVに出力
                 continue
-            self.log.info(f'銘柄コード: {stock_code} の記録済み日付のCSV出力終了')
+            self.log.info(f'銘柄コード: {stock_code} の記録済み日付のDB記録終了')
 
         return True
 
@@ -282,29 +282,27 @@ class PastRecord(ServiceBase):
 
         return start_price, add_data
 
-    def check_recorded_csv(self, stock_code):
+    def set_manifest_path(self):
         '''
-        記録済みCSVのチェック
-
-        Args:
-            stock_code(int or str): 銘柄コード
+        進捗管理用DB(CSV保存ディレクトリのpipeline_manifest.db)を設定する
+        ※DBを新規作成する場合は既存のcheck_past_ohlc.csvの記録を取り込む
 
         Returns:
-            date_list(list): 記録済みの日付一覧
+            bool: 実行結果
         '''
-        check_csv_path = os.path.join(self.output_csv_dir, f'check_past_ohlc.csv')
-        # CSV存在チェック
-        if not os.path.exists(check_csv_path):
-            return []
+        return self.util.pipeline_manifest.set_db_path(os.path.join(self.output_csv_dir, 'pipeline_manifest.db'))
 
-        # CSVの読み込み
-        check_csv = pd.read_csv(check_csv_path)
+    def get_recorded_date_set(self, stock_code):
+        '''
+        記録済みの日付を進捗管理用DBから取得する
 
-        # 銘柄コードが一致する行の日付を取得
-        filtered_data = check_csv[check_csv['stock_code'] == stock_code]
-        date_list = filtered_data['date'].tolist()
+        Args:
+            stock_code(int or str): 銘柄コード
 
-        return date_list
+        Returns:
+            date_set(set): 記録済みの日付(yyyy-mm-dd)
+        '''
+        return set(date for _, date in self.util.pipeline_manifest.get_done_set('collect', stock_code))
 
     def convert_to_int_if_possible(self, value):
         '''
@@ -359,19 +357,12 @@ class PastRecord(ServiceBase):
     def delete_old_data(self):
         '''30日以上前の記録済みデータはいらないので削除する'''
 
-        # CSVの存在チェック/読み込み
-        csv_path = os.path.join(self.output_csv_dir, f'check_past_ohlc.csv')
-        if not os.path.exists(csv_path):
-            return True
-        check_csv = pd.read_csv(csv_path)
-
-        # 30日以上前のデータを削除
-        check_csv['date'] = pd.to_datetime(check_csv['date'])
-        check_csv = check_csv[check_csv['date'] >= datetime.now() - timedelta(days = 30)]
-
-        # 削除後のデータを上書き
-        check_csv.to_csv(csv_path, index = False)
+        # 進捗管理用DBから30日以上前のデータを削除
+        result, deleted_count = self.util.pipeline_manifest.delete_before('collect', (datetime.now() - timedelta(days = 30)).strftime('%Y-%m-%d'))
+        if result == False:
+            return False
 
+        self.log.info(f'削除件数: {deleted_count}')
         return True
 
     def compress_old_data(self,a):
@@ -0,0 +1,157 @@
+import asyncio
+import collections
+import traceback
+
+# 銘柄ごとのキューが上限に達した場合の処理
+# block: 空くまで追加側が待つ、conflate: 未処理のメッセージを全て捨てて最新のメッセージのみにする、drop: 追加するメッセージを捨てる
+OVERFLOW_POLICY_LIST = ['block', 'conflate', 'drop']
+
+class PushDispatcher():
+    '''
+    PUSH配信のメッセージを銘柄ごとのキューに振り分け、一定数のワーカー(asyncioのタスク)で処理するクラス
+
+    メッセージごとにタスクを作成すると負荷が高い時に未処理のタスクが際限なく増え、
+    同じ銘柄のメッセージの処理順も保証されないため、銘柄ごとに受信した順で1件ずつ処理する
+
+    Memo:
+        同じ銘柄のメッセージを同時に処理するワーカーは1つのみ(1件処理するごとに他の銘柄に順番を回す)
+        銘柄ごとのキューの上限(queue_size)に達した場合はoverflow_policyに従う
+        conflate/dropの場合はOHLCの高値・安値の途中経過が失われることがあるため、件数をカウントしてログに出力する
+    '''
+    def __init__(self, log, handler, worker_count = 4, queue_size = 100, overflow_policy = 'block'):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            handler(coroutine function): メッセージを処理する関数 ※引数は受信したデータ(dict)
+            worker_count(int): ワーカー数
+            queue_size(int): 銘柄ごとの未処理メッセージの上限件数
+            overflow_policy(str): キューが上限に達した場合の処理(block, conflate, drop)
+        '''
+        if overflow_policy not in OVERFLOW_POLICY_LIST:
+            raise ValueError(f'キューが上限に達した場合の処理が不正です overflow_policy: {overflow_policy}')
+
+        self.log = log
+        self.handler = handler
+        self.worker_count = worker_count
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+
+        # 銘柄ごとの未処理のメッセージ {証券コード: deque}
+        self.symbol_queue_dict = {}
+
+        # 未処理のメッセージがあり、処理中のワーカーがない銘柄のキュー
+        self.ready_queue = asyncio.Queue()
+
+        # 処理中または処理待ちの銘柄
+        self.active_symbol_set = set()
+
+        # blockの場合にキューが空くのを待つための条件変数
+        self.condition = asyncio.Condition()
+        self.waiting_count = 0
+
+        self.worker_list = []
+
+        # 計測値(pending_count: 全銘柄の未処理件数、blocked_count: キューが上限に達して追加を待った回数)
+        self.stats = {'put_count': 0, 'processed_count': 0, 'error_count': 0, 'blocked_count': 0,
+                      'conflated_count': 0, 'dropped_count': 0, 'pending_count': 0, 'max_pending_count': 0}
+
+    def start(self):
+        '''ワーカーを開始する'''
+        self.worker_list = [asyncio.create_task(self.worker()) for _ in range(self.worker_count)]
+
+    async def put(self, symbol, reception_data):
+        '''
+        受信したメッセージを銘柄のキューに追加する
+
+        Args:
+            symbol(str): 証券コード
+            reception_data(dict): 受信したデータ
+        '''
+        symbol_queue = self.symbol_queue_dict.get(symbol)
+        if symbol_queue is None:
+            symbol_queue = self.symbol_queue_dict[symbol] = collections.deque()
+
+        if len(symbol_queue) >= self.queue_size:
+            if self.overflow_policy == 'block':
+                self.stats['blocked_count'] += 1
+                self.waiting_count += 1
+                try:
+                    async with self.condition:
+                        await self.condition.wait_for(lambda: len(symbol_queue) < self.queue_size)
+                finally:
+                    self.waiting_count -= 1
+            elif self.overflow_policy == 'conflate':
+                # 未処理のメッセージは最新のメッセージにまとめる(PUSH配信の値は累計・最新値のため最新の1件で足りる)
+                self.stats['conflated_count'] += len(symbol_queue)
+                self.stats['pending_count'] -= len(symbol_queue)
+                symbol_queue.clear()
+            else:
+                self.stats['dropped_count'] += 1
+                return
+
+        symbol_queue.append(reception_data)
+        self.stats['put_count'] += 1
+        self.stats['pending_count'] += 1
+        self.stats['max_pending_count'] = max(self.stats['max_pending_count'], self.stats['pending_count'])
+
+        if symbol not in self.active_symbol_set:
+            self.active_symbol_set.add(symbol)
+            self.ready_queue.put_nowait(symbol)
+
+    async def worker(self):
+        '''ワーカーの処理 処理待ちの銘柄のメッセージを1件ずつ処理する'''
+        while True:
+            symbol = await self.ready_queue.get()
+            symbol_queue = self.symbol_queue_dict[symbol]
+            reception_data = symbol_queue.popleft()
+            self.stats['pending_count'] -= 1
+
+            # キューが空くのを待っている追加処理があれば知らせる
+            if self.waiting_count != 0:
+                async with self.condition:
+                    self.condition.notify_all()
+
+            try:
+                await self.handler(reception_data)
+                self.stats['processed_count'] += 1
+            except Exception as e:
+                self.log.error(f'PUSH配信のメッセージ処理でエラー 証券コード: {symbol}\n{str(e)}\n{traceback.format_exc()}')
+                self.stats['error_count'] += 1
+
+            # 未処理のメッセージが残っている場合は他の銘柄の後ろに回す
+            if len(symbol_queue) != 0:
+                self.ready_queue.put_nowait(symbol)
+            else:
+                self.active_symbol_set.discard(symbol)
+            self.ready_queue.task_done()
+
+    async def stop(self):
+        '''
+        未処理のメッセージを全て処理してからワーカーを終了する
+
+        Returns:
+            stats(dict): 計測値
+        '''
+        if len(self.worker_list) != 0:
+            await self.ready_queue.join()
+            for worker in self.worker_list:
+                worker.cancel()
+            await asyncio.gather(*self.worker_list, return_exceptions = True)
+            self.worker_list = []
+
+        stats = self.get_stats()
+        self.log.info(f'PUSH配信のメッセージ処理終了 処理件数: {stats["processed_count"]} エラー件数: {stats["error_count"]} '
+                      f'最大待ち件数: {stats["max_pending_count"]} キュー上限到達: 待機{stats["blocked_count"]}回 '
+                      f'間引き{stats["conflated_count"]}件 破棄{stats["dropped_count"]}件')
+        return stats
+
+    def get_stats(self):
+        '''
+        処理件数・間引き/破棄した件数などの計測値を取得する
+
+        Returns:
+            stats(dict): 計測値 ※symbol_count: メッセージを受信した銘柄数
+        '''
+        stats = dict(self.stats)
+        stats['symbol_count'] = len(self.symbol_queue_dict)
+        return stats
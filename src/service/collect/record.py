@@ -7,6 +7,8 @@ import traceback
 import websockets
 import pytz
 from service_base import ServiceBase
+from .ohlc_writer import OhlcWriter
+from .push_dispatcher import PushDispatcher
 from datetime import datetime, timedelta, timezone
 
 class Record(ServiceBase):
@@ -21,8 +23,17 @@ class Record(ServiceBase):
         # 記録対象の銘柄リスト
         self.target_code_list = []
 
-        # 四本値データの一時記録用メモリ
-        self.ohlc_list = []
+        # 四本値データの一時記録用メモリ((証券コード, 取引時間)ごとの1分足)
+        self.ohlc_store = self.util.ohlc_bar_store
+
+        # 作成済の1分足を別スレッドで四本値テーブルに登録するクラス(websocket_mainの実行中のみ)
+        self.ohlc_writer = None
+
+        # 受信したメッセージを銘柄ごとに順番に処理するクラス(websocket_mainの実行中のみ)
+        self.push_dispatcher = None
+
+        # 受信データのキャプチャファイルを保存するディレクトリ
+        self.capture_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'csv', 'capture')
 
         # タイムゾーン設定用
         self.jst = pytz.timezone('Asia/Tokyo')
@@ -82,21 +93,23 @@ class Record(ServiceBase):
 
         return True, target_code_list
 
-    async def websocket_main(self, time_period):
+    async def websocket_main(self, time_period, replay_socket = None):
         '''
         WebSocket接続/受信とDBへの登録処理を行う
 
         Args:
             time_period(int): 時間種別
                 1: 前場、2: 後場
+            replay_socket(CaptureReplaySocket or None): キャプチャファイルを再生する場合の接続
+                ※指定した場合はWebSocketに接続せず、営業日・時間のチェックも行わない
 
         Returns:
             bool: 処理結果
         '''
         self.log.info('WebSocket接続処理開始')
 
-        # デバッグモードチェック
-        if self.config.BOARD_RECORD_DEBUG == False:
+        # デバッグモード・キャプチャの再生チェック
+        if self.config.BOARD_RECORD_DEBUG == False and replay_socket is None:
             # 日付チェック
             if self.util.culc_time.exchange_date() == False:
                 self.log.info('非営業日のためPUSH配信受信を行いません')
@@ -119,58 +132,83 @@ class Record(ServiceBase):
 
         error_counter = 0
 
-        # WebSocket接続/PUSH配信の受信
-        ws_handler = await self.api.websocket.connect()
-        async with ws_handler as ws:
-            while True:
-                try:
-                    # デバッグモードでない場合のみ時間チェック
-                    if self.config.BOARD_RECORD_DEBUG == False:
-                        # 時間の種別を取得
-                        time_type = self.util.culc_time.exchange_time(datetime.now())
-                        # 前場処理中にお昼休みに入った場合
-                        if time_period == 1 and time_type == 4:
-                            self.log.info('お昼休みなのでPUSH配信受信を行いません')
-                            break
-                        # 後場処理中に大引けになった場合
-                        elif time_period == 2 and time_type in [5]:
-                            self.log.info('大引け後のためPUSH配信受信を終了します')
-                            break
-
-                    # タイムアウト(=PUSH配信が来なくなるまで)の時間を計算
-                    time_out = self.util.culc_time.get_trade_end_time_seconds(accurate = False)
-
-                    message = await asyncio.wait_for(ws.recv(), timeout = time_out)
-                    self.log.info('PUSHメッセージ配信を受信')
-
-                    # メッセージを受信したらレコードを設定する処理をコールバック関数として実行
-                    asyncio.create_task(self.operate_ohlc(json.loads(message)))
+        # 作成済の1分足のDB登録は別スレッドで行う(受信処理をDBの応答待ちで止めない)
+        self.ohlc_writer = OhlcWriter(self.log, self.db, self.config.OHLC_WRITER_FLUSH_SIZE,
+                                      self.config.OHLC_WRITER_FLUSH_INTERVAL, self.config.OHLC_WRITER_QUEUE_SIZE)
+        self.ohlc_writer.start()
 
-                except TimeoutError:
-                    self.log.warning('WebSocket受信がタイムアウトしました')
-                    self.log.error('タイムアウトしたためWebSocket接続を終了します')
-                    break
-
-                except Exception as e:
-                    self.log.error(f'PUSH配信の受信処理でエラー\n{e}\n{traceback.format_exc()}')
-                    error_counter += 1
-                    if error_counter >= 15:
-                        self.log.error('エラーが続いたためWebSocket接続を終了します')
-                        return False
-                    continue
+        # 受信したメッセージは銘柄ごとのキューに入れて一定数のワーカーで処理する
+        self.push_dispatcher = PushDispatcher(self.log, self.operate_ohlc, self.config.PUSH_DISPATCH_WORKER_COUNT,
+                                              self.config.PUSH_DISPATCH_QUEUE_SIZE, self.config.PUSH_DISPATCH_OVERFLOW_POLICY)
+        self.push_dispatcher.start()
 
-        self.log.info('WebSocket接続処理終了')
+        try:
+            # WebSocket接続/PUSH配信の受信 ※キャプチャの再生時は再生用の接続から受信
+            if replay_socket is None:
+                ws_handler = await self.api.websocket.connect()
+            else:
+                ws_handler = replay_socket
+            async with ws_handler as ws:
+                while True:
+                    try:
+                        # デバッグモード・キャプチャの再生でない場合のみ時間チェック
+                        if self.config.BOARD_RECORD_DEBUG == False and replay_socket is None:
+                            # 時間の種別を取得
+                            time_type = self.util.culc_time.exchange_time(datetime.now())
+                            # 前場処理中にお昼休みに入った場合
+                            if time_period == 1 and time_type == 4:
+                                self.log.info('お昼休みなのでPUSH配信受信を行いません')
+                                break
+                            # 後場処理中に大引けになった場合
+                            elif time_period == 2 and time_type in [5]:
+                                self.log.info('大引け後のためPUSH配信受信を終了します')
+                                break
+
+                        # タイムアウト(=PUSH配信が来なくなるまで)の時間を計算 ※キャプチャの再生時は最後まで再生したら終了
+                        time_out = self.util.culc_time.get_trade_end_time_seconds(accurate = False) if replay_socket is None else None
+
+                        message = await asyncio.wait_for(ws.recv(), timeout = time_out)
+                        self.log.info('PUSHメッセージ配信を受信')
+
+                        # キャプチャモードの場合は受信データをそのまま記録
+                        if self.util.message_capture.is_open():
+                            self.util.message_capture.write(message)
+
+                        # メッセージを受信したら必要な項目のみに変換して銘柄のキューに追加(レコードを設定する処理はワーカーで実行)
+                        reception_data = self.util.push_decoder.decode(message)
+                        await self.push_dispatcher.put(reception_data.get('Symbol'), reception_data)
+
+                    except TimeoutError:
+                        if replay_socket is not None:
+                            self.log.info('キャプチャファイルの再生が終了しました')
+                            break
+                        self.log.warning('WebSocket受信がタイムアウトしました')
+                        self.log.error('タイムアウトしたためWebSocket接続を終了します')
+                        break
 
-        # 最後にメモリに残っている四本値データをDBに登録
-        upsert_count = 0
-        for ohlc in self.ohlc_list:
-            result, operate_type = self.db.ohlc.upsert(ohlc)
-            if result != True:
-                self.log.error(f'四本値テーブルへの記録処理でエラー\n{result}')
-                self.log.error(f'記録に失敗したデータ: {ohlc}')
-                continue
-            upsert_count += 1
-        self.log.info(f'メモリに残っている四本値データのDB登録完了 登録レコード数: {upsert_count}')
+                    except Exception as e:
+                        self.log.error(f'PUSH配信の受信処理でエラー\n{e}\n{traceback.format_exc()}')
+                        error_counter += 1
+                        if error_counter >= 15:
+                            self.log.error('エラーが続いたためWebSocket接続を終了します')
+                            return False
+                        continue
+
+            self.log.info('WebSocket接続処理終了')
+
+        finally:
+            # 受信済のメッセージの処理(operate_ohlc)を先に終わらせる
+            await self.push_dispatcher.stop()
+            self.push_dispatcher = None
+
+            # 最後にメモリに残っている四本値データを登録し、キューに残っているデータを全て登録してから書き込みを終了する
+            remain_count = len(self.ohlc_store)
+            for ohlc in self.ohlc_store.values():
+                await self.ohlc_writer.put_async(ohlc)
+                self.ohlc_store.remove(ohlc['symbol'], ohlc['trade_time'])
+            await asyncio.to_thread(self.ohlc_writer.stop)
+            self.ohlc_writer = None
+            self.log.info(f'メモリに残っている四本値データのDB登録完了 登録レコード数: {remain_count}')
 
         return True
 
@@ -179,36 +217,20 @@ class Record(ServiceBase):
         WebSocketで受信した板情報をDBに登録する
 
         Args:
-            reception_data(dict): 受信したデータ
+            reception_data(dict): 受信したデータ(PushDecoder.decodeで変換済のもの)
+                ※CurrentPriceTimeはdatetime型、CurrentPriceMinuteは秒を切り捨てた時分
         '''
-        # 既に記録済の同一分のデータを詰めるために使用
-        recorded_ohlc_data = {}
-
         # 現値データがない場合
         if reception_data['CurrentPriceTime'] is None:
             self.log.warning('現値データが取れません')
             self.log.warning(reception_data)
             return False
 
-        # 直近の取引時間のdatetime型に変換
-        reception_data['CurrentPriceTime'] = datetime.strptime(reception_data['CurrentPriceTime'], '%Y-%m-%dT%H:%M:%S%z')
-        # 直近の取引の秒を切り捨て
-        reception_data['CurrentPriceMinute'] = reception_data['CurrentPriceTime'].replace(second = 0, microsecond = 0)
-
-        # 受信データと同一時分のデータが既に存在するか
-        # 一時保存用のメモリをチェック
-        if len(self.ohlc_list) > 0:
-            for ohlc in self.ohlc_list:
-                try:
-                    # メモリに存在する場合
-                    if ohlc['symbol'] == reception_data['Symbol'] and ohlc['trade_time'] == reception_data['CurrentPriceMinute']:
-                        recorded_ohlc_data = ohlc
-                        break
-                except Exception as e:
-                    self.log.error(f'メモリのチェック処理でエラー\n{e}\n{traceback.format_exc()}')
-                    self.log.error(f'ohlc[trade_time]: {ohlc["trade_time"]}')
-                    self.log.error(f'reception_data[CurrentPriceMinute]: {reception_data["CurrentPriceMinute"]}')
-                    continue
+        # 受信データと同一時分のデータが既に存在するか一時保存用のメモリをチェック
+        # 既に記録済の同一分のデータがない場合は空
+        recorded_ohlc_data = self.ohlc_store.get(reception_data['Symbol'], reception_data['CurrentPriceMinute'])
+        if recorded_ohlc_data is None:
+            recorded_ohlc_data = {}
 
         '''
         # メモリに存在しない場合はDBをチェック
@@ -247,24 +269,45 @@ class Record(ServiceBase):
             self.log.error(f'記録に失敗したデータ: {reception_data}')
             return False
 
-        # 先にメモリを更新
-        for ohlc in self.ohlc_list[:]:
-            try:
-                # 同じ証券コードで同じ取引時間のデータがある場合は更新前のを削除
-                if ohlc['symbol'] == new_ohlc_data['symbol'] and ohlc['trade_time'] == new_ohlc_data['trade_time']:
-                    self.ohlc_list.remove(ohlc)
-                    break
-            except Exception as e:
-                self.log.error(f'メモリの更新処理でエラー\n{e}\n{traceback.format_exc()}')
-                self.log.error(f'ohlc[trade_time]: {ohlc["trade_time"]}')
-                self.log.error(f'new_ohlc_data[trade_time]: {new_ohlc_data["trade_time"]}')
-                continue
-        # 更新後のデータ/新規データを追加
-        self.ohlc_list.append(new_ohlc_data)
+        # 先にメモリを更新(同じ証券コードで同じ取引時間のデータがある場合は置き換える)
+        self.ohlc_store.put(new_ohlc_data)
 
         # メモリに過去時分データがある場合のみ、そのデータをDBに登録してメモリから削除
         if latest_trade_time != None and latest_trade_time.hour != 0 and latest_trade_time.minute != 0:
-            result = self.memory_cleaning(new_ohlc_data['symbol'], latest_trade_time)
+            result = await self.memory_cleaning(new_ohlc_data['symbol'], latest_trade_time)
+
+        return True
+
+    def save_board(self, board_info):
+        '''
+        板情報を設定(BOARD_RECORD_DB)に応じてDBまたはCSVに記録する
+
+        Args:
+            board_info(dict): 板情報APIで取得した板情報 ※get_time(取得日時)を設定したもの
+
+        Returns:
+            bool: 処理結果
+        '''
+        # DB記録モードの場合
+        if self.config.BOARD_RECORD_DB == 1:
+            # 板情報テーブルに合わせたフォーマットに変換
+            board_table_dict = self.util.mold.response_to_boards(board_info)
+            if board_table_dict != False:
+                # 板情報を学習用テーブルに追加
+                result = self.insert_board(board_table_dict)
+                if result == False:
+                    return False
+        # CSV記録モードの場合
+        else:
+            # 板情報を成形する
+            board_info_dict = self.util.mold.response_to_csv(board_info)
+            if board_info_dict == False:
+                return False
+
+            # 板情報をCSVに記録
+            result = self.record_board_csv(board_info_dict)
+            if result == False:
+                return False
 
         return True
 
@@ -388,16 +431,13 @@ class Record(ServiceBase):
         # タイムゾーン付きの今日の0:00を取得
         latest_datetime, latest_total_volume = self.today_datetime.replace(hour = 0, minute = 0), -999
 
-        # 全メモリのチェック
-        for ohlc in self.ohlc_list:
-            # 証券コードが一致していて取引時間が最新の場合
-            if ohlc['symbol'] == reception_data['Symbol']:
-                if latest_datetime < ohlc['trade_time']:
-                    # 最新取引時間と累計出来高を更新
-                    latest_datetime, latest_total_volume = ohlc['trade_time'], ohlc['total_volume']
+        # メモリにある同じ証券コードで取引時間が最新のデータ
+        ohlc = self.ohlc_store.get_latest(reception_data['Symbol'])
+        if ohlc is not None and latest_datetime < ohlc['trade_time']:
+            latest_datetime, latest_total_volume = ohlc['trade_time'], ohlc['total_volume']
         return latest_datetime, latest_total_volume
 
-    def memory_cleaning(self, symbol, latest_trade_time):
+    async def memory_cleaning(self, symbol, latest_trade_time):
         '''
         メモリで保持しているデータの中からもう更新されなくなったものをDBに登録しメモリから取り除く
 
@@ -408,27 +448,129 @@ class Record(ServiceBase):
         Returns:
             bool: 処理結果
         '''
-        # 削除する要素を一時的に保持するリスト
-        to_remove = []
-
-        # メモリの中から取引情報をチェック
-        for index, ohlc in enumerate(self.ohlc_list):
-            # 証券コードが一致していて取引時間が削除しても良い時間(含む)より前の場合
-            if ohlc['symbol'] == symbol and ohlc['trade_time'] <= latest_trade_time:
-                # DBに登録
-                result, operate_type = self.db.ohlc.upsert(ohlc)
-                if result != True:
-                    self.log.error(f'四本値テーブルへの登録処理でエラー\n{result}')
-                    continue
-                    
-                self.log.info(f'四本値テーブルへの登録処理完了 記録した取引時間: {ohlc["trade_time"]}、証券コード: {ohlc["symbol"]}')
+        # 証券コードが一致していて取引時間が削除しても良い時間(含む)より前のデータ
+        for ohlc in self.ohlc_store.get_until(symbol, latest_trade_time):
+            # DB登録の書き込みキューに追加してメモリから削除(登録は書き込みスレッドで行う)
+            # ※キューが上限の場合もイベントループを止めないように空くのを待つ
+            await self.ohlc_writer.put_async(ohlc)
+            self.ohlc_store.remove(ohlc['symbol'], ohlc['trade_time'])
+
+        return True
+
+    def set_record_date(self, record_datetime):
+        '''
+        記録する日付を設定する(キャプチャファイルの再生時に記録した日の日付にする)
 
-                # 削除対象のインデックスを追加
-                to_remove.append(index)
+        Args:
+            record_datetime(datetime): 記録する日の日時(タイムゾーンあり)
+        '''
+        self.today_datetime = record_datetime
+        self.today = self.today_datetime.strftime('%Y%m%d')
 
-        # DBに登録済みのデータをメモリから一括で削除
-        # 複数削除の場合にインデックス番号がずれて違うデータが削除されるのを防ぐために逆順で削除
-        for index in sorted(to_remove, reverse = True):
-            del self.ohlc_list[index]
+    def start_capture(self, kind):
+        '''
+        受信データのキャプチャファイルへの記録を開始する
 
-        return True
\ No newline at end of file
+        Args:
+            kind(str): 受信データの種別(push: PUSH配信、board: 板情報API)
+
+        Returns:
+            bool: 実行結果
+        '''
+        return self.util.message_capture.open(self.capture_dir, kind, self.config.CAPTURE_SEGMENT_SIZE_MB)
+
+    def capture_board(self, board_info):
+        '''
+        板情報APIの受信データをキャプチャファイルに記録する ※記録を開始していない場合は何もしない
+
+        Args:
+            board_info(dict): 板情報APIで取得した板情報(get_timeを設定する前のもの)
+        '''
+        if self.util.message_capture.is_open():
+            self.util.message_capture.write(json.dumps(board_info, ensure_ascii = False))
+
+    def stop_capture(self):
+        '''受信データのキャプチャファイルへの記録を終了する'''
+        self.util.message_capture.close()
+
+    def get_capture_path_list(self, kind, target):
+        '''
+        再生するキャプチャファイルのパスを取得する
+
+        Args:
+            kind(str): 受信データの種別(push, board)
+            target(str): 日付(yyyymmdd)またはキャプチャファイルのパス
+
+        Returns:
+            path_list(list[str]): キャプチャファイルのパスのリスト(記録した順)
+        '''
+        if os.path.isfile(target):
+            return [target]
+        return self.util.message_capture.get_segment_list(self.capture_dir, kind, target)
+
+    def get_capture_date(self, path_list):
+        '''
+        キャプチャファイルの最初の受信データの受信日時を取得する
+
+        Args:
+            path_list(list[str]): キャプチャファイルのパスのリスト
+
+        Returns:
+            receive_datetime(datetime or None): 受信日時(日本時間) ※受信データがない場合はNone
+        '''
+        for receive_time, _ in self.util.message_capture.read(path_list):
+            return datetime.fromtimestamp(receive_time, timezone(timedelta(hours=9)))
+        return None
+
+    async def replay_push(self, path_list, speed = None):
+        '''
+        キャプチャファイルのPUSH配信を受信処理に流して四本値テーブルに登録する
+
+        Args:
+            path_list(list[str]): キャプチャファイルのパスのリスト
+            speed(float or None): 再生速度(1: 等倍、N: N倍速) ※Noneの場合は待たない(最大速度)
+
+        Returns:
+            bool: 処理結果
+            count(int): 再生した件数
+        '''
+        # 累計出来高の基準日などを記録した日に合わせる
+        receive_datetime = self.get_capture_date(path_list)
+        if receive_datetime is None:
+            self.log.error('再生する受信データがありません')
+            return False, 0
+        self.set_record_date(receive_datetime)
+
+        replay_socket = self.util.message_capture.get_replay_socket(path_list, speed)
+        result = await self.websocket_main(1, replay_socket)
+        return result, replay_socket.count
+
+    def replay_board(self, path_list, speed = None):
+        '''
+        キャプチャファイルの板情報を受信時刻を取得日時としてDBまたはCSVに記録する
+
+        Args:
+            path_list(list[str]): キャプチャファイルのパスのリスト
+            speed(float or None): 再生速度(1: 等倍、N: N倍速) ※Noneの場合は待たない(最大速度)
+
+        Returns:
+            bool: 処理結果
+            count(int): 再生した件数
+        '''
+        # CSVのファイル名の日付を記録した日に合わせる
+        receive_datetime = self.get_capture_date(path_list)
+        if receive_datetime is None:
+            self.log.error('再生する受信データがありません')
+            return False, 0
+        self.set_record_date(receive_datetime)
+
+        count = 0
+        for receive_time, message in self.util.message_capture.replay(path_list, speed):
+            board_info = json.loads(message)
+
+            # 取得日時は記録時と同じくローカル時刻
+            board_info['get_time'] = datetime.fromtimestamp(receive_time)
+            self.save_board(board_info)
+            count += 1
+
+        return True, count
@@ -5,6 +5,9 @@ import traceback
 from service_base import ServiceBase
 from datetime import datetime
 
+# 呼値グループを設定していない銘柄の呼値グループ(TOPIX100採用銘柄以外の株式)
+DEFAULT_YOBINE_GROUP = 10000
+
 class BoardMold(ServiceBase):
     '''板情報CSVを成形する'''
     def __init__(self):
@@ -13,6 +16,30 @@ class BoardMold(ServiceBase):
 
         self.target_csv = []
 
+        # モデルで使う説明変数のカラム名 ※Noneの場合は全ての指標を計算する
+        self.required_columns = None
+
+        # 銘柄ごとの呼値グループ(板のティック数の計算に使用) ※設定していない銘柄はDEFAULT_YOBINE_GROUP
+        self.yobine_group_list = {}
+
+    def set_required_columns(self, required_columns):
+        '''
+        モデルで使う説明変数のカラム名を設定する(一覧のカラムを出力しない指標は計算しない)
+
+        Args:
+            required_columns(list or None): 説明変数のカラム名のリスト ※Noneの場合は全ての指標を計算する
+        '''
+        self.required_columns = required_columns
+
+    def set_yobine_group_list(self, yobine_group_list):
+        '''
+        銘柄ごとの呼値グループを設定する
+
+        Args:
+            yobine_group_list(dict): {証券コード: 呼値グループ} ※エンドポイント /symbol/{証券コード} のPriceRangeGroup
+        '''
+        self.yobine_group_list = {str(stock_code): yobine_group for stock_code, yobine_group in yobine_group_list.items()}
+
     def main(self):
         '''主処理'''
         # 取得対象となるCSVを取得する
@@ -86,7 +113,7 @@ class BoardMold(ServiceBase):
             board_df(pandas.DataFrame) or False: 読み込んだCSVのデータ
         '''
         try:
-            board_df = pd.read_csv(csv_path)
+            board_df = self.util.schema.read_csv('board', csv_path)
         except Exception as e:
             self.log.error(f'CSV読み込みでエラー パス: {csv_path}\n{str(e)}\n{traceback.format_exc()}')
             return None, False
@@ -134,17 +161,15 @@ class BoardMold(ServiceBase):
         window_size_list3 = [10, 12, 15]
         af_list = [[0.01, 0.1], [0.02, 0.2], [0.05, 0.5], [0.1, 1]]
 
+        # 計算する指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+        feature_spec = {}
         for minute in minute_list:
-            # minute分前からの増減率・増減幅・増減フラグを計算・追加する
-            result, board_df = self.util.indicator.get_change_price(df = board_df,
-                                                                    column_name = f'change_{minute}min',
-                                                                    interval = minute)
-
-            if result == False:
-                return False, None
+            # minute分前からの増減率・増減幅・増減フラグ
+            features = [['change']]
 
             # 説明変数に60分足以上の間隔ではデータ数が少なくなりすぎるのでスキップ
             if minute >= 60:
+                feature_spec[minute] = features
                 continue
 
             for window_size in window_size_list:
@@ -152,107 +177,60 @@ class BoardMold(ServiceBase):
                 if minute * window_size > 150:
                     continue
 
-                # 単純移動平均線(SMA)を計算・追加する
-                result, board_df = self.util.indicator.get_sma(df = board_df,
-                                                               column_name = f'sma_{minute}min_{window_size}piece',
-                                                               window_size = window_size,
-                                                               interval = minute)
-                if result == False:
-                    return False, None
-
-                # 指数移動平均線(EMA)を計算・追加する
-                result, board_df = self.util.indicator.get_ema(df = board_df,
-                                                               column_name = f'ema_{minute}min_{window_size}piece',
-                                                               window_size = window_size,
-                                                               interval = minute)
-                if result == False:
-                    return False, None
-
-                # 加重移動平均線(WMA)を計算・追加する
-                result, board_df = self.util.indicator.get_wma(df = board_df,
-                                                               column_name = f'wma_{minute}min_{window_size}piece',
-                                                               window_size = window_size,
-                                                               interval = minute)
-                if result == False:
-                    return False, None
-
-                # ボリンジャーバンドを計算・追加する
-                result, board_df = self.util.indicator.get_bollinger_bands(df = board_df,
-                                                                           column_name = f'bb_{minute}min_{window_size}piece',
-                                                                           window_size = window_size,
-                                                                           interval = minute)
-                if result == False:
-                    return False, None
-
-            # 短期と長期の移動平均線の関連性を計算・追加する
-            result, board_df = self.util.indicator.get_ma_cross(df = board_df, interval = minute)
+                # 単純移動平均線(SMA)・指数移動平均線(EMA)・加重移動平均線(WMA)・ボリンジャーバンド
+                features.extend([['sma', window_size], ['ema', window_size], ['wma', window_size], ['bb', window_size]])
+
+            # 短期と長期の移動平均線の関連性
+            features.append(['ma_cross'])
 
             for window_size in window_size_list2:
                 # 間隔と本数が多すぎると実際の数値が出るまで時間がかかるためスキップ
                 if minute * window_size > 150:
                     continue
 
-                # RSIを計算・追加する
-                result, board_df = self.util.indicator.get_rsi(df = board_df,
-                                                            column_name = f'rsi_{minute}min_{window_size}piece',
-                                                            window_size = window_size,
-                                                            interval = minute)
-                if result == False:
-                    return False, None
-
-                # RCIを計算・追加する
-                result, board_df = self.util.indicator.get_rci(df = board_df,
-                                                               column_name = f'rci_{minute}min_{window_size}piece',
-                                                               window_size = window_size,
-                                                               interval = minute)
-                if result == False:
-                    return False, None
+                # RSI・RCI
+                features.extend([['rsi', window_size], ['rci', window_size]])
 
             for window_size in window_size_list3:
                 # 間隔と本数が多すぎると実際の数値が出るまで時間がかかるためスキップ
                 if minute * window_size > 150:
                     continue
 
-                # サイコロジカルラインを計算・追加する
-                result, board_df = self.util.indicator.get_psy(df = board_df,
-                                                               column_name = f'psy_{minute}min_{window_size}piece',
-                                                               window_size = window_size,
-                                                               interval = minute)
-                if result == False:
-                    return False, None
+                # サイコロジカルライン
+                features.append(['psy', window_size])
 
+            # パラボリックSAR
             for min_af, max_af in af_list:
-                # パラボリックSARを計算・追加する
-                result, board_df = self.util.indicator.get_parabolic(df = board_df,
-                                                                     column_name = f'sar_{minute}min_{min_af}_{max_af}af',
-                                                                     min_af = min_af,
-                                                                     max_af = max_af,
-                                                                     interval = minute)
-                if result == False:
-                    return False, None
-
-            # MACDを計算・追加する
-            result, board_df = self.util.indicator.get_macd(df = board_df,
-                                                            column_name = f'macd_{minute}min',
-                                                            short_window_size = 12,
-                                                            long_window_size = 26,
-                                                            signal_window_size = 9,
-                                                            interval = minute)
-            if result == False:
-                return False, None
+                features.append(['sar', min_af, max_af])
+
+            # MACD
+            features.append(['macd', 12, 26, 9])
 
             # 一目均衡表は計算に広いデータが必要になるため5分足までで制限
-            if minute > 5:
-                continue
+            if minute <= 5:
+                features.append(['ichimoku', 9, 26])
 
-            # 一目均衡表を計算・追加する
-            result, board_df = self.util.indicator.get_ichimoku_cloud(df = board_df,
-                                                                      column_name = f'ichimoku_{minute}min',
-                                                                      short_window_size = 9,
-                                                                      long_window_size = 26,
-                                                                      interval = minute)
-            if result == False:
-                return False, None
+            feature_spec[minute] = features
+
+        # モデルで使わない指標は計算しない(目的変数のchangeは残す)
+        feature_spec = self.util.feature_manifest.filter_spec(feature_spec, self.required_columns)
+
+        # 時間足ごとにまとめてテクニカル指標を計算する
+        result, feature_df = self.util.indicator.get_features(df = board_df, feature_spec = feature_spec)
+        if result == False:
+            return False, None
+
+        # 板の厚み・偏り・気配の変化を計算する
+        yobine_group = self.yobine_group_list.get(str(board_df['stock_code'].iloc[0]), DEFAULT_YOBINE_GROUP)
+        result, board_feature_df = self.util.board_feature.get_features(df = board_df, yobine_group = yobine_group)
+        if result == False:
+            return False, None
+
+        # モデルで使わないカラムは出力しない
+        if self.required_columns is not None:
+            board_feature_df = board_feature_df[[column for column in board_feature_df.columns if column in set(self.required_columns)]]
+
+        board_df = pd.concat([board_df, feature_df, board_feature_df], axis = 1)
 
         return True, board_df
 
@@ -2,7 +2,10 @@ import os
 import pandas as pd
 import re
 import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from itertools import islice
 from service_base import ServiceBase
 from tqdm import tqdm
 
@@ -23,11 +26,79 @@ class MoldPastRecord(ServiceBase):
         self.tmp_target_list = []
         self.formatted_separated_list = []
 
-    def set_dir_name(self, csv_dir_name, tmp_csv_dir_name, formatted_csv_dir_name):
-        '''CSVファイルが格納されているディレクトリ名を設定する'''
+        # モデルで使う説明変数のカラム名 ※Noneの場合は全ての指標を計算する
+        self.required_columns = None
+
+        # 四本値CSVを分割して読み込む行数 ※Noneの場合はファイル全体を一度に読み込む
+        self.read_chunk_rows = None
+
+        # 銘柄・日付ごとの処理の並列実行の設定 ※ワーカー数が1の場合は並列化しない
+        self.workers = 1
+        self.chunk_size = 1
+        self.worker_memory_limit_mb = None
+
+        # 目的変数・説明変数の追加とまとめを続けて行う場合に途中のファイルを出力するか
+        self.keep_intermediate = False
+
+        # 目的変数・説明変数の追加とまとめを続けて行う場合の日付ごとの残り件数・計算済のデータ
+        self.fused_remain_dict = {}
+        self.fused_result_dict = {}
+
+        # 目的変数・説明変数の追加とまとめを続けて行う場合の説明変数の定義(まとめ先のファイルに記録する)
+        self.fused_feature_spec = None
+
+    def set_dir_name(self, csv_dir_name, tmp_csv_dir_name, formatted_csv_dir_name, cache_dir_name = None, cache_max_size_mb = None):
+        '''
+        CSVファイルが格納されているディレクトリ名を設定する
+
+        Args:
+            csv_dir_name(str): 四本値CSVのディレクトリ
+            tmp_csv_dir_name(str): 目的変数・説明変数を追加したCSVのディレクトリ
+            formatted_csv_dir_name(str): 結合済CSVのディレクトリ
+            cache_dir_name(str or None): テクニカル指標のキャッシュのディレクトリ ※Noneの場合はキャッシュを使わない
+            cache_max_size_mb(int or None): テクニカル指標のキャッシュの上限サイズ(MB)
+        '''
         self.csv_dir_name = csv_dir_name
         self.tmp_csv_dir_name = tmp_csv_dir_name
         self.formatted_csv_dir_name = formatted_csv_dir_name
+        self.util.indicator_cache.set_cache_dir(cache_dir_name, cache_max_size_mb)
+
+        # まとめ済の銘柄・日付は四本値CSVと同じディレクトリの進捗管理用DBに記録する
+        self.util.pipeline_manifest.set_db_path(os.path.join(csv_dir_name, 'pipeline_manifest.db'))
+
+        # まとめ先のファイルの説明変数のバージョンは結合済CSVと同じディレクトリに記録する
+        self.util.feature_store.set_dir(formatted_csv_dir_name)
+
+    def set_required_columns(self, required_columns):
+        '''
+        モデルで使う説明変数のカラム名を設定する(一覧のカラムを出力しない指標は計算しない)
+
+        Args:
+            required_columns(list or None): 説明変数のカラム名のリスト ※Noneの場合は全ての指標を計算する
+        '''
+        self.required_columns = required_columns
+
+    def set_read_chunk_rows(self, read_chunk_rows):
+        '''
+        四本値CSV(ohlc_yyyymm.csv)を分割して読み込む行数を設定する
+
+        Args:
+            read_chunk_rows(int or None): 1回に読み込む行数 ※Noneの場合はファイル全体を一度に読み込む
+        '''
+        self.read_chunk_rows = read_chunk_rows
+
+    def set_parallel(self, workers, chunk_size = 20, worker_memory_limit_mb = None):
+        '''
+        銘柄・日付ごとの目的変数・説明変数の追加処理をプロセスプールで並列実行する設定を行う
+
+        Args:
+            workers(int or None): ワーカープロセス数 ※Noneの場合はCPUのコア数、1の場合は並列化しない
+            chunk_size(int): 1タスクでまとめて処理するファイル数
+            worker_memory_limit_mb(int or None): ワーカープロセスごとのメモリ上限(MB) ※Noneの場合は無制限
+        '''
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.worker_memory_limit_mb = worker_memory_limit_mb
 
     def get_target_csv_name_list(self):
         '''
@@ -66,11 +137,12 @@ class MoldPastRecord(ServiceBase):
         try:
             # ディレクトリ内のCSVファイル名を取得
             csv_name_list = os.listdir(self.tmp_csv_dir_name)
+            extension = self.util.frame_store.get_extension()
 
             tmp_target_list = []
             for csv_name in csv_name_list:
-                # 目的変数を設定したCSVファイル(tmp_ohlc_yyyyymmdd_[stock_code].csv)を抽出
-                if re.fullmatch(r'tmp_ohlc_\d{8}_\w{4}.csv', csv_name):
+                # 目的変数を設定したファイル(tmp_ohlc_yyyyymmdd_[stock_code].csv/.parquet/.feather)を抽出
+                if re.fullmatch(rf'tmp_ohlc_\d{{8}}_\w{{4}}{re.escape(extension)}', csv_name):
                     tmp_target_list.append(csv_name)
 
             # インスタンス変数に追加
@@ -84,6 +156,14 @@ class MoldPastRecord(ServiceBase):
     def merge_csv(self):
         '''成形済CSVファイルを一つにまとめる'''
 
+        # 列指向形式は追記ができないので日付ごとにまとめて書き込む
+        if self.util.frame_store.file_format != 'csv':
+            return self.merge_frame()
+
+        # まとめ先のファイルに記録する説明変数の定義
+        feature_spec = self.get_iv_feature_spec()
+        self.util.feature_store.register_set(feature_spec)
+
         try:
             # 目的変数まで追加されているCSVファイルのリストを取得
             formatted_tmp_csv_list = [csv_name for csv_name in os.listdir(self.tmp_csv_dir_name) if re.fullmatch(r'formatted_tmp_ohlc_\d{8}_\w{4}.csv', csv_name)]
@@ -118,27 +198,88 @@ class MoldPastRecord(ServiceBase):
                     self.log.error(f'まとめファイルへの書き込みでエラーが発生しました。出力先ファイル名: {output_csv_path}、出力元ファイル名: {csv_path}\n{e}\n{traceback.format_exc()}')
                     continue
 
-                # まとめに成功したファイルを別ファイルに記録する
-                try:
-                    # 記録に成功した小分けしたCSVファイル名,まとめ先のCSVファイル名の順に記録
-                    recorded_csv_name = 'recorded_ohlc.csv'
-                    csv_path = os.path.join(self.csv_dir_name, recorded_csv_name)
-                    with open(csv_path, 'a') as f:
-                        f.write(f'{csv_name},{output_csv_file_name}\n')
-                except Exception as e:
-                    self.log.error(f'まとめ完了したCSVファイルを記録する処理でエラーが発生しました。出力ファイル名: {csv_path}、出力内容: {csv_name},{output_csv_file_name}\n{e}\n{traceback.format_exc()}')
-                    continue
+                # まとめ先のファイルの説明変数を記録する
+                self.util.feature_store.record_append(output_csv_path, feature_spec, not exist_csv)
+
+                # まとめに成功したファイルを記録して、まとめ元のファイルを削除する
+                self.record_merged_file(csv_name, output_csv_file_name)
+
+        except Exception as e:
+            self.log.error(f'成形済CSVファイルの一括まとめ処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def merge_frame(self):
+        '''
+        成形済のParquet/Featherファイルを日付ごとに一つにまとめる
+
+        既存のまとめファイルと同じ日付の成形済ファイルを結合して書き込み直す
+        '''
+        frame_store = self.util.frame_store
+        extension = frame_store.get_extension()
+
+        # まとめ先のファイルに記録する説明変数の定義
+        feature_spec = self.get_iv_feature_spec()
+        self.util.feature_store.register_set(feature_spec)
+
+        try:
+            # 成形済ファイルを日付ごとにまとめる
+            # 例: formatted_tmp_ohlc_20210101_0000.parquet -> 20210101
+            date_dict = {}
+            for file_name in os.listdir(self.tmp_csv_dir_name):
+                if re.fullmatch(rf'formatted_tmp_ohlc_\d{{8}}_\w{{4}}{re.escape(extension)}', file_name):
+                    date_dict.setdefault(re.search(r'\d{8}', file_name).group(), []).append(file_name)
+
+            for date, file_name_list in tqdm(date_dict.items()):
+                output_file_name = f'formatted_ohlc_{date}{extension}'
+                output_path = os.path.join(self.formatted_csv_dir_name, output_file_name)
 
-                # まとめ元のファイルを削除
                 try:
-                    os.remove(os.path.join(self.tmp_csv_dir_name, csv_name))
-                    os.remove(os.path.join(self.tmp_csv_dir_name, csv_name.replace('formatted_', '')))
+                    exist_file = os.path.exists(output_path)
+                    df_list = [frame_store.read(output_path)] if exist_file else []
+                    df_list.extend(frame_store.read(os.path.join(self.tmp_csv_dir_name, file_name)) for file_name in file_name_list)
+                    frame_store.write(pd.concat(df_list, ignore_index = True), output_path)
                 except Exception as e:
-                    self.log.error(f'まとめ完了したCSVファイルを削除する処理でエラーが発生しました。削除ファイル名: {csv_name} / {csv_name.replace("formatted_", "")}\n{e}\n{traceback.format_exc()}')
+                    self.log.error(f'まとめファイルへの書き込みでエラーが発生しました。出力先ファイル名: {output_path}、出力元ファイル数: {len(file_name_list)}\n{e}\n{traceback.format_exc()}')
                     continue
 
+                # まとめ先のファイルの説明変数を記録する
+                self.util.feature_store.record_append(output_path, feature_spec, not exist_file)
+
+                # まとめに成功したファイルを記録して、まとめ元のファイルを削除する
+                for file_name in file_name_list:
+                    self.record_merged_file(file_name, output_file_name)
+
         except Exception as e:
-            self.log.error(f'成形済CSVファイルの一括まとめ処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
+            self.log.error(f'成形済ファイルの一括まとめ処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def record_merged_file(self, csv_name, output_csv_file_name):
+        '''
+        まとめに成功したファイルの銘柄・日付を進捗管理用DBに記録し、まとめ元のファイルを削除する
+
+        Args:
+            csv_name(str): まとめ元のファイル名(formatted_tmp_ohlc_yyyymmdd_[stock_code].xxx)
+            output_csv_file_name(str): まとめ先のファイル名
+
+        Returns:
+            bool: 実行結果
+        '''
+        # まとめに成功した銘柄・日付をまとめ済(merge)として記録する
+        partition = self.util.pipeline_manifest.parse_file_name(csv_name)
+        if partition is None or self.util.pipeline_manifest.mark_done([partition], 'merge', output_csv_file_name) == False:
+            self.log.error(f'まとめ完了したファイルを記録する処理でエラーが発生しました。記録内容: {csv_name},{output_csv_file_name}')
+            return False
+
+        # まとめ元のファイルを削除
+        try:
+            os.remove(os.path.join(self.tmp_csv_dir_name, csv_name))
+            os.remove(os.path.join(self.tmp_csv_dir_name, csv_name.replace('formatted_', '')))
+        except Exception as e:
+            self.log.error(f'まとめ完了したCSVファイルを削除する処理でエラーが発生しました。削除ファイル名: {csv_name} / {csv_name.replace("formatted_", "")}\n{e}\n{traceback.format_exc()}')
             return False
 
         return True
@@ -150,156 +291,605 @@ class MoldPastRecord(ServiceBase):
             for csv_name in self.target_list:
                 self.log.info(f'対象CSVファイル名: {csv_name}')
 
-                # CSVファイルの読み込み
-                csv_path = os.path.join(self.csv_dir_name, csv_name)
-                df = pd.read_csv(csv_path)
+                # 出力先ディレクトリのファイル一覧を取得(存在チェック用にsetにする)
+                output_csv_list = set(os.listdir(self.tmp_csv_dir_name))
 
-                # データの前処理
-                # timestampをdatetime型に変換
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                # まとめ済の銘柄・日付を取得
+                merged_set = self.get_merged_set()
 
-                # 重要度の低い(クロージング・オークション)のレコードを削除
-                df = self.delete_record(df)
+                # CSVファイルを分割して読み込み、銘柄・日付ごとのデータは処理する直前に取り出す
+                # ※月のファイル全体や並列実行時の全件分のコピーをメモリに載せない
+                task_list = self.get_dv_task_list(csv_name, output_csv_list, merged_set)
 
-                # 時間に関する特徴量を追加
-                ## 処理量を減らすため、この中から必要なカラムだけを引数として送り、あとで結合させる
-                df_tmp = self.add_time_feature(df[['timestamp']])
+                self.run_task('create_dv_file', task_list, None)
 
-                ## 重複するカラムを削除してから結合
-                df_tmp.drop(columns = 'timestamp', inplace = True)
-                df = pd.concat([df, df_tmp], axis = 1)
+        except Exception as e:
+            self.log.error(f'目的変数追加処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
+            return False
+
+        return True
 
-                # 日付/証券コードのユニーク値を取得
-                date_list = df['date'].unique()
-                stock_code_list = df['stock_code'].unique()
+    def get_dv_task_list(self, csv_name, output_csv_list, merged_set):
+        '''
+        四本値CSVファイルを分割して読み込み、出力済でない1銘柄・1日分のデータを順番に返す
 
-                # 目的変数(株価変化額/率/フラグ)のカラムを追加
-                ## 処理量を減らすため、この中から必要なカラムだけを引数として送り、あとで結合させる
-                target_columns = ['timestamp', 'close', 'stock_code', 'date']
+        Args:
+            csv_name(str): 四本値CSVファイル名(ohlc_yyyymm.csv)
+            output_csv_list(set): 出力先ディレクトリのファイル名
+            merged_set(set[tuple]): まとめ済の(証券コード, 日付)
 
-                # 出力先ディレクトリのファイル一覧を取得
-                output_csv_list = os.listdir(self.tmp_csv_dir_name)
+        Yields:
+            df(pandas.DataFrame): 1銘柄・1日分の四本値・時間の特徴量のデータ
+            output_csv_name(str): 出力先のファイル名
+        '''
+        extension = self.util.frame_store.get_extension()
 
-                # 記録済のCSVのデータを取得
-                try:
-                    recorded_df = pd.read_csv(os.path.join(self.csv_dir_name, 'recorded_ohlc.csv'), header = None)
-                    recorded_list = recorded_df[0].tolist()
-                except Exception as e:
-                    # ファイルが存在しない場合
-                    self.log.info('記録済のCSVデータは存在しません')
-                    recorded_list = []
+        for df in self.read_ohlc_chunks(csv_name):
+            # 日付/証券コードごとのデータに1回で分割する(組み合わせごとに全行を走査しない)
+            grouped = df.groupby(['date', 'stock_code'], sort = True)
 
-                for date in tqdm(date_list):
-                    for stock_code in tqdm(stock_code_list):
-                        # 出力先のCSVファイルの存在チェック
-                        output_csv_name = f'tmp_ohlc_{str(date).replace("-", "")}_{stock_code}.csv'
-                        output_csv_path = os.path.join(self.tmp_csv_dir_name, output_csv_name)
+            for date, stock_code in grouped.groups.keys():
+                # 出力先のCSVファイルの存在チェック
+                output_csv_name = f'tmp_ohlc_{str(date).replace("-", "")}_{stock_code}{extension}'
 
-                        # 同名のCSVファイルが存在した場合は既に出力済と判定してスキップ
-                        if output_csv_name in output_csv_list:
-                            #self.log.info(f'既にCSVにデータ出力済のためスキップします: {output_csv_path}')
-                            continue
+                # 同名のCSVファイルが存在した場合は既に出力済と判定してスキップ
+                if output_csv_name in output_csv_list:
+                    continue
 
-                        # 記録済情報をメモしたファイルに記録されていた場合は出力済と判定してスキップ
-                        if f'formatted_{output_csv_name}' in recorded_list:
-                            continue
+                # 進捗管理用DBにまとめ済として記録されていた場合は出力済と判定してスキップ
+                if (str(stock_code), str(date)) in merged_set:
+                    continue
 
-                        #self.log.info(f'目的変数追加処理開始 出力ファイル名: {output_csv_path}')
+                yield grouped.get_group((date, stock_code)), output_csv_name
 
-                        # 日付/証券コードごとにデータを切り出し
-                        df_tmp = df[(df['date'] == date) & (df['stock_code'] == stock_code)].copy()
+    def read_ohlc_chunks(self, csv_name):
+        '''
+        四本値CSVファイルを銘柄・日付の区切りで分割して読み込み、前処理をしたデータを順番に返す
 
-                        # データが存在しなければスキップ
-                        if df_tmp.empty:
-                            continue
+        read_chunk_rows行ずつ読み込み、末尾の銘柄・日付は次に読み込んだデータと合わせて返す
+        (1銘柄・1日分のデータが分かれないようにする) ※ファイルの大きさによらずメモリに載るのは約read_chunk_rows行分
 
-                        # 目的変数(株価変化額/率/フラグ)のカラムを追加
-                        df_dv = self.culc_dv(df_tmp[target_columns])
-                        if df_dv is None:
-                            self.log.error(f'目的変数追加処理でエラー 出力ファイル名: {output_csv_path}')
-                            continue
+        Args:
+            csv_name(str): 四本値CSVファイル名(ohlc_yyyymm.csv)
 
-                        ## 重複するカラムを削除してから結合
-                        df_dv.drop(columns = target_columns, inplace = True)
-                        new_df = pd.concat([df_tmp, df_dv], axis = 1)
+        Yields:
+            df(pandas.DataFrame): 前処理をしたデータ ※1銘柄・1日分のデータは全て同じチャンクに含まれる
 
-                        # timestampをstr型に戻して秒を削除
-                        new_df['timestamp'] = new_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
+        Memo:
+            past_ohlc.pyは1銘柄ずつ日付順に追記するため、同じ銘柄・日付の行はファイル内で連続している
+            連続していない行があるファイルは分割すると1銘柄・1日分のデータが欠けるため、ファイル全体を一度に読み込む
+        '''
+        if self.read_chunk_rows is None:
+            yield self.read_ohlc_csv(csv_name)
+            return
 
-                        # 一時保存のCSVファイルの出力
-                        output_csv_path = os.path.join(self.tmp_csv_dir_name, f'tmp_ohlc_{str(date).replace("-", "")}_{stock_code}.csv')
-                        new_df.to_csv(output_csv_path, index = False)
+        csv_path = os.path.join(self.csv_dir_name, csv_name)
 
-                        #self.log.info(f'目的変数追加処理終了 出力ファイル名: {output_csv_path}')
+        # 同じ銘柄・日付の行が連続していない場合はファイル全体を読み込んでから分割する
+        if not self.is_contiguous_csv(csv_path):
+            self.log.warning(f'同じ銘柄・日付の行が連続していないため、ファイル全体を読み込みます ファイル名: {csv_name}')
+            yield self.read_ohlc_csv(csv_name)
+            return
 
+        # 次のチャンクに持ち越す行
+        carry_df = None
+
+        for chunk_df in self.util.schema.read_csv('ohlc', csv_path, chunksize = self.read_chunk_rows):
+            if carry_df is not None:
+                chunk_df = pd.concat([carry_df, chunk_df], ignore_index = True)
+
+            # 末尾の行と同じ銘柄・日付が続く範囲は次のチャンクに続いている可能性があるので持ち越す
+            key = chunk_df['stock_code'].astype(str) + '_' + chunk_df['timestamp'].astype(str).str[:10]
+            boundary_list = (key != key.iat[-1]).to_numpy().nonzero()[0]
+            split_index = 0 if len(boundary_list) == 0 else boundary_list[-1] + 1
+
+            carry_df = chunk_df.iloc[split_index:]
+            if split_index == 0:
+                continue
+
+            yield self.preprocess_ohlc(chunk_df.iloc[:split_index])
+
+        if carry_df is not None and len(carry_df) > 0:
+            yield self.preprocess_ohlc(carry_df)
+
+    def is_contiguous_csv(self, csv_path):
+        '''
+        四本値CSVファイルの同じ銘柄・日付の行が全て連続しているかを判定する
+
+        銘柄と時刻のカラムのみをread_chunk_rows行ずつ読み込んで確認する
+
+        Args:
+            csv_path(str): 四本値CSVファイルのパス
+
+        Returns:
+            bool: 全て連続しているか
+        '''
+        # 出現済の銘柄・日付と直前のチャンクの末尾の銘柄・日付
+        seen_set = set()
+        last_key = None
+
+        for chunk_df in self.util.schema.read_csv('ohlc', csv_path, columns = ['stock_code', 'timestamp'], chunksize = self.read_chunk_rows):
+            key = chunk_df['stock_code'].astype(str) + '_' + chunk_df['timestamp'].astype(str).str[:10]
+
+            # 銘柄・日付が切り替わる行のみを取り出す(直前のチャンクの末尾から続く行は除く)
+            changed = (key != key.shift()).to_numpy()
+            changed[0] = key.iat[0] != last_key
+            start_key_list = key[changed].tolist()
+
+            # 切り替わった先の銘柄・日付が出現済であれば連続していない
+            if len(set(start_key_list)) != len(start_key_list) or not seen_set.isdisjoint(start_key_list):
+                return False
+
+            seen_set.update(start_key_list)
+            last_key = key.iat[-1]
+
+        return True
+
+    def read_ohlc_csv(self, csv_name):
+        '''
+        四本値CSVファイルを読み込み、不要なレコードの削除と時間に関する特徴量の追加を行う
+
+        Args:
+            csv_name(str): 四本値CSVファイル名(ohlc_yyyymm.csv)
+
+        Returns:
+            df(pandas.DataFrame): 前処理をしたデータ
+        '''
+        csv_path = os.path.join(self.csv_dir_name, csv_name)
+        return self.preprocess_ohlc(self.util.schema.read_csv('ohlc', csv_path))
+
+    def preprocess_ohlc(self, df):
+        '''
+        四本値データの不要なレコードの削除と時間に関する特徴量の追加を行う
+
+        Args:
+            df(pandas.DataFrame): 四本値CSVから読み込んだデータ
+
+        Returns:
+            df(pandas.DataFrame): 前処理をしたデータ
+        '''
+        # データの前処理
+        # timestampをdatetime型に変換
+        df = self.util.schema.parse_datetime('ohlc', df)
+
+        # 重要度の低い(クロージング・オークション)のレコードを削除
+        df = self.delete_record(df)
+
+        # 時間に関する特徴量を追加
+        ## 処理量を減らすため、この中から必要なカラムだけを引数として送り、あとで結合させる
+        df_tmp = self.add_time_feature(df[['timestamp']])
+
+        ## 重複するカラムを削除してから結合
+        df_tmp.drop(columns = 'timestamp', inplace = True)
+        df = pd.concat([df, df_tmp], axis = 1)
+
+        return df
+
+    def create_dv_file(self, df, output_csv_name):
+        '''
+        1銘柄・1日分のデータに目的変数のカラムを追加してCSVファイルに出力する
+
+        Args:
+            df(pandas.DataFrame): 1銘柄・1日分の四本値・時間の特徴量のデータ
+            output_csv_name(str): 出力先のCSVファイル名
+
+        Returns:
+            bool: 実行結果
+        '''
+        output_csv_path = os.path.join(self.tmp_csv_dir_name, output_csv_name)
+
+        result, new_df = self.add_dv_columns(df)
+        if result == False:
+            self.log.error(f'目的変数追加処理でエラー 出力ファイル名: {output_csv_path}')
+            return False
+
+        try:
+            # 一時保存のファイルの出力
+            self.write_dv_file(new_df, output_csv_path)
         except Exception as e:
-            self.log.error(f'目的変数追加処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
+            self.log.error(f'目的変数追加処理でエラー 出力ファイル名: {output_csv_path}\n{e}\n{traceback.format_exc()}')
             return False
 
         return True
 
+    def add_dv_columns(self, df):
+        '''
+        1銘柄・1日分のデータに目的変数のカラムを追加する
+
+        Args:
+            df(pandas.DataFrame): 1銘柄・1日分の四本値・時間の特徴量のデータ
+
+        Returns:
+            bool: 実行結果
+            new_df(pandas.DataFrame): 目的変数のカラムを追加したデータ ※timestamp, dateは文字列にする
+        '''
+        try:
+            # 目的変数(株価変化額/率/フラグ)のカラムを追加
+            ## 処理量を減らすため、この中から必要なカラムだけを引数として送り、あとで結合させる
+            target_columns = ['timestamp', 'close', 'stock_code', 'date']
+            df_dv = self.culc_dv(df[target_columns])
+            if df_dv is None:
+                return False, None
+
+            ## 重複するカラムを削除してから結合
+            df_dv.drop(columns = target_columns, inplace = True)
+            new_df = pd.concat([df, df_dv], axis = 1)
+
+            # timestampをstr型に戻して秒を削除
+            new_df['timestamp'] = new_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
+
+            # dateもCSVと同じ文字列にする(列指向形式で日付型として保存されないように)
+            new_df['date'] = new_df['date'].astype(str)
+
+        except Exception as e:
+            self.log.error(f'目的変数の追加でエラー\n{e}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, new_df
+
+    def write_dv_file(self, df, output_csv_path):
+        '''
+        目的変数を追加したデータを一時保存のファイルに出力する
+
+        Args:
+            df(pandas.DataFrame): 目的変数を追加したデータ
+            output_csv_path(str): 出力先のパス
+        '''
+        # フラグ・時間の特徴量・価格を小さい型に変換
+        # ※列指向形式は型ごと保存されるので、説明変数の計算で価格の精度が落ちないように変換しない(成形後に変換する)
+        if self.util.frame_store.file_format == 'csv':
+            df = self.util.feature_dtype.compact(df)
+
+        self.util.frame_store.write(df, output_csv_path)
+
     def create_iv(self):
         '''説明変数のカラムを作成する'''
 
         try:
-            # 出力先ディレクトリのファイル一覧を取得
-            output_csv_list = os.listdir(self.tmp_csv_dir_name)
+            # 出力先ディレクトリのファイル一覧を取得(存在チェック用にsetにする)
+            output_csv_list = set(os.listdir(self.tmp_csv_dir_name))
 
-            # 記録済のCSVのデータを取得
-            try:
-                recorded_df = pd.read_csv(os.path.join(self.csv_dir_name, 'recorded_ohlc.csv'), header = None)
-                recorded_list = recorded_df[0].tolist()
-            except Exception as e:
-                # ファイルが存在しない場合
-                self.log.info('記録済のCSVデータは存在しません')
-                recorded_list = []
-
-            for csv_name in tqdm(self.tmp_target_list):
+            # まとめ済の銘柄・日付を取得
+            merged_set = self.get_merged_set()
+
+            task_list = []
+            for csv_name in self.tmp_target_list:
                 # 出力先CSVファイルの存在チェック
                 output_csv_file_name = f'formatted_{csv_name}'
-                output_csv_path = os.path.join(self.tmp_csv_dir_name, output_csv_file_name)
 
                 # 出力先に同名のCSVファイルが存在する場合は既に出力済と判定してスキップ
                 if output_csv_file_name in output_csv_list:
-                    #self.log.info(f'既にCSVにデータ出力済のためスキップします: {output_csv_file_name}')
                     continue
 
-                # 記録済情報をメモしたファイルに記録されていた場合は出力済と判定してスキップ
-                if output_csv_file_name in recorded_list:
+                # 進捗管理用DBにまとめ済として記録されていた場合は出力済と判定してスキップ
+                if self.util.pipeline_manifest.parse_file_name(csv_name) in merged_set:
                     continue
 
-                # CSVファイルの読み込み
-                csv_path = os.path.join(self.tmp_csv_dir_name, csv_name)
-                df = pd.read_csv(csv_path)
-
-                # 主要なテクニカル指標を追加
-                ## 処理量を減らすため、この中から必要なカラムだけを引数として送り、あとで結合させる
-                target_columns = ['date', 'stock_code', 'high', 'low', 'close']
-                #self.log.info(f'説明変数追加処理開始 出力ファイル名: {output_csv_file_name}')
-                result, df_tmp = self.culc_iv(df[target_columns])
-                if result == False:
-                    self.log.info(f'説明変数追加処理でエラー 対象ファイル名: {csv_name}、 出力ファイル名: {output_csv_file_name}')
-                    continue
+                task_list.append((csv_name,))
+
+            self.run_task('create_iv_file', task_list, len(task_list))
+
+        except Exception as e:
+            self.log.error(f'説明変数追加処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def create_iv_file(self, csv_name):
+        '''
+        目的変数追加済のCSVファイルに説明変数のカラムを追加してformatted_[ファイル名]に出力する
+
+        Args:
+            csv_name(str): 目的変数追加済のCSVファイル名
 
-                ## 重複するカラムを削除してから結合
-                df_tmp.drop(columns = target_columns, inplace = True)
-                df = pd.concat([df, df_tmp], axis = 1)
+        Returns:
+            bool: 実行結果
+        '''
+        output_csv_file_name = f'formatted_{csv_name}'
 
-                # 余分にできてしまった空のレコードを削除
-                df.dropna(how='all', inplace = True)
+        try:
+            # CSVファイルの読み込み
+            csv_path = os.path.join(self.tmp_csv_dir_name, csv_name)
+            df = self.util.frame_store.read(csv_path)
 
-                # CSVファイルの出力
-                output_csv_path = os.path.join(self.tmp_csv_dir_name, f'formatted_{csv_name}')
-                df.to_csv(output_csv_path, index = False)
+            # 主要なテクニカル指標を追加
+            result, df = self.add_iv_columns(df)
+            if result == False:
+                self.log.info(f'説明変数追加処理でエラー 対象ファイル名: {csv_name}、 出力ファイル名: {output_csv_file_name}')
+                return False
 
-                #self.log.info(f'説明変数追加処理終了 出力ファイル名: {output_csv_file_name}')
+            # ファイルの出力
+            self.util.frame_store.write(df, os.path.join(self.tmp_csv_dir_name, output_csv_file_name))
 
         except Exception as e:
-            self.log.error(f'説明変数追加処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
+            self.log.error(f'説明変数追加処理でエラー 対象ファイル名: {csv_name}、 出力ファイル名: {output_csv_file_name}\n{e}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def add_iv_columns(self, df):
+        '''
+        目的変数を追加したデータに説明変数(テクニカル指標)のカラムを追加する
+
+        Args:
+            df(pandas.DataFrame): 1銘柄・1日分の目的変数を追加したデータ
+
+        Returns:
+            bool: 実行結果
+            df(pandas.DataFrame): 説明変数のカラムを追加して小さい型に変換したデータ
+        '''
+        # 処理量を減らすため、この中から必要なカラムだけを引数として送り、あとで結合させる
+        target_columns = ['date', 'stock_code', 'high', 'low', 'close']
+        result, df_tmp = self.culc_iv(df[target_columns])
+        if result == False:
+            return False, None
+
+        try:
+            ## 重複するカラムを削除してから結合
+            df_tmp.drop(columns = target_columns, inplace = True)
+            df = pd.concat([df, df_tmp], axis = 1)
+
+            # 余分にできてしまった空のレコードを削除
+            df.dropna(how='all', inplace = True)
+
+            # フラグ・経過本数・価格・指標を小さい型に変換(analyticsの読み込み時も同じ型を指定する)
+            df = self.util.feature_dtype.compact(df)
+
+        except Exception as e:
+            self.log.error(f'説明変数の追加でエラー\n{e}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, df
+
+    def create_fused(self, keep_intermediate = False):
+        '''
+        目的変数・説明変数の追加と日付ごとのまとめを、1銘柄・1日分ずつメモリ上で続けて行う
+
+        create_dv→create_iv→merge_csvと同じデータを、途中のファイル(tmp_ohlc, formatted_tmp_ohlc)を経由せずに作成する
+        まとめ先のファイルには日付ごとに全銘柄の計算が終わった時点でまとめて書き込む
+
+        複数のプロセスで同時に実行しても同じ銘柄・日付を重複して書き込まないように、
+        処理する銘柄・日付は進捗管理用DBで処理中として取得してから計算する
+
+        Args:
+            keep_intermediate(bool): 途中のデータをtmp/debugに出力するか(デバッグ用)
+
+        Returns:
+            bool: 実行結果
+        '''
+        self.keep_intermediate = keep_intermediate
+        manifest = self.util.pipeline_manifest
+        if keep_intermediate:
+            os.makedirs(os.path.join(self.tmp_csv_dir_name, 'debug'), exist_ok = True)
+
+        # まとめ先のファイルに記録する説明変数の定義
+        self.fused_feature_spec = self.get_iv_feature_spec()
+        self.util.feature_store.register_set(self.fused_feature_spec)
+
+        try:
+            for csv_name in self.target_list:
+                self.log.info(f'対象CSVファイル名: {csv_name}')
+
+                # 日付ごとの残り件数 0件になったらまとめ先に書き込む
+                self.fused_remain_dict = {}
+                self.fused_result_dict = {}
+
+                # CSVファイルを分割して読み込み、処理中として取得した銘柄・日付のデータを順番に取り出す
+                merged_set = self.get_merged_set()
+                claimed_list = []
+                task_list = self.get_fused_task_list(csv_name, merged_set, claimed_list)
+                self.run_task('mold_stock_day', task_list, None, callback = self.add_fused_result)
+
+                # ワーカーが異常終了した場合などで残った計算済のデータも書き込む
+                for date in list(self.fused_result_dict.keys()):
+                    self.write_fused_result(date)
+
+                # 計算できなかった銘柄・日付の処理中を解放する(まとめ済のものは残る)
+                manifest.release(claimed_list, 'merge')
+
+        except Exception as e:
+            self.log.error(f'目的変数・説明変数の追加とまとめ処理で想定外のエラーが発生しました\n{e}\n{traceback.format_exc()}')
             return False
 
         return True
 
+    def get_fused_task_list(self, csv_name, merged_set, claimed_list):
+        '''
+        四本値CSVファイルを分割して読み込み、まとめ済でない1銘柄・1日分のデータを順番に返す
+
+        読み込んだチャンクごとに、まとめ済のものと他のプロセスが処理中のものを除いて処理中として取得し、
+        日付ごとの残り件数に加えてから返す(チャンク内の同じ日付の銘柄はまとめて書き込まれる)
+
+        Args:
+            csv_name(str): 四本値CSVファイル名(ohlc_yyyymm.csv)
+            merged_set(set[tuple]): まとめ済の(証券コード, 日付)
+            claimed_list(list): 処理中として取得した(証券コード, 日付) ※このメソッド内で追加する
+
+        Yields:
+            args(tuple): mold_stock_dayの引数 (1銘柄・1日分のデータ, 日付, 証券コード)
+        '''
+        manifest = self.util.pipeline_manifest
+
+        for df in self.read_ohlc_chunks(csv_name):
+            grouped = df.groupby(['date', 'stock_code'], sort = True)
+            key_list = [(date, stock_code) for date, stock_code in grouped.groups.keys()
+                        if (str(stock_code), str(date)) not in merged_set and manifest.claim(stock_code, str(date), 'merge')]
+
+            for date, stock_code in key_list:
+                claimed_list.append((stock_code, str(date)))
+                self.fused_remain_dict[str(date)] = self.fused_remain_dict.get(str(date), 0) + 1
+
+            for date, stock_code in key_list:
+                yield grouped.get_group((date, stock_code)), str(date), stock_code
+
+    def mold_stock_day(self, df, date, stock_code):
+        '''
+        1銘柄・1日分のデータに目的変数・説明変数のカラムを追加する
+
+        Args:
+            df(pandas.DataFrame): 1銘柄・1日分の四本値・時間の特徴量のデータ
+            date(str): 日付(yyyy-mm-dd)
+            stock_code(int): 証券コード
+
+        Returns:
+            bool: 実行結果
+            df(pandas.DataFrame): 目的変数・説明変数のカラムを追加したデータ
+        '''
+        csv_name = f'tmp_ohlc_{date.replace("-", "")}_{stock_code}{self.util.frame_store.get_extension()}'
+        debug_dir_name = os.path.join(self.tmp_csv_dir_name, 'debug')
+
+        result, df = self.add_dv_columns(df)
+        if result == False:
+            self.log.error(f'目的変数追加処理でエラー 対象: {csv_name}')
+            return False, None
+
+        if self.keep_intermediate:
+            self.write_dv_file(df, os.path.join(debug_dir_name, csv_name))
+
+        result, df = self.add_iv_columns(df)
+        if result == False:
+            self.log.error(f'説明変数追加処理でエラー 対象: {csv_name}')
+            return False, None
+
+        if self.keep_intermediate:
+            self.util.frame_store.write(df, os.path.join(debug_dir_name, f'formatted_{csv_name}'))
+
+        return True, df
+
+    def add_fused_result(self, args, result):
+        '''
+        1銘柄・1日分の計算結果を受け取り、その日付の全銘柄の計算が終わったらまとめ先に書き込む
+
+        Args:
+            args(tuple): mold_stock_dayの引数 (データ, 日付, 証券コード)
+            result(tuple): mold_stock_dayの戻り値 (実行結果, データ)
+
+        Returns:
+            bool: 計算の実行結果
+        '''
+        _, date, stock_code = args
+        success, df = result
+        if success:
+            self.fused_result_dict.setdefault(date, []).append((stock_code, df))
+
+        self.fused_remain_dict[date] -= 1
+        if self.fused_remain_dict[date] == 0:
+            self.write_fused_result(date)
+
+        return success
+
+    def write_fused_result(self, date):
+        '''
+        計算済の1日分のデータをまとめ先のファイル(formatted_ohlc_yyyymmdd)に追加し、まとめ済として記録する
+
+        Args:
+            date(str): 日付(yyyy-mm-dd)
+
+        Returns:
+            bool: 実行結果
+        '''
+        result_list = self.fused_result_dict.pop(date, [])
+        if len(result_list) == 0:
+            return True
+
+        frame_store = self.util.frame_store
+        extension = frame_store.get_extension()
+        output_file_name = f'formatted_ohlc_{date.replace("-", "")}{extension}'
+        output_path = os.path.join(self.formatted_csv_dir_name, output_file_name)
+
+        try:
+            exist_file = os.path.exists(output_path)
+            df = pd.concat([df for _, df in result_list], ignore_index = True)
+            if frame_store.file_format == 'csv':
+                # CSVは末尾に追加する まとめ先のファイルが既に存在する場合はヘッダー行を書き込まない
+                df.to_csv(output_path, mode = 'a', header = not exist_file, index = False)
+            else:
+                # 列指向形式は追記ができないので既存のデータと結合して書き込み直す
+                if exist_file:
+                    df = pd.concat([frame_store.read(output_path), df], ignore_index = True)
+                frame_store.write(df, output_path)
+        except Exception as e:
+            self.log.error(f'まとめファイルへの書き込みでエラーが発生しました。出力先ファイル名: {output_path}\n{e}\n{traceback.format_exc()}')
+            self.util.pipeline_manifest.release([(stock_code, date) for stock_code, _ in result_list], 'merge')
+            return False
+
+        # まとめ先のファイルの説明変数を記録する
+        self.util.feature_store.record_append(output_path, self.fused_feature_spec, not exist_file)
+
+        # 書き込んだ銘柄・日付をまとめて記録する
+        return self.util.pipeline_manifest.mark_done([(stock_code, date) for stock_code, _ in result_list], 'merge', output_file_name)
+
+    def get_merged_set(self):
+        '''
+        進捗管理用DBにまとめ済として記録されている銘柄・日付を取得する
+
+        Returns:
+            merged_set(set[tuple]): まとめ済の(証券コード(str), 日付(yyyy-mm-dd)) ※記録がない場合は空
+                ※保存形式を変えてもまとめ済と判定できるようにファイル名ではなく銘柄・日付で判定する
+        '''
+        try:
+            return self.util.pipeline_manifest.get_done_set('merge')
+        except Exception as e:
+            self.log.error(f'まとめ済の銘柄・日付の取得でエラー\n{e}\n{traceback.format_exc()}')
+            return set()
+
+    def run_task(self, method_name, task_list, total, callback = None):
+        '''
+        銘柄・日付ごとの処理を順番に、またはプロセスプールで並列に実行する
+
+        Args:
+            method_name(str): 実行するメソッド名(create_dv_file, create_iv_file, mold_stock_day)
+            task_list(iterable[tuple]): メソッドに渡す引数のリスト
+            total(int or None): 進捗表示用の件数 ※四本値CSVを分割して読み込む場合など件数が分からない場合はNone
+            callback(function or None): 1件終わるごとに親プロセスで実行する関数 引数は(メソッドの引数, 戻り値)、戻り値は実行結果(bool)
+                ※Noneの場合はメソッドの戻り値(bool)を実行結果とする
+
+        Returns:
+            success_count(int): 成功した件数
+        '''
+        if callback is None:
+            callback = lambda args, result: result
+
+        if self.workers <= 1:
+            function = getattr(self, method_name)
+            return sum(callback(args, function(*args)) for args in tqdm(task_list, total = total))
+
+        # chunk_size件ずつ1タスクにまとめ、ワーカー数の2倍までのタスクを投入して終わったものから補充する
+        # ※全件を一度に投入すると引数のDataFrameが全てメモリに載るため
+        success_count = 0
+        task_iter = iter(task_list)
+        initargs = (self.csv_dir_name, self.tmp_csv_dir_name, self.formatted_csv_dir_name,
+                    self.util.indicator_cache.cache_dir, self.util.indicator_cache.max_size_mb,
+                    self.required_columns, self.util.frame_store.file_format, self.keep_intermediate, self.worker_memory_limit_mb)
+
+        with tqdm(total = total) as progress:
+            try:
+                with ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker, initargs = initargs) as executor:
+                    # 実行中のタスクと引数
+                    running = {}
+                    while True:
+                        while len(running) < self.workers * 2:
+                            chunk = list(islice(task_iter, self.chunk_size))
+                            if len(chunk) == 0:
+                                break
+                            running[executor.submit(run_worker, method_name, chunk)] = chunk
+
+                        if len(running) == 0:
+                            break
+
+                        done, _ = wait(running, return_when = FIRST_COMPLETED)
+                        for future in done:
+                            chunk = running.pop(future)
+                            result_list = future.result()
+                            success_count += sum(callback(args, result) for args, result in zip(chunk, result_list))
+                            progress.update(len(result_list))
+
+            except BrokenProcessPool as e:
+                # メモリ不足などでワーカーが落ちた場合、出力済のファイル以外は次回の実行で作り直す
+                self.log.error(f'並列処理のワーカープロセスが異常終了しました メソッド名: {method_name}\n{e}\n{traceback.format_exc()}')
+
+        return success_count
+
     def delete_record(self, df):
         '''モデル作成の際に使わなさそうなレコードを削除する'''
 
@@ -343,6 +933,72 @@ class MoldPastRecord(ServiceBase):
 
         return df
 
+    def get_iv_feature_spec(self):
+        '''
+        説明変数として計算するテクニカル指標の定義を作成する
+
+        Returns:
+            feature_spec(dict): 計算する指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+                ※モデルで使う説明変数を設定している場合は必要な指標のみ
+        '''
+        # 何分足で計算するか
+        minute_list = [1, 3, 5, 10, 15, 30, 60]
+
+        # 直近何本のデータから計算するか
+        window_size_list = [3, 5, 10, 15]
+        window_size_list2 = [9, 14, 22, 26, 52]
+        window_size_list3 = [10, 12, 15]
+        af_list = [[0.01, 0.1], [0.02, 0.2], [0.05, 0.5], [0.1, 1]]
+
+        # 計算する指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+        feature_spec = {}
+        for minute in minute_list:
+            features = []
+
+            for window_size in window_size_list:
+                # 間隔と本数が多すぎると説明変数として利用できるようになるまで時間がかかるためスキップ
+                if minute * window_size > 150: # TODO 元は150だったが、計算量を減らすため一時的に9に変更
+                    continue
+
+                # 単純移動平均線(SMA)・指数移動平均線(EMA)・加重移動平均線(WMA)・ボリンジャーバンド
+                features.extend([['sma', window_size], ['ema', window_size], ['wma', window_size], ['bb', window_size]])
+
+            # 計算済みの各種移動平均線から短期と長期の関連性を計算する
+            if len(features) != 0:
+                features.append(['ma_cross'])
+
+            for window_size in window_size_list2:
+                # 間隔と本数が多すぎると実際の数値が出るまで時間がかかるためスキップ
+                if minute * window_size > 150: # TODO 元は150だったが、計算量を減らすため一時的に44に変更
+                    continue
+
+                # RSI・RCI
+                features.extend([['rsi', window_size], ['rci', window_size]])
+
+            for window_size in window_size_list3:
+                # 間隔と本数が多すぎると実際の数値が出るまで時間がかかるためスキップ
+                if minute * window_size > 150: # TODO 元は150だったが、計算量を減らすため一時的に59に変更
+                    continue
+
+                # サイコロジカルライン
+                features.append(['psy', window_size])
+
+            # パラボリックSAR(三本値から算出)
+            for min_af, max_af in af_list:
+                features.append(['sar_hlc', min_af, max_af])
+
+            # MACD
+            features.append(['macd', 12, 26, 9])
+
+            # 一目均衡表は計算に広いデータが必要になるため5分足までで制限
+            if minute <= 5:
+                features.append(['ichimoku', 9, 26])
+
+            feature_spec[minute] = features
+
+        # モデルで使わない指標は計算しない
+        return self.util.feature_manifest.filter_spec(feature_spec, self.required_columns)
+
     def culc_iv(self, df):
         '''
         主要なテクニカル指標を追加する
@@ -357,221 +1013,79 @@ class MoldPastRecord(ServiceBase):
                 ※エラーが発生した場合はNoneを返す
 
         '''
-        # 何分足で計算するか
-        minute_list = [1, 3, 5, 10, 15, 30, 60]
-
-        # 直近何本のデータから計算するか
-        window_size_list = [3, 5, 10, 15]
-        window_size_list2 = [9, 14, 22, 26, 52]
-        window_size_list3 = [10, 12, 15]
-        af_list = [[0.01, 0.1], [0.02, 0.2], [0.05, 0.5], [0.1, 1]]
+        feature_spec = self.get_iv_feature_spec()
 
         try:
             # 参照に対して変更を加えないようコピーを作成
-            df = df.copy()
             add_df = df.copy()
 
-            # timestampとcloseのカラムを持ったdfを作成
-            close_columns = ['date', 'stock_code', 'close']
-            unique_df = df[close_columns].copy()
-
             # timestampとhigh, low, closeのカラムを持ったdfを作成
             hlc_columns = ['date', 'stock_code', 'high', 'low', 'close']
             hlc_unique_df = df[hlc_columns].copy()
 
-            # メモリ削減のための一時的なデータフレームを作成
-            ma_tmp_df = df.copy()
-
-            for minute in minute_list:
-                for window_size in window_size_list:
-                    # 間隔と本数が多すぎると説明変数として利用できるようになるまで時間がかかるためスキップ
-                    if minute * window_size > 150: # TODO 元は150だったが、計算量を減らすため一時的に9に変更
-                        continue
-
-                    sma_column_name = f'sma_{minute}min_{window_size}piece'
-                    ema_column_name = f'ema_{minute}min_{window_size}piece'
-                    wma_column_name = f'wma_{minute}min_{window_size}piece'
-                    bb_column_name = f'bb_{minute}min_{window_size}piece'
-
-                    # 単純移動平均線(SMA)を計算・追加する
-                    result, sma_df = self.util.indicator.get_sma(df = unique_df,
-                                                                column_name = sma_column_name,
-                                                                window_size = window_size,
-                                                                interval = minute,
-                                                                price_column_name = 'close')
-                    if result == False:
-                        return False, None
-
-                    # 指数移動平均線(EMA)を計算・追加する
-                    result, ema_df = self.util.indicator.get_ema(df = unique_df,
-                                                                    column_name = ema_column_name,
-                                                                    window_size = window_size,
-                                                                    interval = minute,
-                                                                    price_column_name = 'close')
-                    if result == False:
-                        return False, None
-
-                    # 加重移動平均線(WMA)を計算・追加する
-                    result, wma_df = self.util.indicator.get_wma(df = unique_df,
-                                                                    column_name = wma_column_name,
-                                                                    window_size = window_size,
-                                                                    interval = minute,
-                                                                    price_column_name = 'close')
-                    if result == False:
-                        return False, None
-
-                    # ボリンジャーバンドを計算・追加する
-                    result, bb_df = self.util.indicator.get_bollinger_bands(df = unique_df,
-                                                                            column_name = bb_column_name,
-                                                                            window_size = window_size,
-                                                                            interval = minute,
-                                                                            price_column_name = 'close')
-                    if result == False:
-                        return False, None
-
-                    # 計算したデータをdfに追加する
-                    add_df[sma_column_name] = sma_df[sma_column_name]
-                    add_df[ema_column_name] = ema_df[ema_column_name]
-                    add_df[wma_column_name] = wma_df[wma_column_name]
-
-                    ma_tmp_df[sma_column_name] = sma_df[sma_column_name]
-                    ma_tmp_df[ema_column_name] = ema_df[ema_column_name]
-                    ma_tmp_df[wma_column_name] = wma_df[wma_column_name]
-
-                    ## ボリンジャーバンドは複数のカラムがあるので一つずつ追加
-                    for column_name in bb_df.columns:
-                        if re.search(bb_column_name, column_name):
-                            add_df[column_name] = bb_df[column_name]
-
-                # 計算・カラム追加済みの各種移動平均線のカラム名を取得
-                ma_columns = []
-                for column in ma_tmp_df.columns:
-                    if re.compile(f'.ma_{minute}min_\\d+piece').match(column):
-                        ma_columns.append(column)
-
-                # 対象のカラムがない場合はスキップ
-                if len(ma_columns) != 0:
-                    # 日付と証券コードでフィルタリングし、必要なカラムだけをコピー
-                    ma_unique_df = ma_tmp_df[ma_columns].copy()
-
-                    # 計算済みの移動平均線から短期と長期の関連性を計算・追加する
-                    result, ma_cross_df = self.util.indicator.get_ma_cross(df = ma_unique_df, interval = minute)
-                    if result == False:
-                        return False, None
-
-                    # 計算したデータをdfに追加する
-                    for column_name in ma_cross_df.columns:
-                        if column_name not in ma_columns:
-                            add_df[column_name] = ma_cross_df[column_name]
-
-                for window_size in window_size_list2:
-                    # 間隔と本数が多すぎると実際の数値が出るまで時間がかかるためスキップ
-                    if minute * window_size > 150: # TODO 元は150だったが、計算量を減らすため一時的に44に変更
-                        continue
-
-                    # カラム名定義
-                    rsi_column_name = f'rsi_{minute}min_{window_size}piece'
-                    rci_column_name = f'rci_{minute}min_{window_size}piece'
-
-                    # RSIを計算・追加する
-                    result, rsi_df = self.util.indicator.get_rsi(df = unique_df,
-                                                                column_name = rsi_column_name,
-                                                                window_size = window_size,
-                                                                interval = minute,
-                                                                price_column_name = 'close')
-                    if result == False:
-                        return False, None
-
-                    # RCIを計算・追加する
-                    result, rci_df = self.util.indicator.get_rci(df = unique_df,
-                                                                column_name = rci_column_name,
-                                                                window_size = window_size,
-                                                                interval = minute,
-                                                                price_column_name = 'close')
-
-                    if result == False:
-                        return False, None
-
-                    # 計算したデータをdfに追加する
-                    add_df[rsi_column_name] = rsi_df[rsi_column_name]
-                    add_df[rci_column_name] = rci_df[rci_column_name]
-
-
-                for window_size in window_size_list3:
-                    # 間隔と本数が多すぎると実際の数値が出るまで時間がかかるためスキップ
-                    if minute * window_size > 150: # TODO 元は150だったが、計算量を減らすため一時的に59に変更
-                        continue
-
-                    # カラム名定義
-                    psy_column_name = f'psy_{minute}min_{window_size}piece'
-
-                    # サイコロジカルラインを計算・追加する
-                    result, psy_df = self.util.indicator.get_psy(df = unique_df,
-                                                                column_name = psy_column_name,
-                                                                window_size = window_size,
-                                                                interval = minute,
-                                                                price_column_name = 'close')
-                    if result == False:
-                        return False, None
-
-                    # 計算したデータをdfに追加する
-                    add_df[psy_column_name] = psy_df[psy_column_name]
-
-                for min_af, max_af in af_list:
-                    # カラム名定義
-                    sar_column_name = f'sar_{minute}min_{min_af}_{max_af}af'
-
-                    # パラボリックSARを計算・追加する
-                    result, sar_df = self.util.indicator.get_parabolic_hlc(df = hlc_unique_df,
-                                                                        column_name = sar_column_name,
-                                                                        min_af = min_af,
-                                                                        max_af = max_af,
-                                                                        interval = minute)
-                    if result == False:
-                        return False, None
-
-                    # 計算したデータをdfに追加する
-                    for column_name in sar_df.columns:
-                        if column_name not in add_df.columns:
-                            add_df[column_name] = sar_df[column_name]
-
-                # MACDを計算・追加する
-                result, macd_df = self.util.indicator.get_macd(df = unique_df,
-                                                                column_name = f'macd_{minute}min',
-                                                                short_window_size = 12,
-                                                                long_window_size = 26,
-                                                                signal_window_size = 9,
-                                                                interval = minute,
-                                                                price_column_name = 'close')
-                if result == False:
-                    return False, None
-
-                # 計算したデータをdfに追加する
-                for column_name in macd_df.columns:
-                    if column_name not in add_df.columns:
-                        add_df[column_name] = macd_df[column_name]
-
-                # 一目均衡表は計算に広いデータが必要になるため5分足までで制限
-                if minute > 5:
-                    continue
+            # 時間足ごとにまとめてテクニカル指標を計算する(キャッシュ済の指標は読み込む)
+            result, feature_df = self.util.indicator_cache.get_features(df = hlc_unique_df,
+                                                                        feature_spec = feature_spec,
+                                                                        stock_code = df['stock_code'].iloc[0],
+                                                                        date = df['date'].iloc[0],
+                                                                        price_column_name = 'close')
+            if result == False:
+                return False, None
 
-                # 一目均衡表を計算・追加する
-                result, ichimoku_df = self.util.indicator.get_ichimoku_cloud(df = hlc_unique_df,
-                                                                        column_name = f'ichimoku_{minute}min',
-                                                                        short_window_size = 9,
-                                                                        long_window_size = 26,
-                                                                        interval = minute,
-                                                                        close_column_name = 'close')
-                if result == False:
-                    return False, None
-
-                # 計算したデータをdfに追加する
-                for column_name in ichimoku_df.columns:
-                    if column_name not in add_df.columns:
-                        add_df[column_name] = ichimoku_df[column_name]
+            # 計算したデータをdfに追加する
+            add_df = pd.concat([add_df, feature_df], axis = 1)
 
         except Exception as e:
             self.log.error(f'説明変数の計算に失敗しました\n{e}\n{traceback.format_exc()}')
             return False, None
 
         return True, add_df
+
+# 並列実行時にワーカープロセスごとに作成するインスタンス
+worker_mold = None
+
+def init_worker(csv_dir_name, tmp_csv_dir_name, formatted_csv_dir_name, cache_dir_name, cache_max_size_mb, required_columns, file_format, keep_intermediate, memory_limit_mb):
+    '''
+    ワーカープロセスの初期化処理 親プロセスと同じ設定のMoldPastRecordを作成する
+
+    Args:
+        csv_dir_name(str): 四本値CSVのディレクトリ
+        tmp_csv_dir_name(str): 目的変数・説明変数を追加したCSVのディレクトリ
+        formatted_csv_dir_name(str): 結合済CSVのディレクトリ
+        cache_dir_name(str or None): テクニカル指標のキャッシュのディレクトリ
+        cache_max_size_mb(int or None): テクニカル指標のキャッシュの上限サイズ(MB)
+        required_columns(list or None): モデルで使う説明変数のカラム名
+        file_format(str): 保存形式(csv, parquet, feather)
+        keep_intermediate(bool): 目的変数・説明変数の追加とまとめを続けて行う場合に途中のデータを出力するか
+        memory_limit_mb(int or None): ワーカープロセスのメモリ上限(MB) ※Noneの場合は無制限
+    '''
+    global worker_mold
+    worker_mold = MoldPastRecord()
+    worker_mold.set_dir_name(csv_dir_name, tmp_csv_dir_name, formatted_csv_dir_name, cache_dir_name, cache_max_size_mb)
+    worker_mold.set_required_columns(required_columns)
+    worker_mold.util.frame_store.set_format(file_format)
+    worker_mold.keep_intermediate = keep_intermediate
+
+    # 上限を超えた場合はMemoryErrorになり、そのファイルは次回の実行で作り直す
+    if memory_limit_mb is not None:
+        try:
+            import resource
+            limit = int(memory_limit_mb * 1024 * 1024)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            # Windowsなどresourceモジュールが使えない環境
+            worker_mold.log.warning(f'ワーカープロセスのメモリ上限を設定できません 上限: {memory_limit_mb}MB\n{e}')
+
+def run_worker(method_name, args_list):
+    '''
+    ワーカープロセスでまとめて受け取った引数ごとにメソッドを実行する
+
+    Args:
+        method_name(str): 実行するMoldPastRecordのメソッド名
+        args_list(list[tuple]): メソッドに渡す引数のリスト
+
+    Returns:
+        result_list(list): 引数ごとのメソッドの戻り値
+    '''
+    function = getattr(worker_mold, method_name)
+    return [function(*args) for args in args_list]
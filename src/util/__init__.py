@@ -7,6 +7,20 @@ from .culc_time import CulcTime
 from .stock_price import StockPrice
 from .file_manager import FileManager
 from .indicator import Indicator
+from .indicator_stream import IndicatorStream
+from .indicator_cache import IndicatorCache
+from .feature_dtype import FeatureDtype
+from .schema import Schema
+from .ohlc_generator import OhlcGenerator
+from .indicator_benchmark import IndicatorBenchmark
+from .feature_manifest import FeatureManifest
+from .frame_store import FrameStore
+from .pipeline_manifest import PipelineManifest
+from .feature_store import FeatureStore
+from .board_feature import BoardFeature
+from .ohlc_bar_store import OhlcBarStore
+from .push_decoder import PushDecoder
+from .message_capture import MessageCapture
 
 class Util():
     def __init__(self, log):
@@ -22,9 +36,6 @@ class Util():
         # 共通クラス
         self.common = Common(self.log)
 
-        # API<->DBのデータ変換を行うクラス
-        self.mold = Mold(self.log)
-
         # 時間・日付の計算や判定を行うクラス
         self.culc_time = CulcTime(self.log)
 
@@ -36,3 +47,48 @@ class Util():
 
         # テクニカル指標の計算を行うクラス
         self.indicator = Indicator(self.log)
+
+        # テクニカル指標を1本ずつ逐次計算するクラス
+        self.indicator_stream = IndicatorStream(self.log)
+
+        # テクニカル指標の計算結果をディスクにキャッシュするクラス
+        self.indicator_cache = IndicatorCache(self.log, self.indicator)
+
+        # 説明変数・目的変数のカラムの型を扱うクラス
+        self.feature_dtype = FeatureDtype(self.log)
+
+        # CSV・列指向形式で読み書きするデータセットのカラムと型を管理するクラス
+        self.schema = Schema(self.log, self.feature_dtype)
+
+        # API<->DBのデータ変換を行うクラス
+        self.mold = Mold(self.log, self.schema)
+
+        # 合成した四本値を作成するクラス
+        self.ohlc_generator = OhlcGenerator(self.log)
+
+        # テクニカル指標の計算時間を計測するクラス
+        self.indicator_benchmark = IndicatorBenchmark(self.log, self.indicator, self.ohlc_generator)
+
+        # モデルで使う説明変数から計算が必要な指標を絞り込むクラス
+        self.feature_manifest = FeatureManifest(self.log)
+
+        # 成形処理のデータをCSV・Parquet・Featherで保存・読み込みするクラス
+        self.frame_store = FrameStore(self.log, self.schema)
+
+        # 過去の四本値の取得・成形の進捗を管理するクラス
+        self.pipeline_manifest = PipelineManifest(self.log)
+
+        # 成形済データの説明変数を計算ロジック・定義のバージョンごとに管理するクラス
+        self.feature_store = FeatureStore(self.log, self.frame_store, self.feature_manifest, self.indicator_cache)
+
+        # 板情報から板の厚み・偏りなどの説明変数を計算するクラス
+        self.board_feature = BoardFeature(self.log, self.stock_price)
+
+        # PUSH配信から作成中の1分足を証券コード・取引時間ごとに保持するクラス
+        self.ohlc_bar_store = OhlcBarStore(self.log)
+
+        # PUSH配信のメッセージを記録に必要な項目のみに変換するクラス
+        self.push_decoder = PushDecoder(self.log)
+
+        # PUSH配信・板情報APIの受信データをキャプチャファイルに記録・再生するクラス
+        self.message_capture = MessageCapture(self.log)
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import traceback
+
+# 板の厚み・偏りを何本目までの合計で計算するか
+BOARD_DEPTH_LIST = [1, 3, 5, 10]
+
+# 板情報CSVに記録している気配の本数
+BOARD_LEVEL = 10
+
+class BoardFeature():
+    '''
+    板情報(Mold.response_to_csvの形式)から板の厚み・偏り・気配の変化を説明変数として計算するクラス
+
+    売気配・買気配の10本の価格・数量を(行数, 本数)のnumpy配列にして、1日分を行ごとのループなしでまとめて計算する
+    スプレッドのティック数はStockPrice.get_tick_indexの呼値の表から求める(get_empty_boardを1行ずつ呼ばない)
+
+    Memo:
+        CSVのカラム名はkabuステーションAPIに合わせているため、bid_xxxが売気配(Sell)、ask_xxxが買気配(Buy)
+        追加するカラムは売気配をsell、買気配をbuyとして表記する
+        価格が空(気配なし)の本は数量0として扱う
+        気配の変化(board_ofi_xxx)は1行前との差分から計算するため、1銘柄・1日分を時系列順に渡すこと
+    '''
+    def __init__(self, log, stock_price):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            stock_price(StockPrice): 株価について計算するクラスのインスタンス
+        '''
+        self.log = log
+        self.stock_price = stock_price
+
+    def get_board_arrays(self, df, side):
+        '''
+        売気配・買気配の価格・数量を(行数, 本数)の配列にする
+
+        Args:
+            df(pandas.DataFrame): 板情報
+            side(str): bid(売気配)またはask(買気配)
+
+        Returns:
+            price(numpy.ndarray): 価格 ※気配がない本はnan
+            qty(numpy.ndarray): 数量 ※気配がない本は0
+        '''
+        price = df[[f'{side}_price_{i}' for i in range(1, BOARD_LEVEL + 1)]].to_numpy(dtype = np.float64)
+        qty = df[[f'{side}_qty_{i}' for i in range(1, BOARD_LEVEL + 1)]].to_numpy(dtype = np.float64)
+
+        # 価格が0または空の本は気配なし
+        valid = np.nan_to_num(price) > 0
+        return np.where(valid, price, np.nan), np.where(valid, np.nan_to_num(qty), 0)
+
+    def divide(self, numerator, denominator):
+        '''
+        0除算の場合はnanにして割り算する
+
+        Args:
+            numerator(numpy.ndarray): 分子
+            denominator(numpy.ndarray): 分母
+
+        Returns:
+            result(numpy.ndarray): 計算結果
+        '''
+        return np.divide(numerator, denominator, out = np.full(np.shape(numerator), np.nan), where = denominator != 0)
+
+    def get_order_flow(self, sell_price, sell_qty, buy_price, buy_qty):
+        '''
+        1行前からの気配の変化による買い圧力・売り圧力の差(Order Flow Imbalance)を本ごとに計算する
+
+        買気配は価格が上がったか同じ場合は今の数量を加算し、下がったか同じ場合は前の数量を減算する
+        売気配は価格が下がったか同じ場合は今の数量を加算し、上がったか同じ場合は前の数量を減算する
+        買気配の変化 - 売気配の変化がプラスの場合は買い圧力が強い
+
+        Args:
+            sell_price(numpy.ndarray): 売気配の価格
+            sell_qty(numpy.ndarray): 売気配の数量
+            buy_price(numpy.ndarray): 買気配の価格
+            buy_qty(numpy.ndarray): 買気配の数量
+
+        Returns:
+            order_flow(numpy.ndarray): 本ごとの気配の変化(行数, 本数) ※1行目はnan
+        '''
+        # 気配がない本は価格を比較できないので、売気配は+inf・買気配は-inf(数量0)として比較する
+        sell_price = np.where(np.isnan(sell_price), np.inf, sell_price)
+        buy_price = np.where(np.isnan(buy_price), -np.inf, buy_price)
+
+        buy_flow = (buy_price[1:] >= buy_price[:-1]) * buy_qty[1:] - (buy_price[1:] <= buy_price[:-1]) * buy_qty[:-1]
+        sell_flow = (sell_price[1:] <= sell_price[:-1]) * sell_qty[1:] - (sell_price[1:] >= sell_price[:-1]) * sell_qty[:-1]
+
+        return np.concatenate([np.full((1, sell_price.shape[1]), np.nan), buy_flow - sell_flow])
+
+    def get_features(self, df, yobine_group, depth_list = None):
+        '''
+        板情報から板の厚み・偏り・気配の変化の説明変数をまとめて計算する
+
+        追加するカラムは以下の通り(nは何本目までの合計か)
+            board_spread_tick: 最良売気配と最良買気配の間のティック数(1ティック差の場合は1)
+            board_mid_price: 最良売気配と最良買気配の中間の価格
+            board_sell_depth_{n}, board_buy_depth_{n}: 売気配・買気配のn本目までの数量の合計
+            board_imbalance_{n}: n本目までの(買気配 - 売気配) / (買気配 + 売気配) ※プラスの場合は買いが厚い
+            board_weighted_mid_{n}: n本目までの数量で加重した中間の価格(反対側の数量が多いほど価格が寄る)
+            board_ofi_{n}: n本目までの1行前からの気配の変化(買い圧力 - 売り圧力)の合計
+            board_sell_move_tick, board_buy_move_tick: 最良売気配・最良買気配の1行前からの移動ティック数
+            board_market_order_imbalance: 成行の(買 - 売) / (買 + 売)
+            board_over_under_imbalance: UNDER買気配とOVER売気配の(買 - 売) / (買 + 売)
+
+        Args:
+            df(pandas.DataFrame): 1銘柄・1日分の板情報(時系列順)
+            yobine_group(int or str): 呼値グループ
+            depth_list(list or None): 何本目までの合計で計算するか ※Noneの場合はBOARD_DEPTH_LIST
+
+        Returns:
+            bool: 実行結果
+            feature_df(pandas.DataFrame): 計算した説明変数のカラムのみを持つDataFrame(indexはdfと同じ)
+        '''
+        if depth_list is None:
+            depth_list = BOARD_DEPTH_LIST
+
+        try:
+            sell_price, sell_qty = self.get_board_arrays(df, 'bid')
+            buy_price, buy_qty = self.get_board_arrays(df, 'ask')
+
+            values = {}
+
+            # スプレッドは呼値の表からティック数の差で求める
+            sell_tick = self.stock_price.get_tick_index(yobine_group, sell_price[:, 0])
+            buy_tick = self.stock_price.get_tick_index(yobine_group, buy_price[:, 0])
+            if sell_tick is False or buy_tick is False:
+                self.log.error(f'呼値グループが不正です 呼値グループ: {yobine_group}')
+                return False, None
+            values['board_spread_tick'] = sell_tick - buy_tick
+            values['board_mid_price'] = (sell_price[:, 0] + buy_price[:, 0]) / 2
+
+            # n本目までの合計は累積和から取り出す
+            sell_depth = np.cumsum(sell_qty, axis = 1)
+            buy_depth = np.cumsum(buy_qty, axis = 1)
+            sell_amount = np.cumsum(np.nan_to_num(sell_price) * sell_qty, axis = 1)
+            buy_amount = np.cumsum(np.nan_to_num(buy_price) * buy_qty, axis = 1)
+            order_flow = np.cumsum(self.get_order_flow(sell_price, sell_qty, buy_price, buy_qty), axis = 1)
+
+            for depth in depth_list:
+                sell, buy = sell_depth[:, depth - 1], buy_depth[:, depth - 1]
+                values[f'board_sell_depth_{depth}'] = sell
+                values[f'board_buy_depth_{depth}'] = buy
+                values[f'board_imbalance_{depth}'] = self.divide(buy - sell, buy + sell)
+
+                # 売気配・買気配それぞれの加重平均価格を、反対側の数量で加重する(1本目のみの場合はマイクロプライス)
+                sell_vwap = self.divide(sell_amount[:, depth - 1], sell)
+                buy_vwap = self.divide(buy_amount[:, depth - 1], buy)
+                values[f'board_weighted_mid_{depth}'] = self.divide(sell_vwap * buy + buy_vwap * sell, buy + sell)
+
+                values[f'board_ofi_{depth}'] = order_flow[:, depth - 1]
+
+            # 最良気配の移動ティック数
+            values['board_sell_move_tick'] = np.concatenate([[np.nan], np.diff(sell_tick)])
+            values['board_buy_move_tick'] = np.concatenate([[np.nan], np.diff(buy_tick)])
+
+            # 成行・OVER/UNDERの偏り
+            for column_name, buy_column, sell_column in [('board_market_order_imbalance', 'market_order_buy_qty', 'market_order_sell_qty'),
+                                                         ('board_over_under_imbalance', 'under_buy_qty', 'over_sell_qty')]:
+                buy = np.nan_to_num(df[buy_column].to_numpy(dtype = np.float64))
+                sell = np.nan_to_num(df[sell_column].to_numpy(dtype = np.float64))
+                values[column_name] = self.divide(buy - sell, buy + sell)
+
+            feature_df = pd.DataFrame(values, index = df.index)
+
+        except Exception as e:
+            self.log.error(f'板情報の説明変数の計算でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, feature_df
@@ -0,0 +1,95 @@
+import re
+import numpy as np
+import pandas as pd
+
+# カラム名と型の対応 上から順に判定し、最初に一致したものを使う
+# ※Noneの場合は型を指定しない(timestamp, date, stock_code, volumeなど)
+DTYPE_RULES = [
+    # ボリンジャーバンドはバンド内の位置(position)も含めて全て実数
+    (r'bb_.*', 'float32'),
+    # フラグ(0/1)・クロス(-1/0/1, 雲とのクロスは0~4)・位置関係
+    (r'.*_(flag|cross|position|mismatch)', 'int8'),
+    # クロスからの経過本数・不一致が続いている回数
+    (r'.*_(after\d?|count)', 'int16'),
+    # 時間に関する特徴量
+    (r'hour|minute|day_of_week', 'int8'),
+    (r'get_minute', 'int16'),
+    # 四本値・テクニカル指標・目的変数の変化額/率
+    (r'open|high|low|close', 'float32'),
+    (r'(sma|ema|wma|rsi|rci|psy|sar|macd|ichimoku|change)_.*', 'float32'),
+]
+
+class FeatureDtype():
+    '''
+    説明変数・目的変数のカラムを小さい型(フラグはint8、経過本数はint16、価格・指標はfloat32)で扱うクラス
+
+    成形済CSVの書き込み前にcompactで型を変換する ※読み込み時の型の指定はSchema.read_csvで行う
+    '''
+    def __init__(self, log):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+        '''
+        self.log = log
+        self.rules = [(re.compile(pattern), dtype) for pattern, dtype in DTYPE_RULES]
+
+    def get_dtype(self, column_name):
+        '''
+        カラム名に対応する型を取得する
+
+        Args:
+            column_name(str): カラム名
+
+        Returns:
+            dtype(str or None): 型 ※対応する型がない場合はNone
+        '''
+        for pattern, dtype in self.rules:
+            if pattern.fullmatch(column_name):
+                return dtype
+        return None
+
+    def get_dtype_dict(self, columns):
+        '''
+        カラム名のリストから型を指定するカラムと型の辞書を作成する
+
+        Args:
+            columns(list): カラム名のリスト
+
+        Returns:
+            dtype_dict(dict): {カラム名: 型} ※型を指定しないカラムは含まない
+        '''
+        dtype_dict = {}
+        for column in columns:
+            dtype = self.get_dtype(column)
+            if dtype is not None:
+                dtype_dict[column] = dtype
+        return dtype_dict
+
+    def compact(self, df):
+        '''
+        DataFrameのカラムを小さい型に変換する
+
+        整数型のカラムにNaNや範囲外の値が含まれる場合はfloat32に変換する
+
+        Args:
+            df(pandas.DataFrame): 変換するデータ
+
+        Returns:
+            df(pandas.DataFrame): 型を変換したデータ
+        '''
+        dtype_dict = {}
+        for column, dtype in self.get_dtype_dict(df.columns).items():
+            if df[column].dtype == dtype or not pd.api.types.is_numeric_dtype(df[column]):
+                continue
+
+            if dtype.startswith('int'):
+                values = df[column].to_numpy()
+                info = np.iinfo(dtype)
+                if values.dtype.kind == 'f' and np.isnan(values).any():
+                    dtype = 'float32'
+                elif len(values) != 0 and (values.min() < info.min or values.max() > info.max):
+                    self.log.warning(f'{dtype}の範囲外の値が含まれるためfloat32に変換します カラム名: {column}')
+                    dtype = 'float32'
+            dtype_dict[column] = dtype
+
+        return df.astype(dtype_dict)
@@ -0,0 +1,124 @@
+import json
+import os
+import re
+import traceback
+
+class FeatureManifest():
+    '''
+    モデルで使う説明変数(カラム名)の一覧から、計算が必要なテクニカル指標だけを残すクラス
+
+    一覧は学習済のCatBoostモデル(.cbm)の説明変数名、JSON(カラム名のリスト)、テキスト(1行1カラム)のいずれかから作成する
+    指標の定義(Indicator.get_featuresの形式)から、一覧のカラムを1つも出力しない指標と時間足を除く
+
+    Memo:
+        移動平均線のクロス(ma_cross)が必要な場合は、クロスの計算に使う短期・長期の移動平均線も残す
+        ※残した移動平均線のカラムは一覧になくても出力され、キャッシュや成形済ファイルの指標のバージョンにも記録される
+          (成形済ファイルの移動平均線とクロスのカラムを同じ定義で照合・更新するため、出力後に除かない)
+        change(n分後の変動)は目的変数なので一覧に関わらず残す
+    '''
+    def __init__(self, log):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+        '''
+        self.log = log
+
+    def load(self, manifest):
+        '''
+        必要なカラム名の一覧を読み込む
+
+        Args:
+            manifest(str or list): 学習済モデル(.cbm)・JSON・テキストファイルのパス、またはカラム名のリスト
+
+        Returns:
+            bool: 実行結果
+            required_columns(list): 必要なカラム名のリスト
+        '''
+        if isinstance(manifest, (list, tuple, set)):
+            return True, list(manifest)
+
+        try:
+            if manifest.endswith('.cbm'):
+                # catboostはモデルから読み込む場合のみ使う
+                from catboost import CatBoost
+                model = CatBoost()
+                model.load_model(manifest)
+                required_columns = list(model.feature_names_)
+            elif manifest.endswith('.json'):
+                with open(manifest, 'r', encoding = 'utf-8') as f:
+                    data = json.load(f)
+                required_columns = data['columns'] if isinstance(data, dict) else data
+            else:
+                with open(manifest, 'r', encoding = 'utf-8') as f:
+                    required_columns = [line.strip() for line in f if line.strip() != '' and not line.startswith('#')]
+        except Exception as e:
+            self.log.error(f'説明変数の一覧の読み込みでエラー ファイルパス: {manifest}\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        self.log.info(f'説明変数の一覧を読み込みました ファイル名: {os.path.basename(manifest)} カラム数: {len(required_columns)}')
+        return True, required_columns
+
+    def filter_spec(self, feature_spec, required_columns):
+        '''
+        指標の定義から必要なカラムを出力しない指標を除く
+
+        Args:
+            feature_spec(dict): 計算する指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+            required_columns(list or None): 必要なカラム名のリスト ※Noneの場合は全て残す
+
+        Returns:
+            filtered_spec(dict): 必要な指標のみを残した定義 ※指標が残らない時間足は除く
+        '''
+        if required_columns is None:
+            return feature_spec
+
+        required_columns = set(required_columns)
+        filtered_spec = {}
+        for interval, features in feature_spec.items():
+            # 必要な移動平均線のクロスから、計算に使う移動平均線(種類, 本数)を取得
+            cross_pattern = re.compile(f'(sma|ema|wma)_{interval}min_(\\d+)to(\\d+)piece_.*')
+            cross_ma_list = set()
+            for column in required_columns:
+                match = cross_pattern.fullmatch(column)
+                if match:
+                    cross_ma_list.add((match.group(1), int(match.group(2))))
+                    cross_ma_list.add((match.group(1), int(match.group(3))))
+
+            filtered_features = []
+            for feature in features:
+                kind = feature[0]
+                if kind == 'change':
+                    required = True
+                elif kind == 'ma_cross':
+                    required = len(cross_ma_list) != 0
+                elif kind in ['sma', 'ema', 'wma'] and (kind, feature[1]) in cross_ma_list:
+                    required = True
+                else:
+                    prefix = self.get_column_prefix(interval, feature)
+                    required = prefix in required_columns or any(column.startswith(f'{prefix}_') for column in required_columns)
+
+                if required:
+                    filtered_features.append(feature)
+
+            if len(filtered_features) != 0:
+                filtered_spec[interval] = filtered_features
+
+        return filtered_spec
+
+    def get_column_prefix(self, interval, feature):
+        '''
+        指標が出力するカラム名の共通部分を取得する
+
+        Args:
+            interval(int): 何分足として計算するか
+            feature(list): 指標の定義 [指標の種類, パラメータ...]
+
+        Returns:
+            prefix(str): カラム名 ※複数カラムを出力する指標は'{prefix}_xxx'のカラムになる
+        '''
+        kind, params = feature[0], feature[1:]
+        if kind in ['sar', 'sar_hlc']:
+            return f'sar_{interval}min_{params[0]}_{params[1]}af'
+        if kind in ['macd', 'ichimoku', 'change']:
+            return f'{kind}_{interval}min'
+        return f'{kind}_{interval}min_{params[0]}piece'
@@ -0,0 +1,518 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import traceback
+import pandas as pd
+from contextlib import closing
+
+CREATE_TABLE_SQL_LIST = [
+    # 成形済ファイルごとの指標と、その指標を計算した定義・計算ロジック(シグネチャ)
+    '''
+    CREATE TABLE IF NOT EXISTS file_feature (
+        file_name TEXT NOT NULL,
+        feature_key TEXT NOT NULL,
+        feature TEXT NOT NULL,
+        signature TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (file_name, feature_key)
+    ) WITHOUT ROWID
+    ''',
+    # 説明変数のバージョン(指標とシグネチャの組み合わせ)
+    '''
+    CREATE TABLE IF NOT EXISTS feature_set (
+        version TEXT NOT NULL PRIMARY KEY,
+        features TEXT NOT NULL,
+        signatures TEXT NOT NULL,
+        created_at REAL NOT NULL
+    ) WITHOUT ROWID
+    ''',
+]
+
+# 異なるシグネチャの行が混ざっている指標(次回のupdateで計算し直す)
+MIXED_SIGNATURE = 'mixed'
+
+class FeatureStore():
+    '''
+    成形済データ(formatted_ohlc_yyyymmdd)の説明変数を、計算した定義・計算ロジックのバージョンごとに管理するクラス
+
+    指標(何分足・種類・パラメータ)ごとに、計算ロジックのバージョン(Indicator.FEATURE_VERSION_LIST)を含むシグネチャを記録し、
+    指標の定義や計算ロジックを変えた場合は変わった指標のカラムのみを保存済の全ファイルで計算し直す
+    学習スクリプトはバージョン(指標とシグネチャの組み合わせのハッシュ)を指定して、一致するファイル・カラムのみ読み込める
+
+    Memo:
+        記録はformattedディレクトリのfeature_store.db(SQLite)に保存する ファイル名は拡張子を除いて記録する
+        記録がないファイル(この仕組みを入れる前に作成したもの)はカラム名から指標を推定する
+        再計算は成形済データの四本値(high, low, close)から行う ※列指向形式はfloat32で保存した価格から計算する
+    '''
+    def __init__(self, log, frame_store, feature_manifest, indicator_cache = None):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            frame_store(FrameStore): 成形処理のデータを読み書きするクラスのインスタンス
+            feature_manifest(FeatureManifest): 指標のカラム名を扱うクラスのインスタンス
+            indicator_cache(IndicatorCache or None): テクニカル指標を計算するクラスのインスタンス
+                ※Noneの場合は記録の参照のみ行う(学習スクリプトなど)
+        '''
+        self.log = log
+        self.frame_store = frame_store
+        self.feature_manifest = feature_manifest
+        self.indicator_cache = indicator_cache
+        self.data_dir = None
+        self.db_path = None
+
+    def set_dir(self, data_dir):
+        '''
+        成形済データのディレクトリを設定し、記録用のテーブルがなければ作成する
+
+        Args:
+            data_dir(str): 成形済データのディレクトリ
+
+        Returns:
+            bool: 実行結果
+        '''
+        self.data_dir = data_dir
+        self.db_path = os.path.join(data_dir, 'feature_store.db')
+
+        try:
+            os.makedirs(data_dir, exist_ok = True)
+            with closing(self.connect()) as conn:
+                conn.execute('PRAGMA journal_mode = WAL')
+                for sql in CREATE_TABLE_SQL_LIST:
+                    conn.execute(sql)
+        except Exception as e:
+            self.log.error(f'説明変数の管理用DBの作成でエラー ファイルパス: {self.db_path}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def connect(self):
+        '''
+        SQLiteに接続する
+
+        Returns:
+            conn(sqlite3.Connection): 自動コミットの接続(トランザクションはBEGINで明示する)
+        '''
+        conn = sqlite3.connect(self.db_path, timeout = 60, isolation_level = None)
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def get_signature_dict(self, feature_spec):
+        '''
+        指標の定義から指標ごとのシグネチャを作成する
+
+        シグネチャは指標のキャッシュのバージョン(計算ロジックのバージョン) 移動平均線のクロスは同じ時間足の移動平均線の組み合わせも含む
+        ※キャッシュと同じバージョンを使い、シグネチャが変わった指標はキャッシュも必ず計算し直されるようにする
+
+        Args:
+            feature_spec(dict): 計算する指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+
+        Returns:
+            signature_dict(dict): {指標のキー: ([何分足, 指標の種類, パラメータ...], シグネチャ)}
+        '''
+        indicator = self.indicator_cache.indicator
+        feature_versions = self.indicator_cache.get_feature_versions(feature_spec)
+
+        signature_dict = {}
+        for interval, features in feature_spec.items():
+            for feature in features:
+                feature_key = indicator.get_feature_key(interval, feature)
+                signature_dict[feature_key] = ([int(interval)] + list(feature), f'v{feature_versions[feature_key]}')
+
+        return signature_dict
+
+    def register_set(self, feature_spec):
+        '''
+        指標の定義を説明変数のバージョンとして登録する ※登録済の場合は何もしない
+
+        Args:
+            feature_spec(dict): 計算する指標の定義
+
+        Returns:
+            bool: 実行結果
+            version(str): バージョン(指標とシグネチャの組み合わせのハッシュの先頭12文字)
+        '''
+        signature_dict = self.get_signature_dict(feature_spec)
+        signatures = {feature_key: signature for feature_key, (_, signature) in sorted(signature_dict.items())}
+        version = hashlib.sha1(json.dumps(signatures, sort_keys = True).encode()).hexdigest()[:12]
+
+        try:
+            with closing(self.connect()) as conn:
+                conn.execute('INSERT OR IGNORE INTO feature_set VALUES (?, ?, ?, ?)',
+                             (version, json.dumps({feature_key: feature for feature_key, (feature, _) in signature_dict.items()}),
+                              json.dumps(signatures), time.time()))
+        except Exception as e:
+            self.log.error(f'説明変数のバージョンの登録でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, version
+
+    def get_set_list(self):
+        '''
+        登録済の説明変数のバージョンを取得する
+
+        Returns:
+            set_list(list[dict]): バージョン・指標数・登録日時 ※登録日時の古い順
+        '''
+        with closing(self.connect()) as conn:
+            rows = conn.execute('SELECT version, signatures, created_at FROM feature_set ORDER BY created_at').fetchall()
+        return [{'version': version, 'feature_count': len(json.loads(signatures)), 'created_at': created_at} for version, signatures, created_at in rows]
+
+    def get_set(self, version):
+        '''
+        説明変数のバージョンの指標を取得する
+
+        Args:
+            version(str): バージョン
+
+        Returns:
+            set_state(dict or None): {指標のキー: ([何分足, 指標の種類, パラメータ...], シグネチャ)} ※登録されていない場合はNone
+        '''
+        with closing(self.connect()) as conn:
+            row = conn.execute('SELECT features, signatures FROM feature_set WHERE version = ?', (version,)).fetchone()
+        if row is None:
+            return None
+
+        features, signatures = json.loads(row[0]), json.loads(row[1])
+        return {feature_key: (features[feature_key], signature) for feature_key, signature in signatures.items()}
+
+    def get_file_state(self, file_name):
+        '''
+        成形済ファイルに記録されている指標とシグネチャを取得する
+
+        Args:
+            file_name(str): 成形済ファイル名 ※拡張子は無視する
+
+        Returns:
+            state(dict): {指標のキー: ([何分足, 指標の種類, パラメータ...], シグネチャ)} ※記録がない場合は空
+        '''
+        with closing(self.connect()) as conn:
+            rows = conn.execute('SELECT feature_key, feature, signature FROM file_feature WHERE file_name = ?',
+                                (os.path.splitext(file_name)[0],)).fetchall()
+        return {feature_key: (json.loads(feature), signature) for feature_key, feature, signature in rows}
+
+    def guess_file_state(self, columns, feature_spec):
+        '''
+        記録がない成形済ファイルの指標を、カラム名と指標の定義から推定する
+
+        定義の指標のうちカラムがあるものは現在のシグネチャで計算済とみなす
+        移動平均線のクロスはファイルにある移動平均線から計算したとみなす
+
+        Args:
+            columns(list): 成形済ファイルのカラム名
+            feature_spec(dict): 計算する指標の定義
+
+        Returns:
+            state(dict): {指標のキー: ([何分足, 指標の種類, パラメータ...], シグネチャ)}
+        '''
+        signature_dict = self.get_signature_dict(feature_spec)
+
+        # ファイルにある指標のみの定義
+        exist_spec = {}
+        for interval, features in feature_spec.items():
+            exist_features = [feature for feature in features if len(self.get_feature_columns(interval, feature, columns)) != 0]
+            if len(exist_features) != 0:
+                exist_spec[interval] = exist_features
+
+        state = {}
+        for feature_key, (feature, signature) in self.get_signature_dict(exist_spec).items():
+            state[feature_key] = (feature, signature if feature[1] == 'ma_cross' else signature_dict[feature_key][1])
+        return state
+
+    def get_feature_columns(self, interval, feature, columns):
+        '''
+        指標が出力したカラムをカラム名のリストから取得する
+
+        Args:
+            interval(int): 何分足として計算したか
+            feature(list): 指標の定義 [指標の種類, パラメータ...]
+            columns(list): カラム名のリスト
+
+        Returns:
+            feature_columns(list): 指標のカラム名のリスト
+        '''
+        if feature[0] == 'ma_cross':
+            pattern = re.compile(f'(sma|ema|wma)_{interval}min_\\d+to\\d+piece_.*')
+            return [column for column in columns if pattern.fullmatch(column)]
+
+        prefix = self.feature_manifest.get_column_prefix(interval, feature)
+        return [column for column in columns if column == prefix or column.startswith(f'{prefix}_')]
+
+    def get_mismatched_keys(self, feature_spec, columns):
+        '''
+        計算し直した指標のうち、出力したカラムが指標の定義と合わないものを取得する
+
+        移動平均線のクロスは、同じ時間足で先に定義した移動平均線の短期と長期の組み合わせ(種類が同じもの)のカラムが全てあり、それ以外がないかを確認する
+        それ以外の指標はカラムが1つ以上あるかを確認する
+
+        Args:
+            feature_spec(dict): 計算し直した指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+            columns(list): 計算結果のカラム名
+
+        Returns:
+            mismatched_keys(list): カラムが定義と合わない指標のキー
+        '''
+        indicator = self.indicator_cache.indicator
+
+        mismatched_keys = []
+        for interval, features in feature_spec.items():
+            for index, feature in enumerate(features):
+                feature_columns = self.get_feature_columns(interval, feature, columns)
+                if feature[0] != 'ma_cross':
+                    if len(feature_columns) == 0:
+                        mismatched_keys.append(indicator.get_feature_key(interval, feature))
+                    continue
+
+                # クロスより前に定義した移動平均線から期待する組み合わせ({種類}_{何分足}min_{短期}to{長期}piece)
+                pieces = {}
+                for ma_feature in features[:index]:
+                    if ma_feature[0] in ['sma', 'ema', 'wma']:
+                        pieces.setdefault(ma_feature[0], set()).add(int(ma_feature[1]))
+                expected = {f'{line_type}_{interval}min_{short_piece}to{long_piece}piece'
+                            for line_type, piece_set in pieces.items() for short_piece in piece_set for long_piece in piece_set if short_piece < long_piece}
+                actual = {column.split('piece_')[0] + 'piece' for column in feature_columns}
+                if actual != expected:
+                    mismatched_keys.append(indicator.get_feature_key(interval, feature))
+
+        return mismatched_keys
+
+    def record_file(self, file_name, state):
+        '''
+        成形済ファイルの指標とシグネチャを記録する(既存の記録は置き換える)
+
+        Args:
+            file_name(str): 成形済ファイル名 ※拡張子は除いて記録する
+            state(dict): {指標のキー: ([何分足, 指標の種類, パラメータ...], シグネチャ)}
+
+        Returns:
+            bool: 実行結果
+        '''
+        file_name = os.path.splitext(file_name)[0]
+        now = time.time()
+
+        try:
+            with closing(self.connect()) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('DELETE FROM file_feature WHERE file_name = ?', (file_name,))
+                conn.executemany('INSERT INTO file_feature VALUES (?, ?, ?, ?, ?)',
+                                 [(file_name, feature_key, json.dumps(feature), signature, now) for feature_key, (feature, signature) in state.items()])
+                conn.execute('COMMIT')
+        except Exception as e:
+            self.log.error(f'成形済ファイルの指標の記録でエラー ファイル名: {file_name}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def record_append(self, file_path, feature_spec, new_file):
+        '''
+        成形済ファイルにデータを追加した後に指標とシグネチャを記録する
+
+        既存のデータとシグネチャが異なる指標は、異なるシグネチャの行が混ざっているものとして記録する(次回のupdateで計算し直す)
+
+        Args:
+            file_path(str): 成形済ファイルのパス
+            feature_spec(dict): 追加したデータの計算に使った指標の定義
+            new_file(bool): ファイルを新規に作成したか
+
+        Returns:
+            bool: 実行結果
+        '''
+        target = self.get_signature_dict(feature_spec)
+        if new_file:
+            return self.record_file(os.path.basename(file_path), target)
+
+        try:
+            state = self.get_file_state(os.path.basename(file_path))
+            if len(state) == 0:
+                state = self.guess_file_state(self.frame_store.get_columns(file_path), feature_spec)
+        except Exception as e:
+            self.log.error(f'成形済ファイルの指標の取得でエラー ファイルパス: {file_path}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        merged_state = {}
+        for feature_key in set(state) | set(target):
+            feature, signature = state.get(feature_key, target.get(feature_key))
+            if feature_key not in state or feature_key not in target or state[feature_key][1] != target[feature_key][1]:
+                signature = MIXED_SIGNATURE
+            merged_state[feature_key] = (feature, signature)
+
+        return self.record_file(os.path.basename(file_path), merged_state)
+
+    def get_stale_spec(self, state, target):
+        '''
+        シグネチャが現在の定義と異なる(または未計算の)指標のみの定義を作成する
+
+        Args:
+            state(dict): 成形済ファイルの指標とシグネチャ
+            target(dict): 現在の定義の指標とシグネチャ
+
+        Returns:
+            stale_spec(dict): 計算し直す指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+        '''
+        stale_spec = {}
+        for feature_key, (feature, signature) in target.items():
+            if feature_key in state and state[feature_key][1] == signature:
+                continue
+            stale_spec.setdefault(feature[0], []).append(feature[1:])
+
+        # 移動平均線のクロスは同じ時間足の移動平均線から計算するので合わせて計算する
+        for interval, features in stale_spec.items():
+            if any(feature[0] == 'ma_cross' for feature in features):
+                ma_features = [feature[1:] for feature_key, (feature, _) in target.items()
+                               if feature[0] == interval and feature[1] in ['sma', 'ema', 'wma'] and feature[1:] not in features]
+                stale_spec[interval] = ma_features + features
+
+        return stale_spec
+
+    def update(self, feature_spec, prune = False):
+        '''
+        全ての成形済ファイルで、指標の定義・計算ロジックが変わった指標のカラムのみを計算し直す
+
+        Args:
+            feature_spec(dict): 現在の指標の定義
+            prune(bool): 現在の定義にない指標のカラムを削除するか ※Falseの場合は残す(以前のバージョンを指定した学習で使う)
+
+        Returns:
+            bool: 実行結果
+            updated_count(int): 計算し直したファイル数
+        '''
+        result, version = self.register_set(feature_spec)
+        if result == False:
+            return False, None
+        self.log.info(f'説明変数のバージョン: {version}')
+
+        updated_count = 0
+        for file_name in sorted(self.frame_store.get_file_list(self.data_dir, r'formatted_ohlc_\d{8}')):
+            result, updated = self.update_file(file_name, feature_spec, prune)
+            if result == False:
+                continue
+            updated_count += updated
+
+        return True, updated_count
+
+    def update_file(self, file_name, feature_spec, prune = False):
+        '''
+        成形済ファイル1つで、指標の定義・計算ロジックが変わった指標のカラムのみを計算し直す
+
+        Args:
+            file_name(str): 成形済ファイル名
+            feature_spec(dict): 現在の指標の定義
+            prune(bool): 現在の定義にない指標のカラムを削除するか
+
+        Returns:
+            bool: 実行結果
+            updated(bool): 計算し直したか
+        '''
+        file_path = os.path.join(self.data_dir, file_name)
+        target = self.get_signature_dict(feature_spec)
+
+        try:
+            columns = self.frame_store.get_columns(file_path)
+            state = self.get_file_state(file_name)
+            if len(state) == 0:
+                state = self.guess_file_state(columns, feature_spec)
+
+            stale_spec = self.get_stale_spec(state, target)
+            removed_keys = [feature_key for feature_key in state if feature_key not in target] if prune else []
+
+            if len(stale_spec) == 0 and len(removed_keys) == 0:
+                # 推定した指標も記録しておく
+                return self.record_file(file_name, state), False
+
+            df = self.frame_store.read(file_path)
+
+            # 銘柄・日付ごとに計算し直す(成形時と同じく1銘柄・1日分ずつ計算する)
+            if len(stale_spec) != 0:
+                feature_df_list = []
+                for (stock_code, date), group_df in df.groupby(['stock_code', 'date'], sort = False):
+                    result, feature_df = self.indicator_cache.get_features(df = group_df[['date', 'stock_code', 'high', 'low', 'close']],
+                                                                           feature_spec = stale_spec,
+                                                                           stock_code = stock_code,
+                                                                           date = date,
+                                                                           price_column_name = 'close')
+                    if result == False:
+                        self.log.error(f'説明変数の再計算でエラー ファイル名: {file_name} 証券コード: {stock_code}')
+                        return False, False
+                    feature_df_list.append(feature_df)
+
+                # キャッシュから古い定義の出力を読み込んだ場合などに、現在のシグネチャを記録しないようにする
+                feature_df = pd.concat(feature_df_list)
+                mismatched_keys = self.get_mismatched_keys(stale_spec, feature_df.columns)
+                if len(mismatched_keys) != 0:
+                    self.log.error(f'説明変数の再計算結果のカラムが定義と一致しません ファイル名: {file_name} 指標: {mismatched_keys}')
+                    return False, False
+
+                # 既存のカラムは値を置き換え、新しい指標のカラムは末尾に追加する
+                for column in feature_df.columns:
+                    df[column] = feature_df[column]
+
+                # 計算し直した指標の以前のカラムのうち、今回出力されなかったもの(削除した移動平均線とのクロスなど)を削除する
+                old_columns = set()
+                for interval, features in stale_spec.items():
+                    for feature in features:
+                        feature_key = self.indicator_cache.indicator.get_feature_key(interval, feature)
+                        if feature_key in state:
+                            old_columns.update(self.get_feature_columns(interval, feature, columns))
+                df = df.drop(columns = [column for column in old_columns if column not in feature_df.columns])
+
+            # 現在の定義にない指標のカラムを削除する
+            for feature_key in removed_keys:
+                feature = state[feature_key][0]
+                df = df.drop(columns = self.get_feature_columns(feature[0], feature[1:], df.columns))
+
+            self.frame_store.write(self.frame_store.schema.feature_dtype.compact(df), file_path)
+
+        except Exception as e:
+            self.log.error(f'説明変数の再計算でエラー ファイル名: {file_name}\n{str(e)}\n{traceback.format_exc()}')
+            return False, False
+
+        new_state = {feature_key: value for feature_key, value in state.items() if feature_key not in removed_keys}
+        new_state.update(target)
+        return self.record_file(file_name, new_state), True
+
+    def get_file_list(self, version):
+        '''
+        説明変数のバージョンの指標が全て同じシグネチャで計算済の成形済ファイルを取得する
+
+        Args:
+            version(str): 説明変数のバージョン
+
+        Returns:
+            file_list(list): ファイル名のリスト ※バージョンが登録されていない場合は空
+        '''
+        set_state = self.get_set(version)
+        if set_state is None:
+            self.log.error(f'説明変数のバージョンが登録されていません バージョン: {version}')
+            return []
+
+        file_list = []
+        for file_name in self.frame_store.get_file_list(self.data_dir, r'formatted_ohlc_\d{8}'):
+            state = self.get_file_state(file_name)
+            if all(feature_key in state and state[feature_key][1] == signature for feature_key, (_, signature) in set_state.items()):
+                file_list.append(file_name)
+
+        return file_list
+
+    def select_columns(self, file_name, version, columns):
+        '''
+        成形済ファイルのカラムから、説明変数のバージョンにない指標のカラムを除く
+
+        Args:
+            file_name(str): 成形済ファイル名
+            version(str): 説明変数のバージョン
+            columns(list): 成形済ファイルのカラム名
+
+        Returns:
+            columns(list): 指標以外のカラムとバージョンの指標のカラム
+        '''
+        set_columns = set()
+        for feature, _ in self.get_set(version).values():
+            set_columns.update(self.get_feature_columns(feature[0], feature[1:], columns))
+
+        other_columns = set()
+        for feature, _ in self.get_file_state(file_name).values():
+            other_columns.update(self.get_feature_columns(feature[0], feature[1:], columns))
+
+        return [column for column in columns if column in set_columns or column not in other_columns]
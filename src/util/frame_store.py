@@ -0,0 +1,254 @@
+import os
+import re
+import traceback
+import pandas as pd
+
+# 列指向形式(Parquet/Feather)はpyarrowがインストールされている場合のみ使う
+try:
+    import pyarrow.ipc
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 保存形式と拡張子 ※同じファイル名で複数の形式がある場合は上にあるものを優先して読み込む
+FORMAT_LIST = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv',
+}
+
+# 絞り込み条件の演算子 (カラム名, 演算子, 値)
+FILTER_OPERATOR_LIST = {
+    '==': lambda column, value: column == value,
+    '!=': lambda column, value: column != value,
+    '<': lambda column, value: column < value,
+    '<=': lambda column, value: column <= value,
+    '>': lambda column, value: column > value,
+    '>=': lambda column, value: column >= value,
+    'in': lambda column, value: column.isin(value),
+    'not in': lambda column, value: ~column.isin(value),
+}
+
+class FrameStore():
+    '''
+    成形処理のデータ(DataFrame)をCSV・Parquet・Feather(Arrow IPC)のいずれかで保存・読み込みするクラス
+
+    Parquet/Featherはzstdで圧縮し、型ごと保存するので読み込み時にテキストの解析が発生しない
+    読み込み時はカラムを指定して必要なカラムだけ読み込み、date/stock_codeなどの条件で行を絞り込める
+    ※Parquetは条件をファイルの読み込み時に適用する(条件に合わない行グループは読まない)
+
+    Memo:
+        Parquet/Featherを使う場合はpyarrowのインストールが必要
+    '''
+    def __init__(self, log, schema):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            schema(Schema): データセットのカラムと型を管理するクラスのインスタンス(CSVの読み込みで使用)
+        '''
+        self.log = log
+        self.schema = schema
+        self.file_format = 'csv'
+
+    def set_format(self, file_format):
+        '''
+        書き込みに使う保存形式を設定する
+
+        Args:
+            file_format(str): 保存形式(csv, parquet, feather)
+
+        Returns:
+            bool: 実行結果 ※未対応の形式やpyarrowがない場合はFalse
+        '''
+        if file_format not in FORMAT_LIST:
+            self.log.error(f'未対応の保存形式です 保存形式: {file_format}')
+            return False
+
+        if file_format != 'csv' and not PYARROW_AVAILABLE:
+            self.log.error(f'{file_format}形式で保存するにはpyarrowのインストールが必要です')
+            return False
+
+        self.file_format = file_format
+        return True
+
+    def get_extension(self, file_format = None):
+        '''
+        保存形式の拡張子を取得する
+
+        Args:
+            file_format(str or None): 保存形式 ※Noneの場合は設定中の形式
+
+        Returns:
+            extension(str): 拡張子(.csv, .parquet, .feather)
+        '''
+        return FORMAT_LIST[self.file_format if file_format is None else file_format]
+
+    def get_format(self, file_path):
+        '''
+        ファイルの拡張子から保存形式を取得する
+
+        Args:
+            file_path(str): ファイルパス
+
+        Returns:
+            file_format(str or None): 保存形式 ※対応していない拡張子の場合はNone
+        '''
+        extension = os.path.splitext(file_path)[1]
+        for file_format, format_extension in FORMAT_LIST.items():
+            if extension == format_extension:
+                return file_format
+        return None
+
+    def get_file_list(self, dir_name, name_pattern):
+        '''
+        ディレクトリ内で拡張子を除いたファイル名が一致するファイルの一覧を取得する
+
+        同じファイル名で複数の形式がある場合(CSVに書き出したものなど)は列指向形式のファイルを優先する
+
+        Args:
+            dir_name(str): ディレクトリ
+            name_pattern(str): 拡張子を除いたファイル名の正規表現 例: formatted_ohlc_\\d{8}
+
+        Returns:
+            file_list(list): ファイル名のリスト ※ディレクトリ内の並び順
+        '''
+        pattern = re.compile(name_pattern)
+        file_dict = {}
+        for file_name in os.listdir(dir_name):
+            name, extension = os.path.splitext(file_name)
+            file_format = self.get_format(file_name)
+            if file_format is None or not pattern.fullmatch(name):
+                continue
+
+            if name not in file_dict or list(FORMAT_LIST).index(file_format) < list(FORMAT_LIST).index(self.get_format(file_dict[name])):
+                file_dict[name] = file_name
+
+        return list(file_dict.values())
+
+    def write(self, df, file_path):
+        '''
+        拡張子に合った形式でDataFrameを保存する(既存のファイルは置き換える)
+
+        書きかけのファイルが読まれたり出力済と判定されたりしないように、一時ファイルに書き込んでから置き換える
+
+        Args:
+            df(pandas.DataFrame): 保存するデータ
+            file_path(str): 保存先のパス
+        '''
+        file_format = self.get_format(file_path)
+        part_path = f'{file_path}.part'
+
+        if file_format == 'parquet':
+            df.to_parquet(part_path, engine = 'pyarrow', compression = 'zstd', index = False)
+        elif file_format == 'feather':
+            # Featherはindexを保存できないので振り直す
+            df.reset_index(drop = True).to_feather(part_path, compression = 'zstd')
+        else:
+            df.to_csv(part_path, index = False)
+
+        os.replace(part_path, file_path)
+
+    def read(self, file_path, columns = None, filters = None, use_dtype = False):
+        '''
+        拡張子に合った形式でファイルを読み込む
+
+        Args:
+            file_path(str): ファイルパス
+            columns(list or None): 読み込むカラム名 ※Noneの場合は全て、ファイルにないカラムは無視する、重複は最初の1つのみ読み込む
+            filters(list[tuple] or None): 行の絞り込み条件 [(カラム名, 演算子, 値), ...] ※全ての条件に一致する行を読み込む
+                演算子は==, !=, <, <=, >, >=, in, not in 例: [('stock_code', 'in', [1301, 1332]), ('date', '>=', '2024-01-04')]
+            use_dtype(bool): CSVの場合に成形済データ(Schemaのformatted)の型を指定して読み込むか ※列指向形式は保存時の型で読み込む
+
+        Returns:
+            df(pandas.DataFrame): 読み込んだデータ
+        '''
+        file_format = self.get_format(file_path)
+
+        if columns is not None:
+            # 同じカラムを重複して指定した場合も1つにする(重複したままだとdf[columns]で同じカラムが複数できる)
+            columns = list(dict.fromkeys(columns))
+
+            # 絞り込みに使うカラムも読み込み、ファイルにないカラムは除く
+            file_columns = self.get_columns(file_path)
+            filter_columns = [] if filters is None else [column for column, _, _ in filters]
+            read_columns = [column for column in file_columns if column in set(columns) | set(filter_columns)]
+        else:
+            read_columns = None
+
+        if file_format == 'parquet':
+            df = pd.read_parquet(file_path, engine = 'pyarrow', columns = read_columns, filters = filters)
+        elif file_format == 'feather':
+            df = self.filter_rows(pd.read_feather(file_path, columns = read_columns), filters)
+        elif use_dtype:
+            df = self.filter_rows(self.schema.read_csv('formatted', file_path, columns = read_columns), filters)
+        else:
+            df = self.filter_rows(pd.read_csv(file_path, usecols = read_columns), filters)
+
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+
+        return df
+
+    def get_columns(self, file_path):
+        '''
+        データを読み込まずにファイルのカラム名を取得する
+
+        Args:
+            file_path(str): ファイルパス
+
+        Returns:
+            columns(list): カラム名のリスト
+        '''
+        file_format = self.get_format(file_path)
+        if file_format == 'parquet':
+            return pyarrow.parquet.read_schema(file_path).names
+        if file_format == 'feather':
+            with pyarrow.memory_map(file_path) as source:
+                return pyarrow.ipc.open_file(source).schema.names
+        return pd.read_csv(file_path, nrows = 0).columns.tolist()
+
+    def filter_rows(self, df, filters):
+        '''
+        読み込み後のデータを条件で絞り込む(CSV/Feather用)
+
+        Args:
+            df(pandas.DataFrame): 絞り込むデータ
+            filters(list[tuple] or None): 行の絞り込み条件 ※readと同じ形式
+
+        Returns:
+            df(pandas.DataFrame): 条件に一致する行のデータ
+        '''
+        if filters is None or len(filters) == 0:
+            return df
+
+        mask = pd.Series(True, index = df.index)
+        for column, operator, value in filters:
+            mask &= FILTER_OPERATOR_LIST[operator](df[column], value)
+
+        return df[mask]
+
+    def convert(self, file_path, file_format):
+        '''
+        ファイルを別の形式に変換して同じディレクトリに保存する ※変換元のファイルは残す
+
+        Args:
+            file_path(str): 変換元のファイルパス
+            file_format(str): 変換先の保存形式(csv, parquet, feather)
+
+        Returns:
+            bool: 実行結果
+            output_path(str): 変換先のファイルパス
+        '''
+        output_path = os.path.splitext(file_path)[0] + self.get_extension(file_format)
+        if output_path == file_path:
+            return True, output_path
+
+        try:
+            # 変換元がCSVの場合は型を指定して読み込む(列指向形式で小さい型のまま保存する)
+            self.write(self.read(file_path, use_dtype = True), output_path)
+        except Exception as e:
+            self.log.error(f'ファイルの形式変換でエラー ファイルパス: {file_path} 変換先の形式: {file_format}\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, output_path
@@ -2,10 +2,31 @@ import numpy as np
 import pandas as pd
 import traceback
 import re
+from .indicator_array import IndicatorArray
+
+# 指標の種類ごとの計算ロジックのバージョン 計算方法を変更した指標は値を上げる
+# ※キャッシュ(IndicatorCache)と成形済データ(FeatureStore)は、バージョンが変わった指標のみ計算し直す
+FEATURE_VERSION_LIST = {
+    'sma': 1,
+    'ema': 1,
+    'wma': 1,
+    'bb': 1,
+    'ma_cross': 1,
+    'rsi': 1,
+    'rci': 1,
+    'psy': 1,
+    'sar': 1,
+    'sar_hlc': 1,
+    'macd': 1,
+    'ichimoku': 1,
+    'change': 1,
+}
 
 class Indicator():
     def __init__(self, log):
         self.log = log
+        # numpy配列で計算を行うクラス(各メソッドはここで計算した値をカラムに設定する)
+        self.arrays = IndicatorArray()
 
     def get_sma(self, df, column_name, window_size, interval, price_column_name = 'current_price'):
         '''
@@ -25,23 +46,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
             # SMAの計算・カラムを追加
-            df_resampled[column_name] = df_resampled[price_column_name].rolling(window=window_size).mean().round(1)
-
-            # window_size - 1番目までのデータでは計算ができずNaNになるので-1で埋める
-            df_resampled[column_name].fillna(-1, inplace=True)
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[[column_name]], left_index=True, right_index=True, how='left')
-
-            # 2分足以上の場合は間の数値を前のSMAで埋める
-            df[column_name].fillna(method='ffill', inplace=True)
+            sma = self.arrays.sma(df[price_column_name].to_numpy(), window_size, interval)
+            df = self._add_columns(df, column_name, sma)
 
         except Exception as e:
             self.log.error(f'SMA計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -67,23 +74,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
             # EMAの計算・カラムを追加
-            df_resampled[column_name] = df_resampled[price_column_name].ewm(span = window_size).mean().round(1)
-
-            # window_size - 1番目のデータでは計算ができずNaNになるので-1で埋める
-            df_resampled[column_name].fillna(-1, inplace=True)
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[[column_name]], left_index=True, right_index=True, how='left')
-
-            # 2分足以上の場合は間の数値を前のEMAで埋める
-            df[column_name].fillna(method='ffill', inplace=True)
+            ema = self.arrays.ema(df[price_column_name].to_numpy(), window_size, interval)
+            df = self._add_columns(df, column_name, ema)
 
         except Exception as e:
             self.log.error(f'EMA計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -109,24 +102,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
             # WMAの計算・カラムを追加
-            weights = np.arange(1, window_size + 1)
-            df_resampled[column_name] = df_resampled[price_column_name].rolling(window = window_size).apply(lambda x: np.dot(x, weights) / weights.sum(), raw = True).round(1)
-
-            # window_size - 1番目までのデータでは計算ができずNaNになるので-1で埋める
-            df_resampled[column_name].fillna(-1, inplace=True)
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[[column_name]], left_index=True, right_index=True, how='left')
-
-            # 2分足以上の場合は間の数値を前のWMAで埋める
-            df[column_name].fillna(method='ffill', inplace=True)
+            wma = self.arrays.wma(df[price_column_name].to_numpy(), window_size, interval)
+            df = self._add_columns(df, column_name, wma)
 
         except Exception as e:
             self.log.error(f'WMA計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -148,62 +126,14 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df.iloc[::interval, :].copy()
-            else:
-                df_resampled = df.copy()
-
-            # 既に計算済の移動平均線の値を持つカラムを取得
-            sma_columns = [col for col in df_resampled.columns if re.compile(f'sma_{interval}min_\\d+piece').match(col)]
-            ema_columns = [col for col in df_resampled.columns if re.compile(f'ema_{interval}min_\\d+piece').match(col)]
-            wma_columns = [col for col in df_resampled.columns if re.compile(f'wma_{interval}min_\\d+piece').match(col)]
-
-            if len(sma_columns) == 0 or len(ema_columns) == 0 or len(wma_columns) == 0:
+            # 既に計算済の移動平均線のカラムからクロス・関連性を計算
+            ma_values = {column: df[column].to_numpy() for column in df.columns if re.match(f'(sma|ema|wma)_{interval}min_\\d+piece$', column)}
+            cross_values = self.arrays.ma_cross(ma_values, interval)
+            if len(cross_values) == 0:
                 ##self.log.warning('移動平均線の値が存在しません')
                 return True, pd.DataFrame()
 
-            add_columns = []
-            for columns in [sma_columns, ema_columns, wma_columns]:
-                # 移動平均線の種別
-                line_type = columns[0].split('_')[0]
-                for column_short in columns:
-                    for column_long in columns:
-                        # 短期と長期の本数を取得
-                        short_piece = int(re.search(rf'{interval}min_(\d+)piece', column_short).group(1))
-                        long_piece = int(re.search(rf'{interval}min_(\d+)piece', column_long).group(1))
-
-                        # column_shortが短期、column_longが長期でない場合はスキップ
-                        if short_piece >= long_piece:
-                            continue
-
-                        # 変数定義
-                        golden_cross = f'{line_type}_{interval}min_{short_piece}to{long_piece}piece_golden_cross'
-                        golden_cross_after = f'{line_type}_{interval}min_{short_piece}to{long_piece}piece_golden_cross_after'
-                        dead_cross = f'{line_type}_{interval}min_{short_piece}to{long_piece}piece_dead_cross'
-                        dead_cross_after = f'{line_type}_{interval}min_{short_piece}to{long_piece}piece_dead_cross_after'
-                        diff = f'{line_type}_{interval}min_{short_piece}to{long_piece}piece_diff'
-
-                        # ゴールデンクロス・デッドクロスの判定
-                        df_resampled[golden_cross] = ((df_resampled[column_short].shift(1) <= df_resampled[column_long].shift(1)) & (df_resampled[column_short] > df_resampled[column_long])).astype(int)
-                        df_resampled[dead_cross] = ((df_resampled[column_short].shift(1) >= df_resampled[column_long].shift(1)) & (df_resampled[column_short] < df_resampled[column_long])).astype(int)
-
-                        # 直近でフラグが立ってからの経過時間
-                        df_resampled['gc_id'] = df_resampled[golden_cross].cumsum()
-                        df_resampled[golden_cross_after] = df_resampled.groupby('gc_id').cumcount()
-                        df_resampled['dc_id'] = df_resampled[dead_cross].cumsum()
-                        df_resampled[dead_cross_after] = df_resampled.groupby('dc_id').cumcount()
-
-                        # 短期と長期の差を計算
-                        df_resampled[diff] = (df_resampled[column_short] - df_resampled[column_long]).round(2)
-                        add_columns.extend([golden_cross, golden_cross_after, dead_cross, dead_cross_after, diff])
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[add_columns], left_index=True, right_index=True, how='left')
-
-            # リサンプリングされていない行を直前の値で埋める
-            for column in add_columns:
-                df[column].fillna(method='ffill', inplace=True)
+            df = self._add_columns(df, None, cross_values)
 
         except Exception as e:
             self.log.error(f'MAクロス計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -229,52 +159,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
-            # 移動平均線と移動標準偏差を計算
-            df_resampled['sma_tmp'] = df_resampled[price_column_name].rolling(window = window_size).mean()
-            df_resampled['sigma_tmp'] = df_resampled[price_column_name].rolling(window = window_size).std()
-
-            # 追加対象のカラム名
-            add_columns = []
-
-            # +3α~-3αを計算してカラムに追加する
-            for sigma in [1, 2, 3]:
-                df_resampled[f'{column_name}_upper_{sigma}_alpha'] = (df_resampled['sma_tmp'] + (df_resampled['sigma_tmp'] * sigma)).round(1)
-                df_resampled[f'{column_name}_lower_{sigma}_alpha'] = (df_resampled['sma_tmp'] - (df_resampled['sigma_tmp'] * sigma)).round(1)
-
-                add_columns.extend([f'{column_name}_upper_{sigma}_alpha', f'{column_name}_lower_{sigma}_alpha'])
-
-            # バンド(α)の幅を計算
-            df_resampled[f'{column_name}_width'] = (df_resampled['sigma_tmp'] * 2).round(3)
-            add_columns.append(f'{column_name}_width')
-
-            # バンド幅の収縮・拡大度合いを計算
-            df_resampled[f'{column_name}_width_diff'] = df_resampled[f'{column_name}_width'].diff().round(3)
-            add_columns.append(f'{column_name}_width_diff')
-
-            # 価格とバンドの差を計算
-            df_resampled[f'{column_name}_upper_diff'] = (df_resampled[price_column_name] - df_resampled[f'{column_name}_upper_1_alpha']).round(3)
-            df_resampled[f'{column_name}_lower_diff'] = (df_resampled[f'{column_name}_lower_1_alpha'] - df_resampled[price_column_name]).round(3)
-            add_columns.extend([f'{column_name}_upper_diff', f'{column_name}_lower_diff'])
-
-            # バンド内での位置を計算 αの場合は1、-αの場合は0になる
-            df_resampled[f'{column_name}_position'] = ((df_resampled[price_column_name] - df_resampled[f'{column_name}_lower_1_alpha']) / df_resampled[f'{column_name}_width']).round(3)
-            add_columns.append(f'{column_name}_position')
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[add_columns], left_index=True, right_index=True, how='left')
-
-            for column in add_columns:
-                # リサンプリング対象外の行は、直近の値で埋める
-                df[column].fillna(method='ffill', inplace=True)
-
-                # window_size - 1番目までのデータでは計算ができずNaNになるので-999で埋める
-                ##df[column].fillna(-999, inplace=True)
+            # ボリンジャーバンドの計算・カラムを追加
+            values = self.arrays.bollinger_bands(df[price_column_name].to_numpy(), window_size, interval)
+            df = self._add_columns(df, column_name, values)
 
         except Exception as e:
             self.log.error(f'ボリンジャーバンド計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -300,45 +187,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
-            # 前日との差分を計算
-            df_resampled['diff'] = df_resampled[price_column_name].diff()
-
-            # 前日との差分がプラスならその値、マイナスなら0を設定
-            df_resampled['up'] = df_resampled['diff'].apply(lambda x: x if x > 0 else 0)
-
-            # 前日との差分がマイナスならその値、プラスなら0を設定
-            df_resampled['down'] = df_resampled['diff'].apply(lambda x: abs(x) if x < 0 else 0)
-
-            # 平均上昇幅と平均下降幅を計算
-            df_resampled['up_mean'] = df_resampled['up'].rolling(window = window_size).mean()
-            df_resampled['down_mean'] = df_resampled['down'].rolling(window = window_size).mean()
-
-            # RSIを計算
-            if df_resampled['down_mean'].isna().all() or df_resampled['up_mean'].isna().all():
-                ##df_resampled[column_name] = -999
-                df_resampled[column_name] = None
-            elif df_resampled['down_mean'].sum() == 0:
-                if df_resampled['up_mean'].sum() == 0:
-                    df_resampled[column_name] = 50
-                else:
-                    df_resampled[column_name] = 100
-            else:
-                df_resampled[column_name] = (100 - 100 / (1 + df_resampled['up_mean'] / df_resampled['down_mean'])).round(2)
-
-            # 先頭の要素を-999で埋める
-            ##df_resampled.iloc[0, df_resampled.columns.get_loc(column_name)] = -999
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[column_name], left_index=True, right_index=True, how='left')
-
-            # window_size - 1番目までのデータでは計算ができずNaNになるので-999で埋める かつ 間の要素は直近の要素で埋める
-            df[column_name].fillna(method='ffill', inplace=True)
+            # RSIの計算・カラムを追加
+            rsi = self.arrays.rsi(df[price_column_name].to_numpy(), window_size, interval)
+            df = self._add_columns(df, column_name, rsi)
 
         except Exception as e:
             self.log.error(f'RSI計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -363,26 +214,9 @@ class Indicator():
             df(pandas.DataFrame): RCIを追加したDataFrame
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
             # RCIの計算・カラムを追加
-            df_resampled[column_name] = df_resampled[price_column_name].rolling(window=window_size).apply(self.calc_rci, raw=False)
-
-            # 初めの方の要素はNaNになるので直前の値で埋める
-            df_resampled[column_name].fillna(method='ffill', inplace=True)
-
-            # 先頭の要素を-999で埋める
-            ##df_resampled.iloc[0, df_resampled.columns.get_loc(column_name)] = -999
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[[column_name]], left_index=True, right_index=True, how='left')
-
-            # リサンプリングされていない行を前の値で埋める
-            df[column_name].fillna(method='ffill', inplace=True)
+            rci = self.arrays.rci(df[price_column_name].to_numpy(), window_size, interval)
+            df = self._add_columns(df, column_name, rci)
 
         except Exception as e:
             self.log.error(f'RCI計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -393,6 +227,7 @@ class Indicator():
     def calc_rci(self, sub_df):
         '''
         RCIの計算を行う
+        ※1ウィンドウ分のみの計算用 列全体の計算はindicator_kernel.rolling_rciを使う
 
         Args:
             sub_df(pandas.Series): 価格のリスト
@@ -425,68 +260,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
-            # カラム名の設定
-            macd = column_name
-            macd_signal = f'{macd}_signal'
-            macd_histogram = f'{macd}_diff'
-            add_columns = []
-
-            # MACD(短期EMA - 長期EMA)の計算 # TODO 円でだけでなく、%も見た方がいいかも
-            short_ema = df_resampled[price_column_name].ewm(span = short_window_size).mean()
-            long_ema = df_resampled[price_column_name].ewm(span = long_window_size).mean()
-            df_resampled[macd] = (short_ema - long_ema).round(2)
-            add_columns.append(macd)
-
-            # MACDシグナルの計算
-            df_resampled[macd_signal] = df_resampled[macd].ewm(span = signal_window_size).mean().round(2)
-            add_columns.append(macd_signal)
-
-            # MACDとMACDシグナルの差(ヒストグラム)を計算
-            df_resampled[macd_histogram] = (df_resampled[macd] - df_resampled[macd_signal]).round(3)
-            df_resampled[f'{macd_histogram}_flag'] = df_resampled[macd_histogram].apply(lambda x: 1 if x > 0 else 0)
-            add_columns.extend([macd_histogram, f'{macd_histogram}_flag'])
-
-            # ゴールデンクロス・デッドクロスのフラグ
-            df_resampled[f'{macd}_cross'] = 0
-            df_resampled.loc[(df_resampled[macd] > df_resampled[macd_signal]) & (df_resampled[macd].shift() < df_resampled[macd_signal].shift()), f'{macd}_cross'] = 1
-            df_resampled.loc[(df_resampled[macd] < df_resampled[macd_signal]) & (df_resampled[macd].shift() > df_resampled[macd_signal].shift()), f'{macd}_cross'] = -1
-            add_columns.append(f'{macd}_cross')
-
-            # TODO クロス後の転換シグナルなしフラグ
-
-            # MACDとMACDシグナルの傾きを計算
-            for count in [1, 3, 5, 10]:
-                # 幅が長すぎるとデータが取れないのでスキップ
-                if interval * count >= 300:
-                    continue
-                df_resampled[f'{macd}_{count}_slope'] = (df_resampled[macd].diff(count)).round(3)
-                df_resampled[f'{macd_signal}_{count}_slope'] = (df_resampled[macd_signal].diff(count)).round(3)
-                add_columns.extend([f'{macd}_{count}_slope', f'{macd_signal}_{count}_slope'])
-
-            # MACDの傾きと価格の傾きの不一致(ダイバージェンス)フラグ
-            df_resampled[f'{macd}_mismatch'] = (df_resampled[macd].diff() * df_resampled[price_column_name].diff()).apply(lambda x: 1 if x < 0 else 0)
-            add_columns.append(f'{macd}_mismatch')
-
-            # MACDの傾きと価格の傾きの不一致(ダイバージェンス)フラグが続いている回数
-            df_resampled[f'{macd}_mismatch_count'] = df_resampled[f'{macd}_mismatch'].groupby((df_resampled[f'{macd}_mismatch'] != df_resampled[f'{macd}_mismatch'].shift()).cumsum()).cumcount() + 1
-            df_resampled.loc[df_resampled[f'{macd}_mismatch'] == 0, f'{macd}_mismatch_count'] = 0
-            add_columns.append(f'{macd}_mismatch_count')
-
-            # 先頭の要素を-999で埋める
-            ##df_resampled.iloc[0, df_resampled.columns.get_indexer(add_columns)] = -999
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[add_columns], left_index=True, right_index=True, how='left')
-
-            # リサンプリングされていない行を直前の値で埋める
-            for column in add_columns:
-                df[column].fillna(method='ffill', inplace=True)
+            # MACDの計算・カラムを追加
+            values = self.arrays.macd(df[price_column_name].to_numpy(), short_window_size, long_window_size, signal_window_size, interval)
+            df = self._add_columns(df, column_name, values)
 
         except Exception as e:
             self.log.error(f'MACD計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -512,29 +288,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
-            # 前日との差分を計算
-            df_resampled['diff'] = df_resampled[price_column_name].diff()
-
-            # 前日との差分がプラスなら1、マイナスなら0を設定
-            df_resampled['up'] = df_resampled['diff'].apply(lambda x: 1 if x > 0 else 0)
-
-            # PSYを計算
-            df_resampled[column_name] = (df_resampled['up'].rolling(window = window_size).sum() / window_size * 100).round(1)
-
-            # 先頭の要素を-999で埋める
-            ##df_resampled.iloc[0, df_resampled.columns.get_loc(column_name)] = -999
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[column_name], left_index=True, right_index=True, how='left')
-
-            # リサンプリングされていない行を直前の値で埋める
-            df[column_name].fillna(method='ffill', inplace=True)
+            # PSYの計算・カラムを追加
+            psy = self.arrays.psy(df[price_column_name].to_numpy(), window_size, interval)
+            df = self._add_columns(df, column_name, psy)
 
         except Exception as e:
             self.log.error(f'PSY計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -561,76 +317,9 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[[price_column_name]].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[[price_column_name]].copy()
-
-            # 初期値の設定 SARの初期値と前日のEPは初期値の終値になる
-            sar_list = [df_resampled[price_column_name].iloc[0]]
-            ep = df_resampled[price_column_name].iloc[0]
-            af = min_af
-            trend = ''
-
-            # SARの計算
-            for i in range(1, len(df_resampled)):
-                current_price = df_resampled[price_column_name].iloc[i]
-
-                # 1つ目の要素の場合は前日との差分で上昇か下降トレンドかを判定
-                if i == 1:
-                    if sar_list[-1] < current_price:
-                        trend = 'up'
-                    else:
-                        trend = 'down'
-
-                # 上昇トレンドの場合
-                if trend == 'up':
-                    # トレンド内での高値を更新した場合
-                    if ep < current_price:
-                        ep = current_price
-                        af = min(af + min_af, max_af)
-
-                    # SARの計算
-                    sar = sar_list[i - 1] + af * (ep - sar_list[i - 1])
-
-                    # SARが現在の価格よりも高い場合はトレンドを反転
-                    if sar > current_price:
-                        trend = 'down'
-                        sar = ep
-                        ep = current_price
-                        af = min_af
-
-                # 下降トレンドの場合
-                else:
-                    # トレンド内での安値を更新した場合
-                    if ep > current_price:
-                        ep = current_price
-                        af = min(af + min_af, max_af)
-
-                    # SARの計算
-                    sar = sar_list[i - 1] - af * (sar_list[i - 1] - ep)
-
-                    # SARが現在の価格よりも低い場合はトレンドを反転
-                    if sar < current_price:
-                        trend = 'up'
-                        sar = ep
-                        ep = current_price
-                        af = min_af
-
-                sar_list.append(sar.round(4))
-
-            df_resampled[column_name] = sar_list
-            column_name_flag = f'{column_name}_flag'
-            # SARが一つ前のSARよりも高い場合は1、低い場合は0
-            df_resampled[column_name_flag] = (df_resampled[column_name] > df_resampled[column_name].shift()).astype(int)
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[[column_name, column_name_flag]], left_index=True, right_index=True, how='left')
-
-            # リサンプリングされていない行を直前の値で埋める
-            df[column_name].fillna(method='ffill', inplace=True)
-            df[column_name_flag].fillna(method='ffill', inplace=True)
+            # SARの計算・カラムを追加
+            values = self.arrays.parabolic(df[price_column_name].to_numpy(), min_af, max_af, interval)
+            df = self._add_columns(df, column_name, values)
 
         except Exception as e:
             self.log.error(f'SAR計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -656,83 +345,9 @@ class Indicator():
 
         '''
         try:
-            # 計算に必要なカラム名のリスト
-            columns = ['high', 'low', 'close']
-
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df[columns].iloc[::interval, :].copy()
-            else:
-                df_resampled = df[columns].copy()
-
-            # 初期値の設定 SARの初期値と前日のEPは初期値の終値になる
-            sar_list = [df_resampled['close'].iloc[0]]
-            ep = df_resampled['close'].iloc[0]
-            af = min_af
-            trend = ''
-
-            # SARの計算
-            for i in range(1, len(df_resampled)):
-                close = df_resampled['close'].iloc[i]
-                high = df_resampled['high'].iloc[i]
-                low = df_resampled['low'].iloc[i]
-
-                # 1つ目の要素の場合は前日との差分で上昇か下降トレンドかを判定
-                if i == 1:
-                    if sar_list[0] < close:
-                        trend = 'up'
-                    else:
-                        trend = 'down'
-
-                # 上昇トレンドの場合
-                if trend == 'up':
-                    # トレンド内での高値を更新した場合
-                    if ep < high:
-                        ep, af = high, min(af + min_af, max_af)
-
-                    # SARの計算
-                    sar = sar_list[i - 1] + af * (ep - sar_list[i - 1])
-
-                    # SARが現在の安値と同じか高くなった場合はトレンドを反転
-                    if sar >= low:
-                        trend, af = 'down', min_af
-                        sar = ep
-                        ep = high
-
-                # 下降トレンドの場合
-                else:
-                    # トレンド内での安値を更新した場合
-                    if ep > low:
-                        ep, af = low, min(af + min_af, max_af)
-
-                    # SARの計算
-                    sar = sar_list[i - 1] - af * (sar_list[i - 1] - ep)
-
-                    # SARが現在の高値と同じか高くなった場合はトレンドを反転
-                    if sar <= high:
-                        trend, af = 'up', min_af
-                        sar = ep
-                        ep = low
-
-                sar_list.append(sar.round(4))
-
-            df_resampled[column_name] = sar_list
-            column_name_flag = f'{column_name}_flag'
-            column_name_reverse_flag = f'{column_name}_reverse_flag'
-
-            # SARが一つ前のSARよりも高い場合は1、低い場合は0
-            df_resampled[column_name_flag] = (df_resampled[column_name] > df_resampled[column_name].shift()).astype(int)
-
-            # トレンドが反転した場合は1、そうでない場合は0
-            df_resampled[column_name_reverse_flag] = (df_resampled[column_name_flag] != df_resampled[column_name_flag].shift()).astype(int)
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[[column_name, column_name_flag, column_name_reverse_flag]], left_index=True, right_index=True, how='left')
-
-            # リサンプリングされていない行を直前の値で埋める
-            df[column_name].fillna(method='ffill', inplace=True)
-            df[column_name_flag].fillna(method='ffill', inplace=True)
-            df[column_name_reverse_flag].fillna(method='ffill', inplace=True)
+            # SARの計算・カラムを追加
+            values = self.arrays.parabolic_hlc(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(), min_af, max_af, interval)
+            df = self._add_columns(df, column_name, values)
 
         except Exception as e:
             self.log.error(f'SAR計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -759,152 +374,10 @@ class Indicator():
 
         '''
         try:
-            # 何分足の設定かに応じてデータをリサンプリング
-            if interval > 1:
-                df_resampled = df.iloc[::interval, :].copy()
-            else:
-                df_resampled = df.copy()
-
-            # カラム名の設定
-            base_line = f'{column_name}_base_line'
-            conversion_line = f'{column_name}_conversion_line'
-            leading_span_a = f'{column_name}_leading_span_a'
-            leading_span_b = f'{column_name}_leading_span_b'
-            lagging_span = f'{column_name}_lagging_span'
-            base_conversion_diff = f'{column_name}_bc_diff'
-            base_conversion_position = f'{column_name}_bc_position'
-            base_conversion_cross = f'{column_name}_bc_cross'
-            base_conversion_gc_after = f'{column_name}_bc_gc_after'
-            base_conversion_dc_after = f'{column_name}_bc_dc_after'
-            price_lagging_diff = f'{column_name}_pl_diff'
-            price_lagging_position = f'{column_name}_pl_position'
-            price_lagging_cross = f'{column_name}_pl_cross'
-            price_lagging_gc_after = f'{column_name}_pl_gc_after'
-            price_lagging_dc_after = f'{column_name}_pl_dc_after'
-            leading_span_diff = f'{column_name}_ls_diff'
-            leading_span_position = f'{column_name}_ls_position'
-            leading_span_cross = f'{column_name}_ls_cross'
-            leading_span_gc_after = f'{column_name}_ls_gc_after'
-            leading_span_dc_after = f'{column_name}_ls_dc_after'
-            price_cloud_high_diff = f'{column_name}_cloud_high_diff'
-            price_cloud_low_diff = f'{column_name}_cloud_low_diff'
-            price_cloud_position = f'{column_name}_cloud_position'
-            price_cloud_cross = f'{column_name}_cloud_cross'
-            price_cloud_cross_gc_after1 = f'{column_name}_cloud_gc_after1'
-            price_cloud_cross_gc_after2 = f'{column_name}_cloud_gc_after2'
-            price_cloud_cross_dc_after1 = f'{column_name}_cloud_dc_after1'
-            price_cloud_cross_dc_after2 = f'{column_name}_cloud_dc_after2'
-
-            add_columns = [base_line, conversion_line, leading_span_a, leading_span_b, lagging_span,
-                           base_conversion_diff, base_conversion_position, base_conversion_cross, base_conversion_gc_after, base_conversion_dc_after,
-                           price_lagging_diff, price_lagging_position, price_lagging_cross, price_lagging_gc_after, price_lagging_dc_after,
-                           leading_span_diff, leading_span_position, leading_span_cross, leading_span_gc_after, leading_span_dc_after,
-                           price_cloud_high_diff, price_cloud_low_diff, price_cloud_position, price_cloud_cross,
-                           price_cloud_cross_gc_after1, price_cloud_cross_gc_after2, price_cloud_cross_dc_after1, price_cloud_cross_dc_after2]
-
-            # 高値/安値がない場合
-            if 'high' not in df_resampled.columns:
-                df_resampled['high'] = df_resampled[close_column_name]
-                df_resampled['low'] = df_resampled[close_column_name]
-
-            # 基準線の計算 long_window_size本の高値と安値の平均
-            df_resampled[base_line] = ((df_resampled['high'].rolling(window = long_window_size).max() + df_resampled['low'].rolling(window = long_window_size).min()) / 2).round(3)
-
-            # 転換線の計算 short_window_size本の高値と安値の平均
-            df_resampled[conversion_line] = ((df_resampled['high'].rolling(window = short_window_size).max() + df_resampled['low'].rolling(window = short_window_size).min()) / 2).round(3)
-
-            # 先行スパン1の計算 long_window_size本先の基準線と転換線の平均
-            df_resampled[leading_span_a] = (((df_resampled[conversion_line] + df_resampled[base_line]) / 2).shift(long_window_size)).round(3)
-
-            # 先行スパン2の計算 long_window_size x 2本の高値と安値の平均をlong_window_size本先にずらす
-            df_resampled[leading_span_b] = (((df_resampled['high'].rolling(window = long_window_size * 2).max() + df_resampled['low'].rolling(window = long_window_size * 2).min()) / 2).shift(long_window_size)).round(3)
-
-            # 遅行スパンの計算 現在の価格をlong_window_size本前にずらす
-            df_resampled[lagging_span] = df_resampled[close_column_name].shift(-long_window_size)
-
-            # 基準線と転換線の差/位置関係
-            df_resampled[base_conversion_diff] = (df_resampled[conversion_line] - df_resampled[base_line]).round(3)
-            df_resampled[base_conversion_position] = (df_resampled[conversion_line] - df_resampled[base_line]).apply(lambda x: 1 if x > 0 else 0)
-
-            # 基準線と転換線のクロスフラグ
-            df_resampled[base_conversion_cross] = 0
-            df_resampled.loc[(df_resampled[conversion_line] > df_resampled[base_line]) & (df_resampled[conversion_line].shift() < df_resampled[base_line].shift()), base_conversion_cross] = 1
-            df_resampled.loc[(df_resampled[conversion_line] < df_resampled[base_line]) & (df_resampled[conversion_line].shift() > df_resampled[base_line].shift()), base_conversion_cross] = -1
-
-            # ゴールデンクロス/デッドクロスからの経過データ数を計算
-            df_resampled[base_conversion_gc_after] = df_resampled.groupby((df_resampled[base_conversion_cross] == 1).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[base_conversion_cross] == 1, base_conversion_gc_after] = 0
-            df_resampled[base_conversion_dc_after] = df_resampled.groupby((df_resampled[base_conversion_cross] == -1).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[base_conversion_cross] == -1, base_conversion_dc_after] = 0
-
-            # 終値と遅行スパンの差/位置関係
-            df_resampled[price_lagging_diff] = (df_resampled[close_column_name] - df_resampled[lagging_span]).round(3)
-            df_resampled[price_lagging_position] = (df_resampled[close_column_name] > df_resampled[lagging_span]).astype(int)
-
-            # 終値と遅行スパンのクロスフラグ
-            df_resampled[price_lagging_cross] = 0
-            df_resampled.loc[(df_resampled[close_column_name] > df_resampled[lagging_span]) & (df_resampled[close_column_name].shift() < df_resampled[lagging_span].shift()), price_lagging_cross] = 1
-            df_resampled.loc[(df_resampled[close_column_name] < df_resampled[lagging_span]) & (df_resampled[close_column_name].shift() > df_resampled[lagging_span].shift()), price_lagging_cross] = -1
-
-            # ゴールデンクロス/デッドクロスからの経過データ数を計算
-            df_resampled[price_lagging_gc_after] = df_resampled.groupby((df_resampled[price_lagging_cross] == 1).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[price_lagging_cross] == 1, price_lagging_gc_after] = 0
-            df_resampled[price_lagging_dc_after] = df_resampled.groupby((df_resampled[price_lagging_cross] == -1).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[price_lagging_cross] == -1, price_lagging_dc_after] = 0
-
-            # 先行スパン1と2の差/位置関係
-            df_resampled[leading_span_diff] = (df_resampled[leading_span_a] - df_resampled[leading_span_b]).round(3)
-            df_resampled[leading_span_position] = (df_resampled[leading_span_a] > df_resampled[leading_span_b]).astype(int)
-
-            # 先行スパン1と2のクロスフラグ
-            df_resampled[leading_span_cross] = 0
-            df_resampled.loc[(df_resampled[leading_span_a] > df_resampled[leading_span_b]) & (df_resampled[leading_span_a].shift() < df_resampled[leading_span_b].shift()), leading_span_cross] = 1
-            df_resampled.loc[(df_resampled[leading_span_a] < df_resampled[leading_span_b]) & (df_resampled[leading_span_a].shift() > df_resampled[leading_span_b].shift()), leading_span_cross] = -1
-
-            # ゴールデンクロス/デッドクロスからの経過データ数を計算
-            df_resampled[leading_span_gc_after] = df_resampled.groupby((df_resampled[leading_span_cross] == 1).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[leading_span_cross] == 1, leading_span_gc_after] = 0
-            df_resampled[leading_span_dc_after] = df_resampled.groupby((df_resampled[leading_span_cross] == -1).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[leading_span_cross] == -1, leading_span_dc_after] = 0
-
-            # 終値と雲(先行スパン1と2の間)の差/位置関係
-            df_resampled[price_cloud_high_diff] = (df_resampled[close_column_name] - np.maximum(df_resampled[leading_span_a], df_resampled[leading_span_b])).round(3)
-            df_resampled[price_cloud_low_diff] = (df_resampled[close_column_name] - np.minimum(df_resampled[leading_span_a], df_resampled[leading_span_b])).round(3)
-            # 雲の上下位置フラグ(1: 上、 0: 中、-1: 下)
-            df_resampled[price_cloud_position] = 0
-            df_resampled.loc[(df_resampled[close_column_name] > np.maximum(df_resampled[leading_span_a], df_resampled[leading_span_b])), price_cloud_position] = 1
-            df_resampled.loc[(df_resampled[close_column_name] < np.minimum(df_resampled[leading_span_a], df_resampled[leading_span_b])), price_cloud_position] = -1
-
-            # 終値と雲(先行スパン1と2の間)からのクロスフラグ # TODO おかしいかも
-            df_resampled[price_cloud_cross] = 0
-            # 雲の上->中
-            df_resampled.loc[(df_resampled[close_column_name] >= np.maximum(df_resampled[leading_span_a], df_resampled[leading_span_b])) & (df_resampled[close_column_name].shift() < np.maximum(df_resampled[leading_span_a].shift(), df_resampled[leading_span_b].shift())), price_cloud_cross] = 1
-            # 雲の中->上
-            df_resampled.loc[(df_resampled[close_column_name] <= np.maximum(df_resampled[leading_span_a], df_resampled[leading_span_b])) & (df_resampled[close_column_name].shift() > np.maximum(df_resampled[leading_span_a].shift(), df_resampled[leading_span_b].shift())), price_cloud_cross] = 2
-            # 雲の中->下
-            df_resampled.loc[(df_resampled[close_column_name] >= np.minimum(df_resampled[leading_span_a], df_resampled[leading_span_b])) & (df_resampled[close_column_name].shift() < np.minimum(df_resampled[leading_span_a].shift(), df_resampled[leading_span_b].shift())), price_cloud_cross] = 3
-            # 雲の下->中
-            df_resampled.loc[(df_resampled[close_column_name] <= np.minimum(df_resampled[leading_span_a], df_resampled[leading_span_b])) & (df_resampled[close_column_name].shift() > np.minimum(df_resampled[leading_span_a].shift(), df_resampled[leading_span_b].shift())), price_cloud_cross] = 4
-
-            # ゴールデンクロス/デッドクロスからの経過データ数を計算
-            df_resampled[price_cloud_cross_gc_after1] = df_resampled.groupby((df_resampled[price_cloud_cross] == 2).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[price_cloud_cross] == 2, price_cloud_cross_gc_after1] = 0
-            df_resampled[price_cloud_cross_gc_after2] = df_resampled.groupby((df_resampled[price_cloud_cross] == 4).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[price_cloud_cross] == 4, price_cloud_cross_gc_after2] = 0
-            df_resampled[price_cloud_cross_dc_after1] = df_resampled.groupby((df_resampled[price_cloud_cross] == 1).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[price_cloud_cross] == 1, price_cloud_cross_dc_after1] = 0
-            df_resampled[price_cloud_cross_dc_after2] = df_resampled.groupby((df_resampled[price_cloud_cross] == 3).cumsum()).cumcount()
-            df_resampled.loc[df_resampled[price_cloud_cross] == 3, price_cloud_cross_dc_after2] = 0
-
-            # 先頭の要素を-9999999で埋める
-            ##df_resampled.iloc[0, df_resampled.columns.get_indexer(add_columns)] = -9999999
-
-            # 元のデータフレームにリサンプリングされたデータをマージ
-            df = df.merge(df_resampled[add_columns], left_index=True, right_index=True, how='left')
-
-            # リサンプリングされていない行を直前の値で埋める
-            for column in add_columns:
-                df[column].fillna(method='ffill', inplace=True)
+            # 一目均衡表の計算・カラムを追加 高値/安値がない場合は終値で代用
+            high, low = (df['high'].to_numpy(), df['low'].to_numpy()) if 'high' in df.columns else (None, None)
+            values = self.arrays.ichimoku_cloud(df[close_column_name].to_numpy(), short_window_size, long_window_size, interval, high, low)
+            df = self._add_columns(df, column_name, values)
 
         except Exception as e:
             self.log.error(f'一目均衡表計算でエラー\n{str(e)}\n{traceback.format_exc()}')
@@ -928,34 +401,181 @@ class Indicator():
 
         '''
         try:
-            # 必要なカラムだけコピー
-            df_resampled = df[['current_price']].copy()
+            # 変動価格・変動率・変動フラグの計算・カラムを追加
+            values = self.arrays.change_price(df['current_price'].to_numpy(), interval)
+            df = self._add_columns(df, column_name, values)
 
-            # 変数名の定義
-            change_price = f'{column_name}_price'
-            change_rate = f'{column_name}_rate'
-            change_flag = f'{column_name}_flag'
-            add_columns = [change_price, change_rate, change_flag]
+        except Exception as e:
+            self.log.error(f'計算でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
 
-            # 変動価格・変動率・変動フラグ(0:変動なし, 1:上昇, -1:下落)の計算
-            df_resampled[change_price] = df_resampled['current_price'].shift(-interval) - df_resampled['current_price']
-            df_resampled[change_rate] = df_resampled[change_price] / df_resampled['current_price']
-            ##df_resampled[change_flag] = df_resampled[change_rate].apply(lambda x: -999 if pd.isna(x) else (0 if x == 0 else (1 if x > 0 else -1)))
-            df_resampled[change_flag] = df_resampled[change_rate].apply(lambda x: None if pd.isna(x) else (0 if x == 0 else (1 if x > 0 else -1)))
+        return True, df
 
-            # データの末尾周囲の計算できない要素は-999で埋める
-            ##for column in add_columns:
-            ##    df_resampled[column].fillna(-999, inplace=True)
+    def _add_columns(self, df, column_name, values):
+        '''
+        IndicatorArrayで計算した値をカラムに追加する
 
-            # 元のデータに計算で追加したデータをマージ
-            df = df.merge(df_resampled[add_columns], left_index=True, right_index=True, how='left')
+        Args:
+            df(pandas.DataFrame): 追加先のデータ
+            column_name(str or None): 追加するカラム名 ※Noneの場合はvaluesのキーをそのままカラム名にする
+            values(numpy.ndarray or dict): 計算した値 複数カラムの場合は{サフィックス: 値}
 
-            # 計算(リサンプリング)対象外の行は直前の値で埋める
-            for column in add_columns:
-                df[column].fillna(method='ffill', inplace=True)
+        Returns:
+            df(pandas.DataFrame): カラムを追加したDataFrame
+        '''
+        return pd.concat([df, pd.DataFrame(self._name_columns(column_name, values), index = df.index)], axis = 1)
+
+    def _name_columns(self, column_name, values):
+        '''
+        IndicatorArrayで計算した値を{カラム名: 値}の形式にする
+
+        Args:
+            column_name(str or None): カラム名 ※Noneの場合はvaluesのキーをそのままカラム名にする
+            values(numpy.ndarray or dict): 計算した値 複数カラムの場合は{サフィックス: 値}(サフィックスが空文字の場合はカラム名のみ)
+
+        Returns:
+            columns(dict): {カラム名: 値}
+        '''
+        if not isinstance(values, dict):
+            return {column_name: values}
+        if column_name is None:
+            return values
+        return {(f'{column_name}_{suffix}' if suffix != '' else column_name): value for suffix, value in values.items()}
+
+    def get_features(self, df, feature_spec, price_column_name = 'current_price'):
+        '''
+        複数の時間足・ウィンドウ幅のテクニカル指標をまとめて計算する
+
+        get_feature_valuesで全ての指標を計算した後に1回でDataFrameにする
+        ※get_xxxを1つずつ呼んでマージする場合と同じ値になる
+
+        Args:
+            df(pandas.DataFrame): 価格のデータ
+                ※price_column_nameで指定したカラム(sar_hlcはhigh, low, close)が存在し、データが時系列で連続していること
+            feature_spec(dict): 計算する指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+                指標の種類ごとのパラメータと追加されるカラム名は以下の通り(カラムは定義順に並ぶ)
+                    sma, ema, wma, bb, rsi, rci, psy: [種類, window_size] -> {種類}_{分}min_{window_size}piece
+                    ma_cross: [種類] -> 同じ時間足で定義済のsma, ema, wmaのクロス・関連性
+                        ※クロスの計算に使う移動平均線は定義に含める必要があり、その移動平均線のカラムも出力される
+                    sar, sar_hlc: [種類, min_af, max_af] -> sar_{分}min_{min_af}_{max_af}af
+                    macd: [種類, short_window_size, long_window_size, signal_window_size] -> macd_{分}min
+                    ichimoku: [種類, short_window_size, long_window_size] -> ichimoku_{分}min
+                    change: [種類] -> change_{分}min ※リサンプリングせずに分数先との変動を計算(current_priceカラムが必要)
+            price_column_name(str): 終値のカラム名
 
+        Returns:
+            bool: 実行結果
+            feature_df(pandas.DataFrame): 計算した指標のカラムのみを持つDataFrame(indexはdfと同じ)
+
+        '''
+        result, values, _ = self.get_feature_values(df, feature_spec, price_column_name)
+        if result == False:
+            return False, None
+
+        try:
+            # 全指標をまとめて1回でDataFrameにする
+            feature_df = pd.DataFrame(values, index = df.index)
         except Exception as e:
-            self.log.error(f'計算でエラー\n{str(e)}\n{traceback.format_exc()}')
+            self.log.error(f'テクニカル指標の一括計算でエラー\n{str(e)}\n{traceback.format_exc()}')
             return False, None
 
-        return True, df
\ No newline at end of file
+        return True, feature_df
+
+    def get_feature_values(self, df, feature_spec, price_column_name = 'current_price'):
+        '''
+        複数の時間足・ウィンドウ幅のテクニカル指標をまとめて計算し、DataFrameにせずにカラムごとの配列で返す
+
+        価格のカラムを1回だけnumpy配列に変換し、全ての指標をIndicatorArrayで計算する
+        キャッシュなど指標単位で扱う場合は、DataFrameを作らずにこちらを使う
+
+        Args:
+            df(pandas.DataFrame): 価格のデータ ※get_featuresと同じ
+            feature_spec(dict): 計算する指標の定義 ※get_featuresと同じ形式
+            price_column_name(str): 終値のカラム名
+
+        Returns:
+            bool: 実行結果
+            values(dict): カラム名と値(numpy.ndarray) ※定義順
+            feature_columns(dict): 指標のキー(get_feature_key)と追加したカラム名のリスト
+        '''
+        # ウィンドウ幅のみをパラメータに持つ指標の計算メソッド
+        window_functions = {
+            'sma': self.arrays.sma,
+            'ema': self.arrays.ema,
+            'wma': self.arrays.wma,
+            'bb': self.arrays.bollinger_bands,
+            'rsi': self.arrays.rsi,
+            'rci': self.arrays.rci,
+            'psy': self.arrays.psy,
+        }
+
+        try:
+            # 計算に使うカラムは先にnumpy配列に変換しておく 三本値がある場合はSAR(三本値)・一目均衡表用に使う
+            arrays = {column: df[column].to_numpy() for column in [price_column_name, 'high', 'low', 'close', 'current_price'] if column in df.columns}
+            close = arrays[price_column_name]
+
+            values = {}
+            feature_columns = {}
+            for interval, features in feature_spec.items():
+                # 同じ時間足の移動平均線(ma_crossで使用)
+                ma_values = {}
+
+                for feature in features:
+                    kind, params = feature[0], feature[1:]
+
+                    if kind in window_functions:
+                        column_name = f'{kind}_{interval}min_{params[0]}piece'
+                        columns = self._name_columns(column_name, window_functions[kind](close, params[0], interval))
+                        if kind in ['sma', 'ema', 'wma']:
+                            ma_values.update(columns)
+                    elif kind == 'ma_cross':
+                        columns = self.arrays.ma_cross(ma_values, interval)
+                    elif kind == 'sar':
+                        columns = self._name_columns(f'sar_{interval}min_{params[0]}_{params[1]}af', self.arrays.parabolic(close, params[0], params[1], interval))
+                    elif kind == 'sar_hlc':
+                        columns = self._name_columns(f'sar_{interval}min_{params[0]}_{params[1]}af',
+                                                     self.arrays.parabolic_hlc(arrays['high'], arrays['low'], arrays['close'], params[0], params[1], interval))
+                    elif kind == 'macd':
+                        columns = self._name_columns(f'macd_{interval}min', self.arrays.macd(close, params[0], params[1], params[2], interval))
+                    elif kind == 'ichimoku':
+                        columns = self._name_columns(f'ichimoku_{interval}min',
+                                                     self.arrays.ichimoku_cloud(close, params[0], params[1], interval, arrays.get('high'), arrays.get('low')))
+                    elif kind == 'change':
+                        columns = self._name_columns(f'change_{interval}min', self.arrays.change_price(arrays['current_price'], interval))
+                    else:
+                        self.log.error(f'指標の種類が不正です 種類: {kind}')
+                        return False, None, None
+
+                    values.update(columns)
+                    feature_columns[self.get_feature_key(interval, feature)] = list(columns.keys())
+
+        except Exception as e:
+            self.log.error(f'テクニカル指標の一括計算でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None, None
+
+        return True, values, feature_columns
+
+    def get_feature_key(self, interval, feature):
+        '''
+        指標の定義から指標を一意に表すキーを作成する
+
+        Args:
+            interval(int): 何分足として計算するか
+            feature(list): 指標の定義 [指標の種類, パラメータ...]
+
+        Returns:
+            feature_key(str): 指標のキー 例: 5min_sma_10, 1min_sar_hlc_0.02_0.2
+        '''
+        return '_'.join([f'{interval}min'] + [str(param) for param in feature])
+
+    def get_feature_version(self, kind):
+        '''
+        指標の計算ロジックのバージョンを取得する
+
+        Args:
+            kind(str): 指標の種類
+
+        Returns:
+            version(int): バージョン ※FEATURE_VERSION_LISTにない種類は1
+        '''
+        return FEATURE_VERSION_LIST.get(kind, 1)
@@ -0,0 +1,509 @@
+import re
+import numpy as np
+import pandas as pd
+from .indicator_kernel import rolling_rci, rolling_wma, parabolic_sar, parabolic_sar_hlc, bars_since
+
+class IndicatorArray():
+    '''
+    テクニカル指標をnumpy配列で計算するクラス
+
+    価格の配列を受け取り、interval本ごとに間引いた足(何分足)で計算した後、
+    間の足を直前の値で埋めて元の配列と同じ長さで返す
+    ※IndicatorクラスのDataFrame用のメソッドはこのクラスの計算結果をカラムに設定している
+
+    Memo:
+        複数の値を返す指標は{カラム名のサフィックス: 配列}の辞書を返す
+        サフィックスが空文字の値は指標本体(カラム名そのもの)、それ以外は'{カラム名}_{サフィックス}'のカラムに対応する
+        計算できない入力の場合は例外を送出する(ログ出力は呼び出し元で行う)
+    '''
+
+    def resample(self, values, interval):
+        '''
+        interval本ごとに間引いた配列を取得する
+
+        Args:
+            values(numpy.ndarray): 時系列順の値
+            interval(int): 何分足として計算するか
+
+        Returns:
+            resampled(numpy.ndarray): 間引いた配列(float64)
+        '''
+        values = np.asarray(values, dtype = np.float64)
+        return values[::interval] if interval > 1 else values
+
+    def broadcast(self, values, length, interval):
+        '''
+        間引いた足で計算した値を元の長さに戻し、間の足とNaNを直前の値で埋める
+
+        DataFrameのマージ+ffillと同じ結果(間の足がある場合はfloat型になる)を返す
+
+        Args:
+            values(numpy.ndarray): 間引いた足で計算した値
+            length(int): 元の配列の長さ
+            interval(int): 何分足として計算したか
+
+        Returns:
+            values(numpy.ndarray): 元の長さに戻した値
+        '''
+        values = np.asarray(values)
+        if interval > 1 and length > len(values):
+            values = values.astype(np.float64)[np.arange(length) // interval]
+        return self.ffill(values)
+
+    def ffill(self, values):
+        '''
+        NaNを直前の値で埋める(先頭のNaNはそのまま)
+
+        Args:
+            values(numpy.ndarray): 値
+
+        Returns:
+            values(numpy.ndarray): NaNを埋めた値
+        '''
+        nan_mask = pd.isna(values)
+        if not nan_mask.any():
+            return values
+
+        # NaNでない位置の添字を累積最大で前方に伝播させる
+        index = np.where(nan_mask, 0, np.arange(len(values)))
+        np.maximum.accumulate(index, out = index)
+        return values[index]
+
+    def shift(self, values, periods = 1):
+        '''
+        pandas.Series.shift()と同じく値をずらし、空いた要素をNaNにする
+
+        Args:
+            values(numpy.ndarray): 値
+            periods(int): ずらす本数 ※マイナスの場合は未来の値を持ってくる
+
+        Returns:
+            shifted(numpy.ndarray): ずらした値(float64)
+        '''
+        values = np.asarray(values, dtype = np.float64)
+        shifted = np.full(len(values), np.nan)
+        if abs(periods) >= len(values):
+            return shifted
+        if periods >= 0:
+            shifted[periods:] = values[:len(values) - periods]
+        else:
+            shifted[:periods] = values[-periods:]
+        return shifted
+
+    def diff(self, values, periods = 1):
+        '''pandas.Series.diff()と同じくperiods本前との差を計算する'''
+        return np.asarray(values, dtype = np.float64) - self.shift(values, periods)
+
+    def divide(self, numerator, denominator):
+        '''0除算をpandasと同じくinf/NaNとして扱う割り算'''
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            return numerator / denominator
+
+    def cross(self, values_a, values_b):
+        '''
+        2つの値のクロスフラグを計算する
+
+        Returns:
+            cross(numpy.ndarray): aがbを上抜けた場合は1、下抜けた場合は-1、それ以外は0
+        '''
+        prev_a, prev_b = self.shift(values_a), self.shift(values_b)
+        cross = np.zeros(len(values_a), dtype = np.int64)
+        cross[(values_a > values_b) & (prev_a < prev_b)] = 1
+        cross[(values_a < values_b) & (prev_a > prev_b)] = -1
+        return cross
+
+    def rolling(self, values, window_size):
+        '''pandasと同じ計算順序で移動集計を行うためのRollingオブジェクトを取得する'''
+        return pd.Series(values).rolling(window = window_size)
+
+    def sma(self, close, window_size, interval = 1):
+        '''
+        単純移動平均線(SMA)を計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            window_size(int): ウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            sma(numpy.ndarray): SMA ※計算できない先頭の要素は-1
+        '''
+        resampled = self.resample(close, interval)
+        sma = self.rolling(resampled, window_size).mean().to_numpy().round(1)
+        return self.broadcast(np.where(np.isnan(sma), -1, sma), len(close), interval)
+
+    def ema(self, close, window_size, interval = 1):
+        '''
+        指数移動平均線(EMA)を計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            window_size(int): ウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            ema(numpy.ndarray): EMA ※計算できない要素は-1
+        '''
+        resampled = self.resample(close, interval)
+        ema = pd.Series(resampled).ewm(span = window_size).mean().to_numpy().round(1)
+        return self.broadcast(np.where(np.isnan(ema), -1, ema), len(close), interval)
+
+    def wma(self, close, window_size, interval = 1):
+        '''
+        加重移動平均線(WMA)を計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            window_size(int): ウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            wma(numpy.ndarray): WMA ※計算できない先頭の要素は-1
+        '''
+        resampled = self.resample(close, interval)
+        wma = np.round(rolling_wma(resampled, window_size), 1)
+        return self.broadcast(np.where(np.isnan(wma), -1, wma), len(close), interval)
+
+    def ma_cross(self, ma_values, interval = 1):
+        '''
+        同じ種類の移動平均線の短期と長期の全組み合わせのクロスや関連性を計算する
+
+        Args:
+            ma_values(dict): {移動平均線のカラム名: 値} ※カラム名は{sma|ema|wma}_{interval}min_{本数}piece
+                存在する種類の移動平均線のみで組み合わせを作る
+            interval(int): 何分足として計算するか
+
+        Returns:
+            cross_values(dict): {カラム名: 値}
+                組み合わせごとに golden_cross, golden_cross_after, dead_cross, dead_cross_after, diff の順
+        '''
+        # 移動平均線のカラムと本数を種別ごとに取得
+        line_types = ['sma', 'ema', 'wma']
+        patterns = {line_type: re.compile(f'{line_type}_{interval}min_(\\d+)piece') for line_type in line_types}
+        ma_columns = {line_type: [(column, int(patterns[line_type].match(column).group(1))) for column in ma_values if patterns[line_type].match(column)]
+                      for line_type in line_types}
+
+        # 短期と長期の組み合わせ(移動平均線の種別が同じもの)を列挙
+        ma_list = []
+        short_index, long_index, prefix_list = [], [], []
+        for line_type in line_types:
+            offset = len(ma_list)
+            ma_list.extend(ma_columns[line_type])
+            for i, (_, short_piece) in enumerate(ma_columns[line_type]):
+                for j, (_, long_piece) in enumerate(ma_columns[line_type]):
+                    # 短期が長期より短い組み合わせのみ
+                    if short_piece >= long_piece:
+                        continue
+                    short_index.append(offset + i)
+                    long_index.append(offset + j)
+                    prefix_list.append(f'{line_type}_{interval}min_{short_piece}to{long_piece}piece')
+
+        if len(prefix_list) == 0:
+            return {}
+
+        # 全移動平均線を2次元配列にまとめ、全組み合わせの短期・長期を一度に取り出す
+        length = len(ma_values[ma_list[0][0]])
+        ma_matrix = np.column_stack([self.resample(ma_values[column], interval) for column, _ in ma_list])
+        short_values = ma_matrix[:, short_index]
+        long_values = ma_matrix[:, long_index]
+
+        # 1本前の値(先頭はNaNなので比較結果はFalseになる)
+        short_prev = np.vstack([np.full((1, len(prefix_list)), np.nan), short_values[:-1]])
+        long_prev = np.vstack([np.full((1, len(prefix_list)), np.nan), long_values[:-1]])
+
+        # ゴールデンクロス・デッドクロスの判定
+        golden_cross = (short_prev <= long_prev) & (short_values > long_values)
+        dead_cross = (short_prev >= long_prev) & (short_values < long_values)
+
+        # 直近でフラグが立ってからの経過本数・短期と長期の差
+        values = {
+            'golden_cross': golden_cross.astype(int),
+            'golden_cross_after': bars_since(golden_cross),
+            'dead_cross': dead_cross.astype(int),
+            'dead_cross_after': bars_since(dead_cross),
+            'diff': np.round(short_values - long_values, 2),
+        }
+
+        cross_values = {}
+        for k, prefix in enumerate(prefix_list):
+            for name, value in values.items():
+                cross_values[f'{prefix}_{name}'] = self.broadcast(value[:, k], length, interval)
+        return cross_values
+
+    def bollinger_bands(self, close, window_size, interval = 1):
+        '''
+        ボリンジャーバンドを計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            window_size(int): ウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            values(dict): {サフィックス: 値}
+                upper/lower_{1~3}_alpha, width, width_diff, upper_diff, lower_diff, position
+        '''
+        resampled = self.resample(close, interval)
+
+        # 移動平均線と移動標準偏差
+        sma = self.rolling(resampled, window_size).mean().to_numpy()
+        sigma = self.rolling(resampled, window_size).std().to_numpy()
+
+        # +3α~-3α
+        values = {}
+        for alpha in [1, 2, 3]:
+            values[f'upper_{alpha}_alpha'] = np.round(sma + sigma * alpha, 1)
+            values[f'lower_{alpha}_alpha'] = np.round(sma - sigma * alpha, 1)
+
+        # バンド(α)の幅・収縮/拡大度合い
+        values['width'] = np.round(sigma * 2, 3)
+        values['width_diff'] = np.round(self.diff(values['width']), 3)
+
+        # 価格とバンドの差・バンド内での位置(αの場合は1、-αの場合は0)
+        values['upper_diff'] = np.round(resampled - values['upper_1_alpha'], 3)
+        values['lower_diff'] = np.round(values['lower_1_alpha'] - resampled, 3)
+        values['position'] = np.round(self.divide(resampled - values['lower_1_alpha'], values['width']), 3)
+
+        return {suffix: self.broadcast(value, len(close), interval) for suffix, value in values.items()}
+
+    def rsi(self, close, window_size, interval = 1):
+        '''
+        相対力指数(RSI)を計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            window_size(int): ウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            rsi(numpy.ndarray): RSI
+                ※全体で下落がない場合は上昇の有無に応じて一律100か50、計算できる期間がない場合は全てNaN
+        '''
+        resampled = self.resample(close, interval)
+
+        # 前の足との差分の上昇分・下落分
+        diff = self.diff(resampled)
+        up = np.where(diff > 0, diff, 0)
+        down = np.where(diff < 0, -diff, 0)
+
+        # 平均上昇幅と平均下降幅
+        up_mean = self.rolling(up, window_size).mean().to_numpy()
+        down_mean = self.rolling(down, window_size).mean().to_numpy()
+
+        if np.isnan(down_mean).all() or np.isnan(up_mean).all():
+            rsi = np.full(len(resampled), np.nan)
+        elif np.nansum(down_mean) == 0:
+            rsi = np.full(len(resampled), 50 if np.nansum(up_mean) == 0 else 100)
+        else:
+            rsi = np.round(100 - self.divide(100, 1 + self.divide(up_mean, down_mean)), 2)
+
+        return self.broadcast(rsi, len(close), interval)
+
+    def rci(self, close, window_size, interval = 1):
+        '''
+        順位相関指数(RCI)を計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            window_size(int): ウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            rci(numpy.ndarray): RCI(%)
+        '''
+        return self.broadcast(rolling_rci(self.resample(close, interval), window_size), len(close), interval)
+
+    def psy(self, close, window_size, interval = 1):
+        '''
+        サイコロジカルライン(PSY)を計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            window_size(int): ウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            psy(numpy.ndarray): PSY(%)
+        '''
+        resampled = self.resample(close, interval)
+
+        # 前の足から上昇した場合は1、それ以外は0
+        up = (self.diff(resampled) > 0).astype(int)
+        psy = np.round(self.rolling(up, window_size).sum().to_numpy() / window_size * 100, 1)
+
+        return self.broadcast(psy, len(close), interval)
+
+    def macd(self, close, short_window_size, long_window_size, signal_window_size, interval = 1):
+        '''
+        MACDを計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            short_window_size(int): 短期EMAのウィンドウ幅
+            long_window_size(int): 長期EMAのウィンドウ幅
+            signal_window_size(int): シグナル線のウィンドウ幅
+            interval(int): 何分足として計算するか
+
+        Returns:
+            values(dict): {サフィックス: 値}
+                ''(MACD), signal, diff, diff_flag, cross, {本数}_slope, signal_{本数}_slope, mismatch, mismatch_count
+        '''
+        resampled = self.resample(close, interval)
+        series = pd.Series(resampled)
+
+        # MACD(短期EMA - 長期EMA)とシグナル
+        macd = np.round(series.ewm(span = short_window_size).mean().to_numpy() - series.ewm(span = long_window_size).mean().to_numpy(), 2)
+        signal = pd.Series(macd).ewm(span = signal_window_size).mean().to_numpy().round(2)
+
+        values = {'': macd, 'signal': signal}
+
+        # MACDとシグナルの差(ヒストグラム)
+        values['diff'] = np.round(macd - signal, 3)
+        values['diff_flag'] = (values['diff'] > 0).astype(int)
+
+        # ゴールデンクロス・デッドクロスのフラグ
+        values['cross'] = self.cross(macd, signal)
+
+        # MACDとシグナルの傾き
+        for count in [1, 3, 5, 10]:
+            # 幅が長すぎるとデータが取れないのでスキップ
+            if interval * count >= 300:
+                continue
+            values[f'{count}_slope'] = np.round(self.diff(macd, count), 3)
+            values[f'signal_{count}_slope'] = np.round(self.diff(signal, count), 3)
+
+        # MACDの傾きと価格の傾きの不一致(ダイバージェンス)フラグと続いている回数
+        mismatch = ((self.diff(macd) * self.diff(resampled)) < 0).astype(int)
+        run_start = np.ones(len(mismatch), dtype = bool)
+        run_start[1:] = mismatch[1:] != mismatch[:-1]
+        values['mismatch'] = mismatch
+        values['mismatch_count'] = np.where(mismatch == 0, 0, bars_since(run_start) + 1)
+
+        return {suffix: self.broadcast(value, len(close), interval) for suffix, value in values.items()}
+
+    def parabolic(self, close, min_af, max_af, interval = 1):
+        '''
+        パラボリック(SAR)を終値のみから計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            min_af(float): 加速因数の初期値(最小値)
+            max_af(float): 加速因数の最大値
+            interval(int): 何分足として計算するか
+
+        Returns:
+            values(dict): {サフィックス: 値} ''(SAR), flag
+        '''
+        sar, flag = parabolic_sar(self.resample(close, interval), min_af, max_af)
+        return {'': self.broadcast(sar, len(close), interval), 'flag': self.broadcast(flag, len(close), interval)}
+
+    def parabolic_hlc(self, high, low, close, min_af, max_af, interval = 1):
+        '''
+        パラボリック(SAR)を三本値から計算する
+
+        Args:
+            high(numpy.ndarray): 時系列順の高値
+            low(numpy.ndarray): 時系列順の安値
+            close(numpy.ndarray): 時系列順の終値
+            min_af(float): 加速因数の初期値(最小値)
+            max_af(float): 加速因数の最大値
+            interval(int): 何分足として計算するか
+
+        Returns:
+            values(dict): {サフィックス: 値} ''(SAR), flag, reverse_flag
+        '''
+        sar, flag, reverse_flag = parabolic_sar_hlc(self.resample(high, interval), self.resample(low, interval), self.resample(close, interval), min_af, max_af)
+        return {suffix: self.broadcast(value, len(close), interval) for suffix, value in [('', sar), ('flag', flag), ('reverse_flag', reverse_flag)]}
+
+    def ichimoku_cloud(self, close, short_window_size, long_window_size, interval = 1, high = None, low = None):
+        '''
+        一目均衡表を計算する
+
+        Args:
+            close(numpy.ndarray): 時系列順の終値
+            short_window_size(int): 短期のウィンドウ幅
+            long_window_size(int): 長期のウィンドウ幅
+            interval(int): 何分足として計算するか
+            high(numpy.ndarray or None): 時系列順の高値 ※Noneの場合は終値で代用
+            low(numpy.ndarray or None): 時系列順の安値 ※Noneの場合は終値で代用
+
+        Returns:
+            values(dict): {サフィックス: 値}
+                base_line, conversion_line, leading_span_a/b, lagging_span, bc_xxx, pl_xxx, ls_xxx, cloud_xxx
+        '''
+        close_resampled = self.resample(close, interval)
+        high_resampled = self.resample(close if high is None else high, interval)
+        low_resampled = self.resample(close if low is None else low, interval)
+
+        def high_low_mean(window_size):
+            '''window_size本の高値と安値の平均'''
+            return (self.rolling(high_resampled, window_size).max().to_numpy() + self.rolling(low_resampled, window_size).min().to_numpy()) / 2
+
+        # 基準線・転換線・先行スパン1/2・遅行スパン
+        base_line = np.round(high_low_mean(long_window_size), 3)
+        conversion_line = np.round(high_low_mean(short_window_size), 3)
+        leading_span_a = np.round(self.shift((conversion_line + base_line) / 2, long_window_size), 3)
+        leading_span_b = np.round(self.shift(high_low_mean(long_window_size * 2), long_window_size), 3)
+        lagging_span = self.shift(close_resampled, -long_window_size)
+
+        values = {'base_line': base_line, 'conversion_line': conversion_line,
+                  'leading_span_a': leading_span_a, 'leading_span_b': leading_span_b, 'lagging_span': lagging_span}
+
+        # 基準線と転換線、終値と遅行スパン、先行スパン1と2の差/位置関係/クロスとクロスからの経過本数
+        for prefix, value_a, value_b, position in [('bc', conversion_line, base_line, (conversion_line - base_line) > 0),
+                                                   ('pl', close_resampled, lagging_span, close_resampled > lagging_span),
+                                                   ('ls', leading_span_a, leading_span_b, leading_span_a > leading_span_b)]:
+            cross = self.cross(value_a, value_b)
+            values[f'{prefix}_diff'] = np.round(value_a - value_b, 3)
+            values[f'{prefix}_position'] = position.astype(int)
+            values[f'{prefix}_cross'] = cross
+            values[f'{prefix}_gc_after'] = bars_since(cross == 1)
+            values[f'{prefix}_dc_after'] = bars_since(cross == -1)
+
+        # 終値と雲(先行スパン1と2の間)の差
+        cloud_high = np.maximum(leading_span_a, leading_span_b)
+        cloud_low = np.minimum(leading_span_a, leading_span_b)
+        values['cloud_high_diff'] = np.round(close_resampled - cloud_high, 3)
+        values['cloud_low_diff'] = np.round(close_resampled - cloud_low, 3)
+
+        # 雲の上下位置フラグ(1: 上、 0: 中、-1: 下)
+        cloud_position = np.zeros(len(close_resampled), dtype = np.int64)
+        cloud_position[close_resampled > cloud_high] = 1
+        cloud_position[close_resampled < cloud_low] = -1
+        values['cloud_position'] = cloud_position
+
+        # 終値と雲のクロスフラグ(後の条件で上書きする)
+        close_prev = self.shift(close_resampled)
+        cloud_high_prev = np.maximum(self.shift(leading_span_a), self.shift(leading_span_b))
+        cloud_low_prev = np.minimum(self.shift(leading_span_a), self.shift(leading_span_b))
+        cloud_cross = np.zeros(len(close_resampled), dtype = np.int64)
+        cloud_cross[(close_resampled >= cloud_high) & (close_prev < cloud_high_prev)] = 1
+        cloud_cross[(close_resampled <= cloud_high) & (close_prev > cloud_high_prev)] = 2
+        cloud_cross[(close_resampled >= cloud_low) & (close_prev < cloud_low_prev)] = 3
+        cloud_cross[(close_resampled <= cloud_low) & (close_prev > cloud_low_prev)] = 4
+        values['cloud_cross'] = cloud_cross
+
+        # 雲とのクロスからの経過本数
+        values['cloud_gc_after1'] = bars_since(cloud_cross == 2)
+        values['cloud_gc_after2'] = bars_since(cloud_cross == 4)
+        values['cloud_dc_after1'] = bars_since(cloud_cross == 1)
+        values['cloud_dc_after2'] = bars_since(cloud_cross == 3)
+
+        return {suffix: self.broadcast(value, len(close), interval) for suffix, value in values.items()}
+
+    def change_price(self, current_price, interval):
+        '''
+        interval本先までに変動した価格・変動率・変動フラグを計算する
+
+        Args:
+            current_price(numpy.ndarray): 時系列順の価格
+            interval(int): 何本先との変動を計算するか
+
+        Returns:
+            values(dict): {サフィックス: 値} price, rate, flag(0:変動なし, 1:上昇, -1:下落)
+                ※計算できない末尾の要素は直前の値で埋める
+        '''
+        current_price = np.asarray(current_price, dtype = np.float64)
+        change_price = self.shift(current_price, -interval) - current_price
+        change_rate = self.divide(change_price, current_price)
+        return {'price': self.ffill(change_price), 'rate': self.ffill(change_rate), 'flag': self.ffill(np.sign(change_rate))}
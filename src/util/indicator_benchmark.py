@@ -0,0 +1,255 @@
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import traceback
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from .indicator_cache import IndicatorCache
+from .indicator_kernel import NUMBA_AVAILABLE
+
+# 計測するデータ量 {名前: 営業日数}
+SIZE_LIST = {'day': 1, 'month': 20, 'year': 245}
+
+# 計測する時間足(何分足)
+INTERVAL_LIST = [1, 5, 15, 60]
+
+# 計測結果がこの秒数未満の差の場合はベースラインより遅くても劣化と判定しない(計測誤差対策)
+MIN_DIFF_SECONDS = 0.002
+
+class IndicatorBenchmark():
+    '''
+    テクニカル指標の計算(Indicatorクラスの各メソッド)の実行時間を計測するクラス
+
+    合成した1分足(OhlcGenerator)をデータ量・時間足ごとに計算して最短時間を記録し、
+    保存済のベースラインと比較して閾値以上遅くなったものを劣化として返す
+
+    Memo:
+        get_features_cache_hit/missは一時ディレクトリのキャッシュ(IndicatorCache)を使ったget_featuresの計測
+        ヒット時がget_features(キャッシュなし)より遅い場合はキャッシュを使う意味がない(config.INDICATOR_CACHEの判断に使う)
+    '''
+    def __init__(self, log, indicator, ohlc_generator):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            indicator(Indicator): テクニカル指標の計算を行うクラスのインスタンス
+            ohlc_generator(OhlcGenerator): 合成した四本値を作成するクラスのインスタンス
+        '''
+        self.log = log
+        self.indicator = indicator
+        self.ohlc_generator = ohlc_generator
+
+        # キャッシュの計測用(一時ディレクトリに保存する)
+        self.indicator_cache = IndicatorCache(log, indicator)
+
+    def get_case_list(self, interval, cache_dir):
+        '''
+        計測するメソッドと引数の一覧を取得する
+
+        Args:
+            interval(int): 何分足として計算するか
+            cache_dir(str): キャッシュの計測に使うディレクトリ
+
+        Returns:
+            case_list(list[tuple]): (名前, 実行する関数(引数はDataFrame))のリスト
+        '''
+        indicator = self.indicator
+        feature_spec = {interval: [['sma', 5], ['ema', 5], ['wma', 5], ['bb', 5], ['sma', 10], ['ema', 10], ['wma', 10], ['bb', 10],
+                                   ['ma_cross'], ['rsi', 14], ['rci', 9], ['psy', 12], ['sar_hlc', 0.02, 0.2], ['macd', 12, 26, 9],
+                                   ['ichimoku', 9, 26], ['change']]}
+
+        return [
+            ('get_sma', lambda df: indicator.get_sma(df, 'sma', 10, interval)),
+            ('get_ema', lambda df: indicator.get_ema(df, 'ema', 10, interval)),
+            ('get_wma', lambda df: indicator.get_wma(df, 'wma', 10, interval)),
+            ('get_ma_cross', lambda df: indicator.get_ma_cross(df, interval)),
+            ('get_bollinger_bands', lambda df: indicator.get_bollinger_bands(df, 'bb', 10, interval)),
+            ('get_rsi', lambda df: indicator.get_rsi(df, 'rsi', 14, interval)),
+            ('get_rci', lambda df: indicator.get_rci(df, 'rci', 9, interval)),
+            ('get_psy', lambda df: indicator.get_psy(df, 'psy', 12, interval)),
+            ('get_macd', lambda df: indicator.get_macd(df, 'macd', 12, 26, 9, interval)),
+            ('get_parabolic', lambda df: indicator.get_parabolic(df, 'sar', 0.02, 0.2, interval)),
+            ('get_parabolic_hlc', lambda df: indicator.get_parabolic_hlc(df, 'sar', 0.02, 0.2, interval)),
+            ('get_ichimoku_cloud', lambda df: indicator.get_ichimoku_cloud(df, 'ichimoku', 9, 26, interval)),
+            ('get_change_price', lambda df: indicator.get_change_price(df, 'change', interval)),
+            ('get_features', lambda df: indicator.get_features(df, feature_spec)),
+            ('get_features_cache_miss', lambda df: self.get_features_cache(df, feature_spec, cache_dir, clear = True)),
+            ('get_features_cache_hit', lambda df: self.get_features_cache(df, feature_spec, cache_dir, clear = False)),
+        ]
+
+    def get_features_cache(self, df, feature_spec, cache_dir, clear):
+        '''
+        キャッシュを使ってテクニカル指標をまとめて計算する
+
+        Args:
+            df(pandas.DataFrame): 計測に使うデータ
+            feature_spec(dict): 計算する指標の定義
+            cache_dir(str): キャッシュのディレクトリ
+            clear(bool): 計算前にキャッシュを削除するか ※Falseの場合は前回の計算結果を読み込む
+
+        Returns:
+            bool: 実行結果
+            feature_df(pandas.DataFrame): 計算した指標のカラムのみを持つDataFrame
+        '''
+        if clear:
+            shutil.rmtree(cache_dir, ignore_errors = True)
+        return self.indicator_cache.get_features(df, feature_spec, 1301, '2024-01-04')
+
+    def get_input(self, days, interval):
+        '''
+        計測に使う1銘柄分のデータを作成する
+
+        Args:
+            days(int): 営業日数
+            interval(int): 何分足として計算するか ※MAクロス用の移動平均線の計算に使用
+
+        Returns:
+            df(pandas.DataFrame): high, low, close, current_price, 移動平均線のカラムを持つデータ
+        '''
+        ohlc_df = self.ohlc_generator.generate([1301], '2024-01-04', days)
+        df = ohlc_df[['high', 'low', 'close']].copy()
+        df['current_price'] = df['close']
+
+        # get_ma_cross用の移動平均線(計測対象外)
+        for window_size in [5, 10]:
+            for line_type, function in [('sma', self.indicator.get_sma), ('ema', self.indicator.get_ema), ('wma', self.indicator.get_wma)]:
+                _, df = function(df, f'{line_type}_{interval}min_{window_size}piece', window_size, interval)
+
+        return df
+
+    def run(self, size_list = None, repeat = 3):
+        '''
+        全メソッドの実行時間をデータ量・時間足ごとに計測する
+
+        Args:
+            size_list(list or None): 計測するデータ量の名前(SIZE_LISTのキー) ※Noneの場合は全て
+            repeat(int): 1ケースあたりの計測回数 ※最短時間を記録する
+
+        Returns:
+            bool: 実行結果
+            report(dict): 計測結果
+                results: {計測ケースのキー(メソッド名/データ量/x分足): {'rows': 行数, 'seconds': 最短時間}}
+        '''
+        if size_list is None:
+            size_list = list(SIZE_LIST.keys())
+
+        report = {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'numba': NUMBA_AVAILABLE,
+                'machine': platform.machine(),
+            },
+            'repeat': repeat,
+            'results': {},
+        }
+
+        cache_dir = tempfile.mkdtemp(prefix = 'indicator_cache_')
+        self.indicator_cache.set_cache_dir(cache_dir)
+
+        try:
+            for size in size_list:
+                for interval in INTERVAL_LIST:
+                    df = self.get_input(SIZE_LIST[size], interval)
+
+                    for name, function in self.get_case_list(interval, cache_dir):
+                        # 初回はJITコンパイルなどを含むので計測しない
+                        result, _ = function(df)
+                        if result == False:
+                            self.log.error(f'ベンチマークの計算でエラー メソッド: {name} データ量: {size} 時間足: {interval}分')
+                            return False, None
+
+                        seconds_list = []
+                        for _ in range(repeat):
+                            start = time.perf_counter()
+                            function(df)
+                            seconds_list.append(time.perf_counter() - start)
+
+                        report['results'][self.get_case_key(name, size, interval)] = {'rows': len(df), 'seconds': round(min(seconds_list), 6)}
+
+        except Exception as e:
+            self.log.error(f'ベンチマークの計測でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors = True)
+
+        return True, report
+
+    def get_case_key(self, name, size, interval):
+        '''計測ケースのキーを作成する 例: get_sma/day/5min'''
+        return f'{name}/{size}/{interval}min'
+
+    def compare(self, report, baseline, threshold):
+        '''
+        計測結果をベースラインと比較する
+
+        Args:
+            report(dict): 計測結果
+            baseline(dict): ベースラインの計測結果
+            threshold(float): 劣化と判定する倍率 例: 1.3の場合はベースラインの1.3倍以上の時間がかかったら劣化
+
+        Returns:
+            comparison_list(list[dict]): 両方に存在するケースの比較結果(キー・ベースライン・今回・倍率・劣化かどうか)
+        '''
+        comparison_list = []
+        for key, result in report['results'].items():
+            if key not in baseline['results']:
+                continue
+
+            baseline_seconds = baseline['results'][key]['seconds']
+            ratio = result['seconds'] / baseline_seconds if baseline_seconds > 0 else float('inf')
+            regression = ratio >= threshold and result['seconds'] - baseline_seconds >= MIN_DIFF_SECONDS
+            comparison_list.append({'key': key, 'baseline': baseline_seconds, 'seconds': result['seconds'],
+                                    'ratio': round(ratio, 3), 'regression': regression})
+
+        return comparison_list
+
+    def save_report(self, report, file_path):
+        '''
+        計測結果をJSONファイルに保存する
+
+        Args:
+            report(dict): 計測結果
+            file_path(str): 保存先のパス
+
+        Returns:
+            bool: 実行結果
+        '''
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok = True)
+            with open(file_path, 'w', encoding = 'utf-8') as f:
+                json.dump(report, f, indent = 2, ensure_ascii = False)
+        except Exception as e:
+            self.log.error(f'ベンチマーク結果の保存でエラー ファイルパス: {file_path}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def load_report(self, file_path):
+        '''
+        保存済の計測結果を読み込む
+
+        Args:
+            file_path(str): ファイルパス
+
+        Returns:
+            bool: 実行結果
+            report(dict): 計測結果 ※ファイルが存在しない場合はNone
+        '''
+        if not os.path.exists(file_path):
+            return True, None
+
+        try:
+            with open(file_path, 'r', encoding = 'utf-8') as f:
+                report = json.load(f)
+        except Exception as e:
+            self.log.error(f'ベンチマーク結果の読み込みでエラー ファイルパス: {file_path}\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, report
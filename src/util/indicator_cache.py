@@ -0,0 +1,454 @@
+import hashlib
+import json
+import os
+import re
+import traceback
+import numpy as np
+import pandas as pd
+
+# 指標の計算ロジックやファイルの形式を変更した場合はこの値を変えて既存のキャッシュを無効にする
+CACHE_VERSION = 2
+
+# 銘柄・日付ごとのキャッシュファイルの最大数 未計算の指標を追加するたびに1ファイル増やし、超える場合は1ファイルにまとめ直す
+MAX_SEGMENT_COUNT = 4
+
+# 上限サイズを超えた場合に上限の何割まで削除するか(上限付近で書き込むたびに削除処理が走らないようにする)
+PRUNE_TARGET_RATE = 0.9
+
+# 何回書き込むごとにキャッシュの合計サイズをファイル一覧から計算し直すか(並列実行時の他のプロセスの書き込み・削除を反映する)
+SIZE_RESYNC_INTERVAL = 200
+
+class IndicatorCache():
+    '''
+    テクニカル指標の計算結果を銘柄・日付単位でディスクにキャッシュするクラス
+
+    銘柄・日付ごとにnumpyのnpz形式で保存し、
+    指標の種類・パラメータ・入力(三本値など)のハッシュと計算ロジックのバージョンが一致する指標は計算せずに読み込む
+
+    Memo:
+        npzの読み込みは配列ごとに時間がかかるため、カラムは型ごとに1つの2次元配列にまとめて保存する
+        未計算の指標を追加する場合は既存のファイルを書き換えずに、追加した指標のみを次の連番のファイル({日付}.{連番}.npz)に保存する
+        ファイル数がMAX_SEGMENT_COUNTに達した場合と入力データが変わった場合は、全ての指標を1ファイルにまとめ直す
+        キャッシュの合計サイズが上限を超えた場合は最終利用日時の古いファイルから上限の9割まで削除する
+        合計サイズは書き込んだファイルのサイズから計算し、ファイル一覧の取得は一定回数ごと・削除時のみ行う
+        数値以外(object型)のカラムを含む指標はキャッシュしない
+    '''
+    def __init__(self, log, indicator):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            indicator(Indicator): テクニカル指標の計算を行うクラスのインスタンス
+        '''
+        self.log = log
+        self.indicator = indicator
+        self.cache_dir = None
+        self.max_size_mb = None
+
+        # キャッシュの合計サイズ(バイト) ※Noneの場合は未計算
+        self.total_size = None
+        self.write_count = 0
+
+    def set_cache_dir(self, cache_dir, max_size_mb = None):
+        '''
+        キャッシュの保存先と上限サイズを設定する
+
+        Args:
+            cache_dir(str or None): キャッシュを保存するディレクトリ ※Noneの場合はキャッシュを使わない
+            max_size_mb(int or None): キャッシュの合計サイズの上限(MB) ※Noneの場合は無制限
+        '''
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+        self.total_size = None
+        self.write_count = 0
+
+    def get_features(self, df, feature_spec, stock_code, date, price_column_name = 'current_price'):
+        '''
+        キャッシュ済の指標は読み込み、未計算の指標のみ計算してIndicator.get_featuresと同じ結果を返す
+
+        Args:
+            df(pandas.DataFrame): 1銘柄・1日分の価格のデータ
+            feature_spec(dict): 計算する指標の定義 ※Indicator.get_featuresと同じ形式
+            stock_code(int or str): 証券コード
+            date(str): 日付
+            price_column_name(str): 終値のカラム名
+
+        Returns:
+            bool: 実行結果
+            feature_df(pandas.DataFrame): 計算した指標のカラムのみを持つDataFrame(indexはdfと同じ)
+        '''
+        # キャッシュを使わない場合はそのまま計算
+        if self.cache_dir is None:
+            return self.indicator.get_features(df, feature_spec, price_column_name)
+
+        try:
+            input_hash = self.get_input_hash(df, price_column_name)
+
+            # キャッシュ済の指標を読み込む
+            feature_columns, values, feature_versions, segment_count = self.read_segments(stock_code, date, input_hash, len(df))
+
+            # 計算ロジックのバージョン(移動平均線のクロスは移動平均線の組み合わせも)が変わった指標はキャッシュを使わない
+            spec_versions = self.get_feature_versions(feature_spec)
+            for feature_key, version in spec_versions.items():
+                if feature_key in feature_columns and feature_versions.get(feature_key, 1) != version:
+                    del feature_columns[feature_key]
+
+            # 未計算の指標のみの定義を作成
+            missing_spec = {}
+            for interval, features in feature_spec.items():
+                missing_features = [feature for feature in features if self.indicator.get_feature_key(interval, feature) not in feature_columns]
+
+                # 移動平均線のクロスは同じ時間足の移動平均線から計算するので合わせて計算する
+                if any(feature[0] == 'ma_cross' for feature in missing_features):
+                    missing_features = [feature for feature in features if feature in missing_features or feature[0] in ['sma', 'ema', 'wma']]
+
+                if len(missing_features) != 0:
+                    missing_spec[interval] = missing_features
+
+            # 未計算の指標を計算してキャッシュに追加する
+            if len(missing_spec) != 0:
+                result, calculated_values, calculated_columns = self.indicator.get_feature_values(df, missing_spec, price_column_name)
+                if result == False:
+                    return False, None
+
+                values.update(calculated_values)
+                for feature_key, columns in calculated_columns.items():
+                    feature_columns[feature_key] = columns
+                    feature_versions[feature_key] = spec_versions[feature_key]
+
+                # 数値以外のカラムを含む指標はnpzに保存できないのでキャッシュしない
+                cache_feature_columns = {feature_key: columns for feature_key, columns in feature_columns.items()
+                                         if all(values[column].dtype != object for column in columns)}
+                new_feature_columns = {feature_key: columns for feature_key, columns in cache_feature_columns.items() if feature_key in calculated_columns}
+                if len(new_feature_columns) != 0:
+                    self.add_segment(stock_code, date, input_hash, len(df), segment_count, cache_feature_columns, new_feature_columns, values, feature_versions)
+
+            # 定義順にカラムを並べる
+            column_order = []
+            for interval, features in feature_spec.items():
+                for feature in features:
+                    column_order.extend(feature_columns[self.indicator.get_feature_key(interval, feature)])
+
+            feature_df = pd.DataFrame({column: values[column] for column in column_order}, index = df.index)
+
+        except Exception as e:
+            self.log.error(f'テクニカル指標のキャッシュ処理でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, feature_df
+
+    def get_feature_versions(self, feature_spec):
+        '''
+        指標の定義から指標ごとのキャッシュのバージョンを作成する
+
+        バージョンは計算ロジックのバージョン
+        移動平均線のクロスはキーが移動平均線の組み合わせによらず同じで出力が変わるため、同じ時間足の移動平均線のキーも含める
+        移動平均線の計算ロジックが変わった場合もクロスの値が変わるため、バージョンが1以外の移動平均線はキーにバージョンを付ける
+        (バージョンが1の場合は付けず、作成済のキャッシュ・成形済ファイルのバージョンと同じ文字列にする)
+
+        Args:
+            feature_spec(dict): 計算する指標の定義 {何分足: [[指標の種類, パラメータ...], ...]}
+
+        Returns:
+            feature_versions(dict): {指標のキー: バージョン} ※移動平均線のクロスは'バージョン:移動平均線のキー,...'の文字列
+        '''
+        feature_versions = {}
+        for interval, features in feature_spec.items():
+            ma_keys = []
+            for feature in features:
+                if feature[0] in ['sma', 'ema', 'wma']:
+                    ma_key, ma_version = self.indicator.get_feature_key(interval, feature), self.indicator.get_feature_version(feature[0])
+                    ma_keys.append(ma_key if ma_version == 1 else f'{ma_key}@v{ma_version}')
+            ma_keys.sort()
+            for feature in features:
+                version = self.indicator.get_feature_version(feature[0])
+                if feature[0] == 'ma_cross':
+                    version = f'{version}:{",".join(ma_keys)}'
+                feature_versions[self.indicator.get_feature_key(interval, feature)] = version
+
+        return feature_versions
+
+    def get_cache_path(self, stock_code, date, segment = 0):
+        '''
+        銘柄・日付に対応するキャッシュファイルのパスを取得する
+
+        Args:
+            stock_code(int or str): 証券コード
+            date(str): 日付
+            segment(int): 連番 ※0の場合は最初のファイル({日付}.npz)
+
+        Returns:
+            cache_path(str): キャッシュファイルのパス
+        '''
+        # 日付は区切り文字を除いてファイル名にする(2024-01-01 -> 20240101)
+        date = re.sub(r'\W', '', str(date))
+        file_name = f'{date}.npz' if segment == 0 else f'{date}.{segment}.npz'
+        return os.path.join(self.cache_dir, str(stock_code), file_name)
+
+    def get_input_hash(self, df, price_column_name):
+        '''
+        指標の計算に使う価格データのハッシュ値を計算する
+
+        Args:
+            df(pandas.DataFrame): 価格のデータ
+            price_column_name(str): 終値のカラム名
+
+        Returns:
+            input_hash(str): ハッシュ値
+        '''
+        columns = [price_column_name] + [column for column in ['high', 'low', 'close', 'current_price'] if column in df.columns and column != price_column_name]
+
+        sha1 = hashlib.sha1(f'{CACHE_VERSION}:{price_column_name}:{",".join(columns)}'.encode())
+        sha1.update(pd.util.hash_pandas_object(df[columns], index = False).to_numpy().tobytes())
+        return sha1.hexdigest()
+
+    def read_segments(self, stock_code, date, input_hash, row_count):
+        '''
+        銘柄・日付のキャッシュファイルを連番順に全て読み込む ※同じ指標は後のファイルの値を使う
+
+        Args:
+            stock_code(int or str): 証券コード
+            date(str): 日付
+            input_hash(str): 入力データのハッシュ値
+            row_count(int): 入力データの行数
+
+        Returns:
+            feature_columns(dict): 指標のキーと指標のカラム名のリスト
+            values(dict): カラム名と値(numpy.ndarray)
+            feature_versions(dict): 指標のキーと計算ロジックのバージョン
+            segment_count(int or None): 読み込んだファイル数 ※入力データが変わったファイルがある場合はNone(1ファイルにまとめ直す)
+        '''
+        feature_columns, values, feature_versions = {}, {}, {}
+        for segment in range(MAX_SEGMENT_COUNT):
+            cache_path = self.get_cache_path(stock_code, date, segment)
+            if not os.path.exists(cache_path):
+                return feature_columns, values, feature_versions, segment
+
+            segment_columns, segment_values, segment_versions = self.read_cache(cache_path, input_hash, row_count)
+            if len(segment_columns) == 0:
+                return feature_columns, values, feature_versions, None
+
+            feature_columns.update(segment_columns)
+            values.update(segment_values)
+            feature_versions.update(segment_versions)
+
+        return feature_columns, values, feature_versions, MAX_SEGMENT_COUNT
+
+    def read_cache(self, cache_path, input_hash, row_count):
+        '''
+        キャッシュファイルを1つ読み込む
+
+        Args:
+            cache_path(str): キャッシュファイルのパス
+            input_hash(str): 入力データのハッシュ値
+            row_count(int): 入力データの行数
+
+        Returns:
+            feature_columns(dict): 指標のキーと指標のカラム名のリスト
+            values(dict): カラム名と値(numpy.ndarray)
+            feature_versions(dict): 指標のキーと計算ロジックのバージョン ※バージョンを保存していないキャッシュは空
+                ※ファイルが存在しないか入力データが変わっている場合はいずれも空
+        '''
+        if not os.path.exists(cache_path):
+            return {}, {}, {}
+
+        try:
+            with np.load(cache_path, allow_pickle = False) as npz:
+                meta = json.loads(str(npz['__meta__']))
+
+                # 入力データが変わっている場合はキャッシュを使わない
+                if meta['input_hash'] != input_hash or meta['row_count'] != row_count:
+                    return {}, {}, {}
+
+                # 型ごとの2次元配列(カラム数 x 行数)を1行ずつカラムの値にする
+                values = {}
+                for index, columns in enumerate(meta['blocks']):
+                    values.update(zip(columns, npz[f'block_{index}']))
+        except Exception as e:
+            # 壊れたファイルは作り直す
+            self.log.warning(f'キャッシュファイルの読み込みに失敗したため再作成します ファイルパス: {cache_path}\n{e}')
+            return {}, {}, {}
+
+        # 最終利用日時を更新(削除の優先度に使用)
+        os.utime(cache_path)
+
+        return meta['feature_columns'], values, meta['feature_versions']
+
+    def add_segment(self, stock_code, date, input_hash, row_count, segment_count, feature_columns, new_feature_columns, values, feature_versions):
+        '''
+        計算した指標をキャッシュに追加する
+
+        既存のファイルがあり連番に空きがある場合は追加した指標のみを次の連番のファイルに書き込み、
+        それ以外の場合は全ての指標を最初のファイルに書き込んで連番のファイルを削除する
+
+        Args:
+            stock_code(int or str): 証券コード
+            date(str): 日付
+            input_hash(str): 入力データのハッシュ値
+            row_count(int): 入力データの行数
+            segment_count(int or None): 読み込んだファイル数(read_segmentsの戻り値)
+            feature_columns(dict): キャッシュする全ての指標のキーと指標のカラム名のリスト ※キャッシュ済の指標を含む
+            new_feature_columns(dict): 今回計算した指標のキーと指標のカラム名のリスト
+            values(dict): カラム名と値(numpy.ndarray)
+            feature_versions(dict): 指標のキーと計算ロジックのバージョン
+        '''
+        if segment_count is not None and 0 < segment_count < MAX_SEGMENT_COUNT:
+            size_diff = self.write_cache(self.get_cache_path(stock_code, date, segment_count), input_hash, row_count, new_feature_columns, values, feature_versions)
+        else:
+            size_diff = self.write_cache(self.get_cache_path(stock_code, date), input_hash, row_count, feature_columns, values, feature_versions)
+            for segment in range(1, MAX_SEGMENT_COUNT):
+                segment_path = self.get_cache_path(stock_code, date, segment)
+                try:
+                    segment_size = os.path.getsize(segment_path)
+                    os.remove(segment_path)
+                    size_diff -= segment_size
+                except FileNotFoundError:
+                    # 存在しない場合と並列実行時に他のプロセスが削除した場合
+                    pass
+
+        # 上限サイズを超えた場合は古いものから削除
+        if self.max_size_mb is not None:
+            self.add_total_size(size_diff)
+
+    def write_cache(self, cache_path, input_hash, row_count, feature_columns, values, feature_versions):
+        '''
+        キャッシュファイルを書き込む(既存のファイルは置き換える)
+
+        Args:
+            cache_path(str): キャッシュファイルのパス
+            input_hash(str): 入力データのハッシュ値
+            row_count(int): 入力データの行数
+            feature_columns(dict): 保存する指標のキーと指標のカラム名のリスト
+            values(dict): カラム名と値(numpy.ndarray)
+            feature_versions(dict): 指標のキーと計算ロジックのバージョン
+
+        Returns:
+            size_diff(int): 書き込みによって増えたサイズ(バイト)
+        '''
+        # カラムを型ごとにまとめる
+        blocks = {}
+        for columns in feature_columns.values():
+            for column in columns:
+                blocks.setdefault(values[column].dtype.str, []).append(column)
+
+        meta = {'input_hash': input_hash, 'row_count': row_count, 'feature_columns': feature_columns,
+                'feature_versions': {feature_key: feature_versions[feature_key] for feature_key in feature_columns},
+                'blocks': list(blocks.values())}
+        arrays = {f'block_{index}': np.stack([values[column] for column in columns]) for index, columns in enumerate(blocks.values())}
+
+        # 書き込み途中のファイルが読まれないように一時ファイルに書き込んでから置き換える
+        os.makedirs(os.path.dirname(cache_path), exist_ok = True)
+        old_size = os.path.getsize(cache_path) if os.path.exists(cache_path) else 0
+        tmp_path = f'{cache_path}.tmp.npz'
+        np.savez(tmp_path, __meta__ = np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, cache_path)
+
+        return os.path.getsize(cache_path) - old_size
+
+    def add_total_size(self, size_diff):
+        '''
+        書き込んだファイルのサイズをキャッシュの合計サイズに加え、上限を超えた場合は上限の9割まで削除する
+
+        Args:
+            size_diff(int): 書き込みによって増えたサイズ(バイト)
+        '''
+        self.write_count += 1
+
+        # 初回と一定回数ごとはファイル一覧から計算し直す
+        if self.total_size is None or self.write_count % SIZE_RESYNC_INTERVAL == 0:
+            result, cache_list = self.get_cache_list()
+            if result == False:
+                return
+            self.total_size = sum(cache['size'] for cache in cache_list)
+        else:
+            self.total_size += size_diff
+
+        if self.total_size > self.max_size_mb * 1024 * 1024:
+            self.prune(self.max_size_mb * PRUNE_TARGET_RATE)
+
+    def get_cache_list(self):
+        '''
+        キャッシュファイルの一覧を取得する
+
+        Returns:
+            bool: 実行結果
+            cache_list(list[dict]): キャッシュファイルの情報(パス・証券コード・日付・サイズ・最終利用日時) ※最終利用日時の古い順
+        '''
+        cache_list = []
+        if self.cache_dir is None or not os.path.exists(self.cache_dir):
+            return True, cache_list
+
+        try:
+            for stock_code in os.listdir(self.cache_dir):
+                stock_dir = os.path.join(self.cache_dir, stock_code)
+                if not os.path.isdir(stock_dir):
+                    continue
+
+                for file_name in os.listdir(stock_dir):
+                    if not file_name.endswith('.npz') or '.tmp' in file_name:
+                        continue
+                    path = os.path.join(stock_dir, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        # 並列実行時に他のプロセスが削除した場合
+                        continue
+                    cache_list.append({'path': path, 'stock_code': stock_code, 'date': file_name.split('.')[0],
+                                       'size': stat.st_size, 'mtime': stat.st_mtime})
+        except Exception as e:
+            self.log.error(f'キャッシュファイルの一覧取得でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, sorted(cache_list, key = lambda cache: cache['mtime'])
+
+    def get_feature_keys(self, cache_path):
+        '''
+        キャッシュファイルに保存されている指標のキーを取得する
+
+        Args:
+            cache_path(str): キャッシュファイルのパス
+
+        Returns:
+            feature_keys(list): 指標のキーのリスト ※読み込めない場合は空
+        '''
+        try:
+            with np.load(cache_path, allow_pickle = False) as npz:
+                return list(json.loads(str(npz['__meta__']))['feature_columns'].keys())
+        except Exception:
+            return []
+
+    def prune(self, max_size_mb):
+        '''
+        キャッシュの合計サイズが上限以下になるまで最終利用日時の古いファイルから削除する
+
+        Args:
+            max_size_mb(float): 合計サイズの上限(MB) ※0の場合は全て削除
+
+        Returns:
+            bool: 実行結果
+            deleted_list(list[str]): 削除したファイルのパス
+        '''
+        result, cache_list = self.get_cache_list()
+        if result == False:
+            return False, None
+
+        deleted_list = []
+        total_size = sum(cache['size'] for cache in cache_list)
+        try:
+            for cache in cache_list:
+                if total_size <= max_size_mb * 1024 * 1024:
+                    break
+                try:
+                    os.remove(cache['path'])
+                except FileNotFoundError:
+                    # 並列実行時に他のプロセスが削除した場合
+                    pass
+                total_size -= cache['size']
+                deleted_list.append(cache['path'])
+        except Exception as e:
+            self.log.error(f'キャッシュファイルの削除でエラー\n{str(e)}\n{traceback.format_exc()}')
+            self.total_size = None
+            return False, None
+
+        self.total_size = total_size
+
+        return True, deleted_list
@@ -0,0 +1,279 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# numbaがインストールされている場合はループ処理のカーネルをJITコンパイルする(任意)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+def _jit(func):
+    '''numbaがあればJITコンパイルし、なければそのままのPython関数を返す'''
+    if NUMBA_AVAILABLE:
+        return njit(cache = True)(func)
+    return func
+
+def _loop_input(values):
+    '''
+    ループ処理のカーネルに渡す形式へ変換する
+
+    numbaを使う場合はfloat64のndarray、使わない場合は要素アクセスが速いlistで渡す
+    '''
+    values = np.asarray(values, dtype = np.float64)
+    return values if NUMBA_AVAILABLE else values.tolist()
+
+def rolling_rci(values, window_size):
+    '''
+    RCI(順位相関指数)をスライディングウィンドウ単位でまとめて計算する
+
+    各ウィンドウ内の順位はpandas.Series.rank()と同じく同値を平均順位として扱い、
+    rolling().apply(calc_rci)と同じ値になる
+    価格を整数のコードに置き換え、ウィンドウごとにずらした値を1本の配列としてソートすることで
+    全ウィンドウの順位を一度のsearchsortedで求める
+
+    Args:
+        values(numpy.ndarray): 時系列順の価格
+        window_size(int): RCIを計算する際のウィンドウ幅
+
+    Returns:
+        rci(numpy.ndarray): RCIの値(%) ※先頭のwindow_size - 1個とNaNを含むウィンドウはNaN
+    '''
+    values = np.asarray(values, dtype = np.float64)
+    rci = np.full(len(values), np.nan)
+    if len(values) < window_size:
+        return rci
+
+    # 大小関係を保ったまま価格を0始まりの整数コードに変換
+    _, codes = np.unique(values, return_inverse = True)
+    code_windows = sliding_window_view(codes.astype(np.int64), window_size)
+    window_count = len(code_windows)
+
+    # ウィンドウごとにコードをずらして、全ウィンドウを連結しても順序が混ざらないようにする
+    offset = np.arange(window_count, dtype = np.int64)[:, None] * (len(values) + 1)
+    shifted = code_windows + offset
+    sorted_codes = np.sort(shifted, axis = 1).ravel()
+
+    # 自分より小さい値の数と自分以下の値の数から平均順位を算出
+    window_start = np.arange(window_count, dtype = np.int64)[:, None] * window_size
+    less = np.searchsorted(sorted_codes, shifted.ravel(), side = 'left').reshape(shifted.shape) - window_start
+    less_equal = np.searchsorted(sorted_codes, shifted.ravel(), side = 'right').reshape(shifted.shape) - window_start
+    price_rank = (less + less_equal + 1) / 2
+
+    n = window_size
+    d = ((np.arange(1, n + 1) - price_rank) ** 2).sum(axis = 1)
+    rci[window_size - 1:] = ((1 - 6 * d / (n * (n ** 2 - 1))) * 100).round(2)
+
+    # NaNを含むウィンドウはrolling()と同様にNaNとする
+    nan_window = np.isnan(sliding_window_view(values, window_size)).any(axis = 1)
+    rci[window_size - 1:][nan_window] = np.nan
+
+    return rci
+
+def rolling_wma(values, window_size):
+    '''
+    加重移動平均(WMA)を重み付きの畳み込み1回で計算する
+
+    ※加算順序がnp.dotと異なるため、小数第2位がちょうど5になる値は丸め結果が0.1ずれることがある
+
+    Args:
+        values(numpy.ndarray): 時系列順の価格
+        window_size(int): 移動平均線を計算する際のウィンドウ幅
+
+    Returns:
+        wma(numpy.ndarray): 加重移動平均 ※先頭のwindow_size - 1個とNaNを含むウィンドウはNaN
+    '''
+    values = np.asarray(values, dtype = np.float64)
+    wma = np.full(len(values), np.nan)
+    if len(values) < window_size:
+        return wma
+
+    # 新しい価格ほど重みを大きくする(1, 2, ..., window_size) 畳み込みなので重みは逆順で渡す
+    weights = np.arange(1, window_size + 1)
+    wma[window_size - 1:] = np.convolve(values, weights[::-1], mode = 'valid') / weights.sum()
+
+    return wma
+
+def bars_since(event):
+    '''
+    直近でイベント(クロスなど)が発生してからの経過本数を計算する
+
+    groupby(event.cumsum()).cumcount()と同じ値になる(最初のイベントまでは先頭からの本数)
+    イベントが発生した位置の添字を累積最大で前方に伝播させ、現在の添字との差を取る
+
+    Args:
+        event(numpy.ndarray): イベントが発生したかのフラグ ※1次元または行方向が時系列の2次元
+
+    Returns:
+        count(numpy.ndarray): 経過本数 ※イベント発生時は0
+    '''
+    event = np.asarray(event, dtype = bool)
+    index = np.arange(len(event)).reshape((-1,) + (1,) * (event.ndim - 1))
+    last_event_index = np.maximum.accumulate(np.where(event, index, 0), axis = 0)
+    return index - last_event_index
+
+@_jit
+def _parabolic_loop(close, min_af, max_af):
+    '''終値のみからSARを計算するループ本体(Indicator.get_parabolicの計算順序と同じ)'''
+    n = len(close)
+    sar = np.empty(n)
+    if n == 0:
+        return sar
+
+    # 初期値の設定 SARの初期値と前日のEPは初期値の終値になる
+    sar[0] = close[0]
+    prev_sar = close[0]
+    ep = close[0]
+    af = min_af
+
+    # トレンド 1: 上昇 -1: 下降
+    trend = 0
+
+    for i in range(1, n):
+        current_price = close[i]
+
+        # 1つ目の要素の場合は前日との差分で上昇か下降トレンドかを判定
+        if i == 1:
+            trend = 1 if prev_sar < current_price else -1
+
+        if trend == 1:
+            if ep < current_price:
+                ep = current_price
+                af = min(af + min_af, max_af)
+
+            value = prev_sar + af * (ep - prev_sar)
+
+            # SARが現在の価格よりも高い場合はトレンドを反転
+            if value > current_price:
+                trend = -1
+                value = ep
+                ep = current_price
+                af = min_af
+        else:
+            if ep > current_price:
+                ep = current_price
+                af = min(af + min_af, max_af)
+
+            value = prev_sar - af * (prev_sar - ep)
+
+            # SARが現在の価格よりも低い場合はトレンドを反転
+            if value < current_price:
+                trend = 1
+                value = ep
+                ep = current_price
+                af = min_af
+
+        prev_sar = np.round(value, 4)
+        sar[i] = prev_sar
+
+    return sar
+
+@_jit
+def _parabolic_hlc_loop(high, low, close, min_af, max_af):
+    '''三本値からSARを計算するループ本体(Indicator.get_parabolic_hlcの計算順序と同じ)'''
+    n = len(close)
+    sar = np.empty(n)
+    if n == 0:
+        return sar
+
+    # 初期値の設定 SARの初期値と前日のEPは初期値の終値になる
+    sar[0] = close[0]
+    prev_sar = close[0]
+    ep = close[0]
+    af = min_af
+
+    # トレンド 1: 上昇 -1: 下降
+    trend = 0
+
+    for i in range(1, n):
+        # 1つ目の要素の場合は前日との差分で上昇か下降トレンドかを判定
+        if i == 1:
+            trend = 1 if prev_sar < close[i] else -1
+
+        if trend == 1:
+            if ep < high[i]:
+                ep = high[i]
+                af = min(af + min_af, max_af)
+
+            value = prev_sar + af * (ep - prev_sar)
+
+            # SARが現在の安値と同じか高くなった場合はトレンドを反転
+            if value >= low[i]:
+                trend = -1
+                af = min_af
+                value = ep
+                ep = high[i]
+        else:
+            if ep > low[i]:
+                ep = low[i]
+                af = min(af + min_af, max_af)
+
+            value = prev_sar - af * (prev_sar - ep)
+
+            # SARが現在の高値と同じか高くなった場合はトレンドを反転
+            if value <= high[i]:
+                trend = 1
+                af = min_af
+                value = ep
+                ep = low[i]
+
+        prev_sar = np.round(value, 4)
+        sar[i] = prev_sar
+
+    return sar
+
+def _sar_flags(sar):
+    '''
+    SARの上昇フラグとトレンド反転フラグを計算する
+
+    Args:
+        sar(numpy.ndarray): SARの値
+
+    Returns:
+        flag(numpy.ndarray): SARが一つ前のSARよりも高い場合は1、そうでない場合は0
+        reverse_flag(numpy.ndarray): flagが一つ前から変わった場合は1、そうでない場合は0 ※先頭は1
+    '''
+    flag = np.zeros(len(sar), dtype = np.int64)
+    flag[1:] = sar[1:] > sar[:-1]
+
+    reverse_flag = np.ones(len(sar), dtype = np.int64)
+    reverse_flag[1:] = flag[1:] != flag[:-1]
+
+    return flag, reverse_flag
+
+def parabolic_sar(close, min_af, max_af):
+    '''
+    パラボリック(SAR)を終値のみから計算する
+
+    Args:
+        close(numpy.ndarray): 時系列順の終値 ※1本以上あること
+        min_af(float): 加速因数の初期値(最小値)
+        max_af(float): 加速因数の最大値
+
+    Returns:
+        sar(numpy.ndarray): SARの値
+        flag(numpy.ndarray): SARが一つ前のSARよりも高い場合は1、そうでない場合は0
+    '''
+    sar = np.asarray(_parabolic_loop(_loop_input(close), min_af, max_af))
+    flag, _ = _sar_flags(sar)
+    return sar, flag
+
+def parabolic_sar_hlc(high, low, close, min_af, max_af):
+    '''
+    パラボリック(SAR)を三本値から計算する
+
+    Args:
+        high(numpy.ndarray): 時系列順の高値
+        low(numpy.ndarray): 時系列順の安値
+        close(numpy.ndarray): 時系列順の終値 ※1本以上あること
+        min_af(float): 加速因数の初期値(最小値)
+        max_af(float): 加速因数の最大値
+
+    Returns:
+        sar(numpy.ndarray): SARの値
+        flag(numpy.ndarray): SARが一つ前のSARよりも高い場合は1、そうでない場合は0
+        reverse_flag(numpy.ndarray): トレンドが反転した場合は1、そうでない場合は0
+    '''
+    sar = np.asarray(_parabolic_hlc_loop(_loop_input(high), _loop_input(low), _loop_input(close), min_af, max_af))
+    flag, reverse_flag = _sar_flags(sar)
+    return sar, flag, reverse_flag
@@ -0,0 +1,825 @@
+import math
+import numpy as np
+import traceback
+from collections import deque
+from .indicator_kernel import rolling_rci, rolling_wma
+
+NAN = float('nan')
+
+def _round(value, decimals):
+    '''pandas.Series.round()と同じ丸め方(numpyの丸め)で丸める'''
+    return float(np.round(value, decimals))
+
+def _divide(numerator, denominator):
+    '''0除算をpandasと同じくinf/NaNとして扱う割り算'''
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return float(np.float64(numerator) / np.float64(denominator))
+
+def _is_nan(value):
+    '''NaNかどうかを判定する'''
+    return value != value
+
+class _RollingMean():
+    '''
+    pandasのrolling().mean()と同じ計算順序(Kahan加算)で移動平均を逐次計算する
+
+    ※pandas(window_aggregations.roll_mean)と同じ演算を行うことでバッチ計算と完全一致させる
+    '''
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.buffer = deque(maxlen = window_size)
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def update(self, value):
+        '''
+        値を1つ追加して移動平均を返す
+
+        Args:
+            value(float): 追加する値
+
+        Returns:
+            mean(float): 移動平均 ※計算できない場合はNaN
+        '''
+        if self.prev_value is None:
+            self.prev_value = value
+
+        # ウィンドウから外れる値を除外
+        if len(self.buffer) == self.window_size:
+            old_value = self.buffer[0]
+            if not _is_nan(old_value):
+                self.nobs -= 1
+                y = - old_value - self.compensation_remove
+                t = self.sum_x + y
+                self.compensation_remove = t - self.sum_x - y
+                self.sum_x = t
+                if math.copysign(1, old_value) < 0:
+                    self.neg_ct -= 1
+
+        # 新しい値を追加
+        self.buffer.append(value)
+        if not _is_nan(value):
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1, value) < 0:
+                self.neg_ct += 1
+
+            if value == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = value
+
+        if self.nobs < self.window_size or self.nobs == 0:
+            return NAN
+
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+class _RollingStd():
+    '''
+    pandasのrolling().std()と同じ計算順序(Welford法+Kahan加算)で移動標準偏差を逐次計算する
+
+    ※pandas(window_aggregations.roll_var)と同じ演算を行うことでバッチ計算と完全一致させる
+    '''
+    def __init__(self, window_size, ddof = 1):
+        self.window_size = window_size
+        self.ddof = ddof
+        self.buffer = deque(maxlen = window_size)
+        self.nobs = 0.0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def update(self, value):
+        '''
+        値を1つ追加して移動標準偏差を返す
+
+        Args:
+            value(float): 追加する値
+
+        Returns:
+            std(float): 移動標準偏差 ※計算できない場合はNaN
+        '''
+        if self.prev_value is None:
+            self.prev_value = value
+
+        # ウィンドウから外れる値を除外
+        if len(self.buffer) == self.window_size:
+            old_value = self.buffer[0]
+            if not _is_nan(old_value):
+                self.nobs -= 1
+                if self.nobs:
+                    prev_mean = self.mean_x - self.compensation_remove
+                    y = old_value - self.compensation_remove
+                    t = y - self.mean_x
+                    self.compensation_remove = t + self.mean_x - y
+                    self.mean_x = self.mean_x - t / self.nobs
+                    self.ssqdm_x = self.ssqdm_x - (old_value - prev_mean) * (old_value - self.mean_x)
+                else:
+                    self.mean_x = 0.0
+                    self.ssqdm_x = 0.0
+
+        # 新しい値を追加
+        self.buffer.append(value)
+        if not _is_nan(value):
+            self.nobs += 1
+            if value == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = value
+
+            prev_mean = self.mean_x - self.compensation_add
+            y = value - self.compensation_add
+            t = y - self.mean_x
+            self.compensation_add = t + self.mean_x - y
+            self.mean_x = self.mean_x + t / self.nobs
+            self.ssqdm_x = self.ssqdm_x + (value - prev_mean) * (value - self.mean_x)
+
+        if self.nobs < self.window_size or self.nobs <= self.ddof:
+            return NAN
+
+        if self.nobs == 1 or self.num_consecutive_same_value >= self.nobs:
+            var = 0.0
+        else:
+            var = self.ssqdm_x / (self.nobs - self.ddof)
+
+        # pandasと同じく負の分散は0として扱う
+        return math.sqrt(var) if var > 0 else 0.0
+
+class _Ewm():
+    '''pandasのewm(span).mean()(adjust=True)と同じ計算順序で指数移動平均を逐次計算する'''
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0
+        self.old_wt = 1.0
+        self.weighted = None
+
+    def update(self, value):
+        '''
+        値を1つ追加して指数移動平均を返す
+
+        Args:
+            value(float): 追加する値
+
+        Returns:
+            ema(float): 指数移動平均 ※計算できない場合はNaN
+        '''
+        # 1本目
+        if self.weighted is None:
+            self.weighted = value
+            return self.weighted
+
+        if not _is_nan(self.weighted):
+            if not _is_nan(value):
+                self.old_wt *= self.old_wt_factor
+                # 一定値が続く場合の丸め誤差回避(pandasと同じ処理)
+                if self.weighted != value:
+                    self.weighted = self.old_wt * self.weighted + self.new_wt * value
+                    self.weighted /= (self.old_wt + self.new_wt)
+                self.old_wt += self.new_wt
+        elif not _is_nan(value):
+            self.weighted = value
+
+        return self.weighted
+
+class _RollingExtreme():
+    '''
+    直近window_size本の最大値(最小値)を単調キュー(値が単調に並ぶように古い候補を捨てるdeque)で逐次計算する
+
+    ※1本あたりの計算量は償却O(1) 最大値・最小値は元の値をそのまま返すのでバッチ計算と完全一致する
+    '''
+    def __init__(self, window_size, find_max = True):
+        self.window_size = window_size
+        self.find_max = find_max
+        self.count = 0
+        self.last_nan_index = -1
+
+        # (添字, 値) 先頭がウィンドウ内の最大値(最小値)
+        self.queue = deque()
+
+    def update(self, value):
+        '''
+        値を1つ追加して直近window_size本の最大値(最小値)を返す
+
+        Args:
+            value(float): 追加する値
+
+        Returns:
+            extreme(float): 最大値(最小値) ※本数が足りない場合とウィンドウ内にNaNがある場合はNaN
+        '''
+        index = self.count
+        self.count += 1
+
+        if _is_nan(value):
+            self.last_nan_index = index
+        else:
+            # 追加する値以下(以上)の候補は今後最大値(最小値)にならないので捨てる
+            while len(self.queue) != 0 and (self.queue[-1][1] <= value if self.find_max else self.queue[-1][1] >= value):
+                self.queue.pop()
+            self.queue.append((index, value))
+
+        # ウィンドウから外れた候補を捨てる
+        while len(self.queue) != 0 and self.queue[0][0] <= index - self.window_size:
+            self.queue.popleft()
+
+        if self.count < self.window_size or self.last_nan_index > index - self.window_size:
+            return NAN
+        return self.queue[0][1]
+
+class _SinceEvent():
+    '''直近でイベント(クロスなど)が発生してからの経過本数を数える'''
+    def __init__(self):
+        self.count = -1
+
+    def update(self, event):
+        '''
+        イベントの発生有無を渡して経過本数を返す
+
+        Args:
+            event(bool): イベントが発生したか
+
+        Returns:
+            count(int): 経過本数 ※イベント発生時は0
+        '''
+        self.count = 0 if event else self.count + 1
+        return self.count
+
+class StreamBase():
+    '''
+    1本(1分)ずつ価格を受け取り、テクニカル指標を逐次計算する基底クラス
+
+    Indicatorクラスのget_xxxと同じく、interval本ごとのデータで計算(リサンプリング)し、
+    間の足では直前の値を返す(=バッチ計算のmerge+ffill後の値と一致する)
+    '''
+    # リサンプリングした足でNaNになった場合に直前の値で埋めるか(バッチ計算のffillに相当)
+    forward_fill = True
+
+    def __init__(self, column_name, interval):
+        self.column_name = column_name
+        self.interval = interval
+        self.bar_count = 0
+        self.values = {}
+
+    def reset(self):
+        '''内部状態を初期化する(日付や銘柄が変わった場合に使用)'''
+        self.__init__(**self.init_params)
+
+    def update(self, close, high = None, low = None):
+        '''
+        1本分の価格を追加して指標の値を返す
+
+        Args:
+            close(float): 終値(現在値)
+            high(float): 高値 ※三本値を使う指標のみ使用、未指定の場合は終値
+            low(float): 安値 ※三本値を使う指標のみ使用、未指定の場合は終値
+
+        Returns:
+            values(dict): カラム名をキーとした指標の値
+        '''
+        # interval本ごとの足のみ計算を行う
+        if self.bar_count % self.interval == 0:
+            close = float(close)
+            high = close if high is None else float(high)
+            low = close if low is None else float(low)
+            for column_name, value in self.calculate(close, high, low).items():
+                if self.forward_fill and _is_nan(value) and column_name in self.values:
+                    continue
+                self.values[column_name] = value
+
+        self.bar_count += 1
+        return dict(self.values)
+
+    def calculate(self, close, high, low):
+        '''リサンプリングした足1本分の指標を計算する(サブクラスで実装)'''
+        raise NotImplementedError
+
+class StreamSma(StreamBase):
+    '''単純移動平均線(SMA)の逐次計算 ※Indicator.get_smaと同じ値'''
+    forward_fill = False
+
+    def __init__(self, column_name, window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'window_size': window_size, 'interval': interval}
+        self.rolling_mean = _RollingMean(window_size)
+
+    def calculate(self, close, high, low):
+        sma = self.rolling_mean.update(close)
+        # 計算できない場合は-1
+        return {self.column_name: -1.0 if _is_nan(sma) else _round(sma, 1)}
+
+class StreamEma(StreamBase):
+    '''指数移動平均線(EMA)の逐次計算 ※Indicator.get_emaと同じ値'''
+    forward_fill = False
+
+    def __init__(self, column_name, window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'window_size': window_size, 'interval': interval}
+        self.ewm = _Ewm(window_size)
+
+    def calculate(self, close, high, low):
+        ema = self.ewm.update(close)
+        return {self.column_name: -1.0 if _is_nan(ema) else _round(ema, 1)}
+
+class StreamWma(StreamBase):
+    '''
+    加重移動平均線(WMA)の逐次計算 ※Indicator.get_wmaと同じ値
+
+    Memo:
+        1本あたりO(window_size)で計算する(直近window_size本を毎回畳み込む)
+        加重和を差分で更新するとO(1)になるが、加算順序が変わりバッチ計算と一致しなくなるため行わない
+    '''
+    forward_fill = False
+
+    def __init__(self, column_name, window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'window_size': window_size, 'interval': interval}
+        self.window_size = window_size
+        self.buffer = deque(maxlen = window_size)
+
+    def calculate(self, close, high, low):
+        self.buffer.append(close)
+        if len(self.buffer) < self.window_size:
+            return {self.column_name: -1.0}
+
+        # バッチ計算と同じカーネルで直近window_size本分のみ計算する
+        wma = rolling_wma(np.array(self.buffer), self.window_size)[-1]
+        return {self.column_name: -1.0 if _is_nan(wma) else _round(wma, 1)}
+
+class StreamBollingerBands(StreamBase):
+    '''ボリンジャーバンドの逐次計算 ※Indicator.get_bollinger_bandsと同じ値'''
+    def __init__(self, column_name, window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'window_size': window_size, 'interval': interval}
+        self.rolling_mean = _RollingMean(window_size)
+        self.rolling_std = _RollingStd(window_size)
+        self.prev_width = NAN
+
+    def calculate(self, close, high, low):
+        sma = self.rolling_mean.update(close)
+        sigma = self.rolling_std.update(close)
+
+        result = {}
+        for sigma_count in [1, 2, 3]:
+            result[f'{self.column_name}_upper_{sigma_count}_alpha'] = _round(sma + (sigma * sigma_count), 1)
+            result[f'{self.column_name}_lower_{sigma_count}_alpha'] = _round(sma - (sigma * sigma_count), 1)
+
+        width = _round(sigma * 2, 3)
+        result[f'{self.column_name}_width'] = width
+        result[f'{self.column_name}_width_diff'] = _round(width - self.prev_width, 3)
+        self.prev_width = width
+
+        upper = result[f'{self.column_name}_upper_1_alpha']
+        lower = result[f'{self.column_name}_lower_1_alpha']
+        result[f'{self.column_name}_upper_diff'] = _round(close - upper, 3)
+        result[f'{self.column_name}_lower_diff'] = _round(lower - close, 3)
+        result[f'{self.column_name}_position'] = _round(_divide(close - lower, width), 3)
+        return result
+
+class StreamRsi(StreamBase):
+    '''
+    相対力指数(RSI)の逐次計算 ※Indicator.get_rsiと同じ値
+
+    Memo:
+        バッチ計算では1日を通して下落が一度もない場合にのみ列全体を50/100で埋めるが、
+        これは全データを見ないと判定できないため逐次計算では扱わない
+    '''
+    def __init__(self, column_name, window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'window_size': window_size, 'interval': interval}
+        self.up_mean = _RollingMean(window_size)
+        self.down_mean = _RollingMean(window_size)
+        self.prev_close = NAN
+
+    def calculate(self, close, high, low):
+        diff = close - self.prev_close
+        self.prev_close = close
+
+        up_mean = self.up_mean.update(diff if diff > 0 else 0.0)
+        down_mean = self.down_mean.update(abs(diff) if diff < 0 else 0.0)
+
+        rsi = 100 - _divide(100, 1 + _divide(up_mean, down_mean))
+        return {self.column_name: _round(rsi, 2)}
+
+class StreamRci(StreamBase):
+    '''
+    順位相関指数(RCI)の逐次計算 ※Indicator.get_rciと同じ値
+
+    Memo:
+        1本あたりO(window_size log window_size)で計算する(直近window_size本の順位を毎回求め直す)
+        1本追加するとウィンドウ内の全ての順位が変わりうるため、O(1)にはならない
+    '''
+    def __init__(self, column_name, window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'window_size': window_size, 'interval': interval}
+        self.window_size = window_size
+        self.buffer = deque(maxlen = window_size)
+
+    def calculate(self, close, high, low):
+        self.buffer.append(close)
+        if len(self.buffer) < self.window_size or any(_is_nan(price) for price in self.buffer):
+            return {self.column_name: NAN}
+
+        # バッチ計算と同じカーネルで直近window_size本分のみ計算する
+        return {self.column_name: float(rolling_rci(np.array(self.buffer), self.window_size)[-1])}
+
+class StreamMacd(StreamBase):
+    '''MACDの逐次計算 ※Indicator.get_macdと同じ値'''
+    def __init__(self, column_name, short_window_size, long_window_size, signal_window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'short_window_size': short_window_size, 'long_window_size': long_window_size,
+                            'signal_window_size': signal_window_size, 'interval': interval}
+        self.short_ema = _Ewm(short_window_size)
+        self.long_ema = _Ewm(long_window_size)
+        self.signal_ema = _Ewm(signal_window_size)
+
+        # 傾きを計算する本数 幅が長すぎるとデータが取れないのでget_macdと同じくスキップ
+        self.slope_counts = [count for count in [1, 3, 5, 10] if interval * count < 300]
+
+        # 傾きの計算用に直近のMACD/シグナルを保持
+        self.macd_history = deque([NAN] * 10, maxlen = 11)
+        self.signal_history = deque([NAN] * 10, maxlen = 11)
+        self.prev_close = NAN
+        self.mismatch_count = 0
+
+    def calculate(self, close, high, low):
+        macd = self.column_name
+        macd_signal = f'{macd}_signal'
+        macd_histogram = f'{macd}_diff'
+
+        macd_value = _round(self.short_ema.update(close) - self.long_ema.update(close), 2)
+        signal_value = _round(self.signal_ema.update(macd_value), 2)
+        prev_macd, prev_signal = self.macd_history[-1], self.signal_history[-1]
+        self.macd_history.append(macd_value)
+        self.signal_history.append(signal_value)
+
+        result = {macd: macd_value, macd_signal: signal_value}
+
+        histogram = _round(macd_value - signal_value, 3)
+        result[macd_histogram] = histogram
+        result[f'{macd_histogram}_flag'] = 1 if histogram > 0 else 0
+
+        # ゴールデンクロス・デッドクロスのフラグ
+        cross = 0
+        if macd_value > signal_value and prev_macd < prev_signal:
+            cross = 1
+        if macd_value < signal_value and prev_macd > prev_signal:
+            cross = -1
+        result[f'{macd}_cross'] = cross
+
+        # MACDとMACDシグナルの傾き
+        for count in self.slope_counts:
+            result[f'{macd}_{count}_slope'] = _round(macd_value - self.macd_history[-1 - count], 3)
+            result[f'{macd_signal}_{count}_slope'] = _round(signal_value - self.signal_history[-1 - count], 3)
+
+        # MACDの傾きと価格の傾きの不一致(ダイバージェンス)フラグと継続回数
+        mismatch = 1 if (macd_value - prev_macd) * (close - self.prev_close) < 0 else 0
+        self.prev_close = close
+        self.mismatch_count = self.mismatch_count + 1 if mismatch == 1 else 0
+        result[f'{macd}_mismatch'] = mismatch
+        result[f'{macd}_mismatch_count'] = self.mismatch_count
+        return result
+
+class StreamPsy(StreamBase):
+    '''サイコロジカルライン(PSY)の逐次計算 ※Indicator.get_psyと同じ値'''
+    def __init__(self, column_name, window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'window_size': window_size, 'interval': interval}
+        self.window_size = window_size
+        self.buffer = deque(maxlen = window_size)
+        self.prev_close = NAN
+
+    def calculate(self, close, high, low):
+        self.buffer.append(1 if close - self.prev_close > 0 else 0)
+        self.prev_close = close
+        if len(self.buffer) < self.window_size:
+            return {self.column_name: NAN}
+        return {self.column_name: _round(sum(self.buffer) / self.window_size * 100, 1)}
+
+class StreamParabolic(StreamBase):
+    '''パラボリック(SAR)の逐次計算(終値のみから算出) ※Indicator.get_parabolicと同じ値'''
+    def __init__(self, column_name, min_af, max_af, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'min_af': min_af, 'max_af': max_af, 'interval': interval}
+        self.min_af = min_af
+        self.max_af = max_af
+        self.sar = None
+        self.ep = None
+        self.af = min_af
+        self.trend = ''
+        self.count = 0
+
+    def calculate(self, close, high, low):
+        prev_sar = self.sar
+
+        # 1本目はSARとEPを終値で初期化
+        if self.count == 0:
+            self.sar, self.ep = close, close
+        else:
+            # 2本目で前の足との比較で上昇か下降トレンドかを判定
+            if self.count == 1:
+                self.trend = 'up' if self.sar < close else 'down'
+
+            if self.trend == 'up':
+                if self.ep < close:
+                    self.ep = close
+                    self.af = min(self.af + self.min_af, self.max_af)
+                sar = self.sar + self.af * (self.ep - self.sar)
+                if sar > close:
+                    self.trend, sar, self.ep, self.af = 'down', self.ep, close, self.min_af
+            else:
+                if self.ep > close:
+                    self.ep = close
+                    self.af = min(self.af + self.min_af, self.max_af)
+                sar = self.sar - self.af * (self.sar - self.ep)
+                if sar < close:
+                    self.trend, sar, self.ep, self.af = 'up', self.ep, close, self.min_af
+            self.sar = _round(sar, 4)
+        self.count += 1
+
+        # SARが一つ前のSARよりも高い場合は1、低い場合は0
+        flag = 1 if prev_sar is not None and self.sar > prev_sar else 0
+        return {self.column_name: self.sar, f'{self.column_name}_flag': flag}
+
+class StreamParabolicHlc(StreamBase):
+    '''パラボリック(SAR)の逐次計算(三本値から算出) ※Indicator.get_parabolic_hlcと同じ値'''
+    def __init__(self, column_name, min_af, max_af, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'min_af': min_af, 'max_af': max_af, 'interval': interval}
+        self.min_af = min_af
+        self.max_af = max_af
+        self.sar = None
+        self.ep = None
+        self.af = min_af
+        self.trend = ''
+        self.count = 0
+        self.prev_flag = None
+
+    def calculate(self, close, high, low):
+        prev_sar = self.sar
+
+        # 1本目はSARとEPを終値で初期化
+        if self.count == 0:
+            self.sar, self.ep = close, close
+        else:
+            # 2本目で前の足との比較で上昇か下降トレンドかを判定
+            if self.count == 1:
+                self.trend = 'up' if self.sar < close else 'down'
+
+            if self.trend == 'up':
+                if self.ep < high:
+                    self.ep, self.af = high, min(self.af + self.min_af, self.max_af)
+                sar = self.sar + self.af * (self.ep - self.sar)
+                if sar >= low:
+                    self.trend, self.af = 'down', self.min_af
+                    sar, self.ep = self.ep, high
+            else:
+                if self.ep > low:
+                    self.ep, self.af = low, min(self.af + self.min_af, self.max_af)
+                sar = self.sar - self.af * (self.sar - self.ep)
+                if sar <= high:
+                    self.trend, self.af = 'up', self.min_af
+                    sar, self.ep = self.ep, low
+            self.sar = _round(sar, 4)
+        self.count += 1
+
+        # SARが一つ前のSARよりも高い場合は1、低い場合は0 / トレンドが反転した場合は1
+        flag = 1 if prev_sar is not None and self.sar > prev_sar else 0
+        reverse_flag = 1 if flag != self.prev_flag else 0
+        self.prev_flag = flag
+        return {self.column_name: self.sar, f'{self.column_name}_flag': flag, f'{self.column_name}_reverse_flag': reverse_flag}
+
+class StreamIchimokuCloud(StreamBase):
+    '''
+    一目均衡表の逐次計算 ※Indicator.get_ichimoku_cloudと同じ値
+
+    Memo:
+        遅行スパン(lagging_span)と遅行スパンを使うpl_xxxのカラムは
+        未来(long_window_size本先)の終値を使うため逐次計算では出力しない
+    '''
+    def __init__(self, column_name, short_window_size, long_window_size, interval):
+        super().__init__(column_name, interval)
+        self.init_params = {'column_name': column_name, 'short_window_size': short_window_size,
+                            'long_window_size': long_window_size, 'interval': interval}
+        # 基準線・転換線・先行スパンBの期間ごとの高値の最大値と安値の最小値
+        window_sizes = [short_window_size, long_window_size, long_window_size * 2]
+        self.high_max = {window_size: _RollingExtreme(window_size, find_max = True) for window_size in window_sizes}
+        self.low_min = {window_size: _RollingExtreme(window_size, find_max = False) for window_size in window_sizes}
+        self.high_low_means = {}
+        self.short_window_size = short_window_size
+        self.long_window_size = long_window_size
+
+        # 先行スパンはlong_window_size本ずらすので計算値を保持
+        self.span_a_history = deque([NAN] * long_window_size, maxlen = long_window_size + 1)
+        self.span_b_history = deque([NAN] * long_window_size, maxlen = long_window_size + 1)
+
+        self.prev = {'close': NAN, 'conversion': NAN, 'base': NAN, 'span_a': NAN, 'span_b': NAN}
+        self.counters = {name: _SinceEvent() for name in ['bc_gc', 'bc_dc', 'ls_gc', 'ls_dc', 'cloud_gc1', 'cloud_gc2', 'cloud_dc1', 'cloud_dc2']}
+
+    def update_high_low_means(self, high, low):
+        '''高値・安値を1本追加して、期間ごとの直近の高値の最大値と安値の最小値の平均を更新する'''
+        for window_size in self.high_max:
+            highest = self.high_max[window_size].update(high)
+            lowest = self.low_min[window_size].update(low)
+            self.high_low_means[window_size] = NAN if _is_nan(highest) or _is_nan(lowest) else (highest + lowest) / 2
+
+    def high_low_mean(self, window_size):
+        '''直近window_size本の高値と安値の平均'''
+        return self.high_low_means[window_size]
+
+    def cross(self, current_a, current_b, prev_a, prev_b):
+        '''aがbを上抜けたら1、下抜けたら-1、それ以外は0'''
+        cross = 0
+        if current_a > current_b and prev_a < prev_b:
+            cross = 1
+        if current_a < current_b and prev_a > prev_b:
+            cross = -1
+        return cross
+
+    def calculate(self, close, high, low):
+        name = self.column_name
+        self.update_high_low_means(high, low)
+
+        base = _round(self.high_low_mean(self.long_window_size), 3)
+        conversion = _round(self.high_low_mean(self.short_window_size), 3)
+        self.span_a_history.append((conversion + base) / 2)
+        self.span_b_history.append(self.high_low_mean(self.long_window_size * 2))
+        span_a = _round(self.span_a_history[0], 3)
+        span_b = _round(self.span_b_history[0], 3)
+        prev = self.prev
+
+        result = {f'{name}_base_line': base, f'{name}_conversion_line': conversion,
+                  f'{name}_leading_span_a': span_a, f'{name}_leading_span_b': span_b}
+
+        # 基準線と転換線
+        bc_cross = self.cross(conversion, base, prev['conversion'], prev['base'])
+        result[f'{name}_bc_diff'] = _round(conversion - base, 3)
+        result[f'{name}_bc_position'] = 1 if conversion - base > 0 else 0
+        result[f'{name}_bc_cross'] = bc_cross
+        result[f'{name}_bc_gc_after'] = self.counters['bc_gc'].update(bc_cross == 1)
+        result[f'{name}_bc_dc_after'] = self.counters['bc_dc'].update(bc_cross == -1)
+
+        # 先行スパン1と2
+        ls_cross = self.cross(span_a, span_b, prev['span_a'], prev['span_b'])
+        result[f'{name}_ls_diff'] = _round(span_a - span_b, 3)
+        result[f'{name}_ls_position'] = 1 if span_a > span_b else 0
+        result[f'{name}_ls_cross'] = ls_cross
+        result[f'{name}_ls_gc_after'] = self.counters['ls_gc'].update(ls_cross == 1)
+        result[f'{name}_ls_dc_after'] = self.counters['ls_dc'].update(ls_cross == -1)
+
+        # 終値と雲 NaNが含まれる場合はnp.maximum/np.minimumと同じくNaN
+        cloud_high = NAN if _is_nan(span_a) or _is_nan(span_b) else max(span_a, span_b)
+        cloud_low = NAN if _is_nan(span_a) or _is_nan(span_b) else min(span_a, span_b)
+        prev_cloud_high = NAN if _is_nan(prev['span_a']) or _is_nan(prev['span_b']) else max(prev['span_a'], prev['span_b'])
+        prev_cloud_low = NAN if _is_nan(prev['span_a']) or _is_nan(prev['span_b']) else min(prev['span_a'], prev['span_b'])
+
+        result[f'{name}_cloud_high_diff'] = _round(close - cloud_high, 3)
+        result[f'{name}_cloud_low_diff'] = _round(close - cloud_low, 3)
+        cloud_position = 0
+        if close > cloud_high:
+            cloud_position = 1
+        if close < cloud_low:
+            cloud_position = -1
+        result[f'{name}_cloud_position'] = cloud_position
+
+        # 雲とのクロスフラグ 後の条件ほど優先
+        cloud_cross = 0
+        if close >= cloud_high and prev['close'] < prev_cloud_high:
+            cloud_cross = 1
+        if close <= cloud_high and prev['close'] > prev_cloud_high:
+            cloud_cross = 2
+        if close >= cloud_low and prev['close'] < prev_cloud_low:
+            cloud_cross = 3
+        if close <= cloud_low and prev['close'] > prev_cloud_low:
+            cloud_cross = 4
+        result[f'{name}_cloud_cross'] = cloud_cross
+        result[f'{name}_cloud_gc_after1'] = self.counters['cloud_gc1'].update(cloud_cross == 2)
+        result[f'{name}_cloud_gc_after2'] = self.counters['cloud_gc2'].update(cloud_cross == 4)
+        result[f'{name}_cloud_dc_after1'] = self.counters['cloud_dc1'].update(cloud_cross == 1)
+        result[f'{name}_cloud_dc_after2'] = self.counters['cloud_dc2'].update(cloud_cross == 3)
+
+        self.prev = {'close': close, 'conversion': conversion, 'base': base, 'span_a': span_a, 'span_b': span_b}
+        return result
+
+class StreamIndicatorGroup():
+    '''複数の逐次計算指標をまとめて更新する'''
+    def __init__(self, log):
+        self.log = log
+        self.stream_list = []
+
+    def add(self, stream):
+        '''
+        逐次計算指標を追加する
+
+        Args:
+            stream(StreamBase): 逐次計算指標のインスタンス
+        '''
+        self.stream_list.append(stream)
+
+    def reset(self):
+        '''全指標の内部状態を初期化する'''
+        for stream in self.stream_list:
+            stream.reset()
+
+    def update(self, close, high = None, low = None):
+        '''
+        1本分の価格を全指標に追加する
+
+        Args:
+            close(float): 終値(現在値)
+            high(float): 高値
+            low(float): 安値
+
+        Returns:
+            bool: 実行結果
+            values(dict): カラム名をキーとした全指標の値
+        '''
+        values = {}
+        try:
+            for stream in self.stream_list:
+                values.update(stream.update(close, high, low))
+        except Exception as e:
+            self.log.error(f'テクニカル指標の逐次計算でエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+        return True, values
+
+class IndicatorStream():
+    '''
+    テクニカル指標を1本ずつ逐次計算するインスタンスを生成する
+
+    ※1本あたりの計算量はWMA・RCIがウィンドウ幅に比例し、それ以外はO(1)(一目均衡表は償却O(1))
+
+    Indicatorクラス(DataFrame全体を一括計算)と同じ値を返すため、
+    リアルタイムで計算した特徴量と学習時(PastRecordMold.culc_iv)の特徴量が一致する
+    '''
+    def __init__(self, log):
+        self.log = log
+
+    def create_group(self):
+        '''複数指標をまとめて更新するグループを生成する'''
+        return StreamIndicatorGroup(self.log)
+
+    def create_sma(self, column_name, window_size, interval):
+        '''単純移動平均線(SMA)'''
+        return StreamSma(column_name, window_size, interval)
+
+    def create_ema(self, column_name, window_size, interval):
+        '''指数移動平均線(EMA)'''
+        return StreamEma(column_name, window_size, interval)
+
+    def create_wma(self, column_name, window_size, interval):
+        '''加重移動平均線(WMA)'''
+        return StreamWma(column_name, window_size, interval)
+
+    def create_bollinger_bands(self, column_name, window_size, interval):
+        '''ボリンジャーバンド'''
+        return StreamBollingerBands(column_name, window_size, interval)
+
+    def create_rsi(self, column_name, window_size, interval):
+        '''相対力指数(RSI)'''
+        return StreamRsi(column_name, window_size, interval)
+
+    def create_rci(self, column_name, window_size, interval):
+        '''順位相関指数(RCI)'''
+        return StreamRci(column_name, window_size, interval)
+
+    def create_macd(self, column_name, short_window_size, long_window_size, signal_window_size, interval):
+        '''MACD'''
+        return StreamMacd(column_name, short_window_size, long_window_size, signal_window_size, interval)
+
+    def create_psy(self, column_name, window_size, interval):
+        '''サイコロジカルライン(PSY)'''
+        return StreamPsy(column_name, window_size, interval)
+
+    def create_parabolic(self, column_name, min_af, max_af, interval):
+        '''パラボリック(SAR) 終値のみから算出'''
+        return StreamParabolic(column_name, min_af, max_af, interval)
+
+    def create_parabolic_hlc(self, column_name, min_af, max_af, interval):
+        '''パラボリック(SAR) 三本値から算出'''
+        return StreamParabolicHlc(column_name, min_af, max_af, interval)
+
+    def create_ichimoku_cloud(self, column_name, short_window_size, long_window_size, interval):
+        '''一目均衡表'''
+        return StreamIchimokuCloud(column_name, short_window_size, long_window_size, interval)
@@ -0,0 +1,303 @@
+import asyncio
+import gzip
+import os
+import re
+import struct
+import time
+import traceback
+from datetime import datetime
+
+# 1件ごとのヘッダー(受信時刻のUNIX時間(秒, float64)、メッセージのバイト数(uint32))
+RECORD_HEADER = struct.Struct('<dI')
+
+# キャプチャファイルの拡張子と圧縮レベル(受信処理の負荷を抑えるため最も速い1にする)
+CAPTURE_EXTENSION = '.cap.gz'
+COMPRESS_LEVEL = 1
+
+# 書き込み途中で終了しても直近のデータまで読めるように圧縮データを書き出す間隔(秒)
+FLUSH_INTERVAL = 1.0
+
+class MessageCapture():
+    '''
+    PUSH配信・板情報APIの受信データをそのまま受信時刻とともにキャプチャファイルに追記・再生するクラス
+
+    記録処理の性能問題の再現や、過去の受信データからの四本値・板情報CSVの作り直しに使う
+
+    Memo:
+        ファイルは{種別}_{yyyymmdd}_{連番4桁}.cap.gzで、(ヘッダー + メッセージ)を繰り返したものをgzipで圧縮する
+        1ファイルの圧縮前のサイズが上限に達した場合は次の連番のファイルに切り替える
+        異常終了などでファイルの末尾が途中までしかない場合は、読める所までを再生する
+    '''
+    def __init__(self, log):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+        '''
+        self.log = log
+
+        # 書き込み中のファイル
+        self.file = None
+        self.file_path = None
+        self.capture_dir = None
+        self.kind = None
+        self.segment_size = 0
+        self.written_size = 0
+        self.last_flush_time = 0
+
+    def open(self, capture_dir, kind, segment_size_mb = 256):
+        '''
+        キャプチャファイルへの書き込みを開始する
+
+        Args:
+            capture_dir(str): キャプチャファイルを保存するディレクトリ
+            kind(str): 受信データの種別(push: PUSH配信、board: 板情報API)
+            segment_size_mb(int): 1ファイルの圧縮前の上限サイズ(MB)
+
+        Returns:
+            bool: 実行結果
+        '''
+        self.close()
+        self.capture_dir = capture_dir
+        self.kind = kind
+        self.segment_size = segment_size_mb * 1024 * 1024
+        return self.open_segment()
+
+    def open_segment(self):
+        '''
+        今日の日付で次の連番のキャプチャファイルを作成する
+
+        Returns:
+            bool: 実行結果
+        '''
+        try:
+            os.makedirs(self.capture_dir, exist_ok = True)
+
+            # 同じ日に作成済のファイルがある場合は追記せずに次の連番にする
+            today = datetime.now().strftime('%Y%m%d')
+            segment_list = self.get_segment_list(self.capture_dir, self.kind, today)
+            number = int(os.path.basename(segment_list[-1])[-len(CAPTURE_EXTENSION) - 4:-len(CAPTURE_EXTENSION)]) + 1 if len(segment_list) != 0 else 1
+
+            self.file_path = os.path.join(self.capture_dir, f'{self.kind}_{today}_{number:04}{CAPTURE_EXTENSION}')
+            self.file = gzip.open(self.file_path, 'wb', compresslevel = COMPRESS_LEVEL)
+            self.written_size = 0
+            self.last_flush_time = time.monotonic()
+        except Exception as e:
+            self.log.error(f'キャプチャファイルの作成でエラー\n{str(e)}\n{traceback.format_exc()}')
+            self.file = None
+            return False
+
+        self.log.info(f'キャプチャファイルへの書き込み開始 ファイルパス: {self.file_path}')
+        return True
+
+    def is_open(self):
+        '''
+        キャプチャファイルに書き込み中か
+
+        Returns:
+            bool: 書き込み中か
+        '''
+        return self.file is not None
+
+    def write(self, message, receive_time = None):
+        '''
+        受信データを1件追記する
+
+        Args:
+            message(str or bytes): 受信データ
+            receive_time(float or None): 受信時刻(UNIX時間) ※Noneの場合は現在時刻
+
+        Returns:
+            bool: 実行結果
+        '''
+        if self.file is None:
+            return False
+
+        if receive_time is None:
+            receive_time = time.time()
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+
+        try:
+            self.file.write(RECORD_HEADER.pack(receive_time, len(message)))
+            self.file.write(message)
+            self.written_size += RECORD_HEADER.size + len(message)
+
+            # 上限サイズに達したら次のファイルに切り替える
+            if self.written_size >= self.segment_size:
+                self.file.close()
+                return self.open_segment()
+
+            if time.monotonic() - self.last_flush_time >= FLUSH_INTERVAL:
+                self.file.flush()
+                self.last_flush_time = time.monotonic()
+        except Exception as e:
+            # 記録処理を止めないようにキャプチャのみ終了する
+            self.log.error(f'キャプチャファイルへの書き込みでエラー ファイルパス: {self.file_path}\n{str(e)}\n{traceback.format_exc()}')
+            self.file = None
+            return False
+
+        return True
+
+    def close(self):
+        '''キャプチャファイルへの書き込みを終了する'''
+        if self.file is None:
+            return
+
+        try:
+            self.file.close()
+        except Exception as e:
+            self.log.error(f'キャプチャファイルのクローズでエラー ファイルパス: {self.file_path}\n{str(e)}\n{traceback.format_exc()}')
+        self.file = None
+        self.log.info(f'キャプチャファイルへの書き込み終了 ファイルパス: {self.file_path}')
+
+    def get_segment_list(self, capture_dir, kind, date = None):
+        '''
+        キャプチャファイルのパスを記録した順に取得する
+
+        Args:
+            capture_dir(str): キャプチャファイルのディレクトリ
+            kind(str): 受信データの種別(push, board)
+            date(str or None): 日付(yyyymmdd) ※Noneの場合は全ての日付
+
+        Returns:
+            segment_list(list[str]): キャプチャファイルのパスのリスト
+        '''
+        if not os.path.isdir(capture_dir):
+            return []
+
+        date_pattern = date if date is not None else r'\d{8}'
+        pattern = re.compile(rf'^{kind}_{date_pattern}_\d{{4}}{re.escape(CAPTURE_EXTENSION)}$')
+        return [os.path.join(capture_dir, file_name) for file_name in sorted(os.listdir(capture_dir)) if pattern.match(file_name)]
+
+    def read(self, path_list):
+        '''
+        キャプチャファイルから受信データを記録した順に読み込む
+
+        Args:
+            path_list(list[str]): キャプチャファイルのパスのリスト
+
+        Yields:
+            receive_time(float): 受信時刻(UNIX時間)
+            message(bytes): 受信データ
+        '''
+        for path in path_list:
+            try:
+                with gzip.open(path, 'rb') as f:
+                    while True:
+                        header = f.read(RECORD_HEADER.size)
+                        if len(header) == 0:
+                            break
+
+                        receive_time, size = RECORD_HEADER.unpack(header)
+                        message = f.read(size)
+                        if len(message) != size:
+                            raise EOFError('メッセージが途中までしかありません')
+                        yield receive_time, message
+
+            # 書き込み途中で終了したファイルは読める所までにする
+            except (EOFError, struct.error) as e:
+                self.log.warning(f'キャプチャファイルの末尾が途中までしかないため読み込みを終了します ファイルパス: {path}\n{str(e)}')
+
+    def get_wait_seconds(self, receive_time, first_receive_time, start_time, speed):
+        '''
+        再生時に受信時刻の間隔を再現するための待ち時間を計算する
+
+        Args:
+            receive_time(float): 受信データの受信時刻
+            first_receive_time(float): 最初の受信データの受信時刻
+            start_time(float): 再生を開始した時刻(time.monotonic)
+            speed(float or None): 再生速度(1: 等倍、N: N倍速) ※Noneの場合は待たない(最大速度)
+
+        Returns:
+            wait_seconds(float): 待ち時間(秒)
+        '''
+        if speed is None:
+            return 0
+        return (receive_time - first_receive_time) / speed - (time.monotonic() - start_time)
+
+    def replay(self, path_list, speed = None):
+        '''
+        キャプチャファイルの受信データを受信時刻の間隔に合わせて順に取得する
+
+        Args:
+            path_list(list[str]): キャプチャファイルのパスのリスト
+            speed(float or None): 再生速度(1: 等倍、N: N倍速) ※Noneの場合は待たない(最大速度)
+
+        Yields:
+            receive_time(float): 受信時刻(UNIX時間)
+            message(bytes): 受信データ
+        '''
+        first_receive_time, start_time = None, time.monotonic()
+        for receive_time, message in self.read(path_list):
+            if first_receive_time is None:
+                first_receive_time = receive_time
+
+            wait_seconds = self.get_wait_seconds(receive_time, first_receive_time, start_time, speed)
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+            yield receive_time, message
+
+    def get_replay_socket(self, path_list, speed = None):
+        '''
+        キャプチャファイルのPUSH配信をWebSocketの代わりに受信させるクラスを取得する
+
+        Args:
+            path_list(list[str]): キャプチャファイルのパスのリスト
+            speed(float or None): 再生速度(1: 等倍、N: N倍速) ※Noneの場合は待たない(最大速度)
+
+        Returns:
+            CaptureReplaySocket: Record.websocket_mainに渡す再生用の接続
+        '''
+        return CaptureReplaySocket(self, path_list, speed)
+
+class CaptureReplaySocket():
+    '''
+    キャプチャファイルのPUSH配信をwebsocketsの接続と同じ形(async with / recv)で受信させるクラス
+
+    Memo:
+        全て再生し終わった後のrecvはTimeoutErrorを送出する(WebSocketの受信がタイムアウトした場合と同じ)
+    '''
+    def __init__(self, capture, path_list, speed = None):
+        '''
+        Args:
+            capture(MessageCapture): キャプチャファイルを読み込むクラスのインスタンス
+            path_list(list[str]): キャプチャファイルのパスのリスト
+            speed(float or None): 再生速度(1: 等倍、N: N倍速) ※Noneの場合は待たない(最大速度)
+        '''
+        self.capture = capture
+        self.speed = speed
+        self.reader = capture.read(path_list)
+        self.first_receive_time = None
+        self.start_time = None
+
+        # 再生した件数
+        self.count = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.reader.close()
+        return False
+
+    async def recv(self):
+        '''
+        次の受信データを受信時刻の間隔に合わせて取得する
+
+        Returns:
+            message(bytes): 受信データ
+        '''
+        try:
+            receive_time, message = next(self.reader)
+        except StopIteration:
+            raise TimeoutError('キャプチャファイルの再生終了')
+
+        if self.first_receive_time is None:
+            self.first_receive_time, self.start_time = receive_time, time.monotonic()
+
+        wait_seconds = self.capture.get_wait_seconds(receive_time, self.first_receive_time, self.start_time, self.speed)
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+        self.count += 1
+        return message
@@ -1,10 +1,86 @@
 import traceback
 from datetime import datetime
 
+# 板情報CSVのカラムごとの板情報取得APIのレスポンスの項目(子の項目がある場合は順に指定)
+# ※CSVのカラムと並び順はschema.pyのboardの定義に従う
+BOARD_CSV_ITEM_LIST = {
+    'stock_code': ('Symbol',), # 証券コード
+    'current_price': ('CurrentPrice',), # 現在株価
+    'current_price_change_status': ('CurrentPriceChangeStatus',), # 前の歩み値からの変化
+    'current_price_status': ('CurrentPriceStatus',), # 現在株価のステータス
+    'previous_close': ('PreviousClose',), # 前日終値
+    'change_previous_close': ('ChangePreviousClose',), # 前日比
+    'change_previous_close_per': ('ChangePreviousClosePer',), # 前日比(%)
+    'opening_price': ('OpeningPrice',), # 始値
+    'high_price': ('HighPrice',), # 高値
+    'high_price_time': ('HighPriceTime',), # 高値時刻
+    'low_price': ('LowPrice',), # 安値
+    'low_price_time': ('LowPriceTime',), # 安値時刻
+    'trading_volume': ('TradingVolume',), # 出来高
+    'VWAP': ('VWAP',), # VWAP(売買高加重平均価格)
+    'bid_sign': ('Sell1', 'Sign'), # 売気配フラグ
+    'market_order_sell_qty': ('MarketOrderSellQty',), # 売成行数量
+    'bid_price_1': ('Sell1', 'Price'), # 売気配価格1(最良気配)
+    'bid_qty_1': ('Sell1', 'Qty'), # 売気配数量1(最良気配)
+    'bid_price_2': ('Sell2', 'Price'), # 売気配価格2(2番目に安い価格)
+    'bid_qty_2': ('Sell2', 'Qty'), # 売気配数量2(2番目に安い価格)
+    'bid_price_3': ('Sell3', 'Price'), # 売気配価格3(3番目に安い価格)
+    'bid_qty_3': ('Sell3', 'Qty'), # 売気配数量3(3番目に安い価格)
+    'bid_price_4': ('Sell4', 'Price'), # 売気配価格4(4番目に安い価格)
+    'bid_qty_4': ('Sell4', 'Qty'), # 売気配数量4(4番目に安い価格)
+    'bid_price_5': ('Sell5', 'Price'), # 売気配価格5(5番目に安い価格)
+    'bid_qty_5': ('Sell5', 'Qty'), # 売気配数量5(5番目に安い価格)
+    'bid_price_6': ('Sell6', 'Price'), # 売気配価格6(6番目に安い価格)
+    'bid_qty_6': ('Sell6', 'Qty'), # 売気配数量6(6番目に安い価格)
+    'bid_price_7': ('Sell7', 'Price'), # 売気配価格7(7番目に安い価格)
+    'bid_qty_7': ('Sell7', 'Qty'), # 売気配数量7(7番目に安い価格)
+    'bid_price_8': ('Sell8', 'Price'), # 売気配価格8(8番目に安い価格)
+    'bid_qty_8': ('Sell8', 'Qty'), # 売気配数量8(8番目に安い価格)
+    'bid_price_9': ('Sell9', 'Price'), # 売気配価格9(9番目に安い価格)
+    'bid_qty_9': ('Sell9', 'Qty'), # 売気配数量9(9番目に安い価格)
+    'bid_price_10': ('Sell10', 'Price'), # 売気配価格10(10番目に安い価格)
+    'bid_qty_10': ('Sell10', 'Qty'), # 売気配数量10(10番目に安い価格)
+    'over_sell_qty': ('OverSellQty',), # OVER売気配数量
+    'ask_sign': ('Buy1', 'Sign'), # 買気配フラグ
+    'market_order_buy_qty': ('MarketOrderBuyQty',), # 買成行数量
+    'ask_price_1': ('Buy1', 'Price'), # 買気配価格1(最良気配)
+    'ask_qty_1': ('Buy1', 'Qty'), # 買気配数量1(最良気配)
+    'ask_price_2': ('Buy2', 'Price'), # 買気配価格2(2番目に安い価格)
+    'ask_qty_2': ('Buy2', 'Qty'), # 買気配数量2(2番目に安い価格)
+    'ask_price_3': ('Buy3', 'Price'), # 買気配価格3(3番目に安い価格)
+    'ask_qty_3': ('Buy3', 'Qty'), # 買気配数量3(3番目に安い価格)
+    'ask_price_4': ('Buy4', 'Price'), # 買気配価格4(4番目に安い価格)
+    'ask_qty_4': ('Buy4', 'Qty'), # 買気配数量4(4番目に安い価格)
+    'ask_price_5': ('Buy5', 'Price'), # 買気配価格5(5番目に安い価格)
+    'ask_qty_5': ('Buy5', 'Qty'), # 買気配数量5(5番目に安い価格)
+    'ask_price_6': ('Buy6', 'Price'), # 買気配価格6(6番目に安い価格)
+    'ask_qty_6': ('Buy6', 'Qty'), # 買気配数量6(6番目に安い価格)
+    'ask_price_7': ('Buy7', 'Price'), # 買気配価格7(7番目に安い価格)
+    'ask_qty_7': ('Buy7', 'Qty'), # 買気配数量7(7番目に安い価格)
+    'ask_price_8': ('Buy8', 'Price'), # 買気配価格8(8番目に安い価格)
+    'ask_qty_8': ('Buy8', 'Qty'), # 買気配数量8(8番目に安い価格)
+    'ask_price_9': ('Buy9', 'Price'), # 買気配価格9(9番目に安い価格)
+    'ask_qty_9': ('Buy9', 'Qty'), # 買気配数量9(9番目に安い価格)
+    'ask_price_10': ('Buy10', 'Price'), # 買気配価格10(10番目に安い価格)
+    'ask_qty_10': ('Buy10', 'Qty'), # 買気配数量10(10番目に安い価格)
+    'under_buy_qty': ('UnderBuyQty',), # UNDER売気配数量
+    'get_year': ('get_time', 'year'), # 取得年
+    'get_month': ('get_time', 'month'), # 取得月
+    'get_day': ('get_time', 'day'), # 取得日
+    'get_hour': ('get_time', 'hour'), # 取得時
+    'get_minute': ('get_time', 'minute'), # 取得分
+}
+
 class Mold():
     '''DBやAPIに使うためのデータ整形を行う'''
-    def __init__(self, log):
+    def __init__(self, log, schema):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            schema(Schema): データセットのカラムと型を管理するクラスのインスタンス
+        '''
         self.log = log
+        self.schema = schema
 
     def response_to_boards(self, board_info):
         '''
@@ -87,6 +163,8 @@ class Mold():
     def response_to_csv(self, board_info):
         '''
         板情報取得APIで受け取ったレスポンスをCSVに記録する形に変換する
+        カラムとその順番はschema.pyのboardの定義に従い、値はBOARD_CSV_ITEM_LISTの項目から取得する
+        ※カラムを追加する場合はschema.pyとBOARD_CSV_ITEM_LISTの両方に追加する
 
         Args:
             board_info(dict): 板情報
@@ -97,73 +175,17 @@ class Mold():
         '''
 
         try:
-            board_info_dict = {
-                'stock_code': board_info['Symbol'], # 証券コード
-                'current_price': board_info['CurrentPrice'], # 現在株価
-                'current_price_change_status': board_info['CurrentPriceChangeStatus'], # 前の歩み値からの変化
-                'current_price_status': board_info['CurrentPriceStatus'], # 現在株価のステータス
-                'previous_close': board_info['PreviousClose'], # 前日終値
-                'change_previous_close': board_info['ChangePreviousClose'], # 前日比
-                'change_previous_close_per': board_info['ChangePreviousClosePer'], # 前日比(%)
-                'opening_price': board_info['OpeningPrice'], # 始値
-                'high_price': board_info['HighPrice'], # 高値
-                'high_price_time': self.format_datetime(board_info['HighPriceTime']), # 高値時刻
-                'low_price': board_info['LowPrice'], # 安値
-                'low_price_time': self.format_datetime(board_info['LowPriceTime']), # 安値時刻
-                'trading_volume': board_info['TradingVolume'], # 出来高
-                'VWAP': board_info['VWAP'], # VWAP(売買高加重平均価格)
-                'bid_sign': board_info['Sell1']['Sign'], # 売気配フラグ
-                'market_order_sell_qty': board_info['MarketOrderSellQty'], # 売成行数量
-                'bid_price_1': board_info['Sell1']['Price'], # 売気配価格1(最良気配)
-                'bid_qty_1': board_info['Sell1']['Qty'], # 売気配数量1(最良気配)
-                'bid_price_2': board_info['Sell2']['Price'], # 売気配価格2(2番目に安い価格)
-                'bid_qty_2': board_info['Sell2']['Qty'], # 売気配数量2(2番目に安い価格)
-                'bid_price_3': board_info['Sell3']['Price'], # 売気配価格3(3番目に安い価格)
-                'bid_qty_3': board_info['Sell3']['Qty'], # 売気配数量3(3番目に安い価格)
-                'bid_price_4': board_info['Sell4']['Price'], # 売気配価格4(4番目に安い価格)
-                'bid_qty_4': board_info['Sell4']['Qty'], # 売気配数量4(4番目に安い価格)
-                'bid_price_5': board_info['Sell5']['Price'], # 売気配価格5(5番目に安い価格)
-                'bid_qty_5': board_info['Sell5']['Qty'], # 売気配数量5(5番目に安い価格)
-                'bid_price_6': board_info['Sell6']['Price'], # 売気配価格6(6番目に安い価格)
-                'bid_qty_6': board_info['Sell6']['Qty'], # 売気配数量6(6番目に安い価格)
-                'bid_price_7': board_info['Sell7']['Price'], # 売気配価格7(7番目に安い価格)
-                'bid_qty_7': board_info['Sell7']['Qty'], # 売気配数量7(7番目に安い価格)
-                'bid_price_8': board_info['Sell8']['Price'], # 売気配価格8(8番目に安い価格)
-                'bid_qty_8': board_info['Sell8']['Qty'], # 売気配数量8(8番目に安い価格)
-                'bid_price_9': board_info['Sell9']['Price'], # 売気配価格9(9番目に安い価格)
-                'bid_qty_9': board_info['Sell9']['Qty'], # 売気配数量9(9番目に安い価格)
-                'bid_price_10': board_info['Sell10']['Price'], # 売気配価格10(10番目に安い価格)
-                'bid_qty_10': board_info['Sell10']['Qty'], # 売気配数量10(10番目に安い価格)
-                'over_sell_qty': board_info['OverSellQty'], # OVER売気配数量
-                'ask_sign': board_info['Buy1']['Sign'], # 買気配フラグ
-                'market_order_buy_qty': board_info['MarketOrderBuyQty'], # 買成行数量
-                'ask_price_1': board_info['Buy1']['Price'], # 買気配価格1(最良気配)
-                'ask_qty_1': board_info['Buy1']['Qty'], # 買気配数量1(最良気配)
-                'ask_price_2': board_info['Buy2']['Price'], # 買気配価格2(2番目に安い価格)
-                'ask_qty_2': board_info['Buy2']['Qty'], # 買気配数量2(2番目に安い価格)
-                'ask_price_3': board_info['Buy3']['Price'], # 買気配価格3(3番目に安い価格)
-                'ask_qty_3': board_info['Buy3']['Qty'], # 買気配数量3(3番目に安い価格)
-                'ask_price_4': board_info['Buy4']['Price'], # 買気配価格4(4番目に安い価格)
-                'ask_qty_4': board_info['Buy4']['Qty'], # 買気配数量4(4番目に安い価格)
-                'ask_price_5': board_info['Buy5']['Price'], # 買気配価格5(5番目に安い価格)
-                'ask_qty_5': board_info['Buy5']['Qty'], # 買気配数量5(5番目に安い価格)
-                'ask_price_6': board_info['Buy6']['Price'], # 買気配価格6(6番目に安い価格)
-                'ask_qty_6': board_info['Buy6']['Qty'], # 買気配数量6(6番目に安い価格)
-                'ask_price_7': board_info['Buy7']['Price'], # 買気配価格7(7番目に安い価格)
-                'ask_qty_7': board_info['Buy7']['Qty'], # 買気配数量7(7番目に安い価格)
-                'ask_price_8': board_info['Buy8']['Price'], # 買気配価格8(8番目に安い価格)
-                'ask_qty_8': board_info['Buy8']['Qty'], # 買気配数量8(8番目に安い価格)
-                'ask_price_9': board_info['Buy9']['Price'], # 買気配価格9(9番目に安い価格)
-                'ask_qty_9': board_info['Buy9']['Qty'], # 買気配数量9(9番目に安い価格)
-                'ask_price_10': board_info['Buy10']['Price'], # 買気配価格10(10番目に安い価格)
-                'ask_qty_10': board_info['Buy10']['Qty'], # 買気配数量10(10番目に安い価格)
-                'under_buy_qty': board_info['UnderBuyQty'], # UNDER売気配数量
-                'get_year': board_info['get_time'].year, # 取得年
-                'get_month': board_info['get_time'].month, # 取得月
-                'get_day': board_info['get_time'].day, # 取得日
-                'get_hour': board_info['get_time'].hour, # 取得時
-                'get_minute': board_info['get_time'].minute # 取得分
-            }
+            board_info_dict = {}
+            for column in self.schema.get_columns('board'):
+                # レスポンスの項目を順にたどって値を取得する(get_timeはdatetimeの属性)
+                value = board_info
+                for key in BOARD_CSV_ITEM_LIST[column]:
+                    value = value[key] if isinstance(value, dict) else getattr(value, key)
+
+                # 日時のカラムは文字列を整形する
+                if self.schema.get_dtype('board', column) == 'datetime':
+                    value = self.format_datetime(value)
+                board_info_dict[column] = value
         except Exception as e:
             self.log.error(f'板情報取得APIからCSV記録用フォーマット変換処理でエラー\n{e}\n{traceback.format_exc()}')
             self.log.error(board_info)
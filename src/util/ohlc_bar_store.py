@@ -0,0 +1,123 @@
+class OhlcBarStore():
+    '''
+    PUSH配信から作成中の1分足(四本値)を(証券コード, 取引時間)をキーに保持するクラス
+
+    Record.operate_ohlcで1メッセージごとにリスト全体を走査していた処理(同一時分の検索・置き換え・
+    最新の累計出来高の取得・DB登録済データの削除)を、辞書の参照で行う
+
+    Memo:
+        足のデータはMold.response_to_ohlcで作成した辞書をそのまま保持する(値の計算はしない)
+        並び順は更新した順(リストから削除して末尾に追加していた時と同じ)で、DBへの登録もこの順に行う
+        銘柄ごとに取引時間が最新の足を保持し、累計出来高の取得に使う
+    '''
+    def __init__(self, log):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+        '''
+        self.log = log
+
+        # 全銘柄の足 {(証券コード, 取引時間): 足} ※更新した順
+        self.bar_dict = {}
+
+        # 銘柄ごとの足 {証券コード: {取引時間: 足}} ※更新した順
+        self.symbol_dict = {}
+
+        # 銘柄ごとの取引時間が最新の足 {証券コード: 取引時間}
+        self.latest_dict = {}
+
+    def __len__(self):
+        return len(self.bar_dict)
+
+    def get(self, symbol, trade_time):
+        '''
+        証券コード・取引時間(分)の足を取得する
+
+        Args:
+            symbol(str): 証券コード
+            trade_time(datetime): 取引時間(秒を切り捨てたもの)
+
+        Returns:
+            bar(dict or None): 足のデータ ※存在しない場合はNone
+        '''
+        return self.bar_dict.get((symbol, trade_time))
+
+    def get_latest(self, symbol):
+        '''
+        銘柄の取引時間が最新の足を取得する
+
+        Args:
+            symbol(str): 証券コード
+
+        Returns:
+            bar(dict or None): 足のデータ ※銘柄の足がない場合はNone
+        '''
+        trade_time = self.latest_dict.get(symbol)
+        if trade_time is None:
+            return None
+        return self.bar_dict[(symbol, trade_time)]
+
+    def put(self, bar):
+        '''
+        足を追加する 同じ証券コード・取引時間の足がある場合は置き換えて末尾に移動する
+
+        Args:
+            bar(dict): 足のデータ ※symbol, trade_timeが必要
+        '''
+        symbol, trade_time = bar['symbol'], bar['trade_time']
+
+        # 置き換える場合も更新した順に並ぶように一度削除してから追加する
+        self.bar_dict.pop((symbol, trade_time), None)
+        self.bar_dict[(symbol, trade_time)] = bar
+
+        symbol_bar_dict = self.symbol_dict.setdefault(symbol, {})
+        symbol_bar_dict.pop(trade_time, None)
+        symbol_bar_dict[trade_time] = bar
+
+        latest_trade_time = self.latest_dict.get(symbol)
+        if latest_trade_time is None or latest_trade_time < trade_time:
+            self.latest_dict[symbol] = trade_time
+
+    def get_until(self, symbol, trade_time):
+        '''
+        銘柄の足のうち取引時間が指定の時間(含む)以前のものを更新した順に取得する
+
+        Args:
+            symbol(str): 証券コード
+            trade_time(datetime): 取引時間
+
+        Returns:
+            bar_list(list): 足のデータのリスト
+        '''
+        return [bar for bar_trade_time, bar in self.symbol_dict.get(symbol, {}).items() if bar_trade_time <= trade_time]
+
+    def remove(self, symbol, trade_time):
+        '''
+        足を削除する(DBに登録した足など)
+
+        Args:
+            symbol(str): 証券コード
+            trade_time(datetime): 取引時間
+        '''
+        if self.bar_dict.pop((symbol, trade_time), None) is None:
+            return
+
+        symbol_bar_dict = self.symbol_dict[symbol]
+        del symbol_bar_dict[trade_time]
+
+        # 最新の足を削除した場合は残っている足から選び直す(銘柄ごとに残る足は数本のみ)
+        if self.latest_dict[symbol] == trade_time:
+            if len(symbol_bar_dict) == 0:
+                del self.symbol_dict[symbol]
+                del self.latest_dict[symbol]
+            else:
+                self.latest_dict[symbol] = max(symbol_bar_dict)
+
+    def values(self):
+        '''
+        全ての足を更新した順に取得する
+
+        Returns:
+            bar_list(list): 足のデータのリスト
+        '''
+        return list(self.bar_dict.values())
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# 1分足の取引時間(前場 9:00~11:30、後場 12:30~15:30 引けの1本を含む)
+SESSION_LIST = [('09:00', '11:30'), ('12:30', '15:30')]
+
+# 呼値の単位(TOPIX100構成銘柄) (価格の上限, 呼値)
+TICK_LIST = [(1000, 0.1), (3000, 0.5), (10000, 1), (30000, 5), (100000, 10), (float('inf'), 50)]
+
+class OhlcGenerator():
+    '''
+    ohlc_YYYYMM.csv(米Yahoo!Financeから取得した1分足)と同じ形式の合成データを作成するクラス
+
+    乱数のシードと証券コードから値が決まるので、同じ引数であれば常に同じデータを返す
+    ※ベンチマークや動作確認用 実際の値動きを再現するものではない
+    '''
+    def __init__(self, log):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+        '''
+        self.log = log
+
+    def generate(self, stock_code_list, start_date, days, seed = 0, start_price = 3000):
+        '''
+        合成した1分足の四本値を作成する
+
+        Args:
+            stock_code_list(list): 証券コードのリスト
+            start_date(str): 開始日(YYYY-MM-DD) ※土日は飛ばす
+            days(int): 営業日数
+            seed(int): 乱数のシード
+            start_price(float): 初日の始値
+
+        Returns:
+            df(pandas.DataFrame): stock_code, timestamp(YYYY-MM-DD HH:MM), open, high, low, close, volumeのカラムを持つデータ
+                ※証券コード・時刻順
+        '''
+        # 1日分の時刻(0:00からの経過分数)と営業日
+        minute_list = np.concatenate([np.arange(self.to_minute(start), self.to_minute(end) + 1) for start, end in SESSION_LIST])
+        date_list = pd.bdate_range(start_date, periods = days)
+        timestamp = (date_list.values[:, None] + pd.to_timedelta(minute_list, unit = 'min').values[None, :]).ravel()
+        timestamp = pd.DatetimeIndex(timestamp).strftime('%Y-%m-%d %H:%M')
+
+        df_list = []
+        for stock_code in stock_code_list:
+            rng = np.random.default_rng([seed, int(stock_code)])
+            n = len(timestamp)
+
+            # 終値は対数収益率のランダムウォーク 日を跨ぐ場合はギャップを入れる
+            returns = rng.normal(0, 0.0008, n)
+            returns[::len(minute_list)] += rng.normal(0, 0.005, days)
+            close = start_price * np.exp(np.cumsum(returns))
+            open_price = np.concatenate([[start_price], close[:-1]]) * np.exp(rng.normal(0, 0.0002, n))
+
+            # 高値・安値は始値/終値からのヒゲ
+            high = np.maximum(open_price, close) * (1 + np.abs(rng.normal(0, 0.0004, n)))
+            low = np.minimum(open_price, close) * (1 - np.abs(rng.normal(0, 0.0004, n)))
+
+            df_list.append(pd.DataFrame({
+                'stock_code': stock_code,
+                'timestamp': timestamp,
+                'open': self.round_tick(open_price),
+                'high': self.round_tick(high),
+                'low': self.round_tick(low),
+                'close': self.round_tick(close),
+                # 出来高は寄り付き・引けほど多い
+                'volume': (rng.lognormal(7, 1, n) * np.tile(self.volume_weight(minute_list), days)).astype(np.int64) // 100 * 100,
+            }))
+
+        df = pd.concat(df_list, ignore_index = True)
+
+        # 丸めで高値・安値が始値/終値の内側にならないように補正
+        df['high'] = df[['open', 'high', 'low', 'close']].max(axis = 1)
+        df['low'] = df[['open', 'high', 'low', 'close']].min(axis = 1)
+        return df
+
+    def to_minute(self, time):
+        '''HH:MMを0:00からの経過分数にする'''
+        hour, minute = time.split(':')
+        return int(hour) * 60 + int(minute)
+
+    def round_tick(self, price):
+        '''
+        価格を呼値の単位に丸める
+
+        Args:
+            price(numpy.ndarray): 価格
+
+        Returns:
+            price(numpy.ndarray): 呼値の単位に丸めた価格
+        '''
+        tick = np.select([price < limit for limit, _ in TICK_LIST], [tick for _, tick in TICK_LIST])
+        return np.round(np.round(price / tick) * tick, 1)
+
+    def volume_weight(self, minute_list):
+        '''寄り付き・引けに近いほど大きくなる出来高の倍率'''
+        position = (minute_list - minute_list[0]) / (minute_list[-1] - minute_list[0])
+        return 1 + 16 * (position - 0.5) ** 2
@@ -0,0 +1,284 @@
+import os
+import re
+import sqlite3
+import time
+import traceback
+import pandas as pd
+from contextlib import closing
+
+# 処理中のまま更新されない行を他のプロセスが取得し直せるようになるまでの秒数(異常終了したプロセスの分)
+CLAIM_TIMEOUT_SECONDS = 3600
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS partition_state (
+        stock_code TEXT NOT NULL,
+        date TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        status TEXT NOT NULL,
+        output TEXT,
+        owner TEXT,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (stage, stock_code, date)
+    ) WITHOUT ROWID
+'''
+
+class PipelineManifest():
+    '''
+    過去の四本値の取得・成形の進捗を銘柄・日付・処理の段階ごとにSQLiteで管理するクラス
+
+    (stage, stock_code, date)を主キーにして、処理済かどうかを1件ずつ索引で確認する
+    複数のプロセスで同じ銘柄・日付を処理しないように、処理中(running)として取得(claim)してから処理する
+
+    Memo:
+        処理の段階(stage)
+            collect: 米Yahoo!Financeから取得してohlc_yyyymm.csvに記録済(旧check_past_ohlc.csv)
+            merge: 目的変数・説明変数を追加して日付ごとのまとめファイルに記録済(旧recorded_ohlc.csv)
+        状態(status)はrunning(処理中)・done(処理済)の2つ 処理に失敗した場合は行を削除する
+        日付はyyyy-mm-dd、証券コードは文字列で保存する
+    '''
+    def __init__(self, log):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+        '''
+        self.log = log
+        self.db_path = None
+
+    def set_db_path(self, db_path):
+        '''
+        SQLiteファイルのパスを設定し、テーブルがなければ作成する
+
+        新規に作成する場合は同じディレクトリのrecorded_ohlc.csv・check_past_ohlc.csvの記録を取り込む
+
+        Args:
+            db_path(str): SQLiteファイルのパス
+
+        Returns:
+            bool: 実行結果
+        '''
+        self.db_path = db_path
+        exists = os.path.exists(db_path)
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok = True)
+            with closing(self.connect()) as conn:
+                # 読み込みと書き込みを別プロセスから同時に行えるようにする
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.execute(CREATE_TABLE_SQL)
+        except Exception as e:
+            self.log.error(f'進捗管理用DBの作成でエラー ファイルパス: {db_path}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        if not exists:
+            csv_dir = os.path.dirname(os.path.abspath(db_path))
+            self.import_csv(os.path.join(csv_dir, 'recorded_ohlc.csv'), os.path.join(csv_dir, 'check_past_ohlc.csv'))
+
+        return True
+
+    def connect(self):
+        '''
+        SQLiteに接続する ※プロセスをまたいで使えないため、操作ごとに接続する
+
+        Returns:
+            conn(sqlite3.Connection): 自動コミットの接続(トランザクションはBEGINで明示する)
+        '''
+        conn = sqlite3.connect(self.db_path, timeout = 60, isolation_level = None)
+        # WALモードではコミットごとの同期を減らしても壊れない(電源断時に直近のコミットが失われるのみ)
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def is_done(self, stock_code, date, stage):
+        '''
+        銘柄・日付が指定の段階まで処理済か確認する
+
+        Args:
+            stock_code(int or str): 証券コード
+            date(str): 日付(yyyy-mm-dd)
+            stage(str): 処理の段階(collect, merge)
+
+        Returns:
+            bool: 処理済の場合True
+        '''
+        with closing(self.connect()) as conn:
+            row = conn.execute('SELECT 1 FROM partition_state WHERE stage = ? AND stock_code = ? AND date = ? AND status = ?',
+                               (stage, str(stock_code), date, 'done')).fetchone()
+        return row is not None
+
+    def get_done_set(self, stage, stock_code = None):
+        '''
+        指定の段階まで処理済の銘柄・日付を一度に取得する
+
+        Args:
+            stage(str): 処理の段階(collect, merge)
+            stock_code(int or str or None): 証券コード ※Noneの場合は全銘柄
+
+        Returns:
+            done_set(set[tuple]): 処理済の(証券コード, 日付)
+        '''
+        sql = 'SELECT stock_code, date FROM partition_state WHERE stage = ? AND status = ?'
+        params = [stage, 'done']
+        if stock_code is not None:
+            sql += ' AND stock_code = ?'
+            params.append(str(stock_code))
+
+        with closing(self.connect()) as conn:
+            return set(conn.execute(sql, params).fetchall())
+
+    def mark_done(self, partition_list, stage, output = None):
+        '''
+        銘柄・日付を処理済として記録する(処理中の行は処理済に更新する)
+
+        Args:
+            partition_list(list[tuple]): (証券コード, 日付)のリスト
+            stage(str): 処理の段階(collect, merge)
+            output(str or None): 出力先のファイル名
+
+        Returns:
+            bool: 実行結果
+        '''
+        now = time.time()
+        rows = [(str(stock_code), date, stage, 'done', output, None, now) for stock_code, date in partition_list]
+
+        try:
+            with closing(self.connect()) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany('INSERT OR REPLACE INTO partition_state VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                conn.execute('COMMIT')
+        except Exception as e:
+            self.log.error(f'処理済の記録でエラー 段階: {stage} 件数: {len(rows)}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def claim(self, stock_code, date, stage, owner = None):
+        '''
+        銘柄・日付を処理中として取得する
+
+        処理済の場合や他のプロセスが処理中の場合は取得できない
+        ※処理中のまま一定時間(CLAIM_TIMEOUT_SECONDS)更新されていない場合は異常終了したとみなして取得する
+
+        Args:
+            stock_code(int or str): 証券コード
+            date(str): 日付(yyyy-mm-dd)
+            stage(str): 処理の段階(collect, merge)
+            owner(str or None): 処理するプロセスの識別子 ※Noneの場合はプロセスID
+
+        Returns:
+            bool: 取得できた場合True
+        '''
+        now = time.time()
+        owner = str(os.getpid()) if owner is None else owner
+
+        try:
+            with closing(self.connect()) as conn:
+                # BEGIN IMMEDIATEで書き込みロックを取ってから確認・更新する(同時に取得されないようにする)
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('SELECT status, updated_at FROM partition_state WHERE stage = ? AND stock_code = ? AND date = ?',
+                                   (stage, str(stock_code), date)).fetchone()
+                if row is not None and (row[0] == 'done' or now - row[1] < CLAIM_TIMEOUT_SECONDS):
+                    conn.execute('ROLLBACK')
+                    return False
+
+                conn.execute('INSERT OR REPLACE INTO partition_state VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (str(stock_code), date, stage, 'running', None, owner, now))
+                conn.execute('COMMIT')
+        except Exception as e:
+            self.log.error(f'処理中としての取得でエラー 段階: {stage} 証券コード: {stock_code} 日付: {date}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def release(self, partition_list, stage, owner = None):
+        '''
+        処理中として取得した銘柄・日付を解放する(処理に失敗した場合など)
+        ※処理済の行と他のプロセスが取得した行は削除しない
+
+        Args:
+            partition_list(list[tuple]): (証券コード, 日付)のリスト
+            stage(str): 処理の段階(collect, merge)
+            owner(str or None): 取得したプロセスの識別子 ※Noneの場合はプロセスID
+
+        Returns:
+            bool: 実行結果
+        '''
+        owner = str(os.getpid()) if owner is None else owner
+
+        try:
+            with closing(self.connect()) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany('DELETE FROM partition_state WHERE stage = ? AND stock_code = ? AND date = ? AND status = ? AND owner = ?',
+                                 [(stage, str(stock_code), date, 'running', owner) for stock_code, date in partition_list])
+                conn.execute('COMMIT')
+        except Exception as e:
+            self.log.error(f'処理中の解放でエラー 段階: {stage} 件数: {len(partition_list)}\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def delete_before(self, stage, date):
+        '''
+        指定の日付より前の記録を削除する
+
+        Args:
+            stage(str): 処理の段階(collect, merge)
+            date(str): 日付(yyyy-mm-dd) ※この日付の記録は残す
+
+        Returns:
+            bool: 実行結果
+            deleted_count(int): 削除した件数
+        '''
+        try:
+            with closing(self.connect()) as conn:
+                cursor = conn.execute('DELETE FROM partition_state WHERE stage = ? AND date < ?', (stage, date))
+                return True, cursor.rowcount
+        except Exception as e:
+            self.log.error(f'記録の削除でエラー 段階: {stage} 日付: {date}\n{str(e)}\n{traceback.format_exc()}')
+            return False, None
+
+    def import_csv(self, recorded_csv_path, check_csv_path):
+        '''
+        CSVで管理していた記録(recorded_ohlc.csv・check_past_ohlc.csv)を取り込む ※CSVファイルはそのまま残す
+
+        Args:
+            recorded_csv_path(str): recorded_ohlc.csvのパス(まとめ元のファイル名,まとめ先のファイル名)
+            check_csv_path(str): check_past_ohlc.csvのパス(stock_code,date)
+
+        Returns:
+            bool: 実行結果
+        '''
+        try:
+            if os.path.exists(recorded_csv_path):
+                # formatted_tmp_ohlc_yyyymmdd_[stock_code].csv -> (stock_code, yyyy-mm-dd)
+                merged_dict = {}
+                for csv_name, output in pd.read_csv(recorded_csv_path, header = None).itertuples(index = False):
+                    partition = self.parse_file_name(csv_name)
+                    if partition is not None:
+                        merged_dict.setdefault(output, []).append(partition)
+                for output, partition_list in merged_dict.items():
+                    self.mark_done(partition_list, 'merge', output)
+                self.log.info(f'recorded_ohlc.csvの記録を取り込みました 件数: {sum(len(partition_list) for partition_list in merged_dict.values())}')
+
+            if os.path.exists(check_csv_path):
+                check_df = pd.read_csv(check_csv_path)
+                self.mark_done(list(check_df[['stock_code', 'date']].itertuples(index = False, name = None)), 'collect')
+                self.log.info(f'check_past_ohlc.csvの記録を取り込みました 件数: {len(check_df)}')
+        except Exception as e:
+            self.log.error(f'CSVの記録の取り込みでエラー\n{str(e)}\n{traceback.format_exc()}')
+            return False
+
+        return True
+
+    def parse_file_name(self, file_name):
+        '''
+        成形途中のファイル名から証券コードと日付を取得する
+
+        Args:
+            file_name(str): ファイル名 例: formatted_tmp_ohlc_20240104_1301.csv
+
+        Returns:
+            partition(tuple or None): (証券コード, 日付(yyyy-mm-dd)) ※ファイル名の形式が違う場合はNone
+        '''
+        match = re.search(r'tmp_ohlc_(\d{4})(\d{2})(\d{2})_(\w{4})', file_name)
+        if match is None:
+            return None
+        return match.group(4), f'{match.group(1)}-{match.group(2)}-{match.group(3)}'
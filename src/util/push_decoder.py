@@ -0,0 +1,118 @@
+import json
+from datetime import datetime
+
+# JSONの変換はorjsonがインストールされている場合のみ使う(標準のjsonより数倍速い)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 1分足(四本値)の記録で使うPUSH配信の項目
+OHLC_FIELD_LIST = ['Symbol', 'CurrentPrice', 'TradingVolume', 'CurrentPriceTime']
+
+# PUSH配信の日時の形式(例: 2024-06-03T09:00:01+09:00)
+PUSH_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+class PushDecoder():
+    '''
+    kabuステーションAPIのPUSH配信のメッセージを記録に必要な項目のみの辞書に変換するクラス
+
+    寄り付き直後など受信が集中する時間帯に、json.loadsとdatetime.strptimeの処理時間が受信処理の大半を占めるため
+    orjsonがある場合はorjsonで変換し、日時は日付・タイムゾーンの部分を1日1回だけ変換して時分秒のみ毎回計算する
+
+    Memo:
+        日時の文字列の長さ・区切りが想定と異なる場合(タイムゾーンにコロンがない場合など)はdatetime.strptimeで変換する
+        変換後の日時はdatetime.strptimeで変換した場合と同じ値・タイムゾーンになる
+    '''
+    def __init__(self, log):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+        '''
+        self.log = log
+
+        # 日付・タイムゾーンの部分ごとの0時0分0秒の日時 {(日付部分, タイムゾーン部分): datetime}
+        self.date_cache = {}
+
+        # 直前に変換した日時(同じ秒のメッセージが続く場合はそのまま使う)
+        self.last_time_str = None
+        self.last_time = None
+
+    def loads(self, message):
+        '''
+        JSON文字列を変換する
+
+        Args:
+            message(str or bytes): 受信したメッセージ
+
+        Returns:
+            data(dict): 変換後のデータ
+        '''
+        if ORJSON_AVAILABLE:
+            return orjson.loads(message)
+        return json.loads(message)
+
+    def parse_time(self, time_str):
+        '''
+        PUSH配信の日時文字列をdatetime型に変換する
+
+        Args:
+            time_str(str): 日時文字列(yyyy-mm-ddThh:mm:ss+hh:mm)
+
+        Returns:
+            datetime: 変換後の日時(タイムゾーンあり)
+        '''
+        if time_str == self.last_time_str:
+            return self.last_time
+
+        # 形式が異なる場合は通常の変換を行う
+        if len(time_str) != 25 or time_str[10] != 'T' or time_str[13] != ':' or time_str[16] != ':':
+            return datetime.strptime(time_str, PUSH_TIME_FORMAT)
+
+        date_key = (time_str[:11], time_str[19:])
+        base_time = self.date_cache.get(date_key)
+        if base_time is None:
+            base_time = datetime.strptime(f'{date_key[0]}00:00:00{date_key[1]}', PUSH_TIME_FORMAT)
+
+            # 日付が変わるごとに増えるので、古い日付は残さない
+            if len(self.date_cache) >= 8:
+                self.date_cache.clear()
+            self.date_cache[date_key] = base_time
+
+        try:
+            parsed_time = base_time.replace(hour = int(time_str[11:13]), minute = int(time_str[14:16]), second = int(time_str[17:19]))
+        except ValueError:
+            return datetime.strptime(time_str, PUSH_TIME_FORMAT)
+
+        self.last_time_str, self.last_time = time_str, parsed_time
+        return parsed_time
+
+    def decode(self, message, field_list = None):
+        '''
+        PUSH配信のメッセージを必要な項目のみの辞書に変換する
+
+        CurrentPriceTimeはdatetime型に変換し、秒を切り捨てた時分をCurrentPriceMinuteとして追加する
+        ※現値データがない場合(CurrentPriceTimeがNone)はどちらもNone
+
+        Args:
+            message(str or bytes): 受信したメッセージ
+            field_list(list or None): 取り出す項目 ※Noneの場合はOHLC_FIELD_LIST
+
+        Returns:
+            reception_data(dict): 変換後のデータ ※メッセージにない項目はNone
+        '''
+        if field_list is None:
+            field_list = OHLC_FIELD_LIST
+
+        data = self.loads(message)
+        reception_data = {field: data.get(field) for field in field_list}
+
+        if 'CurrentPriceTime' in reception_data:
+            if reception_data['CurrentPriceTime'] is None:
+                reception_data['CurrentPriceMinute'] = None
+            else:
+                reception_data['CurrentPriceTime'] = self.parse_time(reception_data['CurrentPriceTime'])
+                reception_data['CurrentPriceMinute'] = reception_data['CurrentPriceTime'].replace(second = 0, microsecond = 0)
+
+        return reception_data
@@ -0,0 +1,270 @@
+import pandas as pd
+
+# データセットごとのカラムと型 上から順にCSVのカラム順
+# 型がNoneのカラムは型を指定しない(証券コードは数字のみの場合と英字を含む場合があるため)
+# 整数型のカラムに空の値がある場合、そのカラムのみ実数型で読み込む
+# datetimeのカラムは文字列として読み込み、parse_datesを指定した場合のみ日時型に変換する
+DATASET_LIST = {
+    # 米Yahoo!Financeから取得した四本値(csv/past_ohlc/ohlc_yyyymm.csv)
+    'ohlc': [
+        ('stock_code', None),
+        ('timestamp', 'datetime'),
+        ('open', 'float64'),
+        ('high', 'float64'),
+        ('low', 'float64'),
+        ('close', 'float64'),
+        ('volume', 'int64'),
+    ],
+    # 目的変数・説明変数を追加した四本値(csv/past_ohlc/formatted/formatted_ohlc_yyyymmdd.xxx)
+    # ※ここにないカラム(目的変数・説明変数)の型はFeatureDtypeのルールで決める
+    'formatted': [
+        ('stock_code', None),
+        ('timestamp', 'datetime'),
+        ('open', 'float32'),
+        ('high', 'float32'),
+        ('low', 'float32'),
+        ('close', 'float32'),
+        ('volume', 'int64'),
+        ('date', 'str'),
+        ('hour', 'int8'),
+        ('minute', 'int8'),
+        ('day_of_week', 'int8'),
+        ('get_minute', 'int16'),
+    ],
+    # 成形済データに対する予測結果(csv/pred/pred_[minute]min.csv) ※{minute}は予測する分数
+    'prediction': [
+        ('stock_code', None),
+        ('timestamp', 'datetime'),
+        ('open', 'float32'),
+        ('high', 'float32'),
+        ('low', 'float32'),
+        ('close', 'float32'),
+        ('volume', 'int64'),
+        ('change_{minute}min_flag', 'int8'),
+        ('change_{minute}min_price', 'float32'),
+        ('change_{minute}min_rate', 'float32'),
+        ('pred_change_{minute}min_rate', 'float32'),
+    ],
+    # 板情報取得APIのレスポンスを記録したCSV(csv/yyyymmdd_[stock_code].csv) ※Mold.response_to_csvで作成
+    'board': [
+        ('stock_code', None),
+        ('current_price', 'float64'),
+        ('current_price_change_status', 'str'),
+        ('current_price_status', 'int8'),
+        ('previous_close', 'float64'),
+        ('change_previous_close', 'float64'),
+        ('change_previous_close_per', 'float64'),
+        ('opening_price', 'float64'),
+        ('high_price', 'float64'),
+        ('high_price_time', 'datetime'),
+        ('low_price', 'float64'),
+        ('low_price_time', 'datetime'),
+        ('trading_volume', 'int64'),
+        ('VWAP', 'float64'),
+        ('bid_sign', 'str'),
+        ('market_order_sell_qty', 'int64'),
+        *[(f'bid_{item}_{i}', 'float64' if item == 'price' else 'int64') for i in range(1, 11) for item in ['price', 'qty']],
+        ('over_sell_qty', 'int64'),
+        ('ask_sign', 'str'),
+        ('market_order_buy_qty', 'int64'),
+        *[(f'ask_{item}_{i}', 'float64' if item == 'price' else 'int64') for i in range(1, 11) for item in ['price', 'qty']],
+        ('under_buy_qty', 'int64'),
+        ('get_year', 'int16'),
+        ('get_month', 'int8'),
+        ('get_day', 'int8'),
+        ('get_hour', 'int8'),
+        ('get_minute', 'int8'),
+    ],
+}
+
+class Schema():
+    '''
+    CSV・列指向形式で読み書きするデータセットのカラムと型を一元管理するクラス
+
+    読み込み時はカラムごとの型(dtype)・読み込むカラム(usecols)・日時に変換するカラムをここから指定し、
+    書き込み時はヘッダーのカラム順をここから取得する(型の推論をせず、小さい型で読み込む)
+
+    Memo:
+        データセット: ohlc(四本値), formatted(成形済), prediction(予測結果), board(板情報)
+        目的変数・説明変数の型はFeatureDtypeのルール(カラム名の正規表現)で決める
+    '''
+    def __init__(self, log, feature_dtype):
+        '''
+        Args:
+            log(Log): カスタムログクラスのインスタンス
+            feature_dtype(FeatureDtype): 説明変数・目的変数のカラムの型を扱うクラスのインスタンス
+        '''
+        self.log = log
+        self.feature_dtype = feature_dtype
+
+    def get_columns(self, dataset, **kwargs):
+        '''
+        データセットのカラム名をCSVのカラム順で取得する
+
+        Args:
+            dataset(str): データセット名(ohlc, formatted, prediction, board)
+            kwargs: カラム名の{}に埋め込む値 例: minute = 5
+
+        Returns:
+            columns(list): カラム名のリスト
+        '''
+        return [column.format(**kwargs) for column, _ in DATASET_LIST[dataset]]
+
+    def get_dtype(self, dataset, column, **kwargs):
+        '''
+        データセットのカラムの型を取得する
+
+        Args:
+            dataset(str): データセット名
+            column(str): カラム名
+            kwargs: カラム名の{}に埋め込む値
+
+        Returns:
+            dtype(str or None): 型 ※型を指定しないカラムはNone
+        '''
+        for schema_column, dtype in DATASET_LIST[dataset]:
+            if schema_column.format(**kwargs) == column:
+                return dtype
+
+        # 定義にないカラムは説明変数・目的変数として型を決める(板情報は指標のカラムを追加したもののみ)
+        return self.feature_dtype.get_dtype(column)
+
+    def get_dtype_dict(self, dataset, columns, **kwargs):
+        '''
+        pandas.read_csvのdtypeに指定する型の辞書を作成する
+
+        Args:
+            dataset(str): データセット名
+            columns(list): 読み込むカラム名のリスト
+            kwargs: カラム名の{}に埋め込む値
+
+        Returns:
+            dtype_dict(dict): {カラム名: 型} ※型を指定しないカラムは含まない、日時のカラムは文字列
+        '''
+        dtype_dict = {}
+        for column in columns:
+            dtype = self.get_dtype(dataset, column, **kwargs)
+            if dtype is not None:
+                dtype_dict[column] = 'str' if dtype == 'datetime' else dtype
+        return dtype_dict
+
+    def get_datetime_columns(self, dataset, columns, **kwargs):
+        '''
+        日時型に変換するカラム名を取得する
+
+        Args:
+            dataset(str): データセット名
+            columns(list): カラム名のリスト
+            kwargs: カラム名の{}に埋め込む値
+
+        Returns:
+            datetime_columns(list): 日時型に変換するカラム名のリスト
+        '''
+        return [column for column in columns if self.get_dtype(dataset, column, **kwargs) == 'datetime']
+
+    def read_csv(self, dataset, csv_path, columns = None, parse_dates = False, **kwargs):
+        '''
+        データセットの型を指定してCSVファイルを読み込む
+
+        Args:
+            dataset(str): データセット名(ohlc, formatted, prediction, board)
+            csv_path(str): CSVファイルのパス
+            columns(list or None): 読み込むカラム名 ※Noneの場合は全て、ファイルにないカラムは無視する
+            parse_dates(bool): 日時のカラムを日時型に変換するか
+            kwargs: pandas.read_csvに渡す引数(chunksizeなど)、カラム名の{}に埋め込む値(minute)
+
+        Returns:
+            df(pandas.DataFrame or generator): 読み込んだデータ ※chunksizeを指定した場合はチャンクごとのデータを返すジェネレータ
+        '''
+        format_kwargs = {'minute': kwargs.pop('minute')} if 'minute' in kwargs else {}
+
+        # ヘッダーのみ読み込んでカラムごとの型を決める
+        file_columns = pd.read_csv(csv_path, nrows = 0).columns.tolist()
+        read_columns = file_columns if columns is None else [column for column in file_columns if column in set(columns)]
+        dtype_dict = self.get_dtype_dict(dataset, read_columns, **format_kwargs)
+        usecols = None if columns is None else read_columns
+
+        if 'chunksize' in kwargs:
+            return self.read_csv_chunks(dataset, csv_path, dtype_dict, usecols, parse_dates, format_kwargs, kwargs)
+
+        try:
+            df = pd.read_csv(csv_path, dtype = dtype_dict, usecols = usecols, **kwargs)
+        except ValueError:
+            # 整数型のカラムに空の値がある場合は整数型を推論に任せて読み込み、空の値がないカラムのみ変換する
+            int_dtype_dict = {column: dtype for column, dtype in dtype_dict.items() if dtype.startswith('int')}
+            df = pd.read_csv(csv_path, dtype = {column: dtype for column, dtype in dtype_dict.items() if column not in int_dtype_dict},
+                             usecols = usecols, **kwargs)
+            df = self.cast_int_columns(df, int_dtype_dict)
+
+        if parse_dates:
+            df = self.parse_datetime(dataset, df, **format_kwargs)
+
+        return df
+
+    def read_csv_chunks(self, dataset, csv_path, dtype_dict, usecols, parse_dates, format_kwargs, kwargs):
+        '''
+        データセットの型を指定してCSVファイルをチャンクごとに読み込む
+
+        空の値があるかはチャンクを読むまで分からないため、整数型のカラムはチャンクごとに変換する
+
+        Args:
+            dataset(str): データセット名
+            csv_path(str): CSVファイルのパス
+            dtype_dict(dict): カラムごとの型
+            usecols(list or None): 読み込むカラム名
+            parse_dates(bool): 日時のカラムを日時型に変換するか
+            format_kwargs(dict): カラム名の{}に埋め込む値
+            kwargs(dict): pandas.read_csvに渡す引数
+
+        Yields:
+            df(pandas.DataFrame): チャンクごとのデータ
+        '''
+        int_dtype_dict = {column: dtype for column, dtype in dtype_dict.items() if dtype.startswith('int')}
+        reader = pd.read_csv(csv_path, dtype = {column: dtype for column, dtype in dtype_dict.items() if column not in int_dtype_dict},
+                             usecols = usecols, **kwargs)
+
+        for df in reader:
+            df = self.cast_int_columns(df, int_dtype_dict)
+            if parse_dates:
+                df = self.parse_datetime(dataset, df, **format_kwargs)
+            yield df
+
+    def cast_int_columns(self, df, int_dtype_dict):
+        '''
+        空の値がない整数型のカラムを指定の型に変換する
+
+        空の値があるカラムは実数型のまま(説明変数・目的変数はfloat32、それ以外はfloat64)にする
+
+        Args:
+            df(pandas.DataFrame): 変換するデータ
+            int_dtype_dict(dict): {カラム名: 整数型}
+
+        Returns:
+            df(pandas.DataFrame): 型を変換したデータ
+        '''
+        dtype_dict = {}
+        for column, dtype in int_dtype_dict.items():
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                continue
+            if df[column].isna().any():
+                dtype_dict[column] = 'float32' if dtype in ['int8', 'int16'] else 'float64'
+            else:
+                dtype_dict[column] = dtype
+
+        return df.astype(dtype_dict)
+
+    def parse_datetime(self, dataset, df, **kwargs):
+        '''
+        データセットの日時のカラムを日時型に変換する
+
+        Args:
+            dataset(str): データセット名
+            df(pandas.DataFrame): 変換するデータ
+            kwargs: カラム名の{}に埋め込む値
+
+        Returns:
+            df(pandas.DataFrame): 日時のカラムを変換したデータ
+        '''
+        for column in self.get_datetime_columns(dataset, df.columns, **kwargs):
+            df[column] = pd.to_datetime(df[column])
+        return df
@@ -1,3 +1,31 @@
+import numpy as np
+
+# 呼値グループごとの価格の区切りと呼値 [(区切りの価格(未満), 呼値), ...] ※kabuステーションAPIの呼値グループID
+PRICE_RANGE_LIST = {
+    10000: [
+        (3000, 1), (5000, 5), (30000, 10), (50000, 50), (300000, 100),
+        (500000, 500), (3000000, 1000), (5000000, 5000), (30000000, 10000),
+        (50000000, 50000), (float('inf'), 100000)
+    ],
+    10003: [
+        (1000, 0.1), (3000, 0.5), (10000, 1), (30000, 5), (100000, 10),
+        (300000, 50), (1000000, 100), (3000000, 500), (10000000, 1000),
+        (30000000, 5000), (float('inf'), 10000)
+    ],
+    10118: [(float('inf'), 10)],
+    10119: [(float('inf'), 5)],
+    10318: [
+        (100, 1), (1000, 5), (float('inf'), 10)
+    ],
+    10706: [(float('inf'), 0.25)],
+    10718: [(float('inf'), 0.5)],
+    12122: [(float('inf'), 5)],
+    14473: [(float('inf'), 1)],
+    14515: [(float('inf'), 0.05)],
+    15411: [(float('inf'), 1)],
+    15569: [(float('inf'), 0.5)],
+    17163: [(float('inf'), 0.5)],
+}
 
 class StockPrice():
     '''株価について計算するクラス'''
@@ -7,6 +35,9 @@ class StockPrice():
         self.yobine_group = 0
         self.yobine_list = []
 
+        # 呼値グループごとのティックの表(get_tick_indexで使用)
+        self.tick_ladder_dict = {}
+
     def set_yobine_group(self, yobine_group):
         '''
         KabusAPIで設定している独自の呼値グループIDをインスタンス変数に設定する
@@ -75,42 +106,70 @@ class StockPrice():
         # エンドポイントの返り値をそのまま引数に充てるとstrなのでintに変換する
         yobine_group = int(yobine_group)
 
-        price_ranges = {
-            10000: [
-                (3000, 1), (5000, 5), (30000, 10), (50000, 50), (300000, 100),
-                (500000, 500), (3000000, 1000), (5000000, 5000), (30000000, 10000),
-                (50000000, 50000), (float('inf'), 100000)
-            ],
-            10003: [
-                (1000, 0.1), (3000, 0.5), (10000, 1), (30000, 5), (100000, 10),
-                (300000, 50), (1000000, 100), (3000000, 500), (10000000, 1000),
-                (30000000, 5000), (float('inf'), 10000)
-            ],
-            10118: [(float('inf'), 10)],
-            10119: [(float('inf'), 5)],
-            10318: [
-                (100, 1), (1000, 5), (float('inf'), 10)
-            ],
-            10706: [(float('inf'), 0.25)],
-            10718: [(float('inf'), 0.5)],
-            12122: [(float('inf'), 5)],
-            14473: [(float('inf'), 1)],
-            14515: [(float('inf'), 0.05)],
-            15411: [(float('inf'), 1)],
-            15569: [(float('inf'), 0.5)],
-            17163: [(float('inf'), 0.5)],
-        }
-
         # yobine_groupが見つからない場合
-        if yobine_group not in price_ranges:
+        if yobine_group not in PRICE_RANGE_LIST:
             return False
 
-        for limit, range_value in price_ranges[yobine_group]:
+        for limit, range_value in PRICE_RANGE_LIST[yobine_group]:
             if price + 0.1 <= limit:
                 return range_value
 
         return False
 
+    def get_tick_ladder(self, yobine_group):
+        '''
+        呼値の区切りごとの開始価格・開始ティック数の表を作成する ※呼値グループごとに1回だけ作成する
+
+        Args:
+            yobine_group(int or str): 呼値グループ
+
+        Returns:
+            tick_ladder(tuple or False): (区切りの価格, 呼値, 開始価格, 0円からの開始ティック数)のnumpy配列
+                ※呼値グループが見つからない場合はFalse
+        '''
+        yobine_group = int(yobine_group)
+        if yobine_group not in PRICE_RANGE_LIST:
+            return False
+
+        if yobine_group not in self.tick_ladder_dict:
+            limits = np.array([limit for limit, _ in PRICE_RANGE_LIST[yobine_group]], dtype = np.float64)
+            ticks = np.array([range_value for _, range_value in PRICE_RANGE_LIST[yobine_group]], dtype = np.float64)
+            start_prices = np.concatenate([[0.0], limits[:-1]])
+            # 最後の区切り(上限なし)の幅は使わないので0にしておく
+            widths = np.concatenate([np.diff(start_prices) / ticks[:-1], [0.0]])
+            start_indexes = np.concatenate([[0.0], np.cumsum(widths)[:-1]])
+            self.tick_ladder_dict[yobine_group] = (limits, ticks, start_prices, start_indexes)
+
+        return self.tick_ladder_dict[yobine_group]
+
+    def get_tick_index(self, yobine_group, price):
+        '''
+        価格が0円から呼値の刻みで何ティック目かをまとめて計算する
+
+        2つの価格のティック数の差 - 1が価格間の板の枚数(get_empty_boardの結果)になるため、
+        1行ずつget_empty_boardを呼ぶ代わりにnumpy配列のまま計算できる
+        価格の区切りはget_price_rangeと同じ判定(価格 + 0.1が区切りの価格以下)で求める
+
+        Args:
+            yobine_group(int or str): 呼値グループ
+            price(numpy.ndarray): 価格 ※欠損値(nan)の場合はnanを返す
+
+        Returns:
+            tick_index(numpy.ndarray or False): ティック数 ※呼値グループが見つからない場合はFalse
+        '''
+        tick_ladder = self.get_tick_ladder(yobine_group)
+        if tick_ladder == False:
+            return False
+
+        limits, ticks, start_prices, start_indexes = tick_ladder
+        price = np.asarray(price, dtype = np.float64)
+
+        # 欠損値はsearchsortedで末尾の次になるので範囲内に収める(計算結果はnanのまま)
+        band = np.minimum(np.searchsorted(limits, price + 0.1, side = 'left'), len(limits) - 1)
+
+        # 呼値が小数の場合の丸め誤差を修正
+        return np.round(start_indexes[band] + (price - start_prices[band]) / ticks[band], 6)
+
     def get_empty_board(self, yobine_group, upper_price, lower_price):
         '''
         指定した価格間に板が何枚存在するか
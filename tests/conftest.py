@@ -0,0 +1,25 @@
+'''
+テスト共通の設定
+
+srcディレクトリをimportのパスに追加し、各テストで使うログのインスタンスを用意する
+config.pyがない環境ではconfig.py.sampleの設定値を使う
+'''
+import importlib.machinery
+import importlib.util
+import logging
+import os
+import sys
+import pytest
+
+src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path[:0] = [src_dir, os.path.join(src_dir, 'service')]
+
+if importlib.util.find_spec('config') is None:
+    loader = importlib.machinery.SourceFileLoader('config', os.path.join(src_dir, 'config.py.sample'))
+    config = importlib.util.module_from_spec(importlib.util.spec_from_loader('config', loader))
+    loader.exec_module(config)
+    sys.modules['config'] = config
+
+@pytest.fixture
+def log():
+    return logging.getLogger('test')
@@ -0,0 +1,56 @@
+'''
+FeatureManifestの指標の絞り込みのテスト
+'''
+import numpy as np
+import pandas as pd
+import pytest
+from util.feature_dtype import FeatureDtype
+from util.feature_manifest import FeatureManifest
+from util.feature_store import FeatureStore
+from util.frame_store import FrameStore
+from util.indicator import Indicator
+from util.indicator_cache import IndicatorCache
+from util.schema import Schema
+
+FEATURE_SPEC = {
+    1: [['sma', 5], ['sma', 25], ['sma', 75], ['ema', 5], ['ma_cross', 'ma_cross'], ['rsi', 14], ['psy', 12]],
+    5: [['sma', 5], ['rsi', 14]],
+}
+
+@pytest.fixture
+def indicator(log):
+    return Indicator(log)
+
+@pytest.fixture
+def price_df():
+    price = 1000 + np.cumsum(np.sin(np.arange(300) / 7) * 3)
+    return pd.DataFrame({'current_price': price})
+
+def test_filter_spec_without_required_columns(log):
+    assert FeatureManifest(log).filter_spec(FEATURE_SPEC, None) is FEATURE_SPEC
+
+def test_filter_spec_keeps_required_features(log):
+    filtered_spec = FeatureManifest(log).filter_spec(FEATURE_SPEC, ['rsi_1min_14piece', 'psy_1min_12piece'])
+    assert filtered_spec == {1: [['rsi', 14], ['psy', 12]]}
+
+def test_filter_spec_keeps_ma_for_cross(log):
+    filtered_spec = FeatureManifest(log).filter_spec(FEATURE_SPEC, ['sma_1min_5to25piece_diff'])
+
+    # クロスの計算に使う短期・長期の移動平均線のみ残り、使わない時間足は除かれる
+    assert filtered_spec == {1: [['sma', 5], ['sma', 25], ['ma_cross', 'ma_cross']]}
+
+def test_ma_for_cross_is_output(log, indicator, price_df):
+    filtered_spec = FeatureManifest(log).filter_spec(FEATURE_SPEC, ['sma_1min_5to25piece_diff'])
+    result, feature_df = indicator.get_features(price_df, filtered_spec)
+    assert result
+
+    # クロスの計算に使った移動平均線のカラムは一覧になくても出力される
+    assert list(feature_df.columns) == [
+        'sma_1min_5piece', 'sma_1min_25piece',
+        'sma_1min_5to25piece_golden_cross', 'sma_1min_5to25piece_golden_cross_after',
+        'sma_1min_5to25piece_dead_cross', 'sma_1min_5to25piece_dead_cross_after', 'sma_1min_5to25piece_diff',
+    ]
+
+    # 成形済ファイルの照合で移動平均線とクロスのカラムが定義と一致する
+    feature_store = FeatureStore(log, FrameStore(log, Schema(log, FeatureDtype(log))), FeatureManifest(log), IndicatorCache(log, indicator))
+    assert feature_store.get_mismatched_keys(filtered_spec, feature_df.columns) == []
@@ -0,0 +1,154 @@
+'''
+FeatureStore(成形済データの説明変数のバージョン管理)のテスト
+'''
+import numpy as np
+import pandas as pd
+import pytest
+import util.indicator
+from util.feature_dtype import FeatureDtype
+from util.feature_manifest import FeatureManifest
+from util.feature_store import MIXED_SIGNATURE, FeatureStore
+from util.frame_store import FrameStore
+from util.indicator import Indicator
+from util.indicator_cache import IndicatorCache
+from util.ohlc_generator import OhlcGenerator
+from util.schema import Schema
+
+FILE_NAME = 'formatted_ohlc_20240104.csv'
+
+FEATURE_SPEC = {1: [['sma', 5], ['sma', 25], ['ma_cross', 'ma_cross'], ['rsi', 14], ['psy', 12]], 5: [['macd', 12, 26, 9]]}
+
+@pytest.fixture
+def store(log, tmp_path):
+    store = FeatureStore(log, FrameStore(log, Schema(log, FeatureDtype(log))), FeatureManifest(log), IndicatorCache(log, Indicator(log)))
+    assert store.set_dir(str(tmp_path))
+    return store
+
+@pytest.fixture
+def calls(store, monkeypatch):
+    '''再計算した指標の定義の一覧'''
+    calls = []
+    get_features = store.indicator_cache.get_features
+
+    def spy(df, feature_spec, stock_code, date, price_column_name = 'current_price'):
+        calls.append(feature_spec)
+        return get_features(df, feature_spec, stock_code, date, price_column_name)
+
+    monkeypatch.setattr(store.indicator_cache, 'get_features', spy)
+    return calls
+
+def get_features(store, df, feature_spec):
+    '''銘柄・日付ごとに指標を計算して結合する'''
+    feature_df_list = []
+    for _, group_df in df.groupby(['stock_code', 'date'], sort = False):
+        result, feature_df = store.indicator_cache.indicator.get_features(group_df, feature_spec, 'close')
+        assert result
+        feature_df_list.append(feature_df)
+    return pd.concat(feature_df_list)
+
+def write_formatted(log, store, feature_spec, record = True):
+    '''2銘柄・1日分の成形済ファイルを出力する'''
+    df = OhlcGenerator(log).generate([1301, 1332], '2024-01-04', 1)
+    df['date'] = df['timestamp'].astype(str).str[:10]
+    df = pd.concat([df, get_features(store, df, feature_spec)], axis = 1)
+
+    file_path = f'{store.data_dir}/{FILE_NAME}'
+    store.frame_store.write(df, file_path)
+    if record:
+        assert store.record_append(file_path, feature_spec, True)
+    return file_path
+
+def assert_features(store, file_path, feature_spec):
+    '''ファイルの指標のカラムが、ファイルの四本値から計算し直した値と一致するか'''
+    df = store.frame_store.read(file_path)
+    expected = get_features(store, df, feature_spec)
+    pd.testing.assert_frame_equal(df[expected.columns], expected, check_dtype = False, rtol = 1e-4)
+
+def test_update_without_change(store, calls, log):
+    write_formatted(log, store, FEATURE_SPEC)
+
+    assert store.update(FEATURE_SPEC) == (True, 0)
+    assert calls == []
+
+def test_update_added_feature(store, calls, log):
+    file_path = write_formatted(log, store, FEATURE_SPEC)
+    columns = store.frame_store.get_columns(file_path)
+
+    # 追加した指標のみ計算して末尾に追加する
+    spec = {1: FEATURE_SPEC[1] + [['rci', 9]], 5: FEATURE_SPEC[5]}
+    assert store.update(spec) == (True, 1)
+    assert all(stale_spec == {1: [['rci', 9]]} for stale_spec in calls)
+    assert store.frame_store.get_columns(file_path) == columns + ['rci_1min_9piece']
+    assert_features(store, file_path, spec)
+
+    result, version = store.register_set(spec)
+    assert result and store.get_file_list(version) == [FILE_NAME]
+
+def test_update_ma_recalculates_cross(store, calls, log):
+    file_path = write_formatted(log, store, FEATURE_SPEC)
+
+    # 移動平均線を追加した場合はクロスも計算し直す
+    spec = {1: [['sma', 5], ['sma', 25], ['sma', 75], ['ma_cross', 'ma_cross'], ['rsi', 14], ['psy', 12]], 5: FEATURE_SPEC[5]}
+    assert store.update(spec) == (True, 1)
+    assert calls[0] == {1: [['sma', 5], ['sma', 25], ['sma', 75], ['ma_cross', 'ma_cross']]}
+    assert 'sma_1min_25to75piece_diff' in store.frame_store.get_columns(file_path)
+    assert_features(store, file_path, spec)
+
+def test_update_version_change(store, calls, log, monkeypatch):
+    file_path = write_formatted(log, store, FEATURE_SPEC)
+
+    # 計算ロジックのバージョンが変わった指標のみ計算し直す
+    monkeypatch.setitem(util.indicator.FEATURE_VERSION_LIST, 'macd', 2)
+    assert store.update(FEATURE_SPEC) == (True, 1)
+    assert calls[0] == {5: [['macd', 12, 26, 9]]}
+    assert store.get_file_state(FILE_NAME)['5min_macd_12_26_9'][1] == 'v2'
+    assert_features(store, file_path, FEATURE_SPEC)
+
+def test_update_prune(store, log):
+    file_path = write_formatted(log, store, FEATURE_SPEC)
+    spec = {1: [['sma', 5], ['sma', 25], ['ma_cross', 'ma_cross'], ['rsi', 14]], 5: FEATURE_SPEC[5]}
+
+    # pruneしない場合は定義から外した指標のカラムを残す
+    assert store.update(spec) == (True, 0)
+    assert 'psy_1min_12piece' in store.frame_store.get_columns(file_path)
+
+    # 以前のバージョンを指定した読み込みでは残したカラムを使える
+    result, old_version = store.register_set(FEATURE_SPEC)
+    assert result and store.get_file_list(old_version) == [FILE_NAME]
+
+    result, version = store.register_set(spec)
+    columns = store.frame_store.get_columns(file_path)
+    assert 'psy_1min_12piece' not in store.select_columns(FILE_NAME, version, columns)
+    assert 'psy_1min_12piece' in store.select_columns(FILE_NAME, old_version, columns)
+
+    # pruneする場合は定義にない指標のカラムと記録を削除する
+    assert store.update(spec, prune = True) == (True, 1)
+    assert 'psy_1min_12piece' not in store.frame_store.get_columns(file_path)
+    assert '1min_psy_12' not in store.get_file_state(FILE_NAME)
+    assert store.get_file_list(old_version) == []
+    assert_features(store, file_path, spec)
+
+def test_update_unrecorded_file(store, calls, log):
+    # 記録がないファイルはカラム名から指標を推定する
+    file_path = write_formatted(log, store, FEATURE_SPEC, record = False)
+    state = store.guess_file_state(store.frame_store.get_columns(file_path), FEATURE_SPEC)
+    assert state == store.get_signature_dict(FEATURE_SPEC)
+
+    spec = {1: FEATURE_SPEC[1] + [['bb', 20]], 5: FEATURE_SPEC[5]}
+    assert store.update(spec) == (True, 1)
+    assert all(stale_spec == {1: [['bb', 20]]} for stale_spec in calls)
+    assert set(store.get_file_state(FILE_NAME)) == set(store.get_signature_dict(spec))
+
+def test_record_append_mixed(store, log, monkeypatch):
+    file_path = write_formatted(log, store, FEATURE_SPEC)
+
+    # 既存のデータとシグネチャが異なる指標は、異なるシグネチャの行が混ざっているものとして記録する
+    monkeypatch.setitem(util.indicator.FEATURE_VERSION_LIST, 'rsi', 2)
+    assert store.record_append(file_path, FEATURE_SPEC, False)
+    state = store.get_file_state(FILE_NAME)
+    assert state['1min_rsi_14'][1] == MIXED_SIGNATURE
+    assert state['1min_psy_12'][1] == 'v1'
+
+    # 次回のupdateで計算し直す
+    assert store.update(FEATURE_SPEC) == (True, 1)
+    assert store.get_file_state(FILE_NAME)['1min_rsi_14'][1] == 'v2'
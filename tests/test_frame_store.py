@@ -0,0 +1,46 @@
+'''
+FrameStore(成形処理のデータの読み書き)のテスト
+'''
+import pandas as pd
+import pytest
+from util.feature_dtype import FeatureDtype
+from util.frame_store import FrameStore, PYARROW_AVAILABLE
+from util.schema import Schema
+
+FORMAT_LIST = ['csv'] + (['parquet', 'feather'] if PYARROW_AVAILABLE else [])
+
+@pytest.fixture
+def frame_store(log):
+    return FrameStore(log, Schema(log, FeatureDtype(log)))
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'stock_code': [1301, 1301, 1332], 'date': ['2024-01-04', '2024-01-05', '2024-01-04'],
+                         'open': [100.0, 101.0, 200.0], 'close': [101.0, 102.0, 199.0], 'sma_1min_5piece': [-1.0, 100.5, -1.0]})
+
+@pytest.mark.parametrize('file_format', FORMAT_LIST)
+def test_read_overlapping_columns(tmp_path, frame_store, df, file_format):
+    '''重複したカラムを指定しても各カラムは1つずつ、最初に指定した順で読み込む'''
+    frame_store.set_format(file_format)
+    file_path = str(tmp_path / f'formatted_ohlc_20240104{frame_store.get_extension()}')
+    frame_store.write(df, file_path)
+
+    feature_names = ['stock_code', 'close', 'sma_1min_5piece']
+    keep_columns = ['stock_code', 'date', 'open', 'close']
+    read_df = frame_store.read(file_path, columns = feature_names + keep_columns)
+
+    assert list(read_df.columns) == ['stock_code', 'close', 'sma_1min_5piece', 'date', 'open']
+    assert list(read_df[feature_names].columns) == feature_names
+    pd.testing.assert_frame_equal(read_df[keep_columns].reset_index(drop = True), df[keep_columns])
+
+@pytest.mark.parametrize('file_format', FORMAT_LIST)
+def test_read_overlapping_columns_with_filters(tmp_path, frame_store, df, file_format):
+    '''絞り込みに使うカラムを重複して指定しても1つずつ読み込む'''
+    frame_store.set_format(file_format)
+    file_path = str(tmp_path / f'formatted_ohlc_20240104{frame_store.get_extension()}')
+    frame_store.write(df, file_path)
+
+    read_df = frame_store.read(file_path, columns = ['stock_code', 'close', 'stock_code', 'missing'], filters = [('stock_code', '==', 1301)])
+
+    assert list(read_df.columns) == ['stock_code', 'close']
+    assert read_df['close'].tolist() == [101.0, 102.0]
@@ -0,0 +1,150 @@
+'''
+IndicatorCache(テクニカル指標のキャッシュ)のテスト
+'''
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import util.indicator
+from util.indicator import Indicator
+from util.indicator_cache import IndicatorCache, MAX_SEGMENT_COUNT
+
+FEATURE_SPEC = {1: [['sma', 5], ['sma', 25], ['ma_cross', 'ma_cross'], ['rsi', 14]], 3: [['macd', 12, 26, 9]]}
+
+@pytest.fixture
+def cache(log, tmp_path):
+    cache = IndicatorCache(log, Indicator(log))
+    cache.set_cache_dir(str(tmp_path / 'indicator_cache'))
+    return cache
+
+@pytest.fixture
+def calls(cache, monkeypatch):
+    '''get_feature_valuesで計算した定義の一覧'''
+    calls = []
+    get_feature_values = cache.indicator.get_feature_values
+
+    def spy(df, feature_spec, price_column_name = 'current_price'):
+        calls.append(feature_spec)
+        return get_feature_values(df, feature_spec, price_column_name)
+
+    monkeypatch.setattr(cache.indicator, 'get_feature_values', spy)
+    return calls
+
+def create_price_df(seed = 0):
+    price = np.round(1000 + np.cumsum(np.random.default_rng(seed).normal(0, 2, 300)), 1)
+    return pd.DataFrame({'current_price': price}, index = np.arange(300) + 500)
+
+def get_expected(cache, df, feature_spec):
+    result, expected = cache.indicator.get_features(df, feature_spec)
+    assert result
+    return expected
+
+def test_miss_then_hit(cache, calls):
+    df = create_price_df()
+
+    # 初回は全て計算してキャッシュに保存する
+    result, feature_df = cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')
+    assert result
+    pd.testing.assert_frame_equal(feature_df, get_expected(cache, df, FEATURE_SPEC))
+    assert len(calls) == 2 and os.path.exists(cache.get_cache_path(1301, '2024-01-04'))
+
+    # 2回目は計算せずに読み込み、同じ値になる
+    result, hit_df = cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')
+    assert result
+    assert len(calls) == 2
+    pd.testing.assert_frame_equal(hit_df, feature_df)
+
+def test_partial_hit_adds_segment(cache, calls):
+    df = create_price_df()
+    cache.get_features(df, {1: [['rsi', 14]]}, 1301, '2024-01-04')
+
+    # 未計算の指標のみ計算し、追加分は次の連番のファイルに保存する
+    result, feature_df = cache.get_features(df, {1: [['rsi', 14], ['psy', 12]]}, 1301, '2024-01-04')
+    assert result
+    assert calls[-1] == {1: [['psy', 12]]}
+    assert os.path.exists(cache.get_cache_path(1301, '2024-01-04', 1))
+    pd.testing.assert_frame_equal(feature_df, get_expected(cache, df, {1: [['rsi', 14], ['psy', 12]]}))
+
+def test_segments_are_compacted(cache):
+    df = create_price_df()
+    for window_size in range(2, 2 + MAX_SEGMENT_COUNT + 1):
+        assert cache.get_features(df, {1: [['rsi', window_size]]}, 1301, '2024-01-04')[0]
+
+    # ファイル数が上限に達した場合は1ファイルにまとめ直す
+    stock_dir = os.path.dirname(cache.get_cache_path(1301, '2024-01-04'))
+    assert sorted(os.listdir(stock_dir)) == ['20240104.npz']
+
+    spec = {1: [['rsi', window_size] for window_size in range(2, 2 + MAX_SEGMENT_COUNT + 1)]}
+    result, feature_df = cache.get_features(df, spec, 1301, '2024-01-04')
+    assert result
+    pd.testing.assert_frame_equal(feature_df, get_expected(cache, df, spec))
+
+def test_changed_input_is_recalculated(cache, calls):
+    cache.get_features(create_price_df(0), FEATURE_SPEC, 1301, '2024-01-04')
+
+    # 入力データが変わった場合はキャッシュを使わない
+    df = create_price_df(1)
+    result, feature_df = cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')
+    assert result
+    assert len(calls) == 2 and calls[-1] == FEATURE_SPEC
+    pd.testing.assert_frame_equal(feature_df, get_expected(cache, df, FEATURE_SPEC))
+
+def test_version_change_invalidates_feature(cache, calls, monkeypatch):
+    df = create_price_df()
+    cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')
+
+    # 計算ロジックのバージョンが変わった指標のみ計算し直す
+    monkeypatch.setitem(util.indicator.FEATURE_VERSION_LIST, 'rsi', 99)
+    assert cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')[0]
+    assert calls[-1] == {1: [['rsi', 14]]}
+
+    # 保存したバージョンと一致するので次は計算しない
+    assert cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')[0]
+    assert len(calls) == 2
+
+def test_ma_version_change_invalidates_cross(cache, calls, monkeypatch):
+    df = create_price_df()
+    cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')
+
+    # 移動平均線が変わった場合はクロスも合わせて計算し直す
+    monkeypatch.setitem(util.indicator.FEATURE_VERSION_LIST, 'sma', 99)
+    assert cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')[0]
+    assert calls[-1] == {1: [['sma', 5], ['sma', 25], ['ma_cross', 'ma_cross']]}
+
+def test_prune_removes_oldest(cache):
+    df = create_price_df()
+    for day, date in enumerate(['2024-01-04', '2024-01-05', '2024-01-09']):
+        cache.get_features(df, FEATURE_SPEC, 1301, date)
+        os.utime(cache.get_cache_path(1301, date), (1_700_000_000 + day, 1_700_000_000 + day))
+
+    result, cache_list = cache.get_cache_list()
+    assert result and [item['date'] for item in cache_list] == ['20240104', '20240105', '20240109']
+
+    # 最終利用日時の古いファイルから上限以下になるまで削除する
+    max_size_mb = (cache_list[1]['size'] + cache_list[2]['size']) / 1024 / 1024
+    result, deleted_list = cache.prune(max_size_mb)
+    assert result and deleted_list == [cache_list[0]['path']]
+
+    result, deleted_list = cache.prune(0)
+    assert result and len(deleted_list) == 2
+    assert cache.get_cache_list() == (True, [])
+
+def test_max_size_evicts_on_write(cache):
+    df = create_price_df()
+    cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')
+    size = cache.get_cache_list()[1][0]['size']
+
+    # 上限を超えた書き込みで古いファイルが削除される
+    cache.set_cache_dir(cache.cache_dir, size * 1.5 / 1024 / 1024)
+    os.utime(cache.get_cache_path(1301, '2024-01-04'), (1_700_000_000, 1_700_000_000))
+    cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-05')
+
+    assert [item['date'] for item in cache.get_cache_list()[1]] == ['20240105']
+
+def test_without_cache_dir(cache, calls):
+    cache.set_cache_dir(None)
+    df = create_price_df()
+    result, feature_df = cache.get_features(df, FEATURE_SPEC, 1301, '2024-01-04')
+    assert result
+    pd.testing.assert_frame_equal(feature_df, get_expected(cache, df, FEATURE_SPEC))
+    assert cache.get_cache_list() == (True, [])
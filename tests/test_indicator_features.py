@@ -0,0 +1,82 @@
+'''
+Indicator.get_features(複数の時間足の指標の一括計算)のテスト
+'''
+import numpy as np
+import pandas as pd
+import pytest
+from util.indicator import Indicator
+
+FEATURE_SPEC = {
+    1: [['sma', 5], ['sma', 25], ['ema', 5], ['ema', 25], ['ma_cross', 'ma_cross'], ['bb', 20], ['rsi', 14], ['rci', 9], ['psy', 12],
+        ['sar_hlc', 0.02, 0.2], ['macd', 12, 26, 9], ['ichimoku', 9, 26], ['change', 'change']],
+    3: [['wma', 5], ['wma', 10], ['ma_cross', 'ma_cross'], ['rsi', 14], ['sar', 0.02, 0.2], ['macd', 12, 26, 9], ['change', 'change']],
+}
+
+@pytest.fixture
+def indicator(log):
+    return Indicator(log)
+
+@pytest.fixture
+def price_df():
+    '''時系列で連続した価格のデータ(indexは0始まりでない)'''
+    price = np.round(1000 + np.cumsum(np.sin(np.arange(400) / 9) * 4), 1)
+    return pd.DataFrame({'current_price': price, 'close': price, 'high': price + 2, 'low': price - 2}, index = np.arange(400) + 1000)
+
+def merge_each(indicator, df, feature_spec):
+    '''get_xxxを1つずつ呼んで指標のカラムを追加する'''
+    for interval, features in feature_spec.items():
+        for kind, *params in features:
+            prefix = f'{kind}_{interval}min_{params[0]}piece'
+            if kind == 'sma':
+                result, df = indicator.get_sma(df, prefix, params[0], interval)
+            elif kind == 'ema':
+                result, df = indicator.get_ema(df, prefix, params[0], interval)
+            elif kind == 'wma':
+                result, df = indicator.get_wma(df, prefix, params[0], interval)
+            elif kind == 'ma_cross':
+                result, df = indicator.get_ma_cross(df, interval)
+            elif kind == 'bb':
+                result, df = indicator.get_bollinger_bands(df, prefix, params[0], interval)
+            elif kind == 'rsi':
+                result, df = indicator.get_rsi(df, prefix, params[0], interval)
+            elif kind == 'rci':
+                result, df = indicator.get_rci(df, prefix, params[0], interval)
+            elif kind == 'psy':
+                result, df = indicator.get_psy(df, prefix, params[0], interval)
+            elif kind == 'sar':
+                result, df = indicator.get_parabolic(df, f'sar_{interval}min_{params[0]}_{params[1]}af', params[0], params[1], interval)
+            elif kind == 'sar_hlc':
+                result, df = indicator.get_parabolic_hlc(df, f'sar_{interval}min_{params[0]}_{params[1]}af', params[0], params[1], interval)
+            elif kind == 'macd':
+                result, df = indicator.get_macd(df, f'macd_{interval}min', params[0], params[1], params[2], interval)
+            elif kind == 'ichimoku':
+                result, df = indicator.get_ichimoku_cloud(df, f'ichimoku_{interval}min', params[0], params[1], interval)
+            elif kind == 'change':
+                result, df = indicator.get_change_price(df, f'change_{interval}min', interval)
+            assert result
+
+    return df
+
+def test_get_features_matches_each_method(indicator, price_df):
+    result, feature_df = indicator.get_features(price_df, FEATURE_SPEC)
+    assert result
+
+    # get_xxxを1つずつ呼んでマージした場合と同じカラム・並び・値になる
+    expected = merge_each(indicator, price_df, FEATURE_SPEC).drop(columns = price_df.columns)
+    pd.testing.assert_frame_equal(feature_df, expected, check_dtype = False)
+
+def test_get_features_column_order(indicator, price_df):
+    result, feature_df = indicator.get_features(price_df, {1: [['rsi', 14], ['sma', 5]], 5: [['sma', 5]]})
+    assert result
+    assert list(feature_df.columns) == ['rsi_1min_14piece', 'sma_1min_5piece', 'sma_5min_5piece']
+
+def test_get_feature_values_columns(indicator, price_df):
+    result, values, feature_columns = indicator.get_feature_values(price_df, {1: [['sma', 5], ['sma', 25], ['ma_cross', 'ma_cross']]})
+    assert result
+
+    # 指標のキーごとに追加したカラムがまとまり、全て値に含まれる
+    assert [column for columns in feature_columns.values() for column in columns] == list(values.keys())
+    assert all(len(value) == len(price_df) for value in values.values())
+
+def test_get_features_invalid_kind(indicator, price_df):
+    assert indicator.get_features(price_df, {1: [['unknown', 5]]}) == (False, None)
@@ -0,0 +1,241 @@
+'''
+テクニカル指標のベクトル化した計算(Indicator)が、置き換える前のrolling().apply / apply(lambda)の計算と同じ値になるかのテスト
+
+置き換え前の計算はLegacyIndicatorに残し、固定シードの乱数で作成した価格で両方を計算して比較する
+
+Usage:
+    python -m pytest tests/test_indicator_parity.py
+'''
+import logging
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from util.indicator import Indicator
+
+# 比較する時間足(何分足)
+INTERVAL_LIST = [1, 3, 5]
+
+class LegacyIndicator():
+    '''
+    ベクトル化する前のIndicatorの計算(比較用)
+
+    ※fillna(method = 'ffill', inplace = True)は同じ値になるffill()に置き換えている
+    '''
+    def resample(self, df, price_column_name, interval):
+        '''何分足の設定かに応じてデータをリサンプリング'''
+        if interval > 1:
+            return df[[price_column_name]].iloc[::interval, :].copy()
+        return df[[price_column_name]].copy()
+
+    def merge(self, df, df_resampled, add_columns):
+        '''元のデータフレームにリサンプリングされたデータをマージし、リサンプリングされていない行を直前の値で埋める'''
+        df = df.merge(df_resampled[add_columns], left_index = True, right_index = True, how = 'left')
+        for column in add_columns:
+            df[column] = df[column].ffill()
+        return df
+
+    def get_wma(self, df, column_name, window_size, interval, price_column_name = 'current_price'):
+        df_resampled = self.resample(df, price_column_name, interval)
+
+        weights = np.arange(1, window_size + 1)
+        df_resampled[column_name] = df_resampled[price_column_name].rolling(window = window_size).apply(lambda x: np.dot(x, weights) / weights.sum(), raw = True).round(1)
+        df_resampled[column_name] = df_resampled[column_name].fillna(-1)
+
+        return self.merge(df, df_resampled, [column_name])
+
+    def get_rsi(self, df, column_name, window_size, interval, price_column_name = 'current_price'):
+        df_resampled = self.resample(df, price_column_name, interval)
+
+        df_resampled['diff'] = df_resampled[price_column_name].diff()
+        df_resampled['up'] = df_resampled['diff'].apply(lambda x: x if x > 0 else 0)
+        df_resampled['down'] = df_resampled['diff'].apply(lambda x: abs(x) if x < 0 else 0)
+        df_resampled['up_mean'] = df_resampled['up'].rolling(window = window_size).mean()
+        df_resampled['down_mean'] = df_resampled['down'].rolling(window = window_size).mean()
+
+        if df_resampled['down_mean'].isna().all() or df_resampled['up_mean'].isna().all():
+            df_resampled[column_name] = None
+        elif df_resampled['down_mean'].sum() == 0:
+            if df_resampled['up_mean'].sum() == 0:
+                df_resampled[column_name] = 50
+            else:
+                df_resampled[column_name] = 100
+        else:
+            df_resampled[column_name] = (100 - 100 / (1 + df_resampled['up_mean'] / df_resampled['down_mean'])).round(2)
+
+        return self.merge(df, df_resampled, [column_name])
+
+    def get_macd(self, df, column_name, short_window_size, long_window_size, signal_window_size, interval, price_column_name = 'current_price'):
+        df_resampled = self.resample(df, price_column_name, interval)
+
+        macd = column_name
+        macd_signal = f'{macd}_signal'
+        macd_histogram = f'{macd}_diff'
+        add_columns = []
+
+        short_ema = df_resampled[price_column_name].ewm(span = short_window_size).mean()
+        long_ema = df_resampled[price_column_name].ewm(span = long_window_size).mean()
+        df_resampled[macd] = (short_ema - long_ema).round(2)
+        add_columns.append(macd)
+
+        df_resampled[macd_signal] = df_resampled[macd].ewm(span = signal_window_size).mean().round(2)
+        add_columns.append(macd_signal)
+
+        df_resampled[macd_histogram] = (df_resampled[macd] - df_resampled[macd_signal]).round(3)
+        df_resampled[f'{macd_histogram}_flag'] = df_resampled[macd_histogram].apply(lambda x: 1 if x > 0 else 0)
+        add_columns.extend([macd_histogram, f'{macd_histogram}_flag'])
+
+        df_resampled[f'{macd}_cross'] = 0
+        df_resampled.loc[(df_resampled[macd] > df_resampled[macd_signal]) & (df_resampled[macd].shift() < df_resampled[macd_signal].shift()), f'{macd}_cross'] = 1
+        df_resampled.loc[(df_resampled[macd] < df_resampled[macd_signal]) & (df_resampled[macd].shift() > df_resampled[macd_signal].shift()), f'{macd}_cross'] = -1
+        add_columns.append(f'{macd}_cross')
+
+        for count in [1, 3, 5, 10]:
+            if interval * count >= 300:
+                continue
+            df_resampled[f'{macd}_{count}_slope'] = (df_resampled[macd].diff(count)).round(3)
+            df_resampled[f'{macd_signal}_{count}_slope'] = (df_resampled[macd_signal].diff(count)).round(3)
+            add_columns.extend([f'{macd}_{count}_slope', f'{macd_signal}_{count}_slope'])
+
+        df_resampled[f'{macd}_mismatch'] = (df_resampled[macd].diff() * df_resampled[price_column_name].diff()).apply(lambda x: 1 if x < 0 else 0)
+        add_columns.append(f'{macd}_mismatch')
+
+        df_resampled[f'{macd}_mismatch_count'] = df_resampled[f'{macd}_mismatch'].groupby((df_resampled[f'{macd}_mismatch'] != df_resampled[f'{macd}_mismatch'].shift()).cumsum()).cumcount() + 1
+        df_resampled.loc[df_resampled[f'{macd}_mismatch'] == 0, f'{macd}_mismatch_count'] = 0
+        add_columns.append(f'{macd}_mismatch_count')
+
+        return self.merge(df, df_resampled, add_columns)
+
+    def get_psy(self, df, column_name, window_size, interval, price_column_name = 'current_price'):
+        df_resampled = self.resample(df, price_column_name, interval)
+
+        df_resampled['diff'] = df_resampled[price_column_name].diff()
+        df_resampled['up'] = df_resampled['diff'].apply(lambda x: 1 if x > 0 else 0)
+        df_resampled[column_name] = (df_resampled['up'].rolling(window = window_size).sum() / window_size * 100).round(1)
+
+        return self.merge(df, df_resampled, [column_name])
+
+    def get_change_price(self, df, column_name, interval):
+        df_resampled = df[['current_price']].copy()
+
+        change_price = f'{column_name}_price'
+        change_rate = f'{column_name}_rate'
+        change_flag = f'{column_name}_flag'
+        add_columns = [change_price, change_rate, change_flag]
+
+        df_resampled[change_price] = df_resampled['current_price'].shift(-interval) - df_resampled['current_price']
+        df_resampled[change_rate] = df_resampled[change_price] / df_resampled['current_price']
+        df_resampled[change_flag] = df_resampled[change_rate].apply(lambda x: None if pd.isna(x) else (0 if x == 0 else (1 if x > 0 else -1)))
+
+        return self.merge(df, df_resampled, add_columns)
+
+def create_price_list():
+    '''
+    比較に使う価格を作成する
+
+    Returns:
+        price_list(list[numpy.ndarray]): 1円刻み・0.5円刻み・0.1円単位の不規則な値動き、一定値が続く価格、上昇のみの価格
+    '''
+    rng = np.random.default_rng(20240104)
+    price_list = []
+    for _ in range(4):
+        length = int(rng.integers(60, 400))
+        price_list.append(1000.0 + np.cumsum(rng.integers(-3, 4, length)))
+        price_list.append(np.round(3000 + np.cumsum(rng.integers(-2, 3, length)) * 0.5, 1))
+        price_list.append(np.round(500 + np.cumsum(rng.normal(0, 0.7, length)), 1))
+    price_list.append(np.full(120, 1500.0))
+    price_list.append(1000.0 + np.arange(120))
+    return price_list
+
+PRICE_LIST = create_price_list()
+
+@pytest.fixture(scope = 'module')
+def indicator():
+    return Indicator(logging.getLogger(__name__))
+
+@pytest.fixture(scope = 'module')
+def legacy():
+    return LegacyIndicator()
+
+def to_frame(price):
+    '''価格からIndicatorに渡すDataFrameを作成する'''
+    return pd.DataFrame({'current_price': price, 'close': price, 'high': price + 1, 'low': price - 1})
+
+def assert_same_frame(expected, actual):
+    '''カラムの並びとNaNの位置を含めて値が完全に一致するか'''
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        if expected[column].dtype == object or actual[column].dtype == object:
+            assert actual[column].equals(expected[column]), column
+        else:
+            np.testing.assert_array_equal(actual[column].to_numpy(dtype = float), expected[column].to_numpy(dtype = float), err_msg = column)
+
+@pytest.mark.parametrize('price_index', range(len(PRICE_LIST)))
+@pytest.mark.parametrize('interval', INTERVAL_LIST)
+def test_rsi(indicator, legacy, price_index, interval):
+    df = to_frame(PRICE_LIST[price_index])
+    for window_size in [9, 14]:
+        result, actual = indicator.get_rsi(df, 'rsi', window_size, interval)
+        assert result
+        assert_same_frame(legacy.get_rsi(df, 'rsi', window_size, interval), actual)
+
+@pytest.mark.parametrize('price_index', range(len(PRICE_LIST)))
+@pytest.mark.parametrize('interval', INTERVAL_LIST)
+def test_psy(indicator, legacy, price_index, interval):
+    df = to_frame(PRICE_LIST[price_index])
+    for window_size in [10, 12]:
+        result, actual = indicator.get_psy(df, 'psy', window_size, interval)
+        assert result
+        assert_same_frame(legacy.get_psy(df, 'psy', window_size, interval), actual)
+
+@pytest.mark.parametrize('price_index', range(len(PRICE_LIST)))
+@pytest.mark.parametrize('interval', INTERVAL_LIST)
+def test_macd(indicator, legacy, price_index, interval):
+    df = to_frame(PRICE_LIST[price_index])
+    result, actual = indicator.get_macd(df, 'macd', 12, 26, 9, interval)
+    assert result
+    assert_same_frame(legacy.get_macd(df, 'macd', 12, 26, 9, interval), actual)
+
+@pytest.mark.parametrize('price_index', range(len(PRICE_LIST)))
+@pytest.mark.parametrize('interval', INTERVAL_LIST)
+def test_change_price(indicator, legacy, price_index, interval):
+    df = to_frame(PRICE_LIST[price_index])
+    result, actual = indicator.get_change_price(df, 'change', interval)
+    assert result
+    assert_same_frame(legacy.get_change_price(df, 'change', interval), actual)
+
+@pytest.mark.parametrize('price_index', range(len(PRICE_LIST)))
+@pytest.mark.parametrize('interval', INTERVAL_LIST)
+def test_wma(indicator, legacy, price_index, interval):
+    '''
+    WMAは丸める前の値がちょうど小数第2位が5になる(丸めの境界)場合のみ0.1ずれることを許容する
+
+    畳み込み(np.convolve)とnp.dotでは加算順序が異なるため、丸める前の値が最後の1ビットずれることがあり、
+    境界の値では丸め結果が変わる np.dotの加算順序はBLASの実装に依存するため、ベクトル化して合わせることはしない
+    '''
+    price = PRICE_LIST[price_index]
+    df = to_frame(price)
+    for window_size in [3, 5, 10, 15]:
+        result, actual = indicator.get_wma(df, 'wma', window_size, interval)
+        assert result
+        expected = legacy.get_wma(df, 'wma', window_size, interval)
+        assert list(actual.columns) == list(expected.columns)
+
+        expected_values = expected['wma'].to_numpy(dtype = float)
+        actual_values = actual['wma'].to_numpy(dtype = float)
+        mismatch = expected_values != actual_values
+        if not mismatch.any():
+            continue
+
+        # ずれた位置の丸める前の値(np.dotで計算)が丸めの境界にあり、差が0.1以下であること
+        weights = np.arange(1, window_size + 1)
+        resampled = price[::interval]
+        raw_values = np.array([np.nan] * (window_size - 1) + [np.dot(resampled[i - window_size + 1:i + 1], weights) / weights.sum()
+                                                             for i in range(window_size - 1, len(resampled))])
+        raw_values = pd.Series(raw_values, index = df.index[::interval]).reindex(df.index).ffill().to_numpy()
+        fraction = np.abs(raw_values[mismatch] * 10 - np.floor(raw_values[mismatch] * 10) - 0.5)
+        assert (fraction < 1e-6).all()
+        assert (np.abs(expected_values[mismatch] - actual_values[mismatch]) < 0.1 + 1e-9).all()
@@ -0,0 +1,98 @@
+'''
+MessageCapture(受信データのキャプチャ・再生)のテスト
+'''
+import asyncio
+import gzip
+import os
+import time
+import pytest
+from util.message_capture import RECORD_HEADER, MessageCapture
+
+MESSAGE_LIST = [(1_717_372_800.0 + index * 0.25, f'{{"Symbol": "1301", "CurrentPrice": {3000 + index}, "text": "板情報{index}"}}')
+                for index in range(200)]
+
+@pytest.fixture
+def capture(log):
+    return MessageCapture(log)
+
+def write_all(capture, capture_dir, segment_size_mb = 256):
+    assert capture.open(str(capture_dir), 'push', segment_size_mb)
+    for receive_time, message in MESSAGE_LIST:
+        assert capture.write(message, receive_time)
+    capture.close()
+    return capture.get_segment_list(str(capture_dir), 'push')
+
+def test_round_trip(capture, tmp_path):
+    segment_list = write_all(capture, tmp_path)
+    assert len(segment_list) == 1 and not capture.is_open()
+
+    # 文字列は UTF-8 のバイト列として、受信時刻とともに記録した順に読み込める
+    assert list(capture.read(segment_list)) == [(receive_time, message.encode('utf-8')) for receive_time, message in MESSAGE_LIST]
+
+def test_segment_rotation(capture, tmp_path):
+    # 上限サイズに達したら次の連番のファイルに切り替え、まとめて読むと記録した順になる
+    segment_list = write_all(capture, tmp_path, segment_size_mb = 2000 / 1024 / 1024)
+    assert len(segment_list) > 1
+    assert [os.path.basename(path)[-11:-7] for path in segment_list] == [f'{number:04}' for number in range(1, len(segment_list) + 1)]
+    assert [message for _, message in capture.read(segment_list)] == [message.encode('utf-8') for _, message in MESSAGE_LIST]
+
+    # 同じ日に開き直した場合は追記せずに次の連番にする
+    assert capture.open(str(tmp_path), 'push')
+    capture.close()
+    assert len(capture.get_segment_list(str(tmp_path), 'push')) == len(segment_list) + 1
+    assert capture.get_segment_list(str(tmp_path), 'board') == []
+
+def test_truncated_compressed_file(capture, tmp_path):
+    path = write_all(capture, tmp_path)[0]
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    # 圧縮データの途中で切れたファイルは、読める所までの受信データを返す
+    expected = [(receive_time, message.encode('utf-8')) for receive_time, message in MESSAGE_LIST]
+    for length in [10, len(data) // 3, len(data) // 2, len(data) - 1]:
+        truncated_path = tmp_path / 'truncated.cap.gz'
+        truncated_path.write_bytes(data[:length])
+        read_list = list(capture.read([str(truncated_path)]))
+        assert read_list == expected[:len(read_list)]
+
+@pytest.mark.parametrize('cut_size', [3, RECORD_HEADER.size, RECORD_HEADER.size + 5])
+def test_truncated_record(capture, tmp_path, cut_size):
+    # 最後の1件がヘッダー・メッセージの途中までしかない場合は、その前までを返して次のファイルを読む
+    first_path, second_path = tmp_path / 'first.cap.gz', tmp_path / 'second.cap.gz'
+    record_list = [RECORD_HEADER.pack(receive_time, len(message.encode('utf-8'))) + message.encode('utf-8') for receive_time, message in MESSAGE_LIST[:3]]
+    with gzip.open(first_path, 'wb') as f:
+        f.write(b''.join(record_list[:2]) + record_list[2][:cut_size])
+    with gzip.open(second_path, 'wb') as f:
+        f.write(record_list[2])
+
+    read_list = list(capture.read([str(first_path), str(second_path)]))
+    assert [receive_time for receive_time, _ in read_list] == [receive_time for receive_time, _ in MESSAGE_LIST[:3]]
+
+def test_write_without_open(capture):
+    assert not capture.write('{}')
+
+def test_replay(capture, tmp_path):
+    segment_list = write_all(capture, tmp_path)
+    assert [message for _, message in capture.replay(segment_list)] == [message.encode('utf-8') for _, message in MESSAGE_LIST]
+
+def test_wait_seconds(capture):
+    # 再生開始からの経過時間を引いた、受信時刻の間隔÷再生速度だけ待つ
+    start_time = time.monotonic()
+    assert capture.get_wait_seconds(MESSAGE_LIST[4][0], MESSAGE_LIST[0][0], start_time, 100) == pytest.approx(0.01, abs = 1e-3)
+    assert capture.get_wait_seconds(MESSAGE_LIST[4][0], MESSAGE_LIST[0][0], start_time - 1, 100) < 0
+    assert capture.get_wait_seconds(MESSAGE_LIST[4][0], MESSAGE_LIST[0][0], start_time, None) == 0
+
+def test_replay_socket(capture, tmp_path):
+    segment_list = write_all(capture, tmp_path)
+
+    async def receive_all():
+        message_list = []
+        async with capture.get_replay_socket(segment_list) as socket:
+            with pytest.raises(TimeoutError):
+                while True:
+                    message_list.append(await socket.recv())
+        return message_list, socket.count
+
+    message_list, count = asyncio.run(receive_all())
+    assert message_list == [message.encode('utf-8') for _, message in MESSAGE_LIST]
+    assert count == len(MESSAGE_LIST)
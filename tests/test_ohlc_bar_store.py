@@ -0,0 +1,88 @@
+'''
+OhlcBarStore(PUSH配信から作成中の1分足の保持)のテスト
+'''
+import random
+from datetime import datetime, timedelta
+import pytest
+from util.ohlc_bar_store import OhlcBarStore
+
+START_TIME = datetime(2024, 1, 4, 9, 0)
+
+@pytest.fixture
+def store(log):
+    return OhlcBarStore(log)
+
+def create_bar(symbol, minute, volume = 0):
+    return {'symbol': symbol, 'trade_time': START_TIME + timedelta(minutes = minute), 'volume': volume}
+
+def test_put_and_get(store):
+    store.put(create_bar('1301', 0, 100))
+    store.put(create_bar('1332', 0, 200))
+    store.put(create_bar('1301', 1, 300))
+
+    assert len(store) == 3
+    assert store.get('1301', START_TIME)['volume'] == 100
+    assert store.get('1301', START_TIME + timedelta(minutes = 2)) is None
+    assert store.get_latest('1301')['volume'] == 300
+    assert store.get_latest('1333') is None
+
+def test_put_replaces_and_moves_to_end(store):
+    store.put(create_bar('1301', 0, 100))
+    store.put(create_bar('1332', 0, 200))
+    store.put(create_bar('1301', 0, 150))
+
+    # 置き換えた足は更新した順の末尾に移動する
+    assert len(store) == 2
+    assert [(bar['symbol'], bar['volume']) for bar in store.values()] == [('1332', 200), ('1301', 150)]
+
+def test_latest_ignores_older_bar(store):
+    store.put(create_bar('1301', 2, 300))
+    store.put(create_bar('1301', 1, 200))
+
+    # 取引時間が古い足を後から更新しても最新の足は変わらない
+    assert store.get_latest('1301')['volume'] == 300
+
+def test_get_until(store):
+    for minute in [2, 0, 1, 3]:
+        store.put(create_bar('1301', minute, minute))
+    store.put(create_bar('1332', 0, 10))
+
+    assert [bar['volume'] for bar in store.get_until('1301', START_TIME + timedelta(minutes = 1))] == [0, 1]
+    assert store.get_until('1333', START_TIME) == []
+
+def test_remove(store):
+    for minute in range(3):
+        store.put(create_bar('1301', minute, minute))
+
+    # 最新の足を削除した場合は残っている足から選び直す
+    store.remove('1301', START_TIME + timedelta(minutes = 2))
+    assert store.get_latest('1301')['volume'] == 1
+
+    # 存在しない足の削除は何もしない
+    store.remove('1301', START_TIME + timedelta(minutes = 2))
+    store.remove('1333', START_TIME)
+
+    store.remove('1301', START_TIME)
+    store.remove('1301', START_TIME + timedelta(minutes = 1))
+    assert len(store) == 0 and store.get_latest('1301') is None and store.get_until('1301', START_TIME) == []
+
+def test_matches_list_implementation(store):
+    '''リストで保持していた時の処理(同一時分の置き換え・最新の足の取得・削除)と同じ結果になる'''
+    bar_list = []
+    rng = random.Random(0)
+
+    for volume in range(3000):
+        symbol, minute = rng.choice(['1301', '1332', '1333']), rng.randrange(10)
+        if rng.random() < 0.2:
+            trade_time = START_TIME + timedelta(minutes = minute)
+            bar_list = [bar for bar in bar_list if not (bar['symbol'] == symbol and bar['trade_time'] == trade_time)]
+            store.remove(symbol, trade_time)
+        else:
+            bar = create_bar(symbol, minute, volume)
+            bar_list = [item for item in bar_list if not (item['symbol'] == symbol and item['trade_time'] == bar['trade_time'])] + [bar]
+            store.put(bar)
+
+        symbol_bar_list = [bar for bar in bar_list if bar['symbol'] == symbol]
+        expected_latest = max(symbol_bar_list, key = lambda bar: bar['trade_time']) if len(symbol_bar_list) != 0 else None
+        assert store.get_latest(symbol) is expected_latest
+        assert store.values() == bar_list
@@ -0,0 +1,116 @@
+'''
+OhlcWriter(1分足の四本値テーブルへの書き込み)のテスト
+'''
+import asyncio
+import threading
+import time
+import pytest
+from service.collect.ohlc_writer import OhlcWriter
+
+class FakeOhlcTable():
+    '''四本値テーブルの代わりに登録したデータを記録する'''
+    def __init__(self, fail_symbols = (), wait_event = None):
+        self.fail_symbols = set(fail_symbols)
+        self.wait_event = wait_event
+        self.batch_list = []
+        self.row_list = []
+
+    def upsert_many(self, batch):
+        if self.wait_event is not None:
+            self.wait_event.wait()
+        self.batch_list.append(list(batch))
+        if any(ohlc['symbol'] in self.fail_symbols for ohlc in batch):
+            return False, None
+        self.row_list.extend(batch)
+        return True, len(batch)
+
+    def upsert(self, ohlc):
+        if ohlc['symbol'] in self.fail_symbols:
+            return False, None
+        self.row_list.append(ohlc)
+        return True, 'insert'
+
+class FakeDb():
+    def __init__(self, ohlc):
+        self.ohlc = ohlc
+
+def create_ohlc(index, symbol = '1301'):
+    return {'symbol': symbol, 'trade_time': index, 'volume': index}
+
+def test_stop_drains_queue(log):
+    table = FakeOhlcTable()
+    writer = OhlcWriter(log, FakeDb(table), flush_size = 1000, flush_interval = 60)
+    writer.start()
+    for index in range(250):
+        writer.put(create_ohlc(index))
+
+    # 件数・時間に達していなくても終了時に残りを全て登録する
+    stats = writer.stop()
+    assert [ohlc['volume'] for ohlc in table.row_list] == list(range(250))
+    assert stats['write_count'] == 250 and stats['error_count'] == 0 and stats['queue_size'] == 0
+    assert writer.thread is None
+
+def test_flush_size(log):
+    table = FakeOhlcTable()
+    writer = OhlcWriter(log, FakeDb(table), flush_size = 100, flush_interval = 60)
+    writer.start()
+    for index in range(250):
+        writer.put(create_ohlc(index))
+    writer.stop()
+
+    assert [len(batch) for batch in table.batch_list] == [100, 100, 50]
+
+def test_flush_interval(log):
+    table = FakeOhlcTable()
+    writer = OhlcWriter(log, FakeDb(table), flush_size = 1000, flush_interval = 0.05)
+    writer.start()
+    writer.put(create_ohlc(0))
+
+    # 件数に達しなくても一定時間後に登録する
+    deadline = time.monotonic() + 5
+    while len(table.row_list) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(table.row_list) == 1
+    writer.stop()
+
+def test_put_copies_data(log):
+    table = FakeOhlcTable()
+    writer = OhlcWriter(log, FakeDb(table))
+    writer.start()
+    ohlc = create_ohlc(0)
+    writer.put(ohlc)
+    ohlc['volume'] = 999
+    writer.stop()
+
+    assert table.row_list[0]['volume'] == 0
+
+def test_failed_batch_is_retried_per_row(log):
+    table = FakeOhlcTable(fail_symbols = ['9999'])
+    writer = OhlcWriter(log, FakeDb(table), flush_size = 1000, flush_interval = 60)
+    writer.start()
+    for index in range(5):
+        writer.put(create_ohlc(index, '9999' if index == 2 else '1301'))
+    stats = writer.stop()
+
+    # 一括登録に失敗した場合は1件ずつ登録し直し、失敗したデータのみ除く
+    assert [ohlc['volume'] for ohlc in table.row_list] == [0, 1, 3, 4]
+    assert stats['write_count'] == 4 and stats['error_count'] == 1
+
+def test_full_queue_waits(log):
+    event = threading.Event()
+    table = FakeOhlcTable(wait_event = event)
+    writer = OhlcWriter(log, FakeDb(table), flush_size = 1, flush_interval = 60, queue_size = 2)
+    writer.start()
+
+    async def put_all():
+        # 登録が止まっている間もイベントループは動き続ける
+        task = asyncio.ensure_future(asyncio.gather(*[writer.put_async(create_ohlc(index)) for index in range(6)]))
+        while writer.get_stats()['queue_full_count'] == 0:
+            await asyncio.sleep(0.01)
+        event.set()
+        await task
+
+    asyncio.run(put_all())
+    stats = writer.stop()
+    assert stats['queue_full_count'] >= 1
+    assert sorted(ohlc['volume'] for ohlc in table.row_list) == list(range(6))
@@ -0,0 +1,71 @@
+'''
+MoldPastRecordの四本値CSVの分割読み込みのテスト
+'''
+import pandas as pd
+import pytest
+from service.preprocess.past_record_mold import MoldPastRecord
+from util.ohlc_generator import OhlcGenerator
+
+def write_ohlc_csv(log, csv_path, reverse_day):
+    '''
+    3銘柄×2日分の四本値CSVを出力する
+
+    Args:
+        csv_path(pathlib.Path): 出力先のパス
+        reverse_day(bool): 2日目の銘柄の並びを1日目と逆にして、同じ銘柄の行を連続させないか
+    '''
+    df = OhlcGenerator(log).generate([1301, 1332, 1333], '2024-01-04', 2)
+    df['day'] = df['timestamp'].astype(str).str[:10]
+
+    if reverse_day:
+        # 日付ごとに銘柄を並べる(1銘柄・1日分の行は連続するが、同じ銘柄の2日分は離れる)
+        first_day = df['day'].min()
+        df['order'] = df['stock_code'].where(df['day'] == first_day, -df['stock_code'])
+        df = df.sort_values(['day', 'order', 'timestamp'], kind = 'stable').drop(columns = 'order')
+        # 1日目の先頭銘柄の一部の行を末尾に移して、1銘柄・1日分の行を離す
+        head = df.iloc[:5]
+        df = pd.concat([df.iloc[5:], head])
+
+    df.drop(columns = 'day').to_csv(csv_path, index = False)
+
+def read_all(mold, csv_name):
+    df = pd.concat(mold.read_ohlc_chunks(csv_name), ignore_index = True)
+    return df.sort_values(['stock_code', 'timestamp'], ignore_index = True)
+
+@pytest.fixture
+def mold(tmp_path):
+    mold = MoldPastRecord()
+    mold.csv_dir_name = str(tmp_path)
+    return mold
+
+@pytest.mark.parametrize('reverse_day', [False, True])
+@pytest.mark.parametrize('read_chunk_rows', [7, 100, 1000])
+def test_chunked_read_matches_whole_file(log, mold, tmp_path, reverse_day, read_chunk_rows):
+    write_ohlc_csv(log, tmp_path / 'ohlc_202401.csv', reverse_day)
+
+    mold.set_read_chunk_rows(None)
+    expected = read_all(mold, 'ohlc_202401.csv')
+
+    mold.set_read_chunk_rows(read_chunk_rows)
+    actual = read_all(mold, 'ohlc_202401.csv')
+
+    pd.testing.assert_frame_equal(actual, expected)
+
+def test_chunk_keeps_stock_day_together(log, mold, tmp_path):
+    write_ohlc_csv(log, tmp_path / 'ohlc_202401.csv', True)
+    mold.set_read_chunk_rows(7)
+
+    # 連続していない行があっても1銘柄・1日分のデータが複数のチャンクに分かれない
+    key_list = []
+    for df in mold.read_ohlc_chunks('ohlc_202401.csv'):
+        key_list.extend(df[['stock_code', 'date']].drop_duplicates().itertuples(index = False, name = None))
+
+    assert len(key_list) == len(set(key_list)) == 6
+
+def test_is_contiguous_csv(log, mold, tmp_path):
+    write_ohlc_csv(log, tmp_path / 'sorted.csv', False)
+    write_ohlc_csv(log, tmp_path / 'unsorted.csv', True)
+    mold.set_read_chunk_rows(7)
+
+    assert mold.is_contiguous_csv(str(tmp_path / 'sorted.csv'))
+    assert not mold.is_contiguous_csv(str(tmp_path / 'unsorted.csv'))
@@ -0,0 +1,106 @@
+'''
+PipelineManifest(過去の四本値の取得・成形の進捗管理)のテスト
+'''
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import util.pipeline_manifest
+from util.pipeline_manifest import CLAIM_TIMEOUT_SECONDS, PipelineManifest
+
+@pytest.fixture
+def manifest(log, tmp_path):
+    manifest = PipelineManifest(log)
+    assert manifest.set_db_path(str(tmp_path / 'pipeline_manifest.db'))
+    return manifest
+
+class Clock():
+    '''time.timeの代わりに進めた時刻を返す'''
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+def test_mark_done(manifest):
+    assert manifest.mark_done([(1301, '2024-01-04'), ('1332', '2024-01-04')], 'collect')
+
+    # 証券コードは文字列で記録し、段階ごとに管理する
+    assert manifest.is_done('1301', '2024-01-04', 'collect')
+    assert not manifest.is_done(1301, '2024-01-04', 'merge')
+    assert manifest.get_done_set('collect') == {('1301', '2024-01-04'), ('1332', '2024-01-04')}
+    assert manifest.get_done_set('collect', 1332) == {('1332', '2024-01-04')}
+
+def test_claim(manifest):
+    assert manifest.claim(1301, '2024-01-04', 'merge', owner = 'a')
+
+    # 処理中の間は他のプロセスが取得できず、処理済にもならない
+    assert not manifest.claim(1301, '2024-01-04', 'merge', owner = 'b')
+    assert not manifest.is_done(1301, '2024-01-04', 'merge')
+
+    # 処理済にした後はどのプロセスも取得できない
+    assert manifest.mark_done([(1301, '2024-01-04')], 'merge', 'formatted_ohlc_20240104.csv')
+    assert not manifest.claim(1301, '2024-01-04', 'merge', owner = 'a')
+    assert manifest.get_done_set('merge') == {('1301', '2024-01-04')}
+
+def test_claim_once_at_the_same_time(manifest):
+    with ThreadPoolExecutor(max_workers = 8) as executor:
+        result_list = list(executor.map(lambda owner: manifest.claim(1301, '2024-01-04', 'merge', owner = str(owner)), range(8)))
+
+    assert result_list.count(True) == 1
+
+def test_stale_claim_is_reclaimed(manifest, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(util.pipeline_manifest, 'time', clock)
+    assert manifest.claim(1301, '2024-01-04', 'merge', owner = 'a')
+
+    clock.now += CLAIM_TIMEOUT_SECONDS - 1
+    assert not manifest.claim(1301, '2024-01-04', 'merge', owner = 'b')
+
+    # 一定時間更新されていない処理中の行は異常終了したとみなして取得し直せる
+    clock.now += 2
+    assert manifest.claim(1301, '2024-01-04', 'merge', owner = 'b')
+
+    # 取得し直された行は元のプロセスが解放しても削除されない
+    assert manifest.release([('1301', '2024-01-04')], 'merge', owner = 'a')
+    assert not manifest.claim(1301, '2024-01-04', 'merge', owner = 'c')
+
+def test_release(manifest):
+    assert manifest.claim(1301, '2024-01-04', 'merge', owner = 'a')
+    assert manifest.mark_done([(1332, '2024-01-04')], 'merge')
+
+    # 処理中の行のみ削除し、処理済の行は残す
+    assert manifest.release([(1301, '2024-01-04'), (1332, '2024-01-04')], 'merge', owner = 'a')
+    assert manifest.claim(1301, '2024-01-04', 'merge', owner = 'b')
+    assert manifest.is_done(1332, '2024-01-04', 'merge')
+
+def test_delete_before(manifest):
+    manifest.mark_done([(1301, '2024-01-04'), (1301, '2024-01-05'), (1301, '2024-01-09')], 'collect')
+    manifest.mark_done([(1301, '2024-01-04')], 'merge')
+
+    assert manifest.delete_before('collect', '2024-01-05') == (True, 1)
+    assert manifest.get_done_set('collect') == {('1301', '2024-01-05'), ('1301', '2024-01-09')}
+    assert manifest.get_done_set('merge') == {('1301', '2024-01-04')}
+
+def test_import_csv(log, tmp_path):
+    (tmp_path / 'recorded_ohlc.csv').write_text(
+        'formatted_tmp_ohlc_20240104_1301.csv,formatted_ohlc_20240104.csv\n'
+        'formatted_tmp_ohlc_20240104_1332.csv,formatted_ohlc_20240104.csv\n'
+        'formatted_tmp_ohlc_20240105_1301.csv,formatted_ohlc_20240105.csv\n'
+        'unknown.csv,formatted_ohlc_20240105.csv\n')
+    (tmp_path / 'check_past_ohlc.csv').write_text('stock_code,date\n1301,2024-01-04\n1332,2024-01-05\n')
+
+    # 新規に作成する場合は同じディレクトリのCSVの記録を取り込む
+    manifest = PipelineManifest(log)
+    assert manifest.set_db_path(str(tmp_path / 'pipeline_manifest.db'))
+
+    assert manifest.get_done_set('merge') == {('1301', '2024-01-04'), ('1332', '2024-01-04'), ('1301', '2024-01-05')}
+    assert manifest.get_done_set('collect') == {('1301', '2024-01-04'), ('1332', '2024-01-05')}
+
+    # 作成済のDBを開き直した場合は取り込まない
+    (tmp_path / 'check_past_ohlc.csv').write_text('stock_code,date\n1333,2024-01-09\n')
+    assert manifest.set_db_path(str(tmp_path / 'pipeline_manifest.db'))
+    assert manifest.get_done_set('collect') == {('1301', '2024-01-04'), ('1332', '2024-01-05')}
+
+def test_parse_file_name(manifest):
+    assert manifest.parse_file_name('formatted_tmp_ohlc_20240104_1301.parquet') == ('1301', '2024-01-04')
+    assert manifest.parse_file_name('formatted_ohlc_20240104.csv') is None
@@ -0,0 +1,66 @@
+'''
+PushDecoder(PUSH配信のメッセージの変換)のテスト
+'''
+import json
+from datetime import datetime, timedelta
+import pytest
+import util.push_decoder
+from util.push_decoder import PUSH_TIME_FORMAT, PushDecoder
+
+@pytest.fixture
+def decoder(log):
+    return PushDecoder(log)
+
+def test_parse_time_matches_strptime(decoder):
+    # 日付・タイムゾーンをまたいでも、同じ秒が続いてもdatetime.strptimeと同じ値になる
+    time_str_list = []
+    for date, timezone in [('2024-06-03', '+09:00'), ('2024-06-04', '+09:00'), ('2024-06-04', '+00:00'), ('2024-12-31', '-05:30')]:
+        base_time = datetime(2024, 1, 1, 8, 59, 58)
+        for seconds in range(0, 6 * 3600, 97):
+            time_str = f'{date}T{(base_time + timedelta(seconds = seconds)).strftime("%H:%M:%S")}{timezone}'
+            time_str_list.extend([time_str, time_str])
+
+    for time_str in time_str_list:
+        parsed_time = decoder.parse_time(time_str)
+        expected = datetime.strptime(time_str, PUSH_TIME_FORMAT)
+        assert parsed_time == expected and parsed_time.utcoffset() == expected.utcoffset(), time_str
+
+def test_parse_time_other_format(decoder):
+    # 形式が異なる場合(タイムゾーンにコロンがないなど)は通常の変換を行う
+    for time_str in ['2024-06-03T09:00:01+0900', '2024-06-03T09:00:01Z']:
+        assert decoder.parse_time(time_str) == datetime.strptime(time_str, PUSH_TIME_FORMAT)
+
+    # 通常の変換でも変換できない形式は同じくエラーになる
+    with pytest.raises(ValueError):
+        decoder.parse_time('2024-06-03T09:00:01.123+09:00')
+
+def test_parse_time_invalid(decoder):
+    with pytest.raises(ValueError):
+        decoder.parse_time('2024-06-03T25:00:00+09:00')
+
+def test_date_cache_is_bounded(decoder):
+    for day in range(1, 20):
+        decoder.parse_time(f'2024-06-{day:02d}T09:00:00+09:00')
+    assert len(decoder.date_cache) <= 8
+
+@pytest.mark.parametrize('orjson_available', [True, False])
+def test_decode(decoder, monkeypatch, orjson_available):
+    if orjson_available and not util.push_decoder.ORJSON_AVAILABLE:
+        pytest.skip('orjsonがインストールされていない')
+    monkeypatch.setattr(util.push_decoder, 'ORJSON_AVAILABLE', orjson_available)
+
+    message = json.dumps({'Symbol': '1301', 'CurrentPrice': 3000.5, 'TradingVolume': 12000, 'CurrentPriceTime': '2024-06-03T09:00:59+09:00',
+                          'BidPrice': 3000})
+    for data in [message, message.encode()]:
+        reception_data = decoder.decode(data)
+        assert reception_data == {'Symbol': '1301', 'CurrentPrice': 3000.5, 'TradingVolume': 12000,
+                                  'CurrentPriceTime': datetime.strptime('2024-06-03T09:00:59+09:00', PUSH_TIME_FORMAT),
+                                  'CurrentPriceMinute': datetime.strptime('2024-06-03T09:00:00+09:00', PUSH_TIME_FORMAT)}
+
+def test_decode_without_price_time(decoder):
+    # 現値データがない場合は日時・時分ともNone、メッセージにない項目もNone
+    reception_data = decoder.decode('{"Symbol": "1301", "CurrentPriceTime": null}')
+    assert reception_data == {'Symbol': '1301', 'CurrentPrice': None, 'TradingVolume': None, 'CurrentPriceTime': None, 'CurrentPriceMinute': None}
+
+def test_decode_field_list(decoder):
+    assert decoder.decode('{"Symbol": "1301", "BidPrice": 3000}', ['Symbol', 'BidPrice']) == {'Symbol': '1301', 'BidPrice': 3000}
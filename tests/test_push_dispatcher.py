@@ -0,0 +1,134 @@
+'''
+PushDispatcher(PUSH配信のメッセージの銘柄ごとの振り分け)のテスト
+'''
+import asyncio
+import random
+import pytest
+from service.collect.push_dispatcher import PushDispatcher
+
+class Recorder():
+    '''処理したメッセージを記録するハンドラ ※eventが設定されている場合はセットされるまで処理を止める'''
+    def __init__(self, event = None, delay = False):
+        self.event = event
+        self.delay = delay
+        self.processed_list = []
+        self.active_symbol_set = set()
+        self.overlap_count = 0
+        self.rng = random.Random(0)
+
+    async def __call__(self, reception_data):
+        symbol = reception_data['Symbol']
+        if symbol in self.active_symbol_set:
+            self.overlap_count += 1
+        self.active_symbol_set.add(symbol)
+        try:
+            if self.event is not None:
+                await self.event.wait()
+            if self.delay:
+                await asyncio.sleep(self.rng.random() / 1000)
+            if reception_data.get('error'):
+                raise RuntimeError('handler error')
+            self.processed_list.append((symbol, reception_data['index']))
+        finally:
+            self.active_symbol_set.discard(symbol)
+
+def create_message(symbol, index, error = False):
+    return {'Symbol': symbol, 'index': index, 'error': error}
+
+def test_invalid_overflow_policy(log):
+    with pytest.raises(ValueError):
+        PushDispatcher(log, Recorder(), overflow_policy = 'unknown')
+
+def test_order_per_symbol(log):
+    async def run():
+        recorder = Recorder(delay = True)
+        dispatcher = PushDispatcher(log, recorder, worker_count = 4, queue_size = 1000)
+        dispatcher.start()
+        for index in range(200):
+            for symbol in ['1301', '1332', '1333', '1334', '1335']:
+                await dispatcher.put(symbol, create_message(symbol, index))
+        return recorder, await dispatcher.stop()
+
+    recorder, stats = asyncio.run(run())
+
+    # 銘柄ごとに受信した順で処理し、同じ銘柄を同時に処理しない
+    for symbol in ['1301', '1332', '1333', '1334', '1335']:
+        assert [index for item_symbol, index in recorder.processed_list if item_symbol == symbol] == list(range(200))
+    assert recorder.overlap_count == 0
+    assert stats['processed_count'] == 1000 and stats['pending_count'] == 0 and stats['symbol_count'] == 5
+
+def test_handler_error_does_not_stop(log):
+    async def run():
+        recorder = Recorder()
+        dispatcher = PushDispatcher(log, recorder, worker_count = 2)
+        dispatcher.start()
+        for index in range(5):
+            await dispatcher.put('1301', create_message('1301', index, error = index == 2))
+        return recorder, await dispatcher.stop()
+
+    recorder, stats = asyncio.run(run())
+    assert recorder.processed_list == [('1301', 0), ('1301', 1), ('1301', 3), ('1301', 4)]
+    assert stats['processed_count'] == 4 and stats['error_count'] == 1
+
+async def fill_queue(dispatcher, recorder):
+    '''1件目を処理中にして止め、銘柄のキューを上限(2件)まで埋める'''
+    dispatcher.start()
+    await dispatcher.put('1301', create_message('1301', 0))
+    while '1301' not in recorder.active_symbol_set:
+        await asyncio.sleep(0)
+    await dispatcher.put('1301', create_message('1301', 1))
+    await dispatcher.put('1301', create_message('1301', 2))
+
+def test_block_policy(log):
+    async def run():
+        event = asyncio.Event()
+        recorder = Recorder(event)
+        dispatcher = PushDispatcher(log, recorder, worker_count = 1, queue_size = 2, overflow_policy = 'block')
+        await fill_queue(dispatcher, recorder)
+
+        # 上限に達した場合は空くまで待つ
+        put_task = asyncio.ensure_future(dispatcher.put('1301', create_message('1301', 3)))
+        await asyncio.sleep(0.01)
+        assert not put_task.done()
+
+        event.set()
+        await put_task
+        return recorder, await dispatcher.stop()
+
+    recorder, stats = asyncio.run(run())
+    assert recorder.processed_list == [('1301', index) for index in range(4)]
+    assert stats['blocked_count'] == 1 and stats['max_pending_count'] == 2
+
+def test_conflate_policy(log):
+    async def run():
+        event = asyncio.Event()
+        recorder = Recorder(event)
+        dispatcher = PushDispatcher(log, recorder, worker_count = 1, queue_size = 2, overflow_policy = 'conflate')
+        await fill_queue(dispatcher, recorder)
+
+        # 上限に達した場合は未処理のメッセージを捨てて最新のメッセージのみにする
+        await dispatcher.put('1301', create_message('1301', 3))
+        event.set()
+        return recorder, await dispatcher.stop()
+
+    recorder, stats = asyncio.run(run())
+    assert recorder.processed_list == [('1301', 0), ('1301', 3)]
+    assert stats['conflated_count'] == 2 and stats['pending_count'] == 0
+
+def test_drop_policy(log):
+    async def run():
+        event = asyncio.Event()
+        recorder = Recorder(event)
+        dispatcher = PushDispatcher(log, recorder, worker_count = 1, queue_size = 2, overflow_policy = 'drop')
+        await fill_queue(dispatcher, recorder)
+
+        # 上限に達した場合は追加するメッセージを捨てる(他の銘柄は影響を受けない)
+        await dispatcher.put('1301', create_message('1301', 3))
+        await dispatcher.put('1332', create_message('1332', 0))
+        event.set()
+        return recorder, await dispatcher.stop()
+
+    recorder, stats = asyncio.run(run())
+    assert [item for item in recorder.processed_list if item[0] == '1301'] == [('1301', 0), ('1301', 1), ('1301', 2)]
+    assert ('1332', 0) in recorder.processed_list
+    assert stats['dropped_count'] == 1 and stats['pending_count'] == 0
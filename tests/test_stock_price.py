@@ -0,0 +1,64 @@
+'''
+StockPrice.get_tick_index(価格のティック数の一括計算)のテスト
+'''
+import numpy as np
+import pytest
+from util.stock_price import PRICE_RANGE_LIST, StockPrice
+
+# 呼値グループごとに、呼値の区切りをまたぐ価格帯 (下限, 上限)
+# ※get_empty_boardは小数第1位で丸めるため、呼値が0.25・0.05のグループは比較できない
+PRICE_BAND_LIST = {
+    10000: [(1, 60), (2900, 3200), (4900, 5200), (29500, 30500), (49000, 51000)],
+    10003: [(990, 1010), (2990, 3010), (9990, 10010), (29900, 30100)],
+    10318: [(1, 130), (950, 1100)],
+}
+
+@pytest.fixture
+def stock_price(log):
+    return StockPrice(log)
+
+def get_price_list(stock_price, yobine_group, lower_price, upper_price):
+    '''下限から上限までの呼値の刻みの価格'''
+    result, _ = stock_price.set_yobine_list(lower_price, upper_price, yobine_group)
+    assert result
+    return stock_price.yobine_list
+
+@pytest.mark.parametrize('yobine_group, lower_price, upper_price',
+                         [(yobine_group, lower_price, upper_price) for yobine_group, band_list in PRICE_BAND_LIST.items() for lower_price, upper_price in band_list])
+def test_tick_index_matches_empty_board(stock_price, yobine_group, lower_price, upper_price):
+    price_list = get_price_list(stock_price, yobine_group, lower_price, upper_price)
+    tick_index = stock_price.get_tick_index(yobine_group, np.array(price_list))
+
+    # 2つの価格のティック数の差 - 1 が価格間の板の枚数と一致する
+    for i in range(0, len(price_list), max(1, len(price_list) // 40)):
+        for j in range(i + 1, min(i + 25, len(price_list))):
+            result, board_num = stock_price.get_empty_board(yobine_group, price_list[j], price_list[i])
+            assert result
+            assert tick_index[j] - tick_index[i] - 1 == board_num, (price_list[i], price_list[j])
+
+def test_tick_index_is_consecutive(stock_price):
+    # 呼値の刻みの価格は区切りをまたいでも1ティックずつ増える
+    for yobine_group, band_list in PRICE_BAND_LIST.items():
+        for lower_price, upper_price in band_list:
+            tick_index = stock_price.get_tick_index(yobine_group, np.array(get_price_list(stock_price, yobine_group, lower_price, upper_price)))
+            assert np.all(np.diff(tick_index) == 1), (yobine_group, lower_price)
+
+@pytest.mark.parametrize('yobine_group, tick', [(10706, 0.25), (14515, 0.05)])
+def test_tick_index_decimal_tick(stock_price, yobine_group, tick):
+    # 呼値が小数第2位まであるグループも1ティックずつ増える
+    tick_index = stock_price.get_tick_index(yobine_group, np.round(np.arange(400) * tick + 1000, 2))
+    assert np.all(np.diff(tick_index) == 1)
+
+def test_tick_index_same_price(stock_price):
+    # 同じ価格の場合はget_empty_boardと同じく-1になる
+    tick_index = stock_price.get_tick_index(10000, np.array([3000.0, 3000.0]))
+    assert tick_index[1] - tick_index[0] - 1 == stock_price.get_empty_board(10000, 3000.0, 3000.0)[1] == -1
+
+def test_tick_index_nan(stock_price):
+    tick_index = stock_price.get_tick_index('10000', np.array([np.nan, 2999.0, 3005.0]))
+    assert np.isnan(tick_index[0])
+    assert tick_index[2] - tick_index[1] == 2
+
+def test_tick_index_unknown_group(stock_price):
+    assert 99999 not in PRICE_RANGE_LIST
+    assert stock_price.get_tick_index(99999, np.array([1000.0])) is False